@@ -6,4 +6,34 @@ __all__ = [
     "comparativo",
     "graficos",
     "utils",
+    "explorador",
+    "exportacion",
+    "indice_filtros",
+    "incidentes",
+    "feriados",
+    "patrones_temporales",
+    "prediccion_ml",
+    "registro_modelos",
+    "entrenamiento_background",
+    "tabla_predicciones",
+    "modelos_provincia",
+    "frecuencias_calles",
+    "evaluacion_modelos",
+    "barrido_modelos",
+    "actualizacion_incremental",
+    "almacen_features",
+    "calles",
+    "buscador_calles",
+    "pronosticos",
+    "indice_opciones",
+    "bloqueo_archivos",
+    "secuencia_ids",
+    "diario",
+    "importacion_masiva",
+    "columnas_crecientes",
+    "cambios",
+    "vistas",
+    "precalentamiento",
+    "calculos",
+    "instrumentacion",
 ]
@@ -0,0 +1,232 @@
+"""
+Actualización incremental del modelo de calles con los incidentes registrados desde la app.
+- Cada alta con calle y hora (formulario o importación, ver app.cambios) se agrega a
+  modelos/incremental/registros.jsonl (solo se agrega)
+- Cada modelo derivado recuerda cuántos registros del log ya incorporó; los pendientes se aplican
+  en lote cuando hay al menos LOTE_REGISTROS o el más antiguo espera más de INTERVALO_S segundos
+- Frecuencias: se suman los conteos (equivale a reentrenar con todos los registros)
+- Por provincia: se reajusta solo el fragmento de las provincias con registros nuevos
+- Bosque global: no admite actualización; los registros entran en el próximo entrenamiento completo
+El modelo actualizado se guarda en el registro con un id nuevo, apuntado desde el modelo raíz
+(el entrenado con la versión de datos), así la resolución del modelo a servir no cambia.
+"""
+
+import os
+import json
+import time
+import hashlib
+import pandas as pd
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.bloqueo_archivos import bloqueo_exclusivo
+from app.registro_modelos import MODELOS_DIR, enlazar_artefacto, guardar_artefacto
+from app.modelos_provincia import COLUMNA_PROVINCIA, ModeloPorProvincia, nombre_fragmento, unir_valores
+from app.tabla_predicciones import valores_del_modelo
+
+INCREMENTAL_DIR = os.path.join(MODELOS_DIR, "incremental")
+ARCHIVO_REGISTROS = "registros.jsonl"
+
+# Un lote se aplica con este número de registros pendientes o cuando el más antiguo espera este tiempo
+LOTE_REGISTROS = 20
+INTERVALO_S = 300
+
+COLUMNAS_REGISTRO = ['id_hecho', 'provincia_nombre', 'tipo_lugar', 'mes', 'fecha_hecho', 'hora_hecho', 'calle_nombre', 'registrado']
+
+
+def ruta_registros(directorio: str = INCREMENTAL_DIR) -> str:
+    return os.path.join(directorio, ARCHIVO_REGISTROS)
+
+
+def _termina_a_mitad(ruta: str) -> bool:
+    try:
+        with open(ruta, "rb") as archivo:
+            archivo.seek(0, os.SEEK_END)
+            if archivo.tell() == 0:
+                return False
+            archivo.seek(-1, os.SEEK_END)
+            return archivo.read(1) != b"\n"
+    except OSError:
+        return False
+
+
+def agregar_registros(filas: pd.DataFrame, directorio: str = INCREMENTAL_DIR) -> int:
+    """
+    Agrega al log los incidentes con calle, fecha y hora válidas (fecha en ISO, hora HH:MM:SS).
+    Recibe filas preparadas por app.data_loader.preparar_datos (usa 'fecha' y 'hora');
+    devuelve cuántos registros agregó. Un registro por incidente (la primera fila de cada id_hecho).
+    """
+    filas = filas.drop_duplicates('id_hecho')
+    calles = filas['calle_nombre'].astype('string').str.strip()
+    validas = filas['fecha'].notna() & filas['hora'].notna() & calles.fillna('').ne('')
+    if not validas.any():
+        return 0
+    os.makedirs(directorio, exist_ok=True)
+    fechas = filas.loc[validas, 'fecha']
+    registros = pd.DataFrame({
+        'id_hecho': filas.loc[validas, 'id_hecho'].astype(str),
+        'provincia_nombre': filas.loc[validas, 'provincia_nombre'],
+        'tipo_lugar': filas.loc[validas, 'tipo_lugar'],
+        'mes': fechas.dt.month,
+        'fecha_hecho': fechas.dt.strftime('%Y-%m-%d'),
+        'hora_hecho': filas.loc[validas, 'hora_hecho'].astype(str),
+        'calle_nombre': calles[validas],
+        'registrado': time.time(),
+    }, columns=COLUMNAS_REGISTRO)
+    datos = registros.to_json(orient='records', lines=True, force_ascii=False).encode("utf-8")
+    if not datos.endswith(b"\n"):
+        datos += b"\n"
+    ruta = ruta_registros(directorio)
+    # Sesiones y procesos agregan al mismo log: cada lote entra entero, bajo el bloqueo y con O_APPEND
+    with bloqueo_exclusivo(f"{ruta}.lock"):
+        if _termina_a_mitad(ruta):
+            # Un escritor se cortó a mitad de línea: esa línea queda sola (y se saltea al leer)
+            datos = b"\n" + datos
+        descriptor = os.open(ruta, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+        try:
+            pendiente = memoryview(datos)
+            while pendiente:
+                pendiente = pendiente[os.write(descriptor, pendiente):]
+        finally:
+            os.close(descriptor)
+    return len(registros)
+
+
+def leer_registros(directorio: str = INCREMENTAL_DIR) -> pd.DataFrame:
+    """
+    Todos los registros del log, en orden de llegada. Una última línea sin fin de línea es una
+    escritura en curso y se ignora; una línea completa que no es JSON válido se saltea.
+    """
+    filas = []
+    try:
+        with open(ruta_registros(directorio), encoding="utf-8") as archivo:
+            for linea in archivo:
+                if not linea.endswith("\n"):
+                    break
+                try:
+                    filas.append(json.loads(linea))
+                except json.JSONDecodeError:
+                    continue
+    except OSError:
+        pass
+    return pd.DataFrame(filas, columns=COLUMNAS_REGISTRO)
+
+
+def sin_datos_base(registros: pd.DataFrame, ids_base: pd.Index) -> pd.DataFrame:
+    """Registros que todavía no están en los datos con los que se entrenó el modelo raíz."""
+    return registros[~registros['id_hecho'].astype(str).isin(ids_base)]
+
+
+def lote_listo(
+    pendientes: pd.DataFrame,
+    ahora: Optional[float] = None,
+    lote: int = LOTE_REGISTROS,
+    intervalo_s: float = INTERVALO_S
+) -> bool:
+    """True si hay un lote completo o si el registro pendiente más antiguo ya esperó intervalo_s."""
+    if pendientes.empty:
+        return False
+    ahora = time.time() if ahora is None else ahora
+    return len(pendientes) >= lote or ahora - pendientes['registrado'].min() >= intervalo_s
+
+
+def admite_actualizacion(hiperparametros: Dict[str, Any]) -> bool:
+    """Motores y modos con actualización incremental: frecuencias (sumando conteos) y por provincia."""
+    return hiperparametros.get('motor') == 'frecuencias' or hiperparametros.get('modo') == 'provincias'
+
+
+def id_derivado(id_raiz: str, aplicados: int) -> str:
+    """Id del modelo raíz actualizado con los primeros `aplicados` registros del log."""
+    return hashlib.sha1(f"{id_raiz}+{aplicados}".encode("utf-8")).hexdigest()[:16]
+
+
+def _ruta_derivado(id_raiz: str, directorio: str) -> str:
+    return os.path.join(directorio, f"{id_raiz}.json")
+
+
+def leer_derivado(id_raiz: str, directorio: str = INCREMENTAL_DIR) -> Optional[Dict[str, Any]]:
+    """Último modelo derivado del raíz: {'id': ..., 'aplicados': n} o None."""
+    try:
+        with open(_ruta_derivado(id_raiz, directorio), encoding="utf-8") as archivo:
+            return json.load(archivo)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def escribir_derivado(id_raiz: str, id_modelo: str, aplicados: int, directorio: str = INCREMENTAL_DIR):
+    os.makedirs(directorio, exist_ok=True)
+    ruta = _ruta_derivado(id_raiz, directorio)
+    with open(f"{ruta}.tmp", "w", encoding="utf-8") as archivo:
+        json.dump({'id': id_modelo, 'aplicados': aplicados}, archivo)
+    os.replace(f"{ruta}.tmp", ruta)
+
+
+def _actualizar_por_provincia(
+    modelo: ModeloPorProvincia,
+    id_nuevo: str,
+    X_lote: pd.DataFrame,
+    y_lote: pd.Series,
+    X_acumulado: pd.DataFrame,
+    y_acumulado: pd.Series,
+    X_base: pd.DataFrame,
+    y_base: pd.Series,
+    construir: Callable[..., Any],
+    hiperparametros: Dict[str, Any]
+) -> Tuple[ModeloPorProvincia, List[str]]:
+    """
+    Reajusta solo los fragmentos de las provincias con registros en el lote; el resto se
+    enlaza desde la carpeta del modelo anterior sin cargarse ni reescribirse.
+    - fragmentos con actualizar (frecuencias): suman los conteos del lote
+    - los demás (bosque): se reentrenan con los datos base de la provincia más todos los registros acumulados
+    """
+    provincias = sorted(X_lote[COLUMNA_PROVINCIA].unique())
+    archivos = dict(modelo.fragmentos)
+    nuevos = {}
+    for provincia in provincias:
+        actual = modelo.fragmento(provincia)
+        if actual is not None and hasattr(actual, 'actualizar'):
+            filas = (X_lote[COLUMNA_PROVINCIA] == provincia).to_numpy()
+            nuevos[provincia] = actual.actualizar(X_lote[filas], y_lote[filas])
+        else:
+            base = (X_base[COLUMNA_PROVINCIA] == provincia).to_numpy()
+            acumuladas = (X_acumulado[COLUMNA_PROVINCIA] == provincia).to_numpy()
+            X = pd.concat([X_base[base], X_acumulado[acumuladas]])
+            y = pd.concat([y_base[base], y_acumulado[acumuladas]])
+            nuevos[provincia] = construir(hiperparametros, n_jobs=1).fit(X, y)
+        archivos[provincia] = nombre_fragmento(provincia)
+
+    for provincia, archivo in archivos.items():
+        if provincia in nuevos:
+            guardar_artefacto(id_nuevo, archivo, nuevos[provincia])
+        else:
+            enlazar_artefacto(modelo.id_modelo, id_nuevo, archivo)
+
+    valores = unir_valores(nuevos, valores_del_modelo, base=modelo.valores)
+    clases = sorted({*(str(c) for c in modelo.classes_), *(str(c) for m in nuevos.values() for c in m.classes_)})
+
+    actualizado = ModeloPorProvincia(id_nuevo, archivos, clases, valores)
+    actualizado._cargados.update(nuevos)
+    return actualizado, provincias
+
+
+def actualizar_modelo(
+    modelo: Any,
+    id_nuevo: str,
+    X_lote: pd.DataFrame,
+    y_lote: pd.Series,
+    X_acumulado: pd.DataFrame,
+    y_acumulado: pd.Series,
+    X_base: pd.DataFrame,
+    y_base: pd.Series,
+    construir: Callable[..., Any],
+    hiperparametros: Dict[str, Any]
+) -> Tuple[Any, List[str]]:
+    """
+    Incorpora el lote al modelo; devuelve (modelo actualizado, provincias afectadas).
+    Lanza ValueError si el modelo no admite actualización incremental.
+    """
+    if isinstance(modelo, ModeloPorProvincia):
+        return _actualizar_por_provincia(
+            modelo, id_nuevo, X_lote, y_lote, X_acumulado, y_acumulado, X_base, y_base, construir, hiperparametros
+        )
+    if hasattr(modelo, 'actualizar'):
+        return modelo.actualizar(X_lote, y_lote), sorted(X_lote[COLUMNA_PROVINCIA].unique())
+    raise ValueError("El modelo no admite actualización incremental; se necesita un entrenamiento completo")
@@ -0,0 +1,149 @@
+"""
+Almacén de features del modelo de calles.
+Las features se derivan una sola vez y siguen las altas en vivo, en un conjunto compacto de columnas
+categóricas (códigos enteros + categorías) alineado con el índice del DataFrame base:
+- provincia_nombre, tipo_lugar: códigos de los valores originales
+- mes: 1-12
+- zona_horaria: franja de la hora del hecho (Madrugada, Mañana, Tarde, Noche)
+- dia_semana: nombre del día (Monday ... Sunday), como lo conocen los modelos registrados
+- calle_nombre: la calle tal cual está en los datos
+- calle_clave: clave canónica de la calle (app.calles: acentos, abreviaturas, variantes casi iguales)
+- calle: nombre visible de la clave canónica, objetivo del modelo
+Hora y día salen de las columnas que el cargador ya parseó con formatos explícitos.
+Entrenamiento e inferencia seleccionan columnas de aquí sin copiar el DataFrame base.
+"""
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+from typing import Dict, List, Tuple
+from app.cambios import Cambio, CacheIncremental
+from app.data_loader import FORMATOS_FECHA, FORMATOS_HORA, parsear_con_formatos
+from app.calles import canonizar, nombre_visible, normalizar_calle
+
+ZONAS_HORARIAS = ['Madrugada', 'Mañana', 'Tarde', 'Noche']
+# Franja de cada hora 0-23: [0, 6) madrugada, [6, 12) mañana, [12, 19) tarde, [19, 24) noche
+ZONA_POR_HORA = np.repeat(np.arange(len(ZONAS_HORARIAS), dtype=np.int8), [6, 6, 7, 5])
+
+DIAS_SEMANA = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+MESES = list(range(1, 13))
+
+COLUMNAS_CATEGORICAS = ('provincia_nombre', 'tipo_lugar', 'calle_nombre')
+
+
+def _codigos_enteros(valores: np.ndarray, minimo: int, maximo: int) -> np.ndarray:
+    """Código 0..(maximo-minimo) de cada valor numérico; -1 si falta o está fuera de rango."""
+    validos = np.isfinite(valores) & (valores >= minimo) & (valores <= maximo)
+    return np.where(validos, np.nan_to_num(valores) - minimo, -1).astype(np.int8)
+
+
+def _temporales(df: pd.DataFrame) -> Dict[str, pd.Categorical]:
+    """mes, zona_horaria y dia_semana (categorías fijas) de cada fila de df."""
+    if 'hora' in df.columns:
+        hora = df['hora'].to_numpy(dtype=float)
+    else:
+        hora = parsear_con_formatos(df['hora_hecho'], FORMATOS_HORA).dt.hour.to_numpy(dtype=float)
+    if 'dia_semana' in df.columns and pd.api.types.is_numeric_dtype(df['dia_semana']):
+        dia = df['dia_semana'].to_numpy(dtype=float)
+    else:
+        dia = parsear_con_formatos(df['fecha_hecho'], FORMATOS_FECHA).dt.dayofweek.to_numpy(dtype=float)
+
+    codigo_hora = _codigos_enteros(hora, 0, 23)
+    zona = np.where(codigo_hora >= 0, ZONA_POR_HORA[np.maximum(codigo_hora, 0)], -1)
+
+    return {
+        'mes': pd.Categorical.from_codes(_codigos_enteros(pd.to_numeric(df['mes'], errors='coerce').to_numpy(dtype=float), 1, 12), MESES),
+        'zona_horaria': pd.Categorical.from_codes(zona, ZONAS_HORARIAS),
+        'dia_semana': pd.Categorical.from_codes(_codigos_enteros(dia, 0, 6), DIAS_SEMANA),
+    }
+
+
+def _categorica(df: pd.DataFrame, columna: str) -> pd.Categorical:
+    return pd.Categorical(df[columna]) if columna in df.columns else pd.Categorical([None] * len(df))
+
+
+def construir_features(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Deriva las features del modelo a partir de df sin modificarlo ni copiarlo.
+    Usa las columnas hora / dia_semana del cargador si existen; si no (p. ej. registros
+    sueltos), parsea hora_hecho y fecha_hecho con los formatos explícitos del cargador.
+    """
+    columnas = _temporales(df)
+    for columna in COLUMNAS_CATEGORICAS:
+        columnas[columna] = _categorica(df, columna)
+
+    # La clave canónica se calcula sobre las categorías (calles distintas), no sobre cada fila
+    calles = columnas['calle_nombre']
+    frecuencias = np.bincount(calles.codes[calles.codes >= 0], minlength=len(calles.categories))
+    posiciones, claves = canonizar(list(calles.categories), frecuencias)
+    codigos = np.where(calles.codes >= 0, posiciones[np.maximum(calles.codes, 0)] if len(posiciones) else -1, -1)
+    columnas['calle_clave'] = pd.Categorical.from_codes(codigos, claves)
+    columnas['calle'] = pd.Categorical.from_codes(codigos, [nombre_visible(clave) for clave in claves])
+
+    return pd.DataFrame(columnas, index=df.index)
+
+
+def _claves_de(features: pd.DataFrame, nombres: pd.Index) -> Tuple[np.ndarray, List[str]]:
+    """
+    Código de clave canónica de cada nombre de calle nuevo, según las claves de features:
+    - un nombre que normaliza a una clave existente toma esa clave
+    - un nombre que ya estaba (una variante unida a otra clave) toma la clave de sus filas
+    - el resto son claves nuevas, que se devuelven para sumarlas al final; la deduplicación
+      difusa contra las existentes se hace en la próxima construcción completa
+    """
+    claves = features['calle_clave'].cat.categories
+    normalizadas = [normalizar_calle(nombre) for nombre in nombres]
+    codigos = claves.get_indexer(normalizadas)
+
+    anteriores = features['calle_nombre'].array
+    existentes = np.where(codigos < 0, anteriores.categories.get_indexer(nombres), -1)
+    if (existentes >= 0).any():
+        filas = np.flatnonzero(np.isin(anteriores.codes, existentes[existentes >= 0]))
+        vistos, primera = np.unique(anteriores.codes[filas], return_index=True)
+        clave_de = dict(zip(vistos, features['calle_clave'].cat.codes.to_numpy()[filas[primera]]))
+        codigos = np.where(existentes >= 0, [clave_de.get(e, -1) for e in existentes], codigos)
+
+    nuevas: List[str] = []
+    for i, normalizada in enumerate(normalizadas):
+        if codigos[i] >= 0 or normalizada == '':
+            continue
+        if normalizada not in nuevas:
+            nuevas.append(normalizada)
+        codigos[i] = len(claves) + nuevas.index(normalizada)
+    return codigos, nuevas
+
+
+def _agregar_features(features: pd.DataFrame, cambio: Cambio) -> pd.DataFrame:
+    """
+    Features de la versión nueva: las de las filas nuevas sumadas al final, sin recalcular las
+    existentes. Las categorías de provincia_nombre, tipo_lugar y calle_nombre siguen ordenadas
+    (como en construir_features); las claves canónicas nuevas van al final.
+    """
+    filas = cambio.filas
+    columnas = {}
+    for nombre, nuevas in _temporales(filas).items():
+        columnas[nombre] = union_categoricals([features[nombre].array, nuevas])
+    for columna in COLUMNAS_CATEGORICAS:
+        columnas[columna] = union_categoricals([features[columna].array, _categorica(filas, columna)], sort_categories=True)
+
+    calles = _categorica(filas, 'calle_nombre')
+    claves_nombres, claves_nuevas = _claves_de(features, calles.categories)
+    codigos = np.where(calles.codes >= 0, claves_nombres[np.maximum(calles.codes, 0)] if len(claves_nombres) else -1, -1)
+    codigos = np.concatenate([features['calle_clave'].cat.codes.to_numpy(), codigos])
+    claves = list(features['calle_clave'].cat.categories) + claves_nuevas
+    nombres = list(features['calle'].cat.categories) + [nombre_visible(clave) for clave in claves_nuevas]
+    columnas['calle_clave'] = pd.Categorical.from_codes(codigos, claves)
+    columnas['calle'] = pd.Categorical.from_codes(codigos, nombres)
+
+    return pd.DataFrame(columnas, index=cambio.datos.index)
+
+
+_features = CacheIncremental(construir_features, _agregar_features, max_entradas=2)
+
+
+def features_de(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Almacén de features del DataFrame devuelto por cargar_datos (solo lectura): se calcula una
+    vez y sigue las altas en vivo (app.cambios) sumando solo las filas nuevas.
+    """
+    return _features.obtener(df)
@@ -0,0 +1,343 @@
+"""
+Barrido de motores e hiperparámetros del modelo de calles y panel de calidad.
+- Cada configuración se entrena y evalúa (app.evaluacion_modelos) en un pool de procesos
+- Presupuesto de tiempo por configuración (el bosque se corta entre bloques de árboles)
+  y total (las configuraciones pendientes se cancelan)
+- El reporte se guarda en modelos/reportes/ como JSON, con el frente de Pareto
+  entre precisión top-5, tiempo de ajuste y latencia
+"""
+
+import os
+import json
+import time
+import itertools
+import multiprocessing
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+from concurrent.futures import ProcessPoolExecutor, TimeoutError, as_completed
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sklearn.pipeline import Pipeline
+from app.data_loader import datos_base, version_datos
+from app.entrenamiento_background import informar_progreso
+from app.evaluacion_modelos import evaluar
+from app.registro_modelos import MODELOS_DIR, listar_modelos
+from app.prediccion_ml import (
+    HIPERPARAMETROS, HIPERPARAMETROS_FRECUENCIAS, _ajustar_con_progreso, _datos_entrenamiento,
+    _dividir, construir_estimador, obtener_programador
+)
+
+REPORTES_DIR = os.path.join(MODELOS_DIR, "reportes")
+PRESUPUESTO_CONFIGURACION_S = 60
+PRESUPUESTO_TOTAL_S = 600
+
+# Valores a combinar por motor (se suman a los hiperparámetros por defecto de cada uno)
+GRILLA_BOSQUE = {
+    'n_estimators': [25, 100],
+    'max_depth': [None, 20],
+    'codificador': ['onehot', 'ordinal'],
+    'min_incidentes_calle': [10, 20],
+}
+GRILLA_FRECUENCIAS = {
+    'alpha': [0.25, 1.0, 4.0],
+    'min_incidentes_calle': [5, 10, 20],
+}
+
+
+class PresupuestoAgotado(Exception):
+    """La configuración superó su presupuesto de tiempo."""
+
+
+def configuraciones_barrido(
+    grilla_bosque: Dict[str, List[Any]] = GRILLA_BOSQUE,
+    grilla_frecuencias: Dict[str, List[Any]] = GRILLA_FRECUENCIAS
+) -> List[Dict[str, Any]]:
+    """Producto cartesiano de cada grilla sobre los hiperparámetros por defecto de su motor."""
+    configuraciones = []
+    for base, grilla in ((HIPERPARAMETROS, grilla_bosque), (HIPERPARAMETROS_FRECUENCIAS, grilla_frecuencias)):
+        claves = list(grilla)
+        for valores in itertools.product(*(grilla[c] for c in claves)):
+            configuraciones.append({**base, **dict(zip(claves, valores))})
+    return configuraciones
+
+
+def _evaluar_configuracion(hiperparametros: Dict[str, Any], X: pd.DataFrame, y: pd.Series, presupuesto_s: float) -> Dict[str, Any]:
+    """Tarea del pool: entrena y evalúa una configuración dentro de su presupuesto de tiempo."""
+    X_train, X_test, y_train, y_test = _dividir(X, y, hiperparametros)
+    modelo = construir_estimador(hiperparametros, n_jobs=1)  # el paralelismo está en el pool
+
+    inicio = time.perf_counter()
+
+    def controlar_presupuesto(etapa: str, avance: float):
+        if time.perf_counter() - inicio > presupuesto_s:
+            raise PresupuestoAgotado(etapa)
+
+    resultado = {'hiperparametros': hiperparametros, 'n_entrenamiento': len(X_train), 'n_prueba': len(X_test)}
+    try:
+        if isinstance(modelo, Pipeline):
+            _ajustar_con_progreso(modelo, X_train, y_train, controlar_presupuesto)
+        else:
+            modelo.fit(X_train, y_train)
+    except PresupuestoAgotado:
+        return {**resultado, 'estado': 'tiempo_agotado', 'segundos_ajuste': time.perf_counter() - inicio}
+
+    return {
+        **resultado,
+        'estado': 'ok',
+        'segundos_ajuste': time.perf_counter() - inicio,
+        'clases': len(modelo.classes_),
+        **evaluar(modelo, X_test, y_test),
+    }
+
+
+def frente_pareto(resultados: List[Dict[str, Any]]) -> List[int]:
+    """Índices de los resultados no dominados en (top5 mayor, segundos_ajuste y latencia_fila_ms menores)."""
+    validos = [(i, r) for i, r in enumerate(resultados) if r.get('estado') == 'ok']
+
+    def domina(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+        mejor_o_igual = (a['top5'] >= b['top5'] and a['segundos_ajuste'] <= b['segundos_ajuste']
+                         and a['latencia_fila_ms'] <= b['latencia_fila_ms'])
+        estricto = (a['top5'] > b['top5'] or a['segundos_ajuste'] < b['segundos_ajuste']
+                    or a['latencia_fila_ms'] < b['latencia_fila_ms'])
+        return mejor_o_igual and estricto
+
+    return [i for i, r in validos if not any(domina(otro, r) for j, otro in validos if j != i)]
+
+
+def _costo_estimado(hiperparametros: Dict[str, Any]) -> Tuple[int, int]:
+    """Orden aproximado de costo: frecuencias, luego bosques por cantidad de árboles."""
+    if hiperparametros.get('motor') == 'frecuencias':
+        return (0, 0)
+    return (1, hiperparametros.get('n_estimators', 0) * (2 if hiperparametros.get('codificador', 'onehot') == 'onehot' else 1))
+
+
+def ejecutar_barrido(
+    datos: Dict[int, Tuple[pd.DataFrame, pd.Series]],
+    configuraciones: List[Dict[str, Any]],
+    max_procesos: Optional[int] = None,
+    presupuesto_configuracion_s: float = PRESUPUESTO_CONFIGURACION_S,
+    presupuesto_total_s: float = PRESUPUESTO_TOTAL_S,
+    progreso: Optional[Callable[[float], None]] = None
+) -> Dict[str, Any]:
+    """
+    Evalúa las configuraciones en paralelo.
+    - datos: min_incidentes_calle -> (X, y) ya filtrados
+    Las configuraciones que no llegan a empezar antes de agotar el presupuesto total quedan 'cancelada'.
+    """
+    inicio = time.perf_counter()
+    resultados: List[Optional[Dict[str, Any]]] = [None] * len(configuraciones)
+    pool = ProcessPoolExecutor(max_workers=max_procesos, mp_context=multiprocessing.get_context("spawn"))
+    tareas = {}
+    # Primero las más baratas, para que un presupuesto total corto cancele solo las más caras
+    for i in sorted(range(len(configuraciones)), key=lambda i: _costo_estimado(configuraciones[i])):
+        hiperparametros = configuraciones[i]
+        X, y = datos[hiperparametros['min_incidentes_calle']]
+        tareas[pool.submit(_evaluar_configuracion, hiperparametros, X, y, presupuesto_configuracion_s)] = i
+    try:
+        for terminadas, tarea in enumerate(as_completed(tareas, timeout=presupuesto_total_s), start=1):
+            try:
+                resultados[tareas[tarea]] = tarea.result()
+            except Exception as error:
+                resultados[tareas[tarea]] = {'hiperparametros': configuraciones[tareas[tarea]], 'estado': 'error', 'error': repr(error)}
+            if progreso:
+                progreso(terminadas / len(configuraciones))
+    except TimeoutError:
+        pass
+    finally:
+        # Las que ya corren terminan dentro de su propio presupuesto; las pendientes se cancelan
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    for tarea, i in tareas.items():
+        if resultados[i] is None:
+            if tarea.done() and not tarea.cancelled() and tarea.exception() is None:
+                resultados[i] = tarea.result()
+            else:
+                resultados[i] = {'hiperparametros': configuraciones[i], 'estado': 'cancelada'}
+
+    for i in frente_pareto(resultados):
+        resultados[i]['pareto'] = True
+    return {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'segundos_totales': round(time.perf_counter() - inicio, 3),
+        'presupuesto_configuracion_s': presupuesto_configuracion_s,
+        'presupuesto_total_s': presupuesto_total_s,
+        'resultados': resultados,
+    }
+
+
+def guardar_reporte(reporte: Dict[str, Any], directorio: str = REPORTES_DIR) -> str:
+    """Guarda el reporte como JSON (escritura atómica) y devuelve la ruta."""
+    os.makedirs(directorio, exist_ok=True)
+    nombre = f"barrido_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    ruta = os.path.join(directorio, nombre)
+    with open(f"{ruta}.tmp", "w", encoding="utf-8") as archivo:
+        json.dump(reporte, archivo, ensure_ascii=False, indent=2, default=str)
+    os.replace(f"{ruta}.tmp", ruta)
+    return ruta
+
+
+def listar_reportes(directorio: str = REPORTES_DIR) -> List[str]:
+    """Nombres de los reportes guardados, del más reciente al más antiguo."""
+    if not os.path.isdir(directorio):
+        return []
+    return sorted((n for n in os.listdir(directorio) if n.endswith(".json")), reverse=True)
+
+
+def leer_reporte(nombre: str, directorio: str = REPORTES_DIR) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(directorio, nombre), encoding="utf-8") as archivo:
+            return json.load(archivo)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _barrido_y_guardar(
+    id_tarea: str,
+    datos: Dict[int, Tuple[pd.DataFrame, pd.Series]],
+    configuraciones: List[Dict[str, Any]],
+    version: str,
+    presupuesto_configuracion_s: float,
+    presupuesto_total_s: float
+) -> str:
+    """Tarea del proceso trabajador: ejecuta el barrido, guarda el reporte y devuelve su ruta."""
+    informar_progreso(id_tarea, f"Evaluando {len(configuraciones)} configuraciones", 0.0)
+    reporte = ejecutar_barrido(
+        datos, configuraciones,
+        presupuesto_configuracion_s=presupuesto_configuracion_s,
+        presupuesto_total_s=presupuesto_total_s,
+        progreso=lambda avance: informar_progreso(id_tarea, "Evaluando configuraciones", avance)
+    )
+    reporte['version_datos'] = version
+    ruta = guardar_reporte(reporte)
+    informar_progreso(id_tarea, "Listo", 1.0)
+    return ruta
+
+
+def _tabla_resultados(reporte: Dict[str, Any]) -> pd.DataFrame:
+    filas = []
+    for r in reporte['resultados']:
+        hiperparametros = r['hiperparametros']
+        filas.append({
+            'Motor': 'Frecuencias' if hiperparametros.get('motor') == 'frecuencias' else 'Bosque',
+            'Configuración': ", ".join(f"{k}={v}" for k, v in hiperparametros.items()
+                                      if k in ('n_estimators', 'max_depth', 'codificador', 'alpha', 'min_incidentes_calle')),
+            'Estado': r['estado'],
+            'Pareto': '⭐' if r.get('pareto') else '',
+            'Top-1': r.get('top1'),
+            'Top-5': r.get('top5'),
+            'Log loss': r.get('log_loss'),
+            'Ajuste (s)': r.get('segundos_ajuste'),
+            'Latencia 1 fila (ms)': r.get('latencia_fila_ms'),
+            'Tamaño (MB)': r['bytes_serializado'] / 1_048_576 if r.get('bytes_serializado') else None,
+        })
+    return pd.DataFrame(filas)
+
+
+def _mostrar_progreso_barrido(id_tarea: str):
+    """Barra de progreso del barrido en curso; recarga la página al terminar."""
+    estado = obtener_programador().estado(id_tarea)
+    if estado['estado'] != 'en_curso':
+        st.rerun()
+    st.progress(min(estado['avance'], 1.0), text=f"🧪 Barrido en segundo plano: {estado['etapa']}")
+
+
+if hasattr(st, 'fragment'):
+    _mostrar_progreso_barrido = st.fragment(run_every=2)(_mostrar_progreso_barrido)
+
+
+def mostrar_calidad_modelo(df: pd.DataFrame):
+    """Panel de calidad: métricas de los modelos registrados y barrido de configuraciones."""
+    st.markdown("### 🧪 Calidad del Modelo de Predicción")
+
+    st.markdown("#### 📋 Modelos registrados (conjunto reservado)")
+    modelos = listar_modelos()
+    if modelos:
+        tabla = pd.DataFrame([{
+            'ID': m['id'],
+            'Motor': 'Frecuencias' if m.get('hiperparametros', {}).get('motor') == 'frecuencias' else 'Bosque',
+            'Modo': 'Por provincia' if m.get('hiperparametros', {}).get('modo') == 'provincias' else 'Global',
+            'Top-1': m.get('metricas', {}).get('top1'),
+            'Top-5': m.get('metricas', {}).get('top5'),
+            'Log loss': m.get('metricas', {}).get('log_loss'),
+            'Ajuste (s)': m.get('segundos_entrenamiento'),
+            'Latencia 1 fila (ms)': m.get('metricas', {}).get('latencia_fila_ms'),
+            'Memoria (MB)': (m.get('metricas', {}).get('bytes_memoria') or 0) / 1_048_576,
+        } for m in modelos])
+        st.dataframe(
+            tabla.style.format({'Top-1': '{:.2%}', 'Top-5': '{:.2%}', 'Log loss': '{:.3f}', 'Latencia 1 fila (ms)': '{:.2f}',
+                                'Memoria (MB)': '{:.2f}'}, na_rep='-'),
+            use_container_width=True, hide_index=True
+        )
+    else:
+        st.info("Todavía no hay modelos entrenados. Entrena uno desde el Módulo de Predicción.")
+
+    st.markdown("#### ⚙️ Barrido de configuraciones")
+    configuraciones = configuraciones_barrido()
+    col1, col2 = st.columns(2)
+    with col1:
+        presupuesto_configuracion = st.number_input("Presupuesto por configuración (s):", 5, 3600, PRESUPUESTO_CONFIGURACION_S, key="barrido_presupuesto_config")
+    with col2:
+        presupuesto_total = st.number_input("Presupuesto total (s):", 10, 36000, PRESUPUESTO_TOTAL_S, key="barrido_presupuesto_total")
+    st.caption(f"{len(configuraciones)} configuraciones: bosque (árboles, profundidad, codificador, mínimo por calle) "
+               "y frecuencias (suavizado, mínimo por calle).")
+
+    # Como los modelos, el barrido se guarda por versión de la carga completa (sin las altas en vivo)
+    df = datos_base(df)
+    version = version_datos(df)
+    id_tarea = f"barrido-{version}"
+    programador = obtener_programador()
+    estado = programador.estado(id_tarea)
+    if estado['estado'] == 'en_curso':
+        _mostrar_progreso_barrido(id_tarea)
+    elif st.button("▶️ Ejecutar barrido", type="primary"):
+        datos = {}
+        for minimo in sorted({c['min_incidentes_calle'] for c in configuraciones}):
+            par = _datos_entrenamiento(df, version, minimo)
+            if par is not None:
+                datos[minimo] = par
+        configuraciones = [c for c in configuraciones if c['min_incidentes_calle'] in datos]
+        if not configuraciones:
+            st.error("No hay suficientes datos históricos para entrenar ninguna configuración.")
+        else:
+            programador.solicitar(id_tarea, _barrido_y_guardar, id_tarea, datos, configuraciones, version,
+                                  float(presupuesto_configuracion), float(presupuesto_total))
+            st.rerun()
+    if estado['estado'] == 'error':
+        st.error(f"❌ Falló el barrido: {estado['error']}")
+
+    reportes = listar_reportes()
+    if not reportes:
+        st.info("Todavía no hay reportes de barrido.")
+        return
+
+    nombre = st.selectbox("Reporte:", reportes, key="barrido_reporte")
+    reporte = leer_reporte(nombre)
+    if reporte is None:
+        st.error("No se pudo leer el reporte.")
+        return
+    st.caption(f"Generado {reporte['fecha']} en {reporte['segundos_totales']:.0f} s · versión de datos {reporte.get('version_datos', '-')}")
+
+    tabla = _tabla_resultados(reporte)
+    evaluadas = tabla[tabla['Estado'] == 'ok']
+    if not evaluadas.empty:
+        fig = px.scatter(
+            evaluadas,
+            x='Ajuste (s)',
+            y='Top-5',
+            color='Motor',
+            symbol='Pareto',
+            size=evaluadas['Tamaño (MB)'].clip(lower=0.1),
+            hover_data=['Configuración', 'Top-1', 'Log loss', 'Latencia 1 fila (ms)'],
+            log_x=True,
+            title="Precisión top-5 vs tiempo de ajuste (tamaño = MB; ⭐ = frente de Pareto)"
+        )
+        fig.update_layout(height=450, yaxis_tickformat='.0%')
+        st.plotly_chart(fig, use_container_width=True)
+
+    st.dataframe(
+        tabla.sort_values(['Pareto', 'Top-5'], ascending=False).style.format(
+            {'Top-1': '{:.2%}', 'Top-5': '{:.2%}', 'Log loss': '{:.3f}', 'Ajuste (s)': '{:.2f}',
+             'Latencia 1 fila (ms)': '{:.2f}', 'Tamaño (MB)': '{:.2f}'}, na_rep='-'),
+        use_container_width=True, hide_index=True
+    )
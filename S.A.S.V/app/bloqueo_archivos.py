@@ -0,0 +1,46 @@
+"""
+Bloqueo exclusivo entre procesos sobre un archivo de bloqueo (fcntl en POSIX, msvcrt en Windows).
+Lo usan los escritores que comparten archivos de data/ entre sesiones y procesos de Streamlit.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+# msvcrt.locking reintenta solo 10 veces (~10 s); se vuelve a intentar con esta pausa
+PAUSA_REINTENTO_S = 0.05
+
+
+@contextmanager
+def bloqueo_exclusivo(ruta: str) -> Iterator[None]:
+    """Mantiene el bloqueo de `ruta` (se crea si no existe) mientras dura el bloque with."""
+    directorio = os.path.dirname(ruta)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    descriptor = os.open(ruta, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if os.name == 'nt':
+            while True:
+                try:
+                    msvcrt.locking(descriptor, msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    time.sleep(PAUSA_REINTENTO_S)
+        else:
+            fcntl.flock(descriptor, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if os.name == 'nt':
+                os.lseek(descriptor, 0, os.SEEK_SET)
+                msvcrt.locking(descriptor, msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(descriptor, fcntl.LOCK_UN)
+    finally:
+        os.close(descriptor)
@@ -0,0 +1,187 @@
+"""
+Buscador de calles: búsqueda difusa por trigramas sobre los nombres canónicos (app.calles)
+y el historial de incidentes de la calle elegida.
+El índice y las filas de cada calle se construyen una vez y siguen las altas en vivo; una búsqueda
+y su historial solo tocan las filas de esa calle.
+"""
+
+import copy
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+from typing import List
+from app.almacen_features import features_de
+from app.cambios import Cambio, CacheIncremental
+from app.calles import IndiceTrigramas, normalizar_calle
+
+COLUMNAS_HISTORIAL = {
+    'fecha': 'Fecha',
+    'hora_hecho': 'Hora',
+    'provincia_nombre': 'Provincia',
+    'localidad_nombre': 'Localidad',
+    'tipo_lugar': 'Tipo de lugar',
+    'modo_produccion_hecho': 'Modo de producción',
+    'victima_vehiculo': 'Vehículo víctima',
+    'calle_nombre': 'Escrita como',
+}
+
+
+class IndiceCalles:
+    """
+    Calles canónicas del almacén de features:
+    - indice: trigramas de las claves canónicas
+    - filas / indptr: posiciones de las filas de cada calle (CSR)
+    - variantes: escrituras originales agrupadas en cada calle
+    """
+
+    def __init__(self, features: pd.DataFrame):
+        claves = features['calle_clave']
+        self.claves = list(claves.cat.categories)
+        self.nombres = np.asarray(features['calle'].cat.categories, dtype=object)
+        self.indice = IndiceTrigramas(self.claves)
+
+        codigos = claves.cat.codes.to_numpy()
+        con_calle = np.flatnonzero(codigos >= 0)
+        self.filas = con_calle[np.argsort(codigos[con_calle], kind='stable')]
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(codigos[con_calle], minlength=len(self.claves)))])
+
+        originales = features['calle_nombre'].cat.codes.to_numpy()
+        pares = pd.DataFrame({'calle': codigos[con_calle], 'original': originales[con_calle]}).drop_duplicates()
+        categorias = features['calle_nombre'].cat.categories
+        self.variantes = {calle: list(categorias[grupo['original']]) for calle, grupo in pares.groupby('calle')}
+
+    def agregado(self, features: pd.DataFrame, desde: int) -> "IndiceCalles":
+        """
+        Índice de las features de la versión nueva, cuyas filas desde `desde` son altas: las claves
+        nuevas van al final (ver app.almacen_features) y las filas nuevas al final de su calle.
+        """
+        nuevo = copy.copy(self)
+        nuevo.claves = list(features['calle_clave'].cat.categories)
+        nuevo.nombres = np.asarray(features['calle'].cat.categories, dtype=object)
+        if len(nuevo.claves) > len(self.claves):
+            nuevo.indice = self.indice.agregado(nuevo.claves[len(self.claves):])
+
+        codigos = features['calle_clave'].cat.codes.to_numpy()[desde:]
+        con_calle = np.flatnonzero(codigos >= 0)
+        orden = con_calle[np.argsort(codigos[con_calle], kind='stable')]
+        indptr = np.concatenate([self.indptr, np.full(len(nuevo.claves) - len(self.claves), self.indptr[-1])])
+        nuevo.filas = np.insert(self.filas, indptr[1:][codigos[orden]], desde + orden)
+        nuevo.indptr = indptr + np.concatenate([[0], np.cumsum(np.bincount(codigos[con_calle], minlength=len(nuevo.claves)))])
+
+        originales = features['calle_nombre'].cat.codes.to_numpy()[desde:]
+        categorias = features['calle_nombre'].cat.categories
+        nuevo.variantes = dict(self.variantes)
+        for calle, original in dict.fromkeys(zip(codigos[con_calle], originales[con_calle])):
+            nombre = categorias[original]
+            variantes = nuevo.variantes.get(calle, [])
+            if nombre not in variantes:
+                nuevo.variantes[calle] = variantes + [nombre]
+        return nuevo
+
+    @property
+    def conteos(self) -> np.ndarray:
+        return np.diff(self.indptr)
+
+    def buscar(self, consulta: str, n: int = 10) -> pd.DataFrame:
+        """Calles más parecidas a la consulta (normalizada igual que los datos), con sus víctimas."""
+        resultados = self.indice.buscar(normalizar_calle(consulta), n=n)
+        posiciones = resultados['posicion'].to_numpy(dtype=np.int64)
+        return pd.DataFrame({
+            'posicion': posiciones,
+            'Calle': self.nombres[posiciones],
+            'Víctimas': self.conteos[posiciones],
+            'Coincidencia': resultados['cobertura'].to_numpy(),
+        })
+
+    def filas_de(self, posicion: int) -> np.ndarray:
+        return self.filas[self.indptr[posicion]:self.indptr[posicion + 1]]
+
+    def variantes_de(self, posicion: int) -> List[str]:
+        return self.variantes.get(posicion, [])
+
+
+def _construir_indice(df: pd.DataFrame) -> IndiceCalles:
+    return IndiceCalles(features_de(df))
+
+
+def _agregar_indice(indice: IndiceCalles, cambio: Cambio) -> IndiceCalles:
+    # El almacén de features se suscribió antes: ya tiene la versión nueva
+    return indice.agregado(features_de(cambio.datos), cambio.desde)
+
+
+_indices = CacheIncremental(_construir_indice, _agregar_indice, max_entradas=2)
+
+
+def obtener_indice_calles(df: pd.DataFrame) -> IndiceCalles:
+    """Índice de calles, construido una vez y seguido con las altas en vivo."""
+    return _indices.obtener(df)
+
+
+def mostrar_buscador_calles(df: pd.DataFrame):
+    """Caja de búsqueda de calles e historial de incidentes de la calle elegida."""
+    st.markdown("### 🔎 Buscar una Calle")
+    indice = obtener_indice_calles(df)
+    st.caption(f"{len(indice.claves):,} calles distintas tras normalizar nombres, abreviaturas y variantes.")
+
+    consulta = st.text_input("Nombre de la calle:", placeholder="Ej.: Av. Rivadavia, gral paz, ruta 2", key="buscador_calle")
+    if not consulta.strip():
+        return
+
+    resultados = indice.buscar(consulta)
+    if resultados.empty:
+        st.info("No se encontraron calles parecidas.")
+        return
+
+    posicion = st.selectbox(
+        "Resultados:",
+        resultados['posicion'].tolist(),
+        format_func=lambda p: f"{indice.nombres[p]} ({indice.conteos[p]:,} víctimas)",
+        key="buscador_resultado"
+    )
+
+    historial = df.iloc[indice.filas_de(posicion)]
+    st.markdown(f"#### 🛣️ {indice.nombres[posicion]}")
+    variantes = indice.variantes_de(posicion)
+    if len(variantes) > 1:
+        st.caption("Escrita en los datos como: " + ", ".join(f"“{v}”" for v in variantes))
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("💀 Víctimas", f"{len(historial):,}")
+    with col2:
+        st.metric("🚨 Siniestros", f"{historial['id_hecho'].nunique():,}")
+    with col3:
+        st.metric("🗺️ Provincias", historial['provincia_nombre'].nunique())
+    with col4:
+        anios = historial['anio'].dropna()
+        st.metric("📅 Período", f"{int(anios.min())}-{int(anios.max())}" if len(anios) else "-")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        por_anio = historial.groupby('anio').size()
+        fig_anio = px.bar(
+            x=por_anio.index.astype(int),
+            y=por_anio.values,
+            title="Víctimas por Año",
+            labels={'x': 'Año', 'y': 'Víctimas'}
+        )
+        fig_anio.update_layout(height=350, showlegend=False)
+        fig_anio.update_traces(marker_color='#D9534F')
+        st.plotly_chart(fig_anio, use_container_width=True)
+    with col2:
+        por_provincia = historial['provincia_nombre'].value_counts()
+        fig_provincia = px.bar(
+            x=por_provincia.values,
+            y=por_provincia.index,
+            orientation='h',
+            title="Víctimas por Provincia",
+            labels={'x': 'Víctimas', 'y': 'Provincia'}
+        )
+        fig_provincia.update_layout(height=350, showlegend=False)
+        fig_provincia.update_traces(marker_color='#0A497A')
+        st.plotly_chart(fig_provincia, use_container_width=True)
+
+    columnas = [c for c in COLUMNAS_HISTORIAL if c in historial.columns]
+    tabla = historial[columnas].sort_values('fecha', ascending=False).rename(columns=COLUMNAS_HISTORIAL)
+    st.dataframe(tabla, use_container_width=True, hide_index=True)
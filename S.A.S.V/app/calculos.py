@@ -0,0 +1,328 @@
+"""
+Núcleo de cálculo sin interfaz: agregaciones, filtros, datos de mapas y predicciones.
+Las funciones reciben el DataFrame (y la unidad de conteo) y devuelven estructuras simples
+(DataFrame, Series, arrays de numpy, diccionarios); no dibujan nada ni importan streamlit,
+plotly ni folium. Las vistas (estadisticas, comparativo, graficos, mapa, patrones_temporales,
+prediccion_ml) solo dibujan lo que devuelven, y el mismo cálculo se puede medir, correr en un
+pool de hilos o procesos, o servir desde otra interfaz.
+Se apoyan en las cachés por versión de datos de app.incidentes y app.indice_filtros; las de
+este módulo (tensor temporal y serie diaria) siguen las altas en vivo (app.cambios).
+"""
+
+import pandas as pd
+import numpy as np
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from app.cambios import Cambio, CacheIncremental
+from app.feriados import calendario_feriados
+from app.incidentes import ModeloIncidentes, obtener_conteos, obtener_modelo_incidentes, obtener_resumen_provincias
+from app.indice_filtros import obtener_indice_filtros
+from app.instrumentacion import medir
+from app.utils import coordenadas_provincias
+
+# Marcadores del mapa por provincia: (total mínimo, color, radio), de mayor a menor
+ESCALA_MAPA = (
+    (5000, '#D9534F', 15),  # Rojo fuerte (Advertencia)
+    (2000, '#FF8C00', 12),  # Naranja
+    (500, '#FFD700', 10),   # Amarillo/Oro
+    (0, '#24F81D', 8),      # Verde (Base)
+)
+
+
+# --- Conteos por provincia y categoría ---
+
+def conteo_provincia(df: pd.DataFrame, columna: str, provincia: str, unidad: str = "victimas") -> pd.Series:
+    """Conteo precalculado por (provincia, columna), restringido a una provincia."""
+    conteos = obtener_conteos(df, ('provincia_nombre', columna), unidad)
+    if provincia not in conteos.index.get_level_values(0):
+        return pd.Series(dtype='int64')
+    return conteos.xs(provincia, level=0)
+
+
+@medir("conteos_categoria")
+def conteos_categoria(df: pd.DataFrame, columna: str, unidad: str = "victimas") -> pd.Series:
+    """
+    Conteo precalculado por (provincia, categoría) en la unidad elegida.
+    Se descartan las categorías vacías; los nulos ya no forman parte del conteo.
+    """
+    conteos = obtener_conteos(df, ('provincia_nombre', columna), unidad)
+    return conteos[conteos.index.get_level_values(1) != '']
+
+
+def top_total(conteos: pd.Series, n: Optional[int] = 10) -> pd.Series:
+    """Totales de Argentina por categoría (suma sobre provincias)."""
+    return conteos.groupby(level=1).sum().sort_values(ascending=False).head(n)
+
+
+def top_provincia(conteos: pd.Series, provincia: str, n: Optional[int] = 10) -> pd.Series:
+    """Conteos por categoría de una provincia."""
+    if provincia not in conteos.index.get_level_values(0):
+        return pd.Series(dtype='int64')
+    return conteos.xs(provincia, level=0).sort_values(ascending=False).head(n)
+
+
+@medir("estadisticas_provincia")
+def estadisticas_provincia(df: pd.DataFrame, provincia: str, unidad: str = "victimas") -> Optional[Dict[str, Any]]:
+    """
+    Métricas y series de una provincia, o None si no tiene datos:
+    - total, edad_promedio, anio_min, anio_max, promedio_anual
+    - evolucion (anio, muertes), meses (mes, muertes) y top_localidades (Series, 10 primeras)
+    """
+    resumen = obtener_resumen_provincias(df, unidad).set_index('provincia_nombre')
+    if provincia not in resumen.index:
+        return None
+    fila = resumen.loc[provincia]
+    total = int(obtener_conteos(df, ('provincia_nombre',), unidad).get(provincia, 0))
+    anio_min, anio_max = fila['anio_min'], fila['anio_max']
+    return {
+        'total': total,
+        'edad_promedio': float(fila['edad_promedio']),
+        'anio_min': anio_min,
+        'anio_max': anio_max,
+        'promedio_anual': total / (anio_max - anio_min + 1) if anio_max > anio_min else total,
+        'evolucion': conteo_provincia(df, 'anio', provincia, unidad).sort_index().rename_axis('anio').reset_index(name='muertes'),
+        'meses': conteo_provincia(df, 'mes', provincia, unidad).sort_index().rename_axis('mes').reset_index(name='muertes'),
+        'top_localidades': conteo_provincia(df, 'localidad_nombre', provincia, unidad).head(10),
+    }
+
+
+@medir("comparativo_provincias")
+def comparativo_provincias(df: pd.DataFrame, unidad: str = "victimas") -> pd.DataFrame:
+    """Total, edad promedio y años con datos por provincia (índice), de mayor a menor total."""
+    resumen = obtener_resumen_provincias(df, unidad).set_index('provincia_nombre')
+    return resumen[['total', 'edad_promedio', 'anios_con_datos']].sort_values('total', ascending=False)
+
+
+# --- Mapas ---
+
+def estilo_marcador(total: float) -> Tuple[str, int]:
+    """Color y radio del marcador de una provincia según su total (ESCALA_MAPA)."""
+    for minimo, color, radio in ESCALA_MAPA:
+        if total > minimo:
+            return color, radio
+    return ESCALA_MAPA[-1][1], ESCALA_MAPA[-1][2]
+
+
+@medir("marcadores_provincias")
+def marcadores_provincias(df: pd.DataFrame, unidad: str = "victimas") -> List[Dict[str, Any]]:
+    """
+    Un marcador por provincia con coordenadas conocidas (app.utils): provincia, latitud, longitud,
+    total, edad_promedio, anio_min, anio_max, promedio_anual, color y radio.
+    """
+    marcadores = []
+    for fila in obtener_resumen_provincias(df, unidad).to_dict('records'):
+        provincia = fila['provincia_nombre']
+        if provincia not in coordenadas_provincias:
+            continue
+        latitud, longitud = coordenadas_provincias[provincia]
+        total = fila['total']
+        rango_anios = fila['anio_max'] - fila['anio_min']
+        color, radio = estilo_marcador(total)
+        marcadores.append({
+            'provincia': provincia,
+            'latitud': latitud,
+            'longitud': longitud,
+            'total': total,
+            'edad_promedio': fila['edad_promedio'],
+            'anio_min': fila['anio_min'],
+            'anio_max': fila['anio_max'],
+            'promedio_anual': total / (rango_anios + 1) if rango_anios >= 0 else total,
+            'color': color,
+            'radio': radio,
+        })
+    return marcadores
+
+
+@medir("puntos_mapa_calor")
+def puntos_mapa_calor(
+    df: pd.DataFrame,
+    unidad: str = "victimas",
+    anios: Optional[Tuple[int, int]] = None,
+    meses: Optional[Sequence[int]] = None
+) -> np.ndarray:
+    """
+    Coordenadas (latitud, longitud) de las víctimas o de los incidentes (un punto por siniestro)
+    que cumplen los filtros, sin las que no tienen coordenadas. Array de forma (n, 2).
+    """
+    # Filtro resuelto con el índice de bitmaps compartido
+    posiciones = obtener_indice_filtros(df).filtrar(anios=anios, meses=meses)
+
+    if unidad == "incidentes":
+        # Un punto por siniestro: se pasa de filas de víctimas a filas de la tabla de incidentes
+        modelo = obtener_modelo_incidentes(df)
+        posiciones = modelo.incidentes_de(posiciones)
+        origen = modelo.tabla
+    else:
+        origen = df
+
+    coordenadas = np.column_stack((
+        origen['latitud'].to_numpy()[posiciones],
+        origen['longitud'].to_numpy()[posiciones]
+    ))
+    return coordenadas[~np.isnan(coordenadas).any(axis=1)]
+
+
+# --- Patrones temporales ---
+
+class TensorTemporal:
+    """
+    Conteos por provincia x día de la semana (0=lunes) x hora (0-23).
+    Las filas sin fecha u hora válidas no se cuentan.
+    """
+
+    def __init__(self, datos: pd.DataFrame):
+        codigos, provincias = pd.factorize(datos['provincia_nombre'], sort=True)
+        self.provincias: List[str] = list(provincias)
+        dia = datos['dia_semana'].to_numpy(dtype=float)
+        hora = datos['hora'].to_numpy(dtype=float)
+        validos = (codigos >= 0) & ~np.isnan(dia) & ~np.isnan(hora)
+
+        plano = (codigos[validos] * 7 + dia[validos].astype(np.int64)) * 24 + hora[validos].astype(np.int64)
+        forma = (len(self.provincias), 7, 24)
+        self.conteos = np.bincount(plano, minlength=int(np.prod(forma))).reshape(forma)
+
+    def agregado(self, datos: pd.DataFrame) -> "TensorTemporal":
+        """Tensor con los conteos de `datos` (filas nuevas) sumados; self no cambia."""
+        nuevo = TensorTemporal(datos)
+        provincias = sorted(set(self.provincias) | set(nuevo.provincias))
+        conteos = np.zeros((len(provincias), 7, 24), dtype=np.int64)
+        for tensor in (self, nuevo):
+            conteos[[provincias.index(p) for p in tensor.provincias]] += tensor.conteos
+        nuevo.provincias, nuevo.conteos = provincias, conteos
+        return nuevo
+
+    def matriz(self, provincias: Optional[List[str]] = None) -> np.ndarray:
+        """Matriz 7 x 24 sumando las provincias indicadas (todas si es None)."""
+        if provincias is None:
+            return self.conteos.sum(axis=0)
+        indices = [self.provincias.index(p) for p in provincias if p in self.provincias]
+        return self.conteos[indices].sum(axis=0)
+
+
+def _datos_unidad(df: pd.DataFrame, unidad: str) -> pd.DataFrame:
+    """Filas de víctimas o tabla de incidentes, según la unidad."""
+    if unidad == "incidentes":
+        return obtener_modelo_incidentes(df).tabla
+    return df
+
+
+def _filas_nuevas(cambio: Cambio, unidad: str) -> pd.DataFrame:
+    # Las altas son siempre incidentes nuevos: su tabla de incidentes sale solo de sus filas
+    return ModeloIncidentes(cambio.filas).tabla if unidad == "incidentes" else cambio.filas
+
+
+def _construir_tensor(df: pd.DataFrame, unidad: str) -> TensorTemporal:
+    return TensorTemporal(_datos_unidad(df, unidad))
+
+
+def _agregar_tensor(tensor: TensorTemporal, cambio: Cambio, unidad: str) -> TensorTemporal:
+    return tensor.agregado(_filas_nuevas(cambio, unidad))
+
+
+_tensores = CacheIncremental(_construir_tensor, _agregar_tensor, max_entradas=4)
+
+
+def obtener_tensor_temporal(df: pd.DataFrame, unidad: str = "victimas") -> TensorTemporal:
+    """Tensor provincia x día x hora por unidad, construido una vez y seguido con las altas en vivo."""
+    return _tensores.obtener(df, unidad)
+
+
+def _conteos_diarios(datos: pd.DataFrame) -> pd.DataFrame:
+    datos = datos[datos['fecha'].notna()]
+    return datos.groupby([datos['fecha'].dt.normalize(), 'provincia_nombre'], observed=True).size().unstack(fill_value=0)
+
+
+def _calendario_continuo(tabla: pd.DataFrame) -> pd.DataFrame:
+    # Los días sin hechos cuentan 0
+    dias = pd.date_range(tabla.index.min(), tabla.index.max(), freq='D') if len(tabla) else pd.DatetimeIndex([])
+    return tabla.reindex(dias, fill_value=0)
+
+
+def _construir_serie(df: pd.DataFrame, unidad: str) -> pd.DataFrame:
+    return _calendario_continuo(_conteos_diarios(_datos_unidad(df, unidad)))
+
+
+def _agregar_serie(tabla: pd.DataFrame, cambio: Cambio, unidad: str) -> pd.DataFrame:
+    nuevas = _conteos_diarios(_filas_nuevas(cambio, unidad))
+    return _calendario_continuo(tabla.add(nuevas, fill_value=0).fillna(0).astype(np.int64))
+
+
+_series = CacheIncremental(_construir_serie, _agregar_serie, max_entradas=4)
+
+
+def obtener_serie_diaria(df: pd.DataFrame, unidad: str = "victimas") -> pd.DataFrame:
+    """Tabla fecha x provincia con conteos diarios (fechas continuas, sin huecos)."""
+    return _series.obtener(df, unidad)
+
+
+@medir("patron_semanal")
+def patron_semanal(df: pd.DataFrame, unidad: str = "victimas", provincias: Optional[List[str]] = None) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Matriz día x hora (7 x 24) de las provincias indicadas (todas si es None o vacía) y sus
+    totales por hora y por día. None si no hay datos con fecha y hora válidas.
+    """
+    tensor = obtener_tensor_temporal(df, unidad)
+    if tensor.conteos.sum() == 0:
+        return None
+    matriz = tensor.matriz(provincias or None)
+    return {'matriz': matriz, 'por_hora': matriz.sum(axis=0), 'por_dia': matriz.sum(axis=1)}
+
+
+@medir("serie_diaria")
+def serie_diaria(
+    df: pd.DataFrame,
+    unidad: str = "victimas",
+    provincias: Optional[List[str]] = None,
+    ventanas: Sequence[int] = ()
+) -> pd.DataFrame:
+    """
+    Conteo diario de las provincias indicadas (todas si es None o vacía) en la columna 'diario',
+    más una columna por cada media móvil ('media_7', 'media_30', ...). Vacío si no hay fechas.
+    """
+    tabla = obtener_serie_diaria(df, unidad)
+    columnas = [p for p in (provincias or tabla.columns) if p in tabla.columns]
+    serie = tabla[columnas].sum(axis=1)
+    resultado = pd.DataFrame({'diario': serie})
+    for ventana in ventanas:
+        resultado[f'media_{ventana}'] = serie.rolling(ventana, min_periods=1).mean()
+    return resultado
+
+
+def promedios_feriados(serie: pd.Series) -> Dict[str, float]:
+    """Promedio diario en feriados y en el resto de los días (calendario de app.feriados)."""
+    es_feriado = serie.index.isin(calendario_feriados(serie.index.year.unique()))
+    return {
+        'feriados': float(serie[es_feriado].mean()) if es_feriado.any() else 0.0,
+        'resto': float(serie[~es_feriado].mean()) if (~es_feriado).any() else 0.0,
+    }
+
+
+# --- Predicciones ---
+
+@medir("top_calles")
+def top_calles(
+    tabla: Any,
+    entrada: Dict[str, Any],
+    k: int = 5,
+    pipeline: Optional[Callable[[], Any]] = None
+) -> Optional[pd.DataFrame]:
+    """
+    Las k calles más probables (columnas Calle, Probabilidad) para una combinación de provincia,
+    mes, zona horaria, día y tipo de lugar, buscadas en la tabla de predicciones precalculada
+    (app.tabla_predicciones). Si la combinación no está (valor que el modelo no vio al entrenar)
+    se predice con el pipeline que devuelve `pipeline()`; None si no hay con qué.
+    """
+    resultado = tabla.consultar(k=k, **entrada)
+    if resultado is None and pipeline is not None:
+        modelo = pipeline()
+        probabilidades = modelo.predict_proba(pd.DataFrame([entrada]))[0]
+        resultado = pd.DataFrame({
+            'Calle': modelo.classes_,
+            'Probabilidad': probabilidades
+        }).sort_values(by='Probabilidad', ascending=False).head(k)
+    return resultado
+
+
+@medir("ranking_calles")
+def ranking_calles(tabla: Any, n: int = 20, **filtros: Sequence[Any]) -> pd.DataFrame:
+    """Calles de mayor probabilidad media sobre las combinaciones que cumplen los filtros (vacío = todas)."""
+    return tabla.ranking(n=n, **filtros)
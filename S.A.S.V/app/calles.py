@@ -0,0 +1,239 @@
+"""
+Normalización de nombres de calles e índice de trigramas.
+calle_nombre es texto libre ("Av. Rivadavia", "AVENIDA RIVADAVIA", "rivadavia"); aquí se lleva
+cada nombre a una clave canónica:
+1. sin acentos, en minúsculas y sin puntuación
+2. abreviaturas expandidas (av -> avenida, gral -> general, ...; n/s/e/o al final -> norte/sur/este/oeste)
+3. sin el tipo de vía genérico al comienzo (avenida, calle), salvo en calles numeradas ("calle 7")
+4. deduplicación difusa: claves casi iguales (similitud de trigramas, mismos números y mismos puntos
+   cardinales) se unen a la más frecuente
+Todo se calcula sobre los nombres distintos, no sobre las filas.
+"""
+
+import re
+import copy
+import unicodedata
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+from typing import Dict, List, Sequence, Tuple
+
+ABREVIATURAS = {
+    'av': 'avenida', 'avd': 'avenida', 'avda': 'avenida', 'ave': 'avenida',
+    'bv': 'bulevar', 'bvd': 'bulevar', 'bvar': 'bulevar', 'boulevard': 'bulevar',
+    'pje': 'pasaje', 'psje': 'pasaje',
+    'gral': 'general', 'pte': 'presidente', 'pres': 'presidente', 'dr': 'doctor', 'ing': 'ingeniero',
+    'cnel': 'coronel', 'tte': 'teniente', 'cte': 'comandante', 'sgto': 'sargento', 'alte': 'almirante',
+    'prof': 'profesor', 'pbro': 'presbitero', 'sto': 'santo', 'sta': 'santa', 'hno': 'hermano',
+    'rn': 'ruta nacional', 'rp': 'ruta provincial', 'nac': 'nacional', 'prov': 'provincial',
+}
+# Puntos cardinales: "Belgrano Sur" y "Belgrano Norte" son calles distintas. Las abreviaturas de una
+# letra solo se expanden como última palabra ("e" y "o" son también conjunciones)
+PUNTOS_CARDINALES = ('norte', 'sur', 'este', 'oeste')
+ABREVIATURAS_CARDINALES = {'n': 'norte', 's': 'sur', 'e': 'este', 'o': 'oeste'}
+# Tipos de vía que se quitan del comienzo: "Av. Rivadavia", "Calle Rivadavia" y "Rivadavia" son la misma calle
+PREFIJOS_GENERICOS = ('avenida', 'calle')
+PALABRAS_MENORES = {'de', 'del', 'la', 'las', 'los', 'y', 'e', 'el'}
+
+# Similitud de Jaccard de trigramas a partir de la cual dos claves se consideran la misma calle
+SIMILITUD_DEDUPLICACION = 0.6
+# Filas del índice que se comparan a la vez al buscar pares similares
+FILAS_POR_BLOQUE = 4096
+# Coincidencias exigidas en los prefijos de trigramas raros antes de verificar un par
+PREFIJO_COMPARTIDO = 1
+
+
+def normalizar_calle(texto: str) -> str:
+    """Clave canónica (pasos 1 a 3) de un nombre de calle; '' si no queda nada."""
+    texto = unicodedata.normalize('NFKD', str(texto)).encode('ascii', 'ignore').decode('ascii').lower()
+    palabras = []
+    for palabra in re.sub(r'[^a-z0-9]+', ' ', texto).split():
+        palabras.extend(ABREVIATURAS.get(palabra, palabra).split())
+    if len(palabras) > 1:
+        palabras[-1] = ABREVIATURAS_CARDINALES.get(palabras[-1], palabras[-1])
+    while len(palabras) > 1 and palabras[0] in PREFIJOS_GENERICOS and not (len(palabras) == 2 and palabras[1].isdigit()):
+        palabras = palabras[1:]
+    return ' '.join(palabras)
+
+
+def nombre_visible(clave: str) -> str:
+    """Nombre para mostrar de una clave canónica: palabras capitalizadas salvo artículos y preposiciones."""
+    return ' '.join(
+        palabra if i and palabra in PALABRAS_MENORES else palabra.capitalize()
+        for i, palabra in enumerate(clave.split())
+    )
+
+
+def trigramas(texto: str) -> List[str]:
+    """Trigramas distintos del texto con relleno (dos espacios al inicio, uno al final)."""
+    relleno = f"  {texto} "
+    return list(dict.fromkeys(relleno[i:i + 3] for i in range(len(relleno) - 2)))
+
+
+class IndiceTrigramas:
+    """
+    Índice invertido trigrama -> textos en formato CSR (postings int32 ordenados).
+    Una consulta suma los trigramas compartidos con np.bincount sobre las listas de sus trigramas.
+    """
+
+    def __init__(self, textos: Sequence[str]):
+        self.textos = np.asarray(list(textos), dtype=object)
+        self.ids: Dict[str, int] = {}
+        gramas, documentos = [], []
+        for documento, texto in enumerate(self.textos):
+            for grama in trigramas(texto):
+                gramas.append(self.ids.setdefault(grama, len(self.ids)))
+                documentos.append(documento)
+        gramas = np.asarray(gramas, dtype=np.int64)
+        documentos = np.asarray(documentos, dtype=np.int32)
+        orden = np.argsort(gramas, kind='stable')
+        self.postings = documentos[orden]
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(gramas, minlength=len(self.ids)))])
+        self.largos = np.bincount(documentos, minlength=len(self.textos))
+        # Matriz binaria texto x trigrama, para comparar textos entre sí
+        self.matriz = sparse.csr_matrix(
+            (np.ones(len(gramas), dtype=np.float32), (documentos, gramas)), shape=(len(self.textos), len(self.ids))
+        )
+
+    def agregado(self, textos: Sequence[str]) -> "IndiceTrigramas":
+        """Índice con `textos` sumados al final (posiciones len(self) en adelante); self no cambia."""
+        nuevo = copy.copy(self)
+        nuevo.ids = dict(self.ids)
+        inicio = len(self.textos)
+        gramas, documentos = [], []
+        for documento, texto in enumerate(textos, start=inicio):
+            for grama in trigramas(texto):
+                gramas.append(nuevo.ids.setdefault(grama, len(nuevo.ids)))
+                documentos.append(documento)
+        gramas = np.asarray(gramas, dtype=np.int64)
+        documentos = np.asarray(documentos, dtype=np.int32)
+        n_gramas = len(nuevo.ids)
+        orden = np.argsort(gramas, kind='stable')
+        indptr = np.concatenate([self.indptr, np.full(n_gramas - len(self.ids), self.indptr[-1])])
+        # Los textos nuevos tienen las posiciones más altas: van al final de la lista de cada trigrama
+        nuevo.postings = np.insert(self.postings, indptr[1:][gramas[orden]], documentos[orden])
+        nuevo.indptr = indptr + np.concatenate([[0], np.cumsum(np.bincount(gramas, minlength=n_gramas))])
+        nuevo.textos = np.concatenate([self.textos, np.asarray(list(textos), dtype=object)])
+        nuevo.largos = np.concatenate([self.largos, np.bincount(documentos - inicio, minlength=len(nuevo.textos) - inicio)])
+        anterior = sparse.csr_matrix((self.matriz.data, self.matriz.indices, self.matriz.indptr), shape=(inicio, n_gramas))
+        agregada = sparse.csr_matrix(
+            (np.ones(len(gramas), dtype=np.float32), (documentos - inicio, gramas)), shape=(len(nuevo.textos) - inicio, n_gramas)
+        )
+        nuevo.matriz = sparse.vstack([anterior, agregada], format='csr')
+        return nuevo
+
+    def __len__(self) -> int:
+        return len(self.textos)
+
+    def buscar(self, consulta: str, n: int = 10, similitud_minima: float = 0.2) -> pd.DataFrame:
+        """
+        Textos más parecidos a la consulta: posición, cobertura (fracción de los trigramas de la
+        consulta presentes en el texto) y similitud de Jaccard. Ordena por cobertura y luego Jaccard,
+        así una consulta parcial ("rivad") encuentra el nombre completo.
+        """
+        gramas = [self.ids[g] for g in trigramas(consulta) if g in self.ids]
+        n_consulta = len(trigramas(consulta))
+        if not gramas or n_consulta == 0:
+            return pd.DataFrame({'posicion': [], 'cobertura': [], 'similitud': []})
+        postings = np.concatenate([self.postings[self.indptr[g]:self.indptr[g + 1]] for g in gramas])
+        compartidos = np.bincount(postings, minlength=len(self.textos))
+        candidatos = np.flatnonzero(compartidos)
+        cobertura = compartidos[candidatos] / n_consulta
+        similitud = compartidos[candidatos] / (n_consulta + self.largos[candidatos] - compartidos[candidatos])
+        elegidos = cobertura >= similitud_minima
+        candidatos, cobertura, similitud = candidatos[elegidos], cobertura[elegidos], similitud[elegidos]
+        orden = np.lexsort((-similitud, -cobertura))[:n]
+        return pd.DataFrame({'posicion': candidatos[orden], 'cobertura': cobertura[orden], 'similitud': similitud[orden]})
+
+    def pares_similares(self, umbral: float = SIMILITUD_DEDUPLICACION) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Pares (i < j) de textos con similitud de Jaccard >= umbral.
+        Filtro de prefijos: con los trigramas de cada texto ordenados del más raro al más común, dos
+        textos con Jaccard >= umbral comparten al menos K de sus primeros largo - ceil(umbral * largo) + K
+        (K = PREFIJO_COMPARTIDO). Solo los pares con K coincidencias en los prefijos se verifican con
+        la similitud exacta.
+        """
+        if len(self.textos) < 2:
+            vacio = np.zeros(0, dtype=np.int64)
+            return vacio, vacio, np.zeros(0)
+        frecuencia = np.diff(self.indptr)
+        filas, columnas = self.matriz.nonzero()
+        # Dentro de cada texto, trigramas de menor a mayor frecuencia (desempate por id: orden global)
+        orden = np.lexsort((columnas, frecuencia[columnas], filas))
+        filas, columnas = filas[orden], columnas[orden]
+        rango = np.arange(len(filas)) - np.searchsorted(filas, filas)
+        minimo = np.ceil(umbral * self.largos).astype(np.int64)
+        prefijo = self.largos - minimo + PREFIJO_COMPARTIDO
+        en_prefijo = rango < prefijo[filas]
+        prefijos = sparse.csr_matrix(
+            (np.ones(en_prefijo.sum(), dtype=np.float32), (filas[en_prefijo], columnas[en_prefijo])),
+            shape=self.matriz.shape
+        )
+        traspuesta = prefijos.T.tocsr()
+        resultados = []
+        # Por bloques de filas: la memoria de los candidatos queda acotada por bloque
+        for inicio in range(0, len(self.textos), FILAS_POR_BLOQUE):
+            bloque = (prefijos[inicio:inicio + FILAS_POR_BLOQUE] @ traspuesta).tocoo()
+            i, j = bloque.row.astype(np.int64) + inicio, bloque.col.astype(np.int64)
+            # Solo i < j, con suficientes coincidencias en los prefijos (los textos muy cortos
+            # tienen menos de K trigramas en común) y con largos compatibles: umbral * mayor <= menor
+            largo_i, largo_j = self.largos[i], self.largos[j]
+            requeridas = np.minimum(PREFIJO_COMPARTIDO, np.minimum(minimo[i], minimo[j]))
+            validos = (i < j) & (bloque.data >= requeridas) & \
+                (np.minimum(largo_i, largo_j) >= umbral * np.maximum(largo_i, largo_j))
+            i, j = i[validos], j[validos]
+            compartidos = np.asarray(self.matriz[i].multiply(self.matriz[j]).sum(axis=1)).ravel()
+            similitud = compartidos / (self.largos[i] + self.largos[j] - compartidos)
+            validos = similitud >= umbral
+            resultados.append((i[validos], j[validos], similitud[validos]))
+        return tuple(np.concatenate(partes) for partes in zip(*resultados))
+
+
+def deduplicar(claves: Sequence[str], pesos: Sequence[float], umbral: float = SIMILITUD_DEDUPLICACION) -> np.ndarray:
+    """
+    Paso 4: para cada clave, la posición de su representante (la más pesada de su grupo).
+    Dos claves se unen si tienen los mismos números ("calle 7" y "calle 8" nunca se unen), los
+    mismos puntos cardinales ("belgrano sur" y "belgrano" tampoco) y su similitud de trigramas
+    es >= umbral; los grupos son las componentes conexas de esos pares.
+    Los pares se buscan solo dentro de cada bloque de claves con los mismos números y puntos cardinales.
+    """
+    claves = list(claves)
+    pesos = np.asarray(pesos, dtype=float)
+    bloques = pd.Series([
+        ' '.join(re.findall(r'\d+', clave)) + '|' + ' '.join(p for p in clave.split() if p in PUNTOS_CARDINALES)
+        for clave in claves
+    ])
+    filas, columnas = [], []
+    for posiciones in bloques.groupby(bloques, sort=False).indices.values():
+        if len(posiciones) < 2:
+            continue
+        i, j, _ = IndiceTrigramas([claves[p] for p in posiciones]).pares_similares(umbral)
+        filas.append(posiciones[i])
+        columnas.append(posiciones[j])
+    filas = np.concatenate(filas) if filas else np.zeros(0, dtype=np.int64)
+    columnas = np.concatenate(columnas) if columnas else np.zeros(0, dtype=np.int64)
+    grafo = sparse.coo_matrix((np.ones(len(filas)), (filas, columnas)), shape=(len(claves), len(claves)))
+    _, grupo = connected_components(grafo, directed=False)
+    # Representante: la clave de mayor peso de cada grupo
+    orden = np.lexsort((-pesos, grupo))
+    return orden[np.searchsorted(grupo[orden], grupo)]
+
+
+def canonizar(nombres: Sequence[str], pesos: Sequence[float]) -> Tuple[np.ndarray, List[str]]:
+    """
+    Claves canónicas de una lista de nombres distintos (con su frecuencia como peso).
+    Devuelve (código de cada nombre, claves canónicas); los nombres vacíos tras normalizar reciben -1.
+    """
+    normalizadas = pd.Index([normalizar_calle(nombre) for nombre in nombres])
+    codigos, claves = pd.factorize(normalizadas)
+    peso_clave = np.bincount(codigos, weights=np.asarray(pesos, dtype=float), minlength=len(claves))
+    representante = deduplicar(list(claves), peso_clave)
+    finales, codigo_final = np.unique(representante, return_inverse=True)
+    codigos = codigo_final[codigos] if len(codigos) else codigos
+    claves_finales = [claves[k] for k in finales]
+    vacia = claves_finales.index('') if '' in claves_finales else -1
+    if vacia >= 0:
+        codigos = np.where(codigos == vacia, -1, codigos - (codigos > vacia))
+        claves_finales.pop(vacia)
+    return codigos.astype(np.int64), claves_finales
@@ -0,0 +1,234 @@
+"""
+Feed de cambios en memoria: las altas nuevas llegan a los datos cargados y a sus derivados
+sin recargar el CSV.
+- registrar_altas() guarda las filas en el diario (app.diario), actualiza el índice de opciones
+  y el log de registros del modelo de calles, y publica las filas en el feed del archivo
+- el feed prepara solo las filas nuevas (app.data_loader.preparar_datos) y arma un DataFrame
+  vivo nuevo con versión "<versión base>#<n>"; el anterior no se modifica, así una sesión a
+  mitad de un rerun sigue viendo un estado consistente. Las columnas crecen por el final
+  (app.columnas_crecientes): sumar k filas cuesta O(k), no una copia del DataFrame
+- después avisa a los suscriptores con un Cambio: cada CacheIncremental calcula el valor de
+  la versión nueva sumando solo las filas nuevas al de la versión anterior; si falla, el error
+  queda en el log y esa entrada se descarta (se reconstruye cuando se la pida)
+- las demás sesiones del proceso toman la versión nueva en su próximo rerun (datos_en_vivo)
+Las altas de otros procesos no pasan por este feed: se ven al reiniciar la app.
+"""
+
+import logging
+import threading
+import pandas as pd
+import streamlit as st
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional, Tuple
+from app.actualizacion_incremental import agregar_registros
+from app.columnas_crecientes import TablaCreciente
+from app.data_loader import DATA_PATH, leer_datos, preparar_datos, version_base, version_datos, version_fuente
+from app.diario import Filas, obtener_diario
+from app.indice_opciones import COLUMNAS_OPCIONES, registrar_opciones
+from app.instrumentacion import medir, registrar_cache
+
+_log = logging.getLogger("sasv.cambios")
+
+
+class Cambio:
+    """
+    Altas publicadas en el feed de un archivo:
+    - datos: DataFrame vivo nuevo, que las incluye a partir de la posición `desde`
+    - filas: las filas nuevas ya preparadas (datos.iloc[desde:]); las altas siempre traen
+      id_hecho nuevos (ver app.secuencia_ids), nunca filas de un incidente existente
+    - version_anterior: versión del DataFrame vivo al que se sumaron
+    """
+
+    def __init__(self, path: str, datos: pd.DataFrame, desde: int, version_anterior: str):
+        self.path = path
+        self.datos = datos
+        self.desde = desde
+        self.filas = datos.iloc[desde:]
+        self.version_anterior = version_anterior
+
+    @property
+    def version(self) -> str:
+        return version_datos(self.datos)
+
+
+_suscriptores: List[Callable[[Cambio], None]] = []
+
+
+def suscribir(funcion: Callable[[Cambio], None]):
+    """Registra una función a llamar con cada Cambio del proceso, en orden de publicación."""
+    _suscriptores.append(funcion)
+
+
+def _con_tipos(filas: pd.DataFrame, tipos: pd.Series) -> pd.DataFrame:
+    """Columnas de las filas nuevas con el tipo de las del DataFrame vivo cuando se puede (concat no las pasa a object)."""
+    columnas = {}
+    for columna, tipo in tipos.items():
+        try:
+            columnas[columna] = filas[columna].astype(tipo)
+        except (TypeError, ValueError):
+            columnas[columna] = filas[columna]
+    return pd.DataFrame(columnas, index=filas.index)
+
+
+class FeedCambios:
+    """
+    DataFrame vivo de un archivo de datos, compartido por las sesiones del proceso.
+    Se carga completo una sola vez; después solo se le suman las altas publicadas.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.cambios = 0
+        self._datos: Optional[pd.DataFrame] = None
+        self._tabla: Optional[TablaCreciente] = None
+        self._cargado = False
+        self._bloqueo = threading.Lock()
+
+    def datos(self) -> Optional[pd.DataFrame]:
+        """Carga completa (la primera vez) más las altas publicadas desde entonces; None si no se pudo cargar."""
+        if not self._cargado:
+            with self._bloqueo:
+                if not self._cargado:
+                    self._datos = leer_datos(self.path)
+                    self._cargado = True
+        return self._datos
+
+    @property
+    def cargado(self) -> bool:
+        return self._cargado
+
+    def publicar(self, filas: pd.DataFrame, verificar_ids: bool = True) -> Optional[Cambio]:
+        """
+        Suma filas ya preparadas al DataFrame vivo y avisa a los suscriptores.
+        Devuelve None si no hay nada que sumar: datos todavía sin cargar (la carga leerá el diario)
+        o filas que ya estaban (una carga posterior a la escritura en el diario ya las trae).
+        Con verificar_ids=False (los datos ya estaban cargados antes de escribir las filas en el
+        diario, así que no pueden traerlas) no se busca cada id_hecho en el DataFrame vivo, que es O(n).
+        """
+        with self._bloqueo:
+            actual = self._datos
+            if actual is None:
+                return None
+            nuevas = _con_tipos(filas.reindex(columns=actual.columns), actual.dtypes)
+            if verificar_ids:
+                ya_cargados = actual['id_hecho'].isin(nuevas['id_hecho'])
+                if ya_cargados.any():
+                    nuevas = nuevas[~nuevas['id_hecho'].isin(actual['id_hecho'][ya_cargados])]
+            if nuevas.empty:
+                return None
+
+            if self._tabla is None:
+                # Única copia completa: la primera alta pasa la carga a columnas crecientes
+                self._tabla = TablaCreciente(actual)
+            self._tabla = self._tabla.agregada(nuevas)
+            datos = self._tabla.frame()
+            self.cambios += 1
+            datos.attrs = {**actual.attrs, "version": f"{version_base(actual)}#{self.cambios}"}
+            self._datos = datos
+
+            cambio = Cambio(self.path, datos, len(actual), version_datos(actual))
+            for funcion in list(_suscriptores):
+                try:
+                    funcion(cambio)
+                except Exception:
+                    # Esa caché no sigue la versión nueva: se reconstruye cuando se la pida
+                    _log.exception("Falló un suscriptor del feed de %s (versión %s)", self.path, cambio.version)
+        return cambio
+
+
+@st.cache_resource(show_spinner=False)
+def obtener_feed(path: str = DATA_PATH) -> FeedCambios:
+    """Feed del archivo, compartido por todas las sesiones del proceso."""
+    return FeedCambios(path)
+
+
+@medir("datos_en_vivo")
+def datos_en_vivo(path: str = DATA_PATH) -> Optional[pd.DataFrame]:
+    """DataFrame vivo para las vistas (solo lectura): cambia de versión con cada alta publicada."""
+    return obtener_feed(path).datos()
+
+
+def registrar_altas(filas: Filas, path: str = DATA_PATH) -> Optional[Cambio]:
+    """
+    Guarda las filas como una transacción del diario y las propaga: índice de opciones,
+    log de registros del modelo de calles (solo para DATA_PATH, con el que se entrena) y
+    DataFrame vivo con sus cachés. Devuelve el Cambio publicado (ver FeedCambios.publicar).
+    """
+    tabla = filas if isinstance(filas, pd.DataFrame) else pd.DataFrame(list(filas))
+    version_anterior = version_fuente(path)
+    # Si los datos ya estaban cargados antes de escribir el diario, la carga no puede traer estas filas
+    feed = obtener_feed(path)
+    cargado_antes = feed.cargado
+    obtener_diario(path).agregar(tabla)
+
+    distintos = tabla.reindex(columns=list(COLUMNAS_OPCIONES)).drop_duplicates().to_dict('records')
+    registrar_opciones(distintos, version_anterior, path)
+    preparadas = preparar_datos(tabla)
+    if path == DATA_PATH:
+        agregar_registros(preparadas)
+    return feed.publicar(preparadas, verificar_ids=not cargado_antes)
+
+
+class CacheIncremental:
+    """
+    Valores derivados del DataFrame vivo por versión de datos y argumentos, suscritos al feed:
+    - construir(df, *args): el valor desde cero (primera vez, o una versión que no se siguió)
+    - actualizar(valor, cambio, *args): el valor de la versión nueva a partir del de la anterior,
+      usando solo cambio.filas; no debe modificar `valor` (otra sesión puede estar usándolo).
+      Si falla, se registra en el log y la entrada de la versión anterior se descarta
+    Guarda las últimas max_entradas combinaciones (versión, argumentos); con descartar_anteriores,
+    al seguir una versión nueva se sueltan las de versiones anteriores (valores grandes que ya
+    nadie va a pedir). Los aciertos y fallos se cuentan en la instrumentación
+    (app.instrumentacion) con el nombre de construir.
+    """
+
+    def __init__(
+        self,
+        construir: Callable[..., Any],
+        actualizar: Callable[..., Any],
+        max_entradas: int = 8,
+        descartar_anteriores: bool = False
+    ):
+        self._construir = construir
+        self.nombre = getattr(construir, '__name__', type(self).__name__)
+        self._actualizar = actualizar
+        self.max_entradas = max_entradas
+        self.descartar_anteriores = descartar_anteriores
+        self._valores: "OrderedDict[Tuple[str, Tuple[Any, ...]], Any]" = OrderedDict()
+        self._bloqueo = threading.RLock()
+        suscribir(self._aplicar)
+
+    def _guardar(self, clave: Tuple[str, Tuple[Any, ...]], valor: Any):
+        self._valores[clave] = valor
+        self._valores.move_to_end(clave)
+        while len(self._valores) > self.max_entradas:
+            self._valores.popitem(last=False)
+
+    def obtener(self, df: pd.DataFrame, *args) -> Any:
+        """Valor para la versión de df (los argumentos deben ser hashables)."""
+        clave = (version_datos(df), args)
+        with self._bloqueo:
+            if clave in self._valores:
+                self._valores.move_to_end(clave)
+                registrar_cache(self.nombre, True)
+                return self._valores[clave]
+            registrar_cache(self.nombre, False)
+            valor = self._construir(df, *args)
+            self._guardar(clave, valor)
+            return valor
+
+    def _aplicar(self, cambio: Cambio):
+        with self._bloqueo:
+            anteriores = [(args, valor) for (version, args), valor in self._valores.items()
+                          if version == cambio.version_anterior]
+            for args, valor in anteriores:
+                try:
+                    nuevo = self._actualizar(valor, cambio, *args)
+                except Exception:
+                    _log.exception("%s no pudo seguir la versión %s con argumentos %r", self.nombre, cambio.version, args)
+                    self._valores.pop((cambio.version_anterior, args), None)
+                    continue
+                self._guardar((cambio.version, args), nuevo)
+            if self.descartar_anteriores:
+                for clave in [clave for clave in self._valores if clave[0] != cambio.version]:
+                    del self._valores[clave]
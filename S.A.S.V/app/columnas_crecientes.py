@@ -0,0 +1,159 @@
+"""
+Columnas que crecen por el final sin copiar lo que ya tienen, para los DataFrame vivos de
+app.cambios y las tablas derivadas que los siguen (app.incidentes).
+Cada versión es una vista de solo lectura de sus primeras n filas; sumar k filas cuesta O(k)
+(amortizado) y no toca lo que ven las versiones anteriores:
+- numpy (números, fechas, bool, object): buffer con lugar libre al final, que se reemplaza por
+  uno CRECIMIENTO veces más grande cuando se llena
+- texto y demás tipos de pyarrow: los trozos del ChunkedArray; cada alta suma un trozo
+- otros tipos, o filas nuevas de otro tipo que la columna: se concatenan (O(n), solo esa columna)
+"""
+
+import copy
+import threading
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from typing import Dict, Optional, Tuple
+
+# Capacidad de un buffer nuevo respecto de las filas que tiene que guardar
+CRECIMIENTO = 1.25
+LUGAR_MINIMO = 1024
+# Trozos de una columna de pyarrow a partir de los cuales se unen los agregados
+MAX_TROZOS = 64
+
+
+def _capacidad(n: int) -> int:
+    return max(int(n * CRECIMIENTO), n + LUGAR_MINIMO)
+
+
+class _Buffer:
+    """Arreglo compartido por las versiones de un vector; `usado` es el largo de la más nueva."""
+
+    def __init__(self, valores: np.ndarray, capacidad: int):
+        self.array = np.empty(capacidad, dtype=valores.dtype)
+        self.array[:len(valores)] = valores
+        self.usado = len(valores)
+        self.bloqueo = threading.Lock()
+
+
+class VectorCreciente:
+    """Arreglo numpy 1-D que se extiende por el final; agregado() devuelve una versión nueva y self no cambia."""
+
+    def __init__(self, valores: np.ndarray):
+        valores = np.asarray(valores)
+        self._buffer = _Buffer(valores, _capacidad(len(valores)))
+        self.n = len(valores)
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self._buffer.array.dtype
+
+    @property
+    def valores(self) -> np.ndarray:
+        """Vista de solo lectura de las n filas de esta versión."""
+        vista = self._buffer.array[:self.n]
+        vista.flags.writeable = False
+        return vista
+
+    def agregado(self, nuevos: np.ndarray) -> "VectorCreciente":
+        """Versión con `nuevos` (del mismo tipo) al final."""
+        nuevos = np.asarray(nuevos)
+        n = self.n + len(nuevos)
+        buffer = self._buffer
+        with buffer.bloqueo:
+            # Otra versión ya escribió después de esta, o no queda lugar: se sigue en un buffer nuevo
+            if buffer.usado != self.n or n > len(buffer.array):
+                buffer = _Buffer(self.valores, _capacidad(n))
+            buffer.array[self.n:n] = nuevos
+            buffer.usado = n
+        nuevo = copy.copy(self)
+        nuevo._buffer, nuevo.n = buffer, n
+        return nuevo
+
+
+class _ColumnaNumpy:
+    def __init__(self, serie: pd.Series):
+        self.dtype = serie.dtype
+        self.vector = VectorCreciente(serie.to_numpy())
+
+    def valores(self) -> np.ndarray:
+        return self.vector.valores
+
+    def agregada(self, serie: pd.Series) -> Optional["_ColumnaNumpy"]:
+        if serie.dtype != self.dtype:
+            return None
+        nueva = copy.copy(self)
+        nueva.vector = self.vector.agregado(serie.to_numpy())
+        return nueva
+
+
+class _ColumnaArrow:
+    def __init__(self, serie: pd.Series):
+        self.dtype = serie.dtype
+        trozos = serie.array.__arrow_array__()
+        self.tipo = trozos.type
+        self.trozos: Tuple[pa.Array, ...] = tuple(trozos.chunks)
+        self.base = len(self.trozos)
+
+    def valores(self) -> pd.api.extensions.ExtensionArray:
+        return pd.array(pa.chunked_array(self.trozos, type=self.tipo), dtype=self.dtype)
+
+    def agregada(self, serie: pd.Series) -> Optional["_ColumnaArrow"]:
+        if serie.dtype != self.dtype:
+            return None
+        trozos = self.trozos + tuple(serie.array.__arrow_array__().chunks)
+        if len(trozos) - self.base > MAX_TROZOS:
+            # Los agregados se unen en un solo trozo; los de la carga no se tocan
+            trozos = trozos[:self.base] + (pa.concat_arrays(list(trozos[self.base:])),)
+        nueva = copy.copy(self)
+        nueva.trozos = trozos
+        return nueva
+
+
+class _ColumnaConcatenada:
+    def __init__(self, serie: pd.Series):
+        self.serie = serie.reset_index(drop=True)
+
+    def valores(self) -> pd.Series:
+        return self.serie
+
+    def agregada(self, serie: pd.Series) -> None:
+        return None
+
+
+def _columna(serie: pd.Series):
+    if isinstance(serie.dtype, np.dtype):
+        return _ColumnaNumpy(serie)
+    if isinstance(serie.array, pd.arrays.ArrowExtensionArray):
+        return _ColumnaArrow(serie)
+    return _ColumnaConcatenada(serie)
+
+
+class TablaCreciente:
+    """
+    Columnas de un DataFrame que crecen por el final (ver el docstring del módulo).
+    frame() arma el DataFrame de esta versión, con índice RangeIndex, sin copiar las columnas.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.columnas: Dict[str, object] = {columna: _columna(df[columna]) for columna in df.columns}
+        self.n = len(df)
+        self.nombre_indice = df.index.name
+
+    def agregada(self, filas: pd.DataFrame) -> "TablaCreciente":
+        """Versión con `filas` (mismas columnas) al final; self no cambia."""
+        columnas = {}
+        for nombre, columna in self.columnas.items():
+            nueva = columna.agregada(filas[nombre])
+            if nueva is None:
+                # Tipos distintos: se concatena como lo haría pd.concat, y la columna sigue desde ahí
+                nueva = _columna(pd.concat([pd.Series(columna.valores()), filas[nombre]], ignore_index=True))
+            columnas[nombre] = nueva
+        tabla = copy.copy(self)
+        tabla.columnas, tabla.n = columnas, self.n + len(filas)
+        return tabla
+
+    def frame(self) -> pd.DataFrame:
+        indice = pd.RangeIndex(self.n, name=self.nombre_indice)
+        return pd.DataFrame({nombre: columna.valores() for nombre, columna in self.columnas.items()}, index=indice, copy=False)
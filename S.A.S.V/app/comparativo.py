@@ -5,27 +5,27 @@ Funciones para análisis comparativo entre provincias.
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+from app.calculos import comparativo_provincias
+from app.incidentes import ETIQUETAS_UNIDAD
 
-def mostrar_analisis_comparativo(df: pd.DataFrame):
+def mostrar_analisis_comparativo(df: pd.DataFrame, unidad: str = "victimas"):
     """
     Muestra gráficos y tablas comparativas entre provincias.
+    - unidad: "victimas" o "incidentes" (ver app.incidentes)
     """
-    stats_comparativo = df.groupby('provincia_nombre').agg({
-        'id_hecho': 'count',
-        'victima_tr_edad': lambda x: x.dropna().mean() if len(x.dropna()) > 0 else 0,
-        'anio': lambda x: x.dropna().nunique() if len(x.dropna()) > 0 else 0
-    }).round(2)
+    etiqueta = ETIQUETAS_UNIDAD[unidad]
+    total = f'Total {etiqueta}'
 
-    stats_comparativo.columns = ['Total Muertes', 'Edad Promedio', 'Años con Datos']
-    stats_comparativo = stats_comparativo.sort_values('Total Muertes', ascending=False)
+    stats_comparativo = comparativo_provincias(df, unidad)
+    stats_comparativo.columns = [total, 'Edad Promedio', 'Años con Datos']
 
     fig_comparativo = px.bar(
         stats_comparativo.reset_index(),
         x='provincia_nombre',
-        y='Total Muertes',
-        title="📊 Total de Muertes Viales por Provincia",
-        labels={'provincia_nombre': 'Provincia', 'Total Muertes': 'Número de Muertes'},
-        color='Total Muertes',
+        y=total,
+        title=f"📊 Total de {etiqueta} Viales por Provincia",
+        labels={'provincia_nombre': 'Provincia', total: f'Número de {etiqueta}'},
+        color=total,
         color_continuous_scale='Reds'
     )
     fig_comparativo.update_xaxes(tickangle=45)
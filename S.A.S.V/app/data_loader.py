@@ -7,51 +7,173 @@ import pandas as pd
 import numpy as np
 import streamlit as st
 from app.utils import limpiar_edad
-from typing import Optional
+from app.feriados import marcar_feriados
+from app.diario import bloqueo_diario, filas_diario, ruta_diario
+from app.instrumentacion import marcar_calculo, medir
+from typing import Optional, Sequence
 
 
 # Ruta absoluta al CSV 
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))  # sube desde app/ a S.A.S.V/
 DATA_PATH = os.path.join(BASE_DIR, "data", "MUERTES_VIALES.csv")
 
+# Formatos explícitos, en orden de prioridad (el CSV original usa ISO; el formulario, dd/mm/YYYY)
+FORMATOS_FECHA = ("%Y-%m-%d", "%d/%m/%Y", "%Y-%m-%d %H:%M:%S")
+FORMATOS_HORA = ("%H:%M:%S", "%H:%M")
 
-@st.cache_data
-def cargar_datos(path: str = DATA_PATH) -> Optional[pd.DataFrame]:
+
+def version_archivo(path: str = DATA_PATH) -> str:
+    """
+    Devuelve una huella barata del archivo de datos (mtime + tamaño).
+    Sirve como clave de versión para los índices y cachés derivados.
     """
-    Carga el CSV y aplica limpieza básica:
+    try:
+        info = os.stat(path)
+    except OSError:
+        return "sin-datos"
+    return f"{info.st_mtime_ns}-{info.st_size}"
+
+
+def version_fuente(path: str = DATA_PATH) -> str:
+    """Versión del CSV más su diario de altas (ver app.diario): cambia con cada alta."""
+    return f"{version_archivo(path)}+{version_archivo(ruta_diario(path))}"
+
+
+def parsear_con_formatos(serie: pd.Series, formatos: Sequence[str]) -> pd.Series:
+    """
+    Convierte texto a datetime probando formatos explícitos en orden.
+    Se parsean solo los valores distintos (fechas y horas se repiten mucho) y luego se expanden.
+    """
+    codigos, unicos = pd.factorize(serie)
+    unicos = pd.Series(unicos, dtype=str)
+    resultado = pd.Series(pd.NaT, index=unicos.index, dtype='datetime64[ns]')
+    for formato in formatos:
+        pendientes = resultado.isna()
+        if not pendientes.any():
+            break
+        resultado[pendientes] = pd.to_datetime(unicos[pendientes], format=formato, errors='coerce')
+    # Se agrega un NaT al final: los nulos (código -1) lo toman por indexación negativa
+    valores = np.append(resultado.to_numpy(), np.datetime64('NaT', 'ns'))
+    return pd.Series(valores[codigos], index=serie.index, dtype='datetime64[ns]')
+
+
+def agregar_columnas_temporales(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Agrega columnas temporales derivadas de fecha_hecho y hora_hecho:
+    - fecha (datetime), hora (0-23), dia_semana (0=lunes), dia_anio (1-366)
+    - feriado: True si la fecha es feriado nacional (calendario en app.feriados)
+    Los valores no parseables quedan como NaN/NaT, igual que anio y mes.
+    """
+    if 'fecha_hecho' in df.columns:
+        fecha = parsear_con_formatos(df['fecha_hecho'], FORMATOS_FECHA)
+    else:
+        fecha = pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+    if 'hora_hecho' in df.columns:
+        hora = parsear_con_formatos(df['hora_hecho'], FORMATOS_HORA).dt.hour
+    else:
+        hora = pd.Series(np.nan, index=df.index)
+
+    df['fecha'] = fecha
+    df['hora'] = hora.astype(float)
+    df['dia_semana'] = fecha.dt.dayofweek.astype(float)
+    df['dia_anio'] = fecha.dt.dayofyear.astype(float)
+    df['feriado'] = marcar_feriados(fecha)
+    return df
+
+
+def version_datos(df: pd.DataFrame) -> str:
+    """Versión de datos asociada al DataFrame completo devuelto por cargar_datos."""
+    return df.attrs.get("version", "")
+
+
+def version_base(df: pd.DataFrame) -> str:
+    """Versión de la carga completa, sin contar las altas agregadas en vivo (ver app.cambios)."""
+    return df.attrs.get("version_base", version_datos(df))
+
+
+def datos_base(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Filas de la carga completa, sin las altas agregadas en vivo, con version_base como versión.
+    Para lo que se guarda por versión de datos (modelos entrenados, barridos): no cambia con cada alta.
+    """
+    filas = df.attrs.get("filas_base", len(df))
+    if filas == len(df):
+        return df
+    base = df.iloc[:filas]
+    base.attrs = {**df.attrs, "version": version_base(df)}
+    return base
+
+
+def preparar_datos(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Limpieza básica, la misma para la carga completa y para las altas publicadas en vivo:
     - Filtra provincias desconocidas
     - Convierte lat/long, año, mes
     - Normaliza edades con limpiar_edad
-    - Devuelve DataFrame o None si ocurre error
+    - Agrega columnas temporales (fecha, hora, dia_semana, dia_anio, feriado)
+    """
+    # Mantener todos los registros pero descartar 'Desconocido' o NaN en provincia
+    df = df[df['provincia_nombre'] != 'Desconocido']
+    df = df[df['provincia_nombre'].notna()]
+
+    # Coordenadas a numérico
+    df['latitud'] = pd.to_numeric(df['latitud'], errors='coerce')
+    df['longitud'] = pd.to_numeric(df['longitud'], errors='coerce')
+
+    # Limpiar edades con la función utilitaria
+    if 'victima_tr_edad' in df.columns:
+        df['victima_tr_edad'] = df['victima_tr_edad'].apply(limpiar_edad)
+    else:
+        df['victima_tr_edad'] = np.nan
+
+    # Año y mes
+    df['anio'] = pd.to_numeric(df['anio'], errors='coerce') if 'anio' in df.columns else np.nan
+    df['mes'] = pd.to_numeric(df['mes'], errors='coerce') if 'mes' in df.columns else np.nan
+
+    # Fecha, hora, día de la semana, día del año y feriados (formatos explícitos)
+    df = agregar_columnas_temporales(df)
+
+    return df.reset_index(drop=True)
+
+
+@medir("leer_datos")
+def leer_datos(path: str = DATA_PATH) -> Optional[pd.DataFrame]:
+    """
+    Lee el CSV más las altas del diario aún no compactadas (app.diario) y las prepara
+    (preparar_datos). Registra en df.attrs la versión del CSV y su diario ("version" y
+    "version_base") y la cantidad de filas ("filas_base"). Devuelve None si ocurre un error.
     """
     try:
-        df = pd.read_csv(
-            path,
-            sep=";",
-            encoding="utf-8",
-            low_memory=False
-        )
-
-        # Mantener todos los registros pero descartar 'Desconocido' o NaN en provincia
-        df = df[df['provincia_nombre'] != 'Desconocido']
-        df = df[df['provincia_nombre'].notna()]
-
-        # Coordenadas a numérico
-        df['latitud'] = pd.to_numeric(df['latitud'], errors='coerce')
-        df['longitud'] = pd.to_numeric(df['longitud'], errors='coerce')
-
-        # Limpiar edades con la función utilitaria
-        if 'victima_tr_edad' in df.columns:
-            df['victima_tr_edad'] = df['victima_tr_edad'].apply(limpiar_edad)
-        else:
-            df['victima_tr_edad'] = np.nan
-
-        # Año y mes
-        df['anio'] = pd.to_numeric(df['anio'], errors='coerce') if 'anio' in df.columns else np.nan
-        df['mes'] = pd.to_numeric(df['mes'], errors='coerce') if 'mes' in df.columns else np.nan
+        # CSV y altas del diario que todavía no se compactaron, leídos sin una compactación de por medio
+        with bloqueo_diario(path):
+            df = pd.read_csv(
+                path,
+                sep=";",
+                encoding="utf-8",
+                low_memory=False
+            )
+            diario = filas_diario(path)
+            version = version_fuente(path)
+        if not diario.empty:
+            df = pd.concat([df, diario.reindex(columns=df.columns)], ignore_index=True)
 
+        df = preparar_datos(df)
+        df.attrs.update({"version": version, "version_base": version, "filas_base": len(df)})
         return df
 
     except Exception as e:
         st.error(f"Error al cargar datos: {str(e)}")
         return None
+
+
+# cache_resource: el DataFrame se comparte entre sesiones sin copiarlo en cada rerun.
+# Las vistas deben tratarlo como de solo lectura.
+@medir("cargar_datos", cache=True)
+@st.cache_resource(show_spinner=False)
+@marcar_calculo
+def cargar_datos(path: str = DATA_PATH) -> Optional[pd.DataFrame]:
+    """
+    Carga completa del CSV y su diario (ver leer_datos), una vez por proceso.
+    La app usa app.cambios.datos_en_vivo: la misma carga más las altas publicadas desde entonces.
+    """
+    return leer_datos(path)
@@ -0,0 +1,302 @@
+"""
+Diario de altas de incidentes (append-only) delante del CSV principal.
+Las altas no escriben el CSV: se agregan a data/MUERTES_VIALES_diario.log y una compactación
+periódica las vuelca al CSV.
+- Formato: una transacción por línea, "<crc32> <largo> <json>\n", con el JSON por columnas
+  ({columna: [valores]}: sin repetir los nombres en cada fila); un registro incompleto o
+  con CRC distinto (corte a mitad de escritura) marca el final válido del diario
+- Escritura: un hilo escritor por proceso junta las transacciones que llegan a la vez (commit
+  en grupo) y las escribe con un único write + fsync bajo un bloqueo exclusivo entre procesos;
+  cada llamada vuelve cuando su transacción es durable
+- Recuperación: al abrir el diario se trunca la cola inválida; una compactación interrumpida
+  se rehace desde su marca (el CSV vuelve al tamaño previo y se vuelca otra vez)
+- Lectura: el cargador de datos lee CSV y diario dentro de bloqueo_diario y suma ambas filas
+"""
+
+import os
+import json
+import logging
+import time
+import zlib
+import queue
+import threading
+import pandas as pd
+import streamlit as st
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+from app.bloqueo_archivos import bloqueo_exclusivo
+
+_log = logging.getLogger("sasv.diario")
+
+SEPARADOR_CSV = ';'
+
+# Commit en grupo: tras la primera transacción se esperan otras hasta este tiempo o esta cantidad
+VENTANA_GRUPO_S = 0.002
+MAX_TRANSACCIONES_GRUPO = 512
+# Compactación: con estas filas en el diario, o si hay filas y pasó este tiempo desde la última
+COMPACTAR_CADA_FILAS = 1000
+INTERVALO_COMPACTACION_S = 300
+
+
+def ruta_diario(path: str) -> str:
+    return f"{os.path.splitext(path)[0]}_diario.log"
+
+
+def _ruta_bloqueo(path: str) -> str:
+    return f"{ruta_diario(path)}.lock"
+
+
+def _ruta_marca(path: str) -> str:
+    return f"{ruta_diario(path)}.compactando"
+
+
+Filas = Union[pd.DataFrame, Sequence[Mapping[str, Any]]]
+Transaccion = Dict[str, List[Any]]
+
+
+def _a_json(valor: Any) -> Any:
+    """Escalares de numpy / pandas a tipos de Python (pd.NA -> null); el resto como texto."""
+    if valor is pd.NA:
+        return None
+    return valor.item() if hasattr(valor, 'item') else str(valor)
+
+
+def codificar(filas: Filas) -> bytes:
+    """Una transacción (DataFrame o lista de filas columna -> valor) como línea del diario."""
+    tabla = filas if isinstance(filas, pd.DataFrame) else pd.DataFrame(list(filas))
+    columnas = {str(columna): tabla[columna].tolist() for columna in tabla.columns}
+    datos = json.dumps(columnas, ensure_ascii=False, default=_a_json).encode("utf-8")
+    return b"%08x %d " % (zlib.crc32(datos), len(datos)) + datos + b"\n"
+
+
+def _filas_de(transaccion: Transaccion) -> int:
+    return len(next(iter(transaccion.values()), []))
+
+
+def _tabla(transacciones: List[Transaccion]) -> pd.DataFrame:
+    """Filas de varias transacciones en un DataFrame."""
+    if not transacciones:
+        return pd.DataFrame()
+    return pd.concat([pd.DataFrame(transaccion) for transaccion in transacciones], ignore_index=True)
+
+
+def decodificar(contenido: bytes) -> Tuple[List[Transaccion], int]:
+    """Transacciones válidas desde el comienzo y posición donde termina la última de ellas."""
+    transacciones, posicion = [], 0
+    while posicion < len(contenido):
+        try:
+            crc, largo, _ = contenido[posicion:posicion + 32].split(b" ", 2)
+            inicio = posicion + len(crc) + len(largo) + 2
+            crc, largo = int(crc, 16), int(largo)
+        except ValueError:
+            break
+        fin = inicio + largo
+        datos = contenido[inicio:fin]
+        if len(datos) != largo or contenido[fin:fin + 1] != b"\n" or zlib.crc32(datos) != crc:
+            break
+        try:
+            transacciones.append(json.loads(datos))
+        except ValueError:
+            break
+        posicion = fin + 1
+    return transacciones, posicion
+
+
+def _leer(path: str) -> bytes:
+    try:
+        with open(ruta_diario(path), "rb") as archivo:
+            return archivo.read()
+    except OSError:
+        return b""
+
+
+def _fsync_ruta(ruta: str):
+    descriptor = os.open(ruta, os.O_RDWR)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+def _truncar(ruta: str, largo: int):
+    os.truncate(ruta, largo)
+    _fsync_ruta(ruta)
+
+
+def filas_diario(path: str) -> pd.DataFrame:
+    """
+    Filas de las transacciones válidas del diario (la cola incompleta se ignora).
+    Para leerlas junto con el CSV sin ver una compactación a medias, llamar dentro de bloqueo_diario.
+    """
+    transacciones, _ = decodificar(_leer(path))
+    return _tabla(transacciones)
+
+
+def _volcar(path: str, transacciones: List[Transaccion]):
+    """Agrega las filas al CSV con sus columnas en el orden del encabezado y hace fsync."""
+    filas = _tabla(transacciones)
+    if os.path.exists(path):
+        columnas = pd.read_csv(path, sep=SEPARADOR_CSV, nrows=0).columns
+        filas.reindex(columns=columnas).to_csv(path, mode='a', index=False, header=False, sep=SEPARADOR_CSV)
+    else:
+        filas.to_csv(path, index=False, sep=SEPARADOR_CSV)
+    _fsync_ruta(path)
+
+
+def _terminar_compactacion(path: str):
+    """Rehace una compactación interrumpida (se llama con el bloqueo tomado)."""
+    try:
+        with open(_ruta_marca(path), encoding="utf-8") as archivo:
+            marca = json.load(archivo)
+    except (OSError, ValueError):
+        return
+    if os.path.exists(path) and marca.get('tamano_csv') is not None:
+        _truncar(path, marca['tamano_csv'])
+    transacciones, _ = decodificar(_leer(path))
+    if transacciones:
+        _volcar(path, transacciones)
+    if os.path.exists(ruta_diario(path)):
+        _truncar(ruta_diario(path), 0)
+    os.remove(_ruta_marca(path))
+
+
+@contextmanager
+def bloqueo_diario(path: str) -> Iterator[None]:
+    """Bloqueo del diario con toda compactación terminada: CSV y diario no cambian mientras dura."""
+    with bloqueo_exclusivo(_ruta_bloqueo(path)):
+        _terminar_compactacion(path)
+        yield
+
+
+def recuperar(path: str) -> int:
+    """
+    Deja el diario consistente: termina una compactación interrumpida y trunca la cola
+    inválida. Devuelve la cantidad de filas pendientes de compactar.
+    """
+    with bloqueo_exclusivo(_ruta_bloqueo(path)):
+        _terminar_compactacion(path)
+        contenido = _leer(path)
+        transacciones, fin = decodificar(contenido)
+        if fin < len(contenido):
+            _truncar(ruta_diario(path), fin)
+    return sum(_filas_de(transaccion) for transaccion in transacciones)
+
+
+def compactar(path: str) -> int:
+    """
+    Vuelca el diario al CSV y lo vacía; devuelve las filas volcadas.
+    Antes de tocar el CSV se guarda su tamaño en una marca: si el proceso se corta, la próxima
+    recuperación devuelve el CSV a ese tamaño y repite el volcado (no hay filas duplicadas ni perdidas).
+    """
+    with bloqueo_exclusivo(_ruta_bloqueo(path)):
+        _terminar_compactacion(path)
+        transacciones, _ = decodificar(_leer(path))
+        if not transacciones:
+            return 0
+        marca = _ruta_marca(path)
+        with open(f"{marca}.tmp", "w", encoding="utf-8") as archivo:
+            json.dump({'tamano_csv': os.path.getsize(path) if os.path.exists(path) else None}, archivo)
+            archivo.flush()
+            os.fsync(archivo.fileno())
+        os.replace(f"{marca}.tmp", marca)
+        _terminar_compactacion(path)
+    return sum(_filas_de(transaccion) for transaccion in transacciones)
+
+
+class DiarioIncidentes:
+    """
+    Escritor del diario de un archivo de datos, compartido por las sesiones del proceso.
+    agregar() encola la transacción y espera a que el hilo escritor la haga durable.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.pendientes = recuperar(path)
+        self.grupos_escritos = 0
+        self.transacciones_escritas = 0
+        self._ultima_compactacion = time.monotonic()
+        self._cola: "queue.Queue[Tuple[bytes, int, threading.Event, Dict[str, Any]]]" = queue.Queue()
+        # Se abre una vez, sin buffer: O_APPEND escribe siempre al final, también después de una compactación
+        self._archivo = open(ruta_diario(path), "ab", buffering=0)
+        self._tamano = os.fstat(self._archivo.fileno()).st_size
+        self._hilo = threading.Thread(target=self._escribir, name="diario-incidentes", daemon=True)
+        self._hilo.start()
+
+    def agregar(self, filas: Filas, timeout: Optional[float] = None):
+        """Agrega las filas como una transacción (todas o ninguna); vuelve cuando es durable."""
+        hecho, resultado = threading.Event(), {}
+        self._cola.put((codificar(filas), len(filas), hecho, resultado))
+        if not hecho.wait(timeout):
+            raise TimeoutError("El diario no confirmó la escritura a tiempo")
+        if 'error' in resultado:
+            raise resultado['error']
+
+    def _tomar_grupo(self) -> List[Tuple[bytes, int, threading.Event, Dict[str, Any]]]:
+        """Primera transacción (esperando hasta la próxima compactación) y las que lleguen en la ventana."""
+        try:
+            grupo = [self._cola.get(timeout=INTERVALO_COMPACTACION_S)]
+        except queue.Empty:
+            return []
+        limite = time.monotonic() + VENTANA_GRUPO_S
+        while len(grupo) < MAX_TRANSACCIONES_GRUPO:
+            try:
+                grupo.append(self._cola.get(timeout=max(limite - time.monotonic(), 0)))
+            except queue.Empty:
+                break
+        return grupo
+
+    def _reparar_cola(self):
+        """
+        Con el bloqueo tomado: si el diario cambió desde la última escritura propia (otro proceso
+        escribió, compactó o se cortó a mitad) y no termina en un fin de registro, se trunca la
+        cola inválida antes de agregar, para que las transacciones nuevas no queden detrás de un
+        registro roto. El JSON escapa los saltos de línea: el único b"\\n" es el fin de registro.
+        """
+        tamano = os.fstat(self._archivo.fileno()).st_size
+        if tamano == self._tamano or tamano == 0:
+            return
+        with open(ruta_diario(self.path), "rb") as archivo:
+            archivo.seek(tamano - 1)
+            if archivo.read(1) == b"\n":
+                return
+        _, fin = decodificar(_leer(self.path))
+        _truncar(ruta_diario(self.path), fin)
+
+    def _escribir(self):
+        while True:
+            grupo = self._tomar_grupo()
+            error = None
+            if grupo:
+                try:
+                    with bloqueo_exclusivo(_ruta_bloqueo(self.path)):
+                        self._reparar_cola()
+                        pendiente = memoryview(b"".join(datos for datos, _, _, _ in grupo))
+                        while pendiente:
+                            pendiente = pendiente[self._archivo.write(pendiente):]
+                        os.fsync(self._archivo.fileno())
+                        self._tamano = os.fstat(self._archivo.fileno()).st_size
+                    self.grupos_escritos += 1
+                    self.transacciones_escritas += len(grupo)
+                    self.pendientes += sum(filas for _, filas, _, _ in grupo)
+                except Exception as e:
+                    error = e
+                for _, _, hecho, resultado in grupo:
+                    if error is not None:
+                        resultado['error'] = error
+                    hecho.set()
+            vencido = time.monotonic() - self._ultima_compactacion >= INTERVALO_COMPACTACION_S
+            if self.pendientes >= COMPACTAR_CADA_FILAS or (self.pendientes and vencido):
+                try:
+                    compactar(self.path)
+                    self.pendientes = 0
+                    self._tamano = os.fstat(self._archivo.fileno()).st_size
+                except Exception:
+                    # El diario sigue siendo válido; se reintenta en el próximo ciclo
+                    _log.exception("No se pudo compactar el diario de %s (%s filas pendientes)", self.path, self.pendientes)
+                self._ultima_compactacion = time.monotonic()
+
+
+@st.cache_resource(show_spinner=False)
+def obtener_diario(path: str) -> DiarioIncidentes:
+    """Escritor del diario compartido por todas las sesiones del proceso."""
+    return DiarioIncidentes(path)
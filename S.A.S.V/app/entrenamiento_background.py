@@ -0,0 +1,147 @@
+"""
+Programador de entrenamientos en segundo plano.
+- Ejecuta los ajustes en un proceso trabajador (ProcessPoolExecutor), sin bloquear la página
+- Deduplica pedidos concurrentes para el mismo id de modelo (misma versión de datos e hiperparámetros)
+- El progreso se comunica mediante un JSON por tarea en modelos/progreso/, que la UI consulta;
+  al terminar la tarea el último progreso queda en memoria y el archivo se borra. Al crear el
+  programador (una vez por proceso) se borran los que quedaron de procesos anteriores
+"""
+
+import os
+import glob
+import json
+import time
+import functools
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from app.registro_modelos import MODELOS_DIR
+
+PROGRESO_DIR = os.path.join(MODELOS_DIR, "progreso")
+# Un progreso sin actualizar hace más de esto no es de una tarea viva (de este u otro proceso)
+ANTIGUEDAD_MAXIMA_PROGRESO_S = 6 * 3600
+
+
+def _ruta_progreso(id_tarea: str) -> str:
+    return os.path.join(PROGRESO_DIR, f"{id_tarea}.json")
+
+
+def informar_progreso(id_tarea: str, etapa: str, avance: float, **extra):
+    """
+    Registra el progreso de una tarea (se llama desde el proceso trabajador).
+    - avance: fracción entre 0 y 1
+    """
+    os.makedirs(PROGRESO_DIR, exist_ok=True)
+    ruta = _ruta_progreso(id_tarea)
+    estado = {"etapa": etapa, "avance": round(float(avance), 4), "actualizado": time.time(), **extra}
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "w", encoding="utf-8") as archivo:
+        json.dump(estado, archivo, ensure_ascii=False)
+    os.replace(temporal, ruta)
+
+
+def leer_progreso(id_tarea: str) -> Optional[Dict[str, Any]]:
+    """Último progreso informado por la tarea, o None si no hay registro."""
+    try:
+        with open(_ruta_progreso(id_tarea), encoding="utf-8") as archivo:
+            return json.load(archivo)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def borrar_progreso(id_tarea: str):
+    try:
+        os.remove(_ruta_progreso(id_tarea))
+    except OSError:
+        pass
+
+
+def limpiar_progresos(antiguedad_maxima_s: float = ANTIGUEDAD_MAXIMA_PROGRESO_S) -> int:
+    """
+    Borra los archivos de progreso (y temporales a medio escribir) sin actualizar hace más de
+    antiguedad_maxima_s: tareas de procesos que terminaron sin limpiarlos. Devuelve cuántos borró.
+    """
+    limite = time.time() - antiguedad_maxima_s
+    borrados = 0
+    for ruta in glob.glob(os.path.join(PROGRESO_DIR, "*.json")) + glob.glob(os.path.join(PROGRESO_DIR, "*.tmp")):
+        try:
+            if os.path.getmtime(ruta) < limite:
+                os.remove(ruta)
+                borrados += 1
+        except OSError:
+            continue
+    return borrados
+
+
+class ProgramadorEntrenamiento:
+    """
+    Cola de entrenamientos compartida por todas las sesiones del proceso de Streamlit.
+    Un mismo id_tarea nunca se ejecuta dos veces a la vez; si falló, se puede volver a pedir.
+    """
+
+    def __init__(self, max_procesos: int = 1):
+        self.max_procesos = max_procesos
+        self._tareas: Dict[str, Future] = {}
+        # Último progreso de las tareas terminadas (su archivo ya se borró)
+        self._finales: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        limpiar_progresos()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: el proceso hijo no hereda los hilos del servidor de Streamlit
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_procesos,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def solicitar(self, id_tarea: str, funcion: Callable, *args, **kwargs) -> Future:
+        """
+        Encola funcion(*args, **kwargs) en el proceso trabajador, salvo que ya haya
+        una tarea con el mismo id en curso o terminada con éxito (en ese caso la devuelve).
+        La función debe ser de nivel de módulo (se serializa con pickle).
+        """
+        with self._lock:
+            tarea = self._tareas.get(id_tarea)
+            if tarea is not None and not (tarea.done() and tarea.exception() is not None):
+                return tarea
+            informar_progreso(id_tarea, "En cola", 0.0)
+            tarea = self._pool().submit(funcion, *args, **kwargs)
+            self._tareas[id_tarea] = tarea
+        tarea.add_done_callback(functools.partial(self._al_terminar, id_tarea))
+        return tarea
+
+    def _al_terminar(self, id_tarea: str, tarea: Future):
+        with self._lock:
+            # Si la tarea ya se volvió a pedir (falló y se reintentó), el archivo es de la nueva
+            if self._tareas.get(id_tarea) is not tarea:
+                return
+            self._finales[id_tarea] = leer_progreso(id_tarea) or {"etapa": "", "avance": 0.0}
+            borrar_progreso(id_tarea)
+
+    def tarea(self, id_tarea: str) -> Optional[Future]:
+        return self._tareas.get(id_tarea)
+
+    def en_curso(self, id_tarea: str) -> bool:
+        tarea = self._tareas.get(id_tarea)
+        return tarea is not None and not tarea.done()
+
+    def estado(self, id_tarea: str) -> Dict[str, Any]:
+        """
+        Estado combinado de la tarea:
+        - 'estado': 'sin_tarea' | 'en_curso' | 'terminada' | 'error'
+        - 'etapa', 'avance': último progreso informado
+        - 'resultado' / 'error' cuando terminó
+        """
+        tarea = self._tareas.get(id_tarea)
+        progreso = leer_progreso(id_tarea) or self._finales.get(id_tarea) or {"etapa": "", "avance": 0.0}
+        if tarea is None:
+            return {"estado": "sin_tarea", **progreso}
+        if not tarea.done():
+            return {"estado": "en_curso", **progreso}
+        if tarea.exception() is not None:
+            return {"estado": "error", "error": repr(tarea.exception()), **progreso}
+        return {"estado": "terminada", "resultado": tarea.result(), **progreso}
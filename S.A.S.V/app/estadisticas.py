@@ -5,55 +5,65 @@ Funciones para mostrar estadísticas detalladas por provincia.
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
+from app.calculos import estadisticas_provincia
+from app.incidentes import ETIQUETAS_UNIDAD
+from app.pronosticos import HORIZONTE, MESES_MINIMOS_ENTRENAMIENTO, MODELOS_PRONOSTICO, NIVEL_INTERVALO, obtener_pronosticos
 
-def mostrar_estadisticas_detalladas(df: pd.DataFrame, provincia_seleccionada: str):
+# Meses de historia que se muestran junto al pronóstico
+MESES_HISTORIA_PRONOSTICO = 36
+
+
+def mostrar_estadisticas_provincia(df: pd.DataFrame, unidad: str = "victimas"):
+    """Vista de estadísticas: selector de provincia y sus estadísticas detalladas."""
+    provincias = sorted(df['provincia_nombre'].unique())
+    provincia_seleccionada = st.selectbox(
+        "Selecciona una provincia para ver estadísticas detalladas:",
+        provincias
+    )
+    mostrar_estadisticas_detalladas(df, provincia_seleccionada, unidad)
+
+
+def mostrar_estadisticas_detalladas(df: pd.DataFrame, provincia_seleccionada: str, unidad: str = "victimas"):
     """
-    Calcula y muestra métricas y gráficos para una provincia seleccionada.
+    Muestra métricas y gráficos para una provincia seleccionada (calculados en app.calculos).
+    - unidad: "victimas" o "incidentes" (ver app.incidentes)
     """
-    df_provincia = df[df['provincia_nombre'] == provincia_seleccionada].copy()
+    estadisticas = estadisticas_provincia(df, provincia_seleccionada, unidad)
 
-    if len(df_provincia) == 0:
+    if estadisticas is None:
         st.warning("No hay datos disponibles para esta provincia")
         return
 
+    etiqueta = ETIQUETAS_UNIDAD[unidad]
+
     col1, col2, col3, col4 = st.columns(4)
 
     with col1:
         st.metric(
-            label="🚗 Total Muertes",
-            value=f"{len(df_provincia):,}",
+            label=f"🚗 Total {etiqueta}",
+            value=f"{estadisticas['total']:,}",
             delta=None
         )
 
     with col2:
-        edad_prom = df_provincia['victima_tr_edad'].dropna().mean()
-        if pd.isna(edad_prom):
-            edad_prom = 0
         st.metric(
             label="👥 Edad Promedio",
-            value=f"{edad_prom:.1f} años",
+            value=f"{estadisticas['edad_promedio']:.1f} años",
             delta=None
         )
 
     with col3:
-        anio_min = df_provincia['anio'].dropna().min()
-        anio_max = df_provincia['anio'].dropna().max()
-        if pd.isna(anio_min) or pd.isna(anio_max):
-            anio_min = anio_max = 0
         st.metric(
             label="📅 Período",
-            value=f"{anio_min:.0f}-{anio_max:.0f}",
+            value=f"{estadisticas['anio_min']:.0f}-{estadisticas['anio_max']:.0f}",
             delta=None
         )
 
     with col4:
-        if anio_max > anio_min:
-            muertes_por_anio = len(df_provincia) / (anio_max - anio_min + 1)
-        else:
-            muertes_por_anio = len(df_provincia)
         st.metric(
             label="📊 Promedio por Año",
-            value=f"{muertes_por_anio:.0f}",
+            value=f"{estadisticas['promedio_anual']:.0f}",
             delta=None
         )
 
@@ -62,13 +72,13 @@ def mostrar_estadisticas_detalladas(df: pd.DataFrame, provincia_seleccionada: st
     col1, col2 = st.columns(2)
 
     with col1:
-        evolucion = df_provincia.groupby('anio').size().reset_index(name='muertes')
+        evolucion = estadisticas['evolucion']
         fig_tiempo = px.line(
             evolucion,
             x='anio',
             y='muertes',
-            title=f"📈 Evolución de Muertes Viales en {provincia_seleccionada}",
-            labels={'anio': 'Año', 'muertes': 'Número de Muertes'},
+            title=f"📈 Evolución de {etiqueta} Viales en {provincia_seleccionada}",
+            labels={'anio': 'Año', 'muertes': f'Número de {etiqueta}'},
             markers=True
         )
         fig_tiempo.update_layout(height=400, showlegend=False)
@@ -76,7 +86,7 @@ def mostrar_estadisticas_detalladas(df: pd.DataFrame, provincia_seleccionada: st
         st.plotly_chart(fig_tiempo, use_container_width=True)
 
     with col2:
-        meses = df_provincia.groupby('mes').size().reset_index(name='muertes')
+        meses = estadisticas['meses'].copy()
         meses['mes_nombre'] = meses['mes'].map({
             1: 'Ene', 2: 'Feb', 3: 'Mar', 4: 'Abr', 5: 'May', 6: 'Jun',
             7: 'Jul', 8: 'Ago', 9: 'Sep', 10: 'Oct', 11: 'Nov', 12: 'Dic'
@@ -87,22 +97,75 @@ def mostrar_estadisticas_detalladas(df: pd.DataFrame, provincia_seleccionada: st
             x='mes_nombre',
             y='muertes',
             title=f"📅 Distribución por Mes - {provincia_seleccionada}",
-            labels={'mes_nombre': 'Mes', 'muertes': 'Número de Muertes'}
+            labels={'mes_nombre': 'Mes', 'muertes': f'Número de {etiqueta}'}
         )
         fig_mes.update_layout(height=400, showlegend=False)
         fig_mes.update_traces(marker_color= '#D9534F')
         st.plotly_chart(fig_mes, use_container_width=True)
 
-    st.subheader(f"🏘️ Top 10 Localidades con Más Muertes - {provincia_seleccionada}")
-    top_localidades = df_provincia['localidad_nombre'].value_counts().head(10)
+    st.subheader(f"🏘️ Top 10 Localidades con Más {etiqueta} - {provincia_seleccionada}")
+    top_localidades = estadisticas['top_localidades']
 
     fig_localidades = px.bar(
         x=top_localidades.values,
         y=top_localidades.index,
         orientation='h',
-        title="Localidades con Mayor Número de Muertes Viales",
-        labels={'x': 'Número de Muertes', 'y': 'Localidad'}
+        title=f"Localidades con Mayor Número de {etiqueta} Viales",
+        labels={'x': f'Número de {etiqueta}', 'y': 'Localidad'}
     )
     fig_localidades.update_layout(height=500, showlegend=False)
     fig_localidades.update_traces(marker_color='#2ca02c')
     st.plotly_chart(fig_localidades, use_container_width=True)
+
+    _mostrar_pronostico(df, provincia_seleccionada, unidad)
+
+
+def _mostrar_pronostico(df: pd.DataFrame, provincia: str, unidad: str):
+    """Pronóstico mensual de la provincia con su banda y las métricas de backtesting de cada modelo."""
+    etiqueta = ETIQUETAS_UNIDAD[unidad]
+    st.subheader(f"🔮 Pronóstico Mensual de {etiqueta} - {provincia}")
+    pronosticos = obtener_pronosticos(df, unidad)
+    if not pronosticos.disponible or provincia not in pronosticos.provincias:
+        st.info(f"Se necesitan al menos {MESES_MINIMOS_ENTRENAMIENTO} meses de datos para pronosticar.")
+        return
+
+    modelos = list(MODELOS_PRONOSTICO)
+    modelo = st.selectbox(
+        "Modelo de pronóstico:",
+        modelos,
+        index=modelos.index(pronosticos.mejor_modelo(provincia)),
+        help="Por defecto, el de menor error en el backtesting de esta provincia",
+        key="modelo_pronostico"
+    )
+
+    historia = pronosticos.serie(provincia).iloc[-MESES_HISTORIA_PRONOSTICO:]
+    futuro = pronosticos.pronostico(provincia, modelo)
+    fig_pronostico = go.Figure()
+    fig_pronostico.add_trace(go.Scatter(
+        x=list(futuro.index) + list(futuro.index[::-1]),
+        y=list(futuro['superior']) + list(futuro['inferior'][::-1]),
+        fill='toself', fillcolor='rgba(217, 83, 79, 0.2)', line=dict(width=0),
+        name=f"Intervalo {NIVEL_INTERVALO:.0%}", hoverinfo='skip'
+    ))
+    fig_pronostico.add_trace(go.Scatter(x=historia.index, y=historia.values, name='Observado', line=dict(color='#0A497A', width=2)))
+    fig_pronostico.add_trace(go.Scatter(x=futuro.index, y=futuro['media'], name='Pronóstico', line=dict(color='#D9534F', width=3, dash='dash')))
+    fig_pronostico.update_layout(
+        height=420,
+        xaxis_title="Mes",
+        yaxis_title=f"Número de {etiqueta}",
+        legend=dict(orientation='h', y=-0.2)
+    )
+    st.plotly_chart(fig_pronostico, use_container_width=True)
+
+    metricas = pronosticos.metricas_de(provincia)
+    if not metricas.empty:
+        st.caption(
+            "Backtesting de origen móvil: cada modelo se reentrena sin los últimos años y pronostica los "
+            f"{HORIZONTE} meses siguientes. MASE < 1 mejora al ingenuo estacional; la cobertura debería acercarse "
+            f"al {NIVEL_INTERVALO:.0%}."
+        )
+        st.dataframe(
+            metricas.style.format({'MAE': '{:.2f}', 'RMSE': '{:.2f}', 'MASE': '{:.2f}', 'Cobertura': '{:.0%}'}),
+            use_container_width=True,
+            hide_index=True
+        )
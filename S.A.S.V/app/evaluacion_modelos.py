@@ -0,0 +1,68 @@
+"""
+Evaluación de modelos de calles sobre el conjunto reservado.
+Calidad (top-1, top-5, log loss) y costo (latencia de predicción, tamaño serializado y
+en memoria) con las mismas funciones para cualquier motor o modo.
+"""
+
+import io
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from typing import Any, Dict
+from app.modelos_provincia import aciertos_top_k, bytes_en_memoria
+
+# Predicciones de una fila que se cronometran (se informa la mediana)
+REPETICIONES_LATENCIA = 30
+PROBABILIDAD_MINIMA = 1e-15
+
+
+def log_loss(probabilidades: np.ndarray, clases: np.ndarray, y_real: pd.Series) -> float:
+    """Pérdida logarítmica media; una calle que el modelo no conoce cuenta con probabilidad mínima."""
+    posicion = pd.Index(clases).get_indexer(y_real)
+    conocidas = posicion >= 0
+    p_real = np.full(len(posicion), PROBABILIDAD_MINIMA)
+    p_real[conocidas] = probabilidades[np.flatnonzero(conocidas), posicion[conocidas]]
+    return float(-np.log(np.clip(p_real, PROBABILIDAD_MINIMA, 1.0)).mean())
+
+
+def bytes_serializado(modelo: Any) -> int:
+    """Tamaño del modelo serializado con joblib (sin comprimir), incluidos sus fragmentos si los tiene."""
+    if hasattr(modelo, 'bytes_serializado'):
+        return modelo.bytes_serializado()
+    buffer = io.BytesIO()
+    joblib.dump(modelo, buffer)
+    return buffer.getbuffer().nbytes
+
+
+def evaluar(
+    modelo: Any,
+    X_prueba: pd.DataFrame,
+    y_prueba: pd.Series,
+    repeticiones: int = REPETICIONES_LATENCIA
+) -> Dict[str, float]:
+    """
+    Métricas del modelo ajustado sobre el conjunto reservado:
+    top1, top5, log_loss, latencia_fila_ms (mediana de una fila), latencia_lote_us (por fila,
+    prediciendo todo el conjunto de una vez), bytes_serializado y bytes_memoria.
+    """
+    inicio = time.perf_counter()
+    probabilidades = modelo.predict_proba(X_prueba)
+    segundos_lote = time.perf_counter() - inicio
+
+    fila = X_prueba.iloc[:1]
+    latencias = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        modelo.predict_proba(fila)
+        latencias.append(time.perf_counter() - inicio)
+
+    return {
+        'top1': float(aciertos_top_k(probabilidades, modelo.classes_, y_prueba, 1).mean()),
+        'top5': float(aciertos_top_k(probabilidades, modelo.classes_, y_prueba, 5).mean()),
+        'log_loss': log_loss(probabilidades, modelo.classes_, y_prueba),
+        'latencia_fila_ms': float(np.median(latencias) * 1e3) if latencias else None,
+        'latencia_lote_us': segundos_lote / max(len(X_prueba), 1) * 1e6,
+        'bytes_serializado': bytes_serializado(modelo),
+        'bytes_memoria': bytes_en_memoria(modelo),
+    }
@@ -0,0 +1,158 @@
+"""
+Explorador de datos paginado: filtros resueltos con el índice de bitmaps
+y ordenamiento mediante permutaciones precalculadas por columna.
+"""
+
+import bisect
+import streamlit as st
+import pandas as pd
+import numpy as np
+from typing import Tuple
+from app.cambios import Cambio, CacheIncremental
+from app.exportacion import mostrar_exportacion
+from app.indice_filtros import obtener_indice_filtros
+
+
+# Orden por defecto del explorador
+ORDEN_POR_DEFECTO = ('anio', 'provincia_nombre')
+
+
+def _construir_orden(df: pd.DataFrame, columnas: Tuple[str, ...], ascendente: bool) -> np.ndarray:
+    claves = []
+    for columna in columnas:
+        codigos, _ = pd.factorize(df[columna], sort=True)
+        codigos = codigos.astype(np.int64)
+        if ascendente:
+            codigos[codigos < 0] = np.iinfo(np.int64).max
+        else:
+            codigos = -codigos
+        claves.append(codigos)
+    # np.lexsort ordena por la última clave primero
+    return np.lexsort(claves[::-1])
+
+
+def _insercion(df: pd.DataFrame, orden: np.ndarray, columnas: Tuple[str, ...], ascendente: bool, fila: int) -> int:
+    """
+    Posición de `orden` donde va la fila: después de las que tienen su misma clave (orden estable).
+    Búsqueda binaria columna por columna, leyendo solo O(log n) valores.
+    """
+    desde, hasta = 0, len(orden)
+    for columna in columnas:
+        valores = df[columna].array
+        valor = valores[fila]
+        # Dentro del tramo de claves iguales en las columnas anteriores, los nulos van al final
+        nulos = bisect.bisect_left(orden, True, desde, hasta, key=lambda p: pd.isna(valores[p]))
+        if pd.isna(valor):
+            desde = nulos
+        elif ascendente:
+            desde, hasta = (bisect.bisect_left(orden, True, desde, nulos, key=lambda p: valores[p] >= valor),
+                            bisect.bisect_left(orden, True, desde, nulos, key=lambda p: valores[p] > valor))
+        else:
+            desde, hasta = (bisect.bisect_left(orden, True, desde, nulos, key=lambda p: valores[p] <= valor),
+                            bisect.bisect_left(orden, True, desde, nulos, key=lambda p: valores[p] < valor))
+    return hasta
+
+
+def _agregar_orden(orden: np.ndarray, cambio: Cambio, columnas: Tuple[str, ...], ascendente: bool) -> np.ndarray:
+    # Las filas nuevas, ordenadas entre sí, se insertan en la permutación anterior
+    nuevas = cambio.desde + _construir_orden(cambio.filas, columnas, ascendente)
+    puntos = [_insercion(cambio.datos, orden, columnas, ascendente, fila) for fila in nuevas]
+    return np.insert(orden, puntos, nuevas)
+
+
+# Cada entrada es una permutación de todas las filas: solo se guardan las de la versión actual
+_ordenes = CacheIncremental(_construir_orden, _agregar_orden, max_entradas=4, descartar_anteriores=True)
+
+
+def obtener_orden(df: pd.DataFrame, columnas: Tuple[str, ...], ascendente: bool) -> np.ndarray:
+    """
+    Permutación completa del DataFrame ordenada por una o más columnas (nulos al final).
+    Se calcula una sola vez por columnas y sentido, y las altas en vivo se insertan por búsqueda
+    binaria; luego ordenar una selección es O(n).
+    """
+    return _ordenes.obtener(df, tuple(columnas), ascendente)
+
+
+def ordenar_posiciones(df: pd.DataFrame, posiciones: np.ndarray, columnas: Tuple[str, ...], ascendente: bool) -> np.ndarray:
+    """Reordena las posiciones seleccionadas según el orden global precalculado de las columnas."""
+    orden = obtener_orden(df, columnas, ascendente)
+    seleccion = np.zeros(len(df), dtype=bool)
+    seleccion[posiciones] = True
+    return orden[seleccion[orden]]
+
+
+def _paginar(total: int, tam_pagina: int) -> Tuple[int, int]:
+    """Devuelve (número de páginas, página actual) a partir del estado del widget."""
+    paginas = max(1, -(-total // tam_pagina))
+    # Con otros filtros o tamaño de página, la página elegida puede quedar fuera de rango
+    if st.session_state.setdefault("explorador_pagina", 1) > paginas:
+        st.session_state["explorador_pagina"] = paginas
+    pagina = st.number_input(
+        f"Página (de {paginas:,}):",
+        min_value=1,
+        max_value=paginas,
+        step=1,
+        key="explorador_pagina"
+    )
+    return paginas, int(pagina)
+
+
+def mostrar_explorador_datos(df: pd.DataFrame):
+    """
+    Muestra el explorador de datos con filtros por año y provincia,
+    navegación por páginas y ordenamiento por cualquier columna.
+    La exportación solo se genera cuando el usuario la solicita.
+    """
+    indice = obtener_indice_filtros(df)
+    anios = indice.valores('anio')
+    provincias = indice.valores('provincia_nombre')
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        anio_seleccionado = st.slider(
+            "Año:",
+            min_value=anios[0],
+            max_value=anios[-1],
+            value=(anios[0], anios[-1])
+        )
+    with col2:
+        provincias_seleccionadas = st.multiselect(
+            "Provincias:",
+            options=provincias,
+            default=provincias[:5]
+        )
+
+    posiciones = indice.filtrar(anios=anio_seleccionado, provincias=provincias_seleccionadas)
+    total = len(posiciones)
+
+    st.markdown(f"#### 📊 Datos Filtrados: {total:,} registros")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        columna_orden = st.selectbox(
+            "Ordenar por:",
+            options=["(año y provincia)"] + list(df.columns),
+            key="explorador_orden"
+        )
+    with col2:
+        sentido = st.radio("Sentido:", ["Ascendente", "Descendente"], horizontal=True, key="explorador_sentido")
+    with col3:
+        tam_pagina = st.selectbox("Filas por página:", [25, 50, 100, 250, 500], index=2, key="explorador_tam_pagina")
+
+    columnas_orden = ORDEN_POR_DEFECTO if columna_orden == "(año y provincia)" else (columna_orden,)
+    posiciones = ordenar_posiciones(df, posiciones, columnas_orden, sentido == "Ascendente")
+
+    paginas, pagina = _paginar(total, tam_pagina)
+    inicio = (pagina - 1) * tam_pagina
+    st.dataframe(df.iloc[posiciones[inicio:inicio + tam_pagina]], use_container_width=True)
+    st.caption(f"Mostrando filas {min(inicio + 1, total):,}-{min(inicio + tam_pagina, total):,} de {total:,} (página {pagina} de {paginas:,})")
+
+    # La exportación se genera solo a pedido, nunca en cada rerun
+    mostrar_exportacion(
+        df,
+        posiciones,
+        nombre_base=f"muertes_viales_filtrado_{anio_seleccionado[0]}_{anio_seleccionado[1]}",
+        firma=f"{anio_seleccionado}|{sorted(provincias_seleccionadas)}|{columna_orden}|{sentido}",
+        clave="explorador_exportacion"
+    )
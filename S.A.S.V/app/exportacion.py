@@ -0,0 +1,251 @@
+"""
+Exportación por bloques de datos filtrados (CSV, CSV gzip, Parquet, Excel).
+Los archivos se escriben en disco bloque a bloque, de modo que la memoria
+usada no depende del tamaño de la exportación.
+Cada sesión escribe en su propio directorio temporal, que se borra cuando Streamlit descarta la
+sesión; al iniciar el proceso, barrer_exportaciones() borra los que quedaron de procesos anteriores.
+El archivo se lee recién cuando el usuario hace clic en descargar, no en cada rerun.
+"""
+
+import os
+import glob
+import gzip
+import time
+import shutil
+import weakref
+import tempfile
+import functools
+import streamlit as st
+import pandas as pd
+import numpy as np
+from typing import Callable, List, Optional
+
+# Formato -> (extensión, tipo MIME)
+FORMATOS_EXPORTACION = {
+    "CSV": (".csv", "text/csv"),
+    "CSV comprimido (gzip)": (".csv.gz", "application/gzip"),
+    "Parquet": (".parquet", "application/vnd.apache.parquet"),
+    "Excel": (".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+TAM_BLOQUE = 100_000
+FILAS_MAX_EXCEL = 1_048_575  # límite de filas de una hoja, sin contar el encabezado
+UMBRAL_PROGRESO = 200_000    # a partir de esta cantidad de filas se muestra la barra de progreso
+
+PREFIJO_TEMPORAL = "sasv_export_"
+# Al iniciar, se borran las exportaciones sin tocar hace más de esto (las de otros procesos vivos son más nuevas)
+ANTIGUEDAD_MAXIMA_S = 12 * 3600
+
+
+def _bloques(df: pd.DataFrame, posiciones: np.ndarray, columnas: List[str], tam_bloque: int):
+    """Genera sub-DataFrames de a lo sumo tam_bloque filas, en el orden de posiciones."""
+    indices = df.columns.get_indexer(columnas)
+    if (indices < 0).any():
+        raise KeyError(f"Columnas inexistentes: {[c for c, i in zip(columnas, indices) if i < 0]}")
+    for inicio in range(0, len(posiciones), tam_bloque):
+        # Filas y columnas en un solo iloc: no se copian las columnas que no se exportan
+        yield inicio, df.iloc[posiciones[inicio:inicio + tam_bloque], indices]
+
+
+def _escribir_csv(archivo, bloques, total: int, progreso):
+    for inicio, bloque in bloques:
+        bloque.to_csv(archivo, index=False, header=(inicio == 0), lineterminator="\n")
+        progreso(min(inicio + len(bloque), total))
+
+
+def _escribir_parquet(ruta: str, bloques, total: int, progreso):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    escritor = None
+    esquema = None
+    try:
+        for inicio, bloque in bloques:
+            # Texto siempre como string para que el esquema sea estable entre bloques
+            bloque = bloque.apply(lambda s: s.astype("string") if s.dtype == object else s)
+            tabla = pa.Table.from_pandas(bloque, schema=esquema, preserve_index=False)
+            if escritor is None:
+                esquema = tabla.schema
+                escritor = pq.ParquetWriter(ruta, esquema, compression="snappy")
+            escritor.write_table(tabla)
+            progreso(min(inicio + len(bloque), total))
+    finally:
+        if escritor is not None:
+            escritor.close()
+
+
+def _escribir_excel(ruta: str, columnas: List[str], bloques, total: int, progreso):
+    from openpyxl import Workbook
+
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet("datos")
+    hoja.append(columnas)
+    for inicio, bloque in bloques:
+        valores = bloque.astype(object).where(bloque.notna(), None)
+        for fila in valores.itertuples(index=False, name=None):
+            hoja.append(fila)
+        progreso(min(inicio + len(bloque), total))
+    libro.save(ruta)
+
+
+def exportar_por_bloques(
+    df: pd.DataFrame,
+    posiciones: np.ndarray,
+    formato: str,
+    columnas: Optional[List[str]] = None,
+    tam_bloque: int = TAM_BLOQUE,
+    progreso: Optional[Callable[[int], None]] = None,
+    directorio: Optional[str] = None
+) -> str:
+    """
+    Escribe las filas indicadas por posiciones en un archivo temporal y devuelve su ruta.
+    - formato: una clave de FORMATOS_EXPORTACION
+    - columnas: subconjunto opcional de columnas (por defecto, todas)
+    - progreso: callback opcional que recibe la cantidad de filas escritas
+    - directorio: dónde crear el archivo (por defecto, el directorio temporal del sistema)
+    """
+    if formato not in FORMATOS_EXPORTACION:
+        raise ValueError(f"Formato de exportación desconocido: {formato}")
+    columnas = list(columnas) if columnas else list(df.columns)
+    total = len(posiciones)
+    if formato == "Excel" and total > FILAS_MAX_EXCEL:
+        raise ValueError(f"Excel admite como máximo {FILAS_MAX_EXCEL:,} filas; usa CSV o Parquet.")
+
+    progreso = progreso or (lambda filas: None)
+    extension, _ = FORMATOS_EXPORTACION[formato]
+    descriptor, ruta = tempfile.mkstemp(prefix=PREFIJO_TEMPORAL, suffix=extension, dir=directorio)
+    os.close(descriptor)
+
+    bloques = _bloques(df, posiciones, columnas, tam_bloque)
+    try:
+        if formato == "CSV":
+            with open(ruta, "w", encoding="utf-8", newline="") as archivo:
+                _escribir_csv(archivo, bloques, total, progreso)
+        elif formato == "CSV comprimido (gzip)":
+            with gzip.open(ruta, "wt", encoding="utf-8", newline="", compresslevel=6) as archivo:
+                _escribir_csv(archivo, bloques, total, progreso)
+        elif formato == "Parquet":
+            _escribir_parquet(ruta, bloques, total, progreso)
+        else:
+            _escribir_excel(ruta, columnas, bloques, total, progreso)
+    except Exception:
+        os.remove(ruta)
+        raise
+    return ruta
+
+
+class _DirectorioSesion:
+    """Directorio temporal de las exportaciones de una sesión: se borra al descartarse la sesión o al salir."""
+
+    def __init__(self):
+        self.ruta = tempfile.mkdtemp(prefix=PREFIJO_TEMPORAL)
+        weakref.finalize(self, shutil.rmtree, self.ruta, ignore_errors=True)
+
+
+def _directorio_sesion() -> str:
+    directorio = st.session_state.get("exportacion_directorio")
+    if directorio is None or not os.path.isdir(directorio.ruta):
+        directorio = _DirectorioSesion()
+        st.session_state["exportacion_directorio"] = directorio
+    return directorio.ruta
+
+
+@st.cache_resource(show_spinner=False)
+def barrer_exportaciones() -> int:
+    """
+    Borra, una vez por proceso, las exportaciones temporales abandonadas (sesiones de procesos
+    anteriores que terminaron sin limpiar). Devuelve cuántas entradas se borraron.
+    """
+    limite = time.time() - ANTIGUEDAD_MAXIMA_S
+    borradas = 0
+    for ruta in glob.glob(os.path.join(tempfile.gettempdir(), f"{PREFIJO_TEMPORAL}*")):
+        try:
+            if os.path.getmtime(ruta) >= limite:
+                continue
+            if os.path.isdir(ruta):
+                shutil.rmtree(ruta)
+            else:
+                os.remove(ruta)
+            borradas += 1
+        except OSError:
+            continue
+    return borradas
+
+
+def _leer(ruta: str) -> bytes:
+    with open(ruta, "rb") as archivo:
+        return archivo.read()
+
+
+def _descartar_exportacion(clave: str):
+    """Elimina el archivo temporal de una exportación previa de la sesión."""
+    anterior = st.session_state.pop(clave, None)
+    if anterior and os.path.exists(anterior["ruta"]):
+        os.remove(anterior["ruta"])
+
+
+def mostrar_exportacion(
+    df: pd.DataFrame,
+    posiciones: np.ndarray,
+    nombre_base: str,
+    firma: str,
+    clave: str = "exportacion"
+):
+    """
+    Panel de exportación: elige formato y columnas, genera el archivo solo al hacer clic
+    y lo sirve desde disco con st.download_button (leído al descargar).
+    - nombre_base: nombre del archivo descargado, sin extensión
+    - firma: identifica la selección actual; si cambia, se descarta la exportación previa
+    """
+    estado_clave = f"{clave}_archivo"
+    previa = st.session_state.get(estado_clave)
+    if previa and (previa["firma"] != firma or not os.path.exists(previa["ruta"])):
+        _descartar_exportacion(estado_clave)
+        previa = None
+
+    with st.expander("📥 Exportar datos filtrados", expanded=previa is not None):
+        col1, col2 = st.columns([1, 2])
+        with col1:
+            formato = st.selectbox("Formato:", list(FORMATOS_EXPORTACION.keys()), key=f"{clave}_formato")
+        with col2:
+            columnas = st.multiselect(
+                "Columnas (vacío = todas):",
+                options=list(df.columns),
+                key=f"{clave}_columnas"
+            )
+
+        if st.button("📦 Generar archivo", disabled=len(posiciones) == 0, key=f"{clave}_generar"):
+            _descartar_exportacion(estado_clave)
+            total = len(posiciones)
+            barra = st.progress(0.0, text="Exportando...") if total >= UMBRAL_PROGRESO else None
+
+            def _avance(filas: int):
+                if barra is not None:
+                    barra.progress(filas / total, text=f"Exportando... {filas:,} de {total:,} filas")
+
+            try:
+                ruta = exportar_por_bloques(df, posiciones, formato, columnas, progreso=_avance, directorio=_directorio_sesion())
+            except ImportError as e:
+                st.error(f"❌ El formato {formato} requiere una dependencia no instalada: {e.name}")
+                return
+            except ValueError as e:
+                st.error(f"❌ {e}")
+                return
+            finally:
+                if barra is not None:
+                    barra.empty()
+
+            extension, mime = FORMATOS_EXPORTACION[formato]
+            previa = {"ruta": ruta, "nombre": f"{nombre_base}{extension}", "mime": mime, "firma": firma}
+            st.session_state[estado_clave] = previa
+
+        if previa is not None:
+            tamanio = os.path.getsize(previa["ruta"]) / 1_048_576
+            # Datos diferidos: el archivo se lee solo cuando se hace clic en descargar
+            st.download_button(
+                label=f"📥 Descargar {previa['nombre']} ({tamanio:.1f} MB)",
+                data=functools.partial(_leer, previa["ruta"]),
+                file_name=previa["nombre"],
+                mime=previa["mime"],
+                key=f"{clave}_descargar"
+            )
@@ -0,0 +1,68 @@
+"""
+Calendario de feriados nacionales de Argentina incluido con la aplicación.
+- Feriados de fecha fija e inamovibles
+- Carnaval (lunes y martes) y Viernes Santo, calculados a partir de la Pascua
+- Los feriados trasladables se toman en su fecha nominal (aproximación)
+"""
+
+import datetime as dt
+import pandas as pd
+import numpy as np
+from typing import Iterable, List
+
+# (mes, día) de los feriados de fecha fija
+FERIADOS_FIJOS = [
+    (1, 1),    # Año Nuevo
+    (3, 24),   # Día Nacional de la Memoria por la Verdad y la Justicia
+    (4, 2),    # Día del Veterano y de los Caídos en Malvinas
+    (5, 1),    # Día del Trabajador
+    (5, 25),   # Revolución de Mayo
+    (6, 17),   # Paso a la Inmortalidad del Gral. Güemes (trasladable)
+    (6, 20),   # Paso a la Inmortalidad del Gral. Belgrano
+    (7, 9),    # Día de la Independencia
+    (8, 17),   # Paso a la Inmortalidad del Gral. San Martín (trasladable)
+    (10, 12),  # Día del Respeto a la Diversidad Cultural (trasladable)
+    (11, 20),  # Día de la Soberanía Nacional (trasladable)
+    (12, 8),   # Inmaculada Concepción de María
+    (12, 25),  # Navidad
+]
+
+
+def _pascua(anio: int) -> dt.date:
+    """Domingo de Pascua (algoritmo anónimo gregoriano)."""
+    a = anio % 19
+    b, c = divmod(anio, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes, dia = divmod(h + l - 7 * m + 114, 31)
+    return dt.date(anio, mes, dia + 1)
+
+
+def feriados_nacionales(anio: int) -> List[dt.date]:
+    """Lista ordenada de feriados nacionales de un año."""
+    pascua = _pascua(anio)
+    moviles = [
+        pascua - dt.timedelta(days=48),  # Carnaval (lunes)
+        pascua - dt.timedelta(days=47),  # Carnaval (martes)
+        pascua - dt.timedelta(days=2),   # Viernes Santo
+    ]
+    return sorted({dt.date(anio, mes, dia) for mes, dia in FERIADOS_FIJOS} | set(moviles))
+
+
+def calendario_feriados(anios: Iterable[int]) -> pd.DatetimeIndex:
+    """Todos los feriados de los años indicados."""
+    fechas = [f for anio in sorted(set(anios)) for f in feriados_nacionales(anio)]
+    return pd.DatetimeIndex(fechas)
+
+
+def marcar_feriados(fechas: pd.Series) -> np.ndarray:
+    """Vector booleano: True si la fecha es feriado nacional (NaT -> False)."""
+    anios = fechas.dt.year.dropna().unique()
+    if len(anios) == 0:
+        return np.zeros(len(fechas), dtype=bool)
+    return fechas.dt.normalize().isin(calendario_feriados(int(a) for a in anios)).to_numpy()
@@ -0,0 +1,191 @@
+"""
+Motor liviano de predicción de calles: frecuencias condicionales jerárquicas suavizadas.
+P(calle | provincia, tipo de lugar, franja, día, mes) se estima con los conteos de cada nivel
+de la jerarquía, suavizados hacia el nivel anterior (más general):
+
+    p_nivel(c) = (n_nivel(c) + alpha * p_anterior(c)) / (N_nivel + alpha)
+
+Los conteos de cada nivel se guardan como una matriz dispersa (CSR) indexada por la clave
+en base mixta del prefijo de features, solo con las combinaciones observadas.
+Como son conteos, los registros nuevos se suman sin reentrenar (ver actualizar).
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, ClassifierMixin
+from typing import Any, Dict, List, Optional, Sequence
+
+# De lo más general a lo más específico: la calle depende sobre todo de la provincia
+JERARQUIA = ('provincia_nombre', 'tipo_lugar', 'zona_horaria', 'dia_semana', 'mes')
+
+# Hasta este tamaño de lote los códigos se buscan en diccionarios (más rápido que pandas para pocas filas)
+FILAS_BUSQUEDA_DIRECTA = 32
+
+
+class _Nivel:
+    """Conteos (clave del prefijo x clase) en formato CSR más el total de cada clave."""
+
+    def __init__(self, claves: np.ndarray, clases: np.ndarray, n_clases: int, pesos: Optional[np.ndarray] = None):
+        if pesos is None:
+            combinadas, conteos = np.unique(claves * n_clases + clases, return_counts=True)
+        else:
+            combinadas, posicion = np.unique(claves * n_clases + clases, return_inverse=True)
+            conteos = np.bincount(posicion.ravel(), weights=pesos, minlength=len(combinadas))
+        claves_filas = combinadas // n_clases
+        self.claves = np.unique(claves_filas)
+        self.indptr = np.append(np.searchsorted(claves_filas, self.claves), len(claves_filas))
+        self.indices = (combinadas % n_clases).astype(np.int32)
+        self.datos = conteos.astype(np.float32)
+        self.totales = np.add.reduceat(self.datos, self.indptr[:-1]) if len(self.claves) else np.zeros(0, np.float32)
+
+    def entradas(self):
+        """(clave, clase, conteo) de cada celda no nula, para reconstruir el nivel."""
+        return np.repeat(self.claves, np.diff(self.indptr)), self.indices.astype(np.int64), self.datos
+
+    def filas(self, claves: np.ndarray) -> np.ndarray:
+        """Fila de cada clave, o -1 si la combinación no se observó."""
+        if len(self.claves) == 0:
+            return np.full(len(claves), -1)
+        posicion = np.minimum(np.searchsorted(self.claves, claves), len(self.claves) - 1)
+        return np.where(self.claves[posicion] == claves, posicion, -1)
+
+    def densa(self, filas: np.ndarray, n_clases: int) -> np.ndarray:
+        """Conteos densos (n_filas x n_clases) de las filas indicadas (las -1 quedan en cero)."""
+        salida = np.zeros((len(filas), n_clases), dtype=np.float64)
+        validas = np.flatnonzero(filas >= 0)
+        inicio = self.indptr[filas[validas]]
+        largo = self.indptr[filas[validas] + 1] - inicio
+        muestra = np.repeat(validas, largo)
+        desplazamiento = np.arange(largo.sum()) - np.repeat(np.cumsum(largo) - largo, largo)
+        posiciones = np.repeat(inicio, largo) + desplazamiento
+        salida[muestra, self.indices[posiciones]] = self.datos[posiciones]
+        return salida
+
+    @property
+    def nbytes(self) -> int:
+        return self.claves.nbytes + self.indptr.nbytes + self.indices.nbytes + self.datos.nbytes + self.totales.nbytes
+
+
+class FrecuenciasJerarquicas(BaseEstimator, ClassifierMixin):
+    """
+    Clasificador estilo scikit-learn (fit / predict_proba / predict / classes_) sobre features categóricas.
+    - jerarquia: orden de las features, de la más general a la más específica
+    - alpha: fuerza del suavizado hacia el nivel anterior (0 = frecuencias crudas)
+    Los valores no vistos en el entrenamiento cortan la jerarquía en ese nivel.
+    """
+
+    def __init__(self, jerarquia: Sequence[str] = JERARQUIA, alpha: float = 1.0):
+        self.jerarquia = jerarquia
+        self.alpha = alpha
+
+    def _codigos(self, X: pd.DataFrame) -> List[np.ndarray]:
+        if len(X) <= FILAS_BUSQUEDA_DIRECTA:
+            return [np.array([mapa.get(v, -1) for v in X[feature].tolist()], dtype=np.int64)
+                    for feature, mapa in zip(self.jerarquia, self.mapas_)]
+        return [pd.Index(categorias).get_indexer(X[feature]) for feature, categorias in zip(self.jerarquia, self.categorias_)]
+
+    def _claves(self, codigos: List[np.ndarray]) -> List[np.ndarray]:
+        """Clave en base mixta del prefijo de cada nivel; -1 desde la primera feature desconocida."""
+        claves, clave, valida = [], np.zeros(len(codigos[0]), dtype=np.int64), np.ones(len(codigos[0]), dtype=bool)
+        for codigo, categorias in zip(codigos, self.categorias_):
+            valida &= codigo >= 0
+            clave = clave * len(categorias) + np.maximum(codigo, 0)
+            claves.append(np.where(valida, clave, -1))
+        return claves
+
+    def fit(self, X: pd.DataFrame, y: Sequence[Any]):
+        codigos_y, self.classes_ = pd.factorize(pd.Series(y), sort=True)
+        self.classes_ = np.asarray(self.classes_, dtype=object)
+        n_clases = len(self.classes_)
+        self.categorias_ = [np.asarray(sorted(pd.unique(X[f].dropna()).tolist(), key=lambda v: (str(type(v)), v)), dtype=object)
+                            for f in self.jerarquia]
+        self.mapas_ = [{v: i for i, v in enumerate(categorias)} for categorias in self.categorias_]
+
+        self.previa_ = (np.bincount(codigos_y, minlength=n_clases) + 1.0) / (len(codigos_y) + n_clases)
+        self.niveles_ = []
+        for claves in self._claves(self._codigos(X)):
+            conocidas = claves >= 0
+            self.niveles_.append(_Nivel(claves[conocidas], codigos_y[conocidas], n_clases))
+        return self
+
+    def actualizar(self, X: pd.DataFrame, y: Sequence[Any]):
+        """
+        Aprendizaje incremental: suma los conteos de registros nuevos al modelo ajustado.
+        Las calles y valores de features nuevos se agregan al final (los códigos existentes
+        no cambian), las claves de cada nivel se recodifican a la nueva base mixta y el
+        resultado equivale a haber ajustado con todos los registros. Costo proporcional
+        a las celdas observadas, no a las filas de entrenamiento.
+        """
+        y = pd.Series(y, index=X.index)
+        tamanios_previos = [len(categorias) for categorias in self.categorias_]
+        nuevas = [c for c in pd.unique(y) if c not in set(self.classes_)]
+        self.classes_ = np.concatenate([self.classes_, np.asarray(nuevas, dtype=object)])
+        for i, feature in enumerate(self.jerarquia):
+            valores = [v for v in pd.unique(X[feature].dropna()) if v not in self.mapas_[i]]
+            self.categorias_[i] = np.concatenate([self.categorias_[i], np.asarray(valores, dtype=object)])
+            self.mapas_[i].update({v: tamanios_previos[i] + j for j, v in enumerate(valores)})
+        tamanios = [len(categorias) for categorias in self.categorias_]
+        n_clases = len(self.classes_)
+
+        codigos_y = pd.Index(self.classes_).get_indexer(y)
+        niveles = []
+        for profundidad, (nivel, claves) in enumerate(zip(self.niveles_, self._claves(self._codigos(X))), start=1):
+            claves_previas, clases_previas, conteos_previos = nivel.entradas()
+            claves_previas = np.ravel_multi_index(
+                np.unravel_index(claves_previas, tamanios_previos[:profundidad]), tamanios[:profundidad]
+            ).astype(np.int64)
+            conocidas = claves >= 0
+            niveles.append(_Nivel(
+                np.concatenate([claves_previas, claves[conocidas]]),
+                np.concatenate([clases_previas, codigos_y[conocidas]]),
+                n_clases,
+                pesos=np.concatenate([conteos_previos, np.ones(conocidas.sum())]),
+            ))
+        self.niveles_ = niveles
+
+        # La previa se rehace con los conteos por calle del primer nivel (todas las filas tienen provincia)
+        _, clases, conteos = self.niveles_[0].entradas()
+        por_clase = np.bincount(clases, weights=conteos, minlength=n_clases)
+        self.previa_ = (por_clase + 1.0) / (por_clase.sum() + n_clases)
+        return self
+
+    def predict_proba(self, X: pd.DataFrame) -> np.ndarray:
+        n_clases = len(self.classes_)
+        probabilidades = np.broadcast_to(self.previa_, (len(X), n_clases)).copy()
+        for nivel, claves in zip(self.niveles_, self._claves(self._codigos(X))):
+            filas = np.where(claves >= 0, nivel.filas(claves), -1)
+            vistas = filas >= 0
+            if not vistas.any():
+                break
+            conteos = nivel.densa(filas[vistas], n_clases)
+            totales = nivel.totales[filas[vistas]][:, None]
+            probabilidades[vistas] = (conteos + self.alpha * probabilidades[vistas]) / (totales + self.alpha)
+        return probabilidades
+
+    def proba_fila(self, **valores) -> np.ndarray:
+        """Probabilidades para una sola combinación (feature=valor), sin pasar por un DataFrame."""
+        probabilidades = self.previa_.copy()
+        clave = 0
+        for feature, mapa, categorias, nivel in zip(self.jerarquia, self.mapas_, self.categorias_, self.niveles_):
+            codigo = mapa.get(valores[feature])
+            if codigo is None:
+                break
+            clave = clave * len(categorias) + codigo
+            fila = int(nivel.filas(np.array([clave]))[0])
+            if fila < 0:
+                break
+            inicio, fin = nivel.indptr[fila], nivel.indptr[fila + 1]
+            probabilidades *= self.alpha
+            probabilidades[nivel.indices[inicio:fin]] += nivel.datos[inicio:fin]
+            probabilidades /= nivel.totales[fila] + self.alpha
+        return probabilidades
+
+    def predict(self, X: pd.DataFrame) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def valores_features(self) -> Dict[str, List[Any]]:
+        """Espacio de entrada conocido (ver app.tabla_predicciones.valores_del_modelo)."""
+        return {feature: list(categorias) for feature, categorias in zip(self.jerarquia, self.categorias_)}
+
+    def bytes_en_memoria(self) -> int:
+        return self.previa_.nbytes + sum(nivel.nbytes for nivel in self.niveles_)
@@ -5,20 +5,22 @@ Gráficos temáticos: tipo de lugar, vehículos (víctima/inculpado), modo de pr
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from folium.plugins import HeatMap
+from app.calculos import conteos_categoria, top_provincia, top_total
+from app.incidentes import ETIQUETAS_UNIDAD
 
-def crear_graficos_tipo_lugar(df: pd.DataFrame):
+def crear_graficos_tipo_lugar(df: pd.DataFrame, unidad: str = "victimas"):
     """Crear gráficos de tipo de lugar por provincia y total Argentina"""
     st.markdown("### 🛣️ Análisis por Tipo de Lugar")
 
-    df_limpio = df[df['tipo_lugar'].notna() & (df['tipo_lugar'] != '')].copy()
+    conteos = conteos_categoria(df, 'tipo_lugar', unidad)
+    etiqueta = ETIQUETAS_UNIDAD[unidad]
 
-    if len(df_limpio) == 0:
+    if len(conteos) == 0:
         st.warning("No hay datos disponibles para tipo de lugar")
         return
 
     st.markdown("#### 📊 Total Argentina - Distribución por Tipo de Lugar")
-    tipo_lugar_total = df_limpio['tipo_lugar'].value_counts().head(10)
+    tipo_lugar_total = top_total(conteos)
 
     col1, col2 = st.columns(2)
 
@@ -28,7 +30,7 @@ def crear_graficos_tipo_lugar(df: pd.DataFrame):
             y=tipo_lugar_total.index,
             orientation='h',
             title="Top 10 Tipos de Lugar - Total Argentina",
-            labels={'x': 'Número de Muertes', 'y': 'Tipo de Lugar'},
+            labels={'x': f'Número de {etiqueta}', 'y': 'Tipo de Lugar'},
             color=tipo_lugar_total.values,
             color_continuous_scale='Reds'
         )
@@ -45,14 +47,13 @@ def crear_graficos_tipo_lugar(df: pd.DataFrame):
         st.plotly_chart(fig_torta, use_container_width=True)
 
     st.markdown("#### 🗺️ Distribución por Provincia")
-    provincias = sorted(df_limpio['provincia_nombre'].unique())
+    provincias = sorted(conteos.index.get_level_values(0).unique())
     provincia_seleccionada = st.selectbox(
         "Selecciona una provincia para ver el análisis de tipo de lugar:",
         provincias
     )
 
-    df_provincia = df_limpio[df_limpio['provincia_nombre'] == provincia_seleccionada]
-    tipo_lugar_provincia = df_provincia['tipo_lugar'].value_counts().head(10)
+    tipo_lugar_provincia = top_provincia(conteos, provincia_seleccionada)
 
     col1, col2 = st.columns(2)
 
@@ -62,7 +63,7 @@ def crear_graficos_tipo_lugar(df: pd.DataFrame):
             y=tipo_lugar_provincia.index,
             orientation='h',
             title=f"Top 10 Tipos de Lugar - {provincia_seleccionada}",
-            labels={'x': 'Número de Muertes', 'y': 'Tipo de Lugar'},
+            labels={'x': f'Número de {etiqueta}', 'y': 'Tipo de Lugar'},
             color=tipo_lugar_provincia.values,
             color_continuous_scale='Blues'
         )
@@ -78,18 +79,19 @@ def crear_graficos_tipo_lugar(df: pd.DataFrame):
         fig_prov_torta.update_layout(height=500)
         st.plotly_chart(fig_prov_torta, use_container_width=True)
 
-def crear_graficos_victima_vehiculo(df: pd.DataFrame):
+def crear_graficos_victima_vehiculo(df: pd.DataFrame, unidad: str = "victimas"):
     """Crear gráficos de vehículo de la víctima por provincia y total Argentina"""
     st.markdown("### 🚗 Análisis por Vehículo de la Víctima")
 
-    df_limpio = df[df['victima_vehiculo'].notna() & (df['victima_vehiculo'] != '')].copy()
+    conteos = conteos_categoria(df, 'victima_vehiculo', unidad)
+    etiqueta = ETIQUETAS_UNIDAD[unidad]
 
-    if len(df_limpio) == 0:
+    if len(conteos) == 0:
         st.warning("No hay datos disponibles para vehículo de la víctima")
         return
 
     st.markdown("#### 📊 Total Argentina - Distribución por Vehículo de la Víctima")
-    victima_vehiculo_total = df_limpio['victima_vehiculo'].value_counts().head(10)
+    victima_vehiculo_total = top_total(conteos)
 
     col1, col2 = st.columns(2)
 
@@ -99,7 +101,7 @@ def crear_graficos_victima_vehiculo(df: pd.DataFrame):
             y=victima_vehiculo_total.index,
             orientation='h',
             title="Top 10 Vehículos de Víctimas - Total Argentina",
-            labels={'x': 'Número de Muertes', 'y': 'Tipo de Vehículo'},
+            labels={'x': f'Número de {etiqueta}', 'y': 'Tipo de Vehículo'},
             color=victima_vehiculo_total.values,
             color_continuous_scale='Greens'
         )
@@ -116,15 +118,14 @@ def crear_graficos_victima_vehiculo(df: pd.DataFrame):
         st.plotly_chart(fig_torta, use_container_width=True)
 
     st.markdown("#### 🗺️ Distribución por Provincia")
-    provincias = sorted(df_limpio['provincia_nombre'].unique())
+    provincias = sorted(conteos.index.get_level_values(0).unique())
     provincia_seleccionada = st.selectbox(
         "Selecciona una provincia para ver el análisis de vehículo de la víctima:",
         provincias,
         key="victima_vehiculo_provincia"
     )
 
-    df_provincia = df_limpio[df_limpio['provincia_nombre'] == provincia_seleccionada]
-    victima_vehiculo_provincia = df_provincia['victima_vehiculo'].value_counts().head(10)
+    victima_vehiculo_provincia = top_provincia(conteos, provincia_seleccionada)
 
     col1, col2 = st.columns(2)
 
@@ -134,7 +135,7 @@ def crear_graficos_victima_vehiculo(df: pd.DataFrame):
             y=victima_vehiculo_provincia.index,
             orientation='h',
             title=f"Top 10 Vehículos de Víctimas - {provincia_seleccionada}",
-            labels={'x': 'Número de Muertes', 'y': 'Tipo de Vehículo'},
+            labels={'x': f'Número de {etiqueta}', 'y': 'Tipo de Vehículo'},
             color=victima_vehiculo_provincia.values,
             color_continuous_scale='Purples'
         )
@@ -150,18 +151,18 @@ def crear_graficos_victima_vehiculo(df: pd.DataFrame):
         fig_prov_torta.update_layout(height=500)
         st.plotly_chart(fig_prov_torta, use_container_width=True)
 
-def crear_graficos_inculpado_vehiculo(df: pd.DataFrame):
+def crear_graficos_inculpado_vehiculo(df: pd.DataFrame, unidad: str = "victimas"):
     """Crear gráficos de vehículo del inculpado por provincia y total Argentina"""
     st.markdown("### 🚙 Análisis por Vehículo del Inculpado")
 
-    df_limpio = df[df['inculpado_vehiculo'].notna() & (df['inculpado_vehiculo'] != '')].copy()
+    conteos = conteos_categoria(df, 'inculpado_vehiculo', unidad)
 
-    if len(df_limpio) == 0:
+    if len(conteos) == 0:
         st.warning("No hay datos disponibles para vehículo del inculpado")
         return
 
     st.markdown("#### 📊 Total Argentina - Distribución por Vehículo del Inculpado")
-    inculpado_vehiculo_total = df_limpio['inculpado_vehiculo'].value_counts().head(10)
+    inculpado_vehiculo_total = top_total(conteos)
 
     col1, col2 = st.columns(2)
 
@@ -188,15 +189,14 @@ def crear_graficos_inculpado_vehiculo(df: pd.DataFrame):
         st.plotly_chart(fig_torta, use_container_width=True)
 
     st.markdown("#### 🗺️ Distribución por Provincia")
-    provincias = sorted(df_limpio['provincia_nombre'].unique())
+    provincias = sorted(conteos.index.get_level_values(0).unique())
     provincia_seleccionada = st.selectbox(
         "Selecciona una provincia para ver el análisis de vehículo del inculpado:",
         provincias,
         key="inculpado_vehiculo_provincia"
     )
 
-    df_provincia = df_limpio[df_limpio['provincia_nombre'] == provincia_seleccionada]
-    inculpado_vehiculo_provincia = df_provincia['inculpado_vehiculo'].value_counts().head(10)
+    inculpado_vehiculo_provincia = top_provincia(conteos, provincia_seleccionada)
 
     col1, col2 = st.columns(2)
 
@@ -223,18 +223,18 @@ def crear_graficos_inculpado_vehiculo(df: pd.DataFrame):
         st.plotly_chart(fig_prov_torta, use_container_width=True)
 
 
-def crear_graficos_modo_produccion_hecho(df: pd.DataFrame):
+def crear_graficos_modo_produccion_hecho(df: pd.DataFrame, unidad: str = "victimas"):
     """Crear gráficos de modo de producción del hecho con valores absolutos y porcentuales"""
     st.markdown("### 🚨 Análisis por Modo de Producción del Hecho")
 
-    df_limpio = df[df['modo_produccion_hecho'].notna() & (df['modo_produccion_hecho'] != '')].copy()
+    conteos = conteos_categoria(df, 'modo_produccion_hecho', unidad)
 
-    if len(df_limpio) == 0:
+    if len(conteos) == 0:
         st.warning("No hay datos disponibles para modo de producción del hecho")
         return
 
     st.markdown("#### 🗺️ Filtro por Provincia")
-    provincias = ['Todas las Provincias'] + sorted(df_limpio['provincia_nombre'].unique())
+    provincias = ['Todas las Provincias'] + sorted(conteos.index.get_level_values(0).unique())
     provincia_seleccionada = st.selectbox(
         "Selecciona una provincia para filtrar los datos (o 'Todas las Provincias' para el total):",
         provincias,
@@ -242,14 +242,13 @@ def crear_graficos_modo_produccion_hecho(df: pd.DataFrame):
     )
 
     if provincia_seleccionada == 'Todas las Provincias':
-        df_filtrado = df_limpio
+        modo_produccion_counts = top_total(conteos, n=None)
         titulo_analisis = "Total Argentina"
     else:
-        df_filtrado = df_limpio[df_limpio['provincia_nombre'] == provincia_seleccionada]
+        modo_produccion_counts = top_provincia(conteos, provincia_seleccionada, n=None)
         titulo_analisis = provincia_seleccionada
 
-    modo_produccion_counts = df_filtrado['modo_produccion_hecho'].value_counts()
-    total_casos = len(df_filtrado)
+    total_casos = int(modo_produccion_counts.sum())
 
     df_stats = pd.DataFrame({
         'Modo de Producción': modo_produccion_counts.index,
@@ -0,0 +1,267 @@
+"""
+Importación masiva de incidentes desde CSV o Excel (lotes mensuales de las agencias provinciales).
+Cada regla se evalúa sobre columnas completas (sin recorrer filas):
+- campos obligatorios presentes
+- provincia conocida y valores categóricos dentro del índice de opciones del formulario
+- coordenadas (si vienen) dentro de Argentina y de la caja de su provincia (derivada de los datos históricos)
+- fecha válida y no futura, hora opcional válida
+- edad en un formato que entienda limpiar_edad (número, rango "X-Y", "menos de N") entre 0 y 120, o sin dato
+El resultado es un informe de errores por fila; las filas válidas se agregan en una sola
+transacción del diario de altas con ids reservados como un rango de la secuencia. Un archivo
+(por su contenido) se importa una sola vez por sesión.
+"""
+
+import io
+import hashlib
+import unicodedata
+import numpy as np
+import pandas as pd
+import streamlit as st
+from typing import Dict, List, Tuple
+from app.cambios import registrar_altas
+from app.data_loader import DATA_PATH, FORMATOS_FECHA, FORMATOS_HORA, parsear_con_formatos, version_datos
+from app.indice_opciones import COLUMNAS_OPCIONES, canonizar_opcion, obtener_indice_opciones
+from app.secuencia_ids import reservar_ids
+from app.utils import coordenadas_provincias, limpiar_edad
+
+COLUMNAS_OBLIGATORIAS = ('provincia_nombre', 'fecha_hecho', 'tipo_lugar', 'modo_produccion_hecho')
+
+# Caja de Argentina continental e insular (lat, lon)
+LATITUD_ARGENTINA = (-55.1, -21.7)
+LONGITUD_ARGENTINA = (-73.6, -53.5)
+# Caja observada de cada provincia: percentiles de sus coordenadas históricas más un margen en grados
+PERCENTILES_CAJA_PROVINCIA = (0.001, 0.999)
+MARGEN_CAJA_PROVINCIA = 1.0
+EDAD_MAXIMA = 120
+
+# Nombres alternativos de provincias -> nombre usado en los datos
+ALIAS_PROVINCIAS = {
+    'ciudad autonoma de buenos aires': 'CABA',
+    'capital federal': 'CABA',
+    'tierra del fuego, antartida e islas del atlantico sur': 'Tierra del Fuego',
+}
+
+COLUMNAS_INFORME = ['Fila', 'Columna', 'Valor', 'Error']
+
+
+def _clave_texto(texto: str) -> str:
+    return unicodedata.normalize('NFKD', str(texto)).encode('ascii', 'ignore').decode('ascii').strip().lower()
+
+
+def leer_archivo(nombre: str, contenido: bytes) -> pd.DataFrame:
+    """Lee el archivo subido como texto: Excel por extensión; CSV con ';' o ','."""
+    if nombre.lower().endswith(('.xlsx', '.xls')):
+        return pd.read_excel(io.BytesIO(contenido), dtype=str)
+    datos = pd.read_csv(io.BytesIO(contenido), sep=';', dtype=str, encoding='utf-8-sig')
+    if datos.shape[1] == 1 and ',' in datos.columns[0]:
+        datos = pd.read_csv(io.BytesIO(contenido), sep=',', dtype=str, encoding='utf-8-sig')
+    return datos
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _cajas_provincias(_df: pd.DataFrame, version: str) -> pd.DataFrame:
+    """Caja lat/lon de cada provincia según sus coordenadas históricas (ver PERCENTILES_CAJA_PROVINCIA)."""
+    bajo, alto = PERCENTILES_CAJA_PROVINCIA
+    coordenadas = _df[['provincia_nombre', 'latitud', 'longitud']].dropna()
+    cuantiles = coordenadas.groupby('provincia_nombre')[['latitud', 'longitud']].quantile([bajo, alto]).unstack()
+    return pd.DataFrame({
+        'lat_min': cuantiles[('latitud', bajo)] - MARGEN_CAJA_PROVINCIA,
+        'lat_max': cuantiles[('latitud', alto)] + MARGEN_CAJA_PROVINCIA,
+        'lon_min': cuantiles[('longitud', bajo)] - MARGEN_CAJA_PROVINCIA,
+        'lon_max': cuantiles[('longitud', alto)] + MARGEN_CAJA_PROVINCIA,
+    })
+
+
+def _errores(mascara: np.ndarray, columna: str, valores: pd.Series, mensaje: str) -> pd.DataFrame:
+    """Filas del informe para las posiciones donde mascara es True."""
+    posiciones = np.flatnonzero(mascara)
+    return pd.DataFrame({
+        'posicion': posiciones,
+        'Columna': columna,
+        'Valor': valores.iloc[posiciones].astype(str).to_numpy() if len(posiciones) else [],
+        'Error': mensaje,
+    })
+
+
+def validar(
+    datos: pd.DataFrame,
+    opciones: Dict[str, List[str]],
+    cajas: pd.DataFrame
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Valida y normaliza todas las filas a la vez.
+    Devuelve (filas normalizadas, informe de errores con una fila por problema);
+    'Fila' es el número de fila en el archivo (el encabezado es la fila 1).
+    """
+    n = len(datos)
+    vacio = pd.Series([''] * n, index=datos.index, dtype=object)
+    texto = {c: datos[c].astype(str).str.strip().where(datos[c].notna(), '') if c in datos.columns else vacio
+             for c in set(datos.columns) | set(COLUMNAS_OBLIGATORIAS)}
+    normalizados = datos.copy()
+    informe = []
+
+    for columna in COLUMNAS_OBLIGATORIAS:
+        informe.append(_errores((texto[columna] == '').to_numpy(), columna, texto[columna], "Campo obligatorio vacío"))
+
+    # Provincia: se compara sin acentos ni mayúsculas y se lleva al nombre de los datos
+    conocidas = {_clave_texto(p): p for p in coordenadas_provincias}
+    conocidas.update(ALIAS_PROVINCIAS)
+    distintas = pd.Series(texto['provincia_nombre'].unique())
+    canonicas = dict(zip(distintas, distintas.map(lambda p: conocidas.get(_clave_texto(p)))))
+    provincia = texto['provincia_nombre'].map(canonicas)
+    informe.append(_errores((provincia.isna() & (texto['provincia_nombre'] != '')).to_numpy(),
+                            'provincia_nombre', texto['provincia_nombre'], "Provincia desconocida"))
+    normalizados['provincia_nombre'] = provincia
+
+    # Categóricas: canonizadas igual que el formulario y contra el índice de opciones
+    for columna in COLUMNAS_OPCIONES:
+        if columna not in datos.columns or columna not in opciones:
+            continue
+        distintas = pd.Series(texto[columna].unique())
+        canonicas = dict(zip(distintas, distintas.map(canonizar_opcion)))
+        valores = texto[columna].map(canonicas)
+        desconocidos = ~valores.isin(opciones[columna]) & (texto[columna] != '')
+        informe.append(_errores(desconocidos.to_numpy(), columna, texto[columna], "Valor fuera de las opciones conocidas"))
+        normalizados[columna] = valores.where(texto[columna] != '')
+
+    # Coordenadas: numéricas, dentro de Argentina y de la caja de la provincia
+    latitud = pd.to_numeric(texto['latitud'].str.replace(',', '.', regex=False), errors='coerce')
+    longitud = pd.to_numeric(texto['longitud'].str.replace(',', '.', regex=False), errors='coerce')
+    for columna, valores, crudos in (('latitud', latitud, texto['latitud']), ('longitud', longitud, texto['longitud'])):
+        informe.append(_errores((valores.isna() & (crudos != '')).to_numpy(), columna, crudos, "No es un número"))
+    fuera_pais = ~latitud.between(*LATITUD_ARGENTINA) | ~longitud.between(*LONGITUD_ARGENTINA)
+    fuera_pais &= latitud.notna() & longitud.notna()
+    informe.append(_errores(fuera_pais.to_numpy(), 'latitud/longitud', latitud.astype(str) + ', ' + longitud.astype(str),
+                            "Coordenadas fuera de Argentina"))
+    caja = cajas.reindex(provincia.to_numpy())
+    fuera_provincia = (
+        (latitud.to_numpy() < caja['lat_min'].to_numpy()) | (latitud.to_numpy() > caja['lat_max'].to_numpy()) |
+        (longitud.to_numpy() < caja['lon_min'].to_numpy()) | (longitud.to_numpy() > caja['lon_max'].to_numpy())
+    ) & ~fuera_pais.to_numpy()
+    informe.append(_errores(fuera_provincia, 'latitud/longitud', latitud.astype(str) + ', ' + longitud.astype(str),
+                            "Coordenadas fuera de la provincia"))
+    normalizados['latitud'], normalizados['longitud'] = latitud, longitud
+
+    # Fecha (formatos explícitos del cargador), no futura; anio y mes salen de la fecha
+    fecha = parsear_con_formatos(texto['fecha_hecho'].replace('', np.nan), FORMATOS_FECHA)
+    informe.append(_errores((fecha.isna() & (texto['fecha_hecho'] != '')).to_numpy(), 'fecha_hecho', texto['fecha_hecho'],
+                            "Fecha inválida (AAAA-MM-DD o DD/MM/AAAA)"))
+    informe.append(_errores((fecha > pd.Timestamp.now()).to_numpy(), 'fecha_hecho', texto['fecha_hecho'], "Fecha futura"))
+    normalizados['fecha_hecho'] = fecha.dt.strftime('%d/%m/%Y')
+    normalizados['anio'] = fecha.dt.year.astype('Int64')
+    normalizados['mes'] = fecha.dt.month.astype('Int64')
+
+    if 'hora_hecho' in datos.columns:
+        hora = parsear_con_formatos(texto['hora_hecho'].replace('', np.nan), FORMATOS_HORA)
+        informe.append(_errores((hora.isna() & (texto['hora_hecho'] != '')).to_numpy(), 'hora_hecho', texto['hora_hecho'],
+                                "Hora inválida (HH:MM o HH:MM:SS)"))
+        normalizados['hora_hecho'] = hora.dt.strftime('%H:%M:%S')
+
+    if 'victima_tr_edad' in datos.columns:
+        # Se guarda el texto original (como en el dataset); sin dígitos ("SD", vacío) es edad desconocida
+        distintas = pd.Series(texto['victima_tr_edad'].unique())
+        edades = dict(zip(distintas, distintas.map(limpiar_edad)))
+        edad = texto['victima_tr_edad'].map(edades)
+        con_numero = texto['victima_tr_edad'].str.contains(r'\d', regex=True)
+        invalida = con_numero & (edad.isna() | ~edad.between(0, EDAD_MAXIMA))
+        informe.append(_errores(invalida.to_numpy(), 'victima_tr_edad', texto['victima_tr_edad'],
+                                f"Edad inválida (número, rango X-Y o 'menos de N', de 0 a {EDAD_MAXIMA})"))
+
+    informe = pd.concat(informe, ignore_index=True)
+    informe['Fila'] = informe.pop('posicion') + 2
+    informe = informe.sort_values(['Fila', 'Columna'], kind='stable').reset_index(drop=True)
+    return normalizados, informe[COLUMNAS_INFORME]
+
+
+def asignar_ids(filas: pd.DataFrame) -> pd.Series:
+    """
+    Reserva un rango de ids de la secuencia: uno por incidente. Las filas que comparten el
+    id_hecho del archivo (varias víctimas de un mismo hecho) reciben el mismo id nuevo.
+    """
+    if 'id_hecho' in filas.columns and filas['id_hecho'].notna().any():
+        codigos, _ = pd.factorize(filas['id_hecho'])
+        sin_id = codigos < 0
+        codigos[sin_id] = codigos.max(initial=-1) + 1 + np.arange(sin_id.sum())
+    else:
+        codigos = np.arange(len(filas))
+    ids = reservar_ids(int(codigos.max(initial=-1)) + 1)
+    return pd.Series(ids.start + codigos, index=filas.index)
+
+
+def importar(filas: pd.DataFrame, columnas_csv: List[str]) -> range:
+    """Agrega las filas validadas como una transacción del diario (ver app.cambios); devuelve los ids asignados."""
+    filas = filas.assign(id_hecho=asignar_ids(filas))
+    columnas = columnas_csv or list(filas.columns)
+    registrar_altas(filas.reindex(columns=columnas), DATA_PATH)
+    return range(int(filas['id_hecho'].min()), int(filas['id_hecho'].max()) + 1)
+
+
+def mostrar_importacion_masiva(df: pd.DataFrame):
+    """Carga de un archivo, informe de validación e importación de las filas válidas."""
+    st.markdown("### 📥 Importación Masiva de Incidentes")
+    st.caption(
+        "Archivo CSV (separado por ';' o ',') o Excel con las columnas del dataset. Obligatorias: "
+        + ", ".join(COLUMNAS_OBLIGATORIAS) + ". Una fila por víctima; las filas con el mismo id_hecho forman un hecho."
+    )
+    archivo = st.file_uploader("Archivo a importar", type=['csv', 'xlsx', 'xls'], key="importacion_archivo")
+    if archivo is None:
+        return
+
+    # Un archivo ya importado en la sesión sigue en el uploader: no se vuelve a ofrecer
+    contenido = archivo.getvalue()
+    huella = hashlib.sha1(contenido).hexdigest()
+    importados: Dict[str, range] = st.session_state.setdefault("importacion_importados", {})
+    if huella in importados:
+        ids = importados[huella]
+        st.info(
+            f"ℹ️ Este archivo ya se importó en esta sesión (id_hecho {ids.start} a {ids.stop - 1}). "
+            "Para importar otro, quítelo y cargue el nuevo."
+        )
+        return
+
+    try:
+        datos = leer_archivo(archivo.name, contenido)
+    except Exception as e:
+        st.error(f"❌ No se pudo leer el archivo: {e}")
+        return
+    if datos.empty:
+        st.warning("El archivo no tiene filas.")
+        return
+
+    indice = obtener_indice_opciones()
+    normalizados, informe = validar(datos, indice.opciones, _cajas_provincias(df, version_datos(df)))
+    filas_con_error = informe['Fila'].unique() - 2
+    validas = np.ones(len(datos), dtype=bool)
+    validas[filas_con_error] = False
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("📄 Filas leídas", f"{len(datos):,}")
+    with col2:
+        st.metric("✅ Filas válidas", f"{int(validas.sum()):,}")
+    with col3:
+        st.metric("⚠️ Filas con errores", f"{len(filas_con_error):,}")
+
+    if not informe.empty:
+        st.markdown("#### ⚠️ Informe de errores")
+        resumen = informe.groupby(['Columna', 'Error']).size().rename('Filas').reset_index()
+        st.dataframe(resumen, use_container_width=True, hide_index=True)
+        st.dataframe(informe.head(1000), use_container_width=True, hide_index=True)
+        st.download_button(
+            "⬇️ Descargar informe completo (CSV)",
+            informe.to_csv(index=False, sep=';').encode('utf-8'),
+            file_name="errores_importacion.csv",
+            mime="text/csv"
+        )
+
+    if not validas.any():
+        st.error("No hay filas válidas para importar.")
+        return
+    if st.button(f"💾 Importar {int(validas.sum()):,} filas válidas", type="primary", key="importacion_confirmar"):
+        try:
+            ids = importar(normalizados[validas], indice.columnas)
+        except Exception as e:
+            st.error(f"❌ Error al importar: {e}")
+            return
+        importados[huella] = ids
+        st.success(f"✅ Se importaron {int(validas.sum()):,} filas (id_hecho {ids.start} a {ids.stop - 1}).")
@@ -0,0 +1,263 @@
+"""
+Modelo dual víctima / incidente.
+El CSV tiene una fila por persona; aquí se mantiene además una tabla por incidente
+(id_hecho único) y el mapeo entre ambas, calculados una sola vez.
+El modelo, los conteos precalculados y el resumen por provincia siguen las altas en vivo
+(app.cambios) sumando solo las filas nuevas.
+"""
+
+import copy
+import pandas as pd
+import numpy as np
+from typing import List, Optional, Tuple
+from app.cambios import Cambio, CacheIncremental
+from app.columnas_crecientes import TablaCreciente, VectorCreciente
+from app.instrumentacion import medir
+
+# Opción visible -> unidad interna
+UNIDADES_CONTEO = {
+    "Víctimas": "victimas",
+    "Incidentes": "incidentes",
+}
+
+# Sustantivo usado en títulos y etiquetas según la unidad
+ETIQUETAS_UNIDAD = {
+    "victimas": "Muertes",
+    "incidentes": "Siniestros",
+}
+
+# Columnas propias del hecho (se toma el primer valor de cada incidente)
+COLUMNAS_INCIDENTE = (
+    'provincia_nombre', 'localidad_nombre', 'anio', 'mes', 'fecha_hecho', 'hora_hecho',
+    'latitud', 'longitud', 'tipo_lugar', 'modo_produccion_hecho', 'calle_nombre',
+    'fecha', 'hora', 'dia_semana', 'feriado'
+)
+
+COLUMNAS_VEHICULO = ('victima_vehiculo', 'inculpado_vehiculo')
+BITS_POR_PALABRA = 64  # vehículos por columna uint64 de la máscara
+
+
+def columnas_mascara(n_vehiculos: int) -> List[str]:
+    """Columnas uint64 de la máscara de vehículos: 'vehiculos' (los primeros 64), 'vehiculos_1', ..."""
+    palabras = max(1, -(-n_vehiculos // BITS_POR_PALABRA))
+    return ['vehiculos'] + [f'vehiculos_{k}' for k in range(1, palabras)]
+
+
+def _codigos_incidente(ids: pd.Series) -> np.ndarray:
+    """Código 0..k-1 de incidente de cada fila, en orden de aparición."""
+    codigos, _ = pd.factorize(ids)
+    codigos = codigos.astype(np.int64)
+    # Las filas sin id_hecho se tratan como incidentes independientes
+    sin_id = codigos < 0
+    codigos[sin_id] = codigos.max(initial=-1) + 1 + np.arange(sin_id.sum())
+    return codigos
+
+
+def _tabla_incidentes(df: pd.DataFrame, codigos: np.ndarray) -> pd.DataFrame:
+    columnas = [c for c in COLUMNAS_INCIDENTE if c in df.columns]
+    agregaciones = {c: (c, 'first') for c in columnas}
+    agregaciones.update({
+        'id_hecho': ('id_hecho', 'first'),
+        'victimas': ('id_hecho', 'size'),
+        'edad_min': ('victima_tr_edad', 'min'),
+        'edad_max': ('victima_tr_edad', 'max'),
+    })
+    tabla = df.groupby(codigos, sort=True).agg(**agregaciones)
+    tabla.index.name = 'incidente'
+    return tabla
+
+
+def _mascaras(df: pd.DataFrame, codigos: np.ndarray, n_incidentes: int, vehiculos: List[str]) -> pd.DataFrame:
+    columnas = columnas_mascara(len(vehiculos))
+    mascaras = np.zeros((n_incidentes, len(columnas)), dtype=np.uint64)
+    for columna in COLUMNAS_VEHICULO:
+        if columna not in df.columns:
+            continue
+        posicion = pd.Index(vehiculos).get_indexer(df[columna])
+        conocidos = posicion >= 0
+        palabra, bit = np.divmod(posicion[conocidos], BITS_POR_PALABRA)
+        bits = np.left_shift(np.uint64(1), bit.astype(np.uint64))
+        np.bitwise_or.at(mascaras, (codigos[conocidos], palabra), bits)
+    return pd.DataFrame(mascaras, columns=columnas)
+
+
+class ModeloIncidentes:
+    """
+    Tabla de incidentes deduplicada por id_hecho, construida con un único groupby:
+    - victimas: cantidad de filas (personas) del incidente
+    - edad_min / edad_max: sobre victima_tr_edad
+    - vehiculos, vehiculos_1, ...: máscara de bits con los vehículos involucrados, 64 por
+      columna (ver columnas_mascara y vehiculos_de)
+    Además guarda el código de incidente de cada fila para ir y volver entre ambos niveles.
+    Tabla y arreglos son de solo lectura (los comparten sesiones y versiones de datos).
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        codigos = _codigos_incidente(df['id_hecho'])
+        n_incidentes = int(codigos.max(initial=-1)) + 1
+        tabla = _tabla_incidentes(df, codigos)
+
+        # Conjunto de vehículos como máscara de bits, acumulada con OR por incidente
+        valores = pd.concat([df[c] for c in COLUMNAS_VEHICULO if c in df.columns], ignore_index=True)
+        _, self.vehiculos = pd.factorize(valores.dropna(), sort=True)
+        self.vehiculos = list(self.vehiculos)
+        tabla = tabla.join(_mascaras(df, codigos, n_incidentes, self.vehiculos))
+
+        # Mapeo incidente -> filas de víctimas (tramos contiguos de una permutación)
+        orden = np.argsort(codigos, kind='stable')
+        limites = np.searchsorted(codigos[orden], np.arange(n_incidentes + 1))
+        # Tabla y arreglos crecen por el final con las altas en vivo (ver agregado)
+        self._crecientes = (TablaCreciente(tabla), VectorCreciente(codigos), VectorCreciente(orden), VectorCreciente(limites))
+        self._publicar()
+
+    def _publicar(self):
+        tabla, codigos, orden, limites = self._crecientes
+        self.tabla = tabla.frame()
+        self.codigos = codigos.valores
+        self._orden = orden.valores
+        self._limites = limites.valores
+
+    def agregado(self, filas: pd.DataFrame) -> "ModeloIncidentes":
+        """
+        Modelo con las filas nuevas sumadas al final; self no cambia. Las altas son siempre
+        incidentes nuevos (ver app.cambios.Cambio): sus códigos siguen a los existentes.
+        """
+        locales = _codigos_incidente(filas['id_hecho'])
+        n_nuevos = int(locales.max(initial=-1)) + 1
+        tabla = _tabla_incidentes(filas, locales)
+        valores = pd.concat([filas[c] for c in COLUMNAS_VEHICULO if c in filas.columns], ignore_index=True).dropna()
+        vehiculos = self.vehiculos + sorted(set(valores) - set(self.vehiculos))
+        tabla = tabla.join(_mascaras(filas, locales, n_nuevos, vehiculos))
+
+        orden = np.argsort(locales, kind='stable')
+        limites = np.searchsorted(locales[orden], np.arange(1, n_nuevos + 1))
+        anterior, codigos, orden_anterior, limites_anteriores = self._crecientes
+        faltantes = [c for c in tabla.columns if c not in anterior.columnas]
+        if faltantes:
+            # Pasaron los 64 vehículos de la última columna: se rehace la tabla con una más en cero (O(n), raro)
+            anterior = TablaCreciente(self.tabla.assign(**{c: np.uint64(0) for c in faltantes}))
+        n_filas = len(self.codigos)
+        nuevo = copy.copy(self)
+        nuevo.vehiculos = vehiculos
+        nuevo._crecientes = (
+            anterior.agregada(tabla),
+            codigos.agregado(locales + self.n_incidentes),
+            orden_anterior.agregado(orden + n_filas),
+            limites_anteriores.agregado(limites + n_filas),
+        )
+        nuevo._publicar()
+        return nuevo
+
+    @property
+    def n_incidentes(self) -> int:
+        return len(self.tabla)
+
+    def filas_de(self, incidente: int) -> np.ndarray:
+        """Posiciones (iloc) de las víctimas de un incidente."""
+        return self._orden[self._limites[incidente]:self._limites[incidente + 1]]
+
+    def incidentes_de(self, posiciones: np.ndarray) -> np.ndarray:
+        """Incidentes (sin repetir) a los que pertenecen las filas de víctimas indicadas."""
+        return np.unique(self.codigos[posiciones])
+
+    def mascara_de(self, incidente: int) -> int:
+        """Máscara de vehículos de un incidente, con todas sus columnas unidas en un entero."""
+        fila = self.tabla.iloc[incidente]
+        return sum(int(fila[c]) << (k * BITS_POR_PALABRA) for k, c in enumerate(columnas_mascara(len(self.vehiculos))))
+
+    def vehiculos_de(self, mascara: int) -> List[str]:
+        """Decodifica una máscara de vehículos (ver mascara_de)."""
+        mascara = int(mascara)
+        return [v for i, v in enumerate(self.vehiculos) if mascara >> i & 1]
+
+
+def _agregar_modelo(modelo: ModeloIncidentes, cambio: Cambio) -> ModeloIncidentes:
+    return modelo.agregado(cambio.filas)
+
+
+_modelos = CacheIncremental(ModeloIncidentes, _agregar_modelo, max_entradas=2)
+
+
+@medir("obtener_modelo_incidentes")
+def obtener_modelo_incidentes(df: pd.DataFrame) -> ModeloIncidentes:
+    """Tabla de incidentes, construida una vez y seguida con las altas en vivo."""
+    return _modelos.obtener(df)
+
+
+def _contar(datos: pd.DataFrame, columnas: Tuple[str, ...], incidentes: Optional[np.ndarray]) -> pd.Series:
+    claves = datos[list(columnas)]
+    if incidentes is not None:
+        # Un incidente cuenta una vez por cada combinación distinta de valores
+        claves = claves.assign(_incidente=incidentes).drop_duplicates()
+    return claves.groupby(list(columnas), observed=True).size()
+
+
+def _construir_conteos(df: pd.DataFrame, columnas: Tuple[str, ...], unidad: str) -> pd.Series:
+    incidentes = obtener_modelo_incidentes(df).codigos if unidad == "incidentes" else None
+    return _contar(df, columnas, incidentes).sort_values(ascending=False)
+
+
+def _agregar_conteos(conteos: pd.Series, cambio: Cambio, columnas: Tuple[str, ...], unidad: str) -> pd.Series:
+    # Las altas son siempre incidentes nuevos: sus filas se agrupan por id_hecho entre ellas
+    incidentes = pd.factorize(cambio.filas['id_hecho'])[0] if unidad == "incidentes" else None
+    nuevos = _contar(cambio.filas, columnas, incidentes)
+    return conteos.add(nuevos, fill_value=0).astype(np.int64).sort_values(ascending=False)
+
+
+_conteos = CacheIncremental(_construir_conteos, _agregar_conteos, max_entradas=64)
+
+
+def obtener_conteos(df: pd.DataFrame, columnas: Tuple[str, ...], unidad: str = "victimas") -> pd.Series:
+    """
+    Conteo precalculado por las columnas indicadas, en víctimas o en incidentes.
+    Devuelve una Series (índice = valores de las columnas) ordenada de mayor a menor.
+    """
+    return _conteos.obtener(df, tuple(columnas), unidad)
+
+
+def _partes_provincias(datos: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
+    """Partes sumables del resumen: suma y cantidad de edades por provincia, y filas por (provincia, año)."""
+    edades = datos.groupby('provincia_nombre')['victima_tr_edad'].agg(['sum', 'count'])
+    anios = datos.groupby(['provincia_nombre', 'anio']).size()
+    return edades, anios
+
+
+def _agregar_partes(partes: Tuple[pd.DataFrame, pd.Series], cambio: Cambio) -> Tuple[pd.DataFrame, pd.Series]:
+    edades, anios = partes
+    nuevas_edades, nuevos_anios = _partes_provincias(cambio.filas)
+    return edades.add(nuevas_edades, fill_value=0), anios.add(nuevos_anios, fill_value=0)
+
+
+_partes = CacheIncremental(_partes_provincias, _agregar_partes, max_entradas=2)
+
+
+def _resumen_provincias(df: pd.DataFrame, unidad: str) -> pd.DataFrame:
+    # Se arma desde las partes y los conteos (ambos seguidos con las altas): O(provincias x años)
+    edades, anios = _partes.obtener(df)
+    anio = pd.Series(anios.index.get_level_values('anio'), index=anios.index.get_level_values('provincia_nombre'))
+    resumen = pd.DataFrame({'edad_promedio': edades['sum'] / edades['count']}).join(
+        anio.groupby(level=0).agg(['min', 'max', 'size']).rename(
+            columns={'min': 'anio_min', 'max': 'anio_max', 'size': 'anios_con_datos'}
+        )
+    )
+    resumen['anios_con_datos'] = resumen['anios_con_datos'].fillna(0).astype(np.int64)
+    resumen['total'] = obtener_conteos(df, ('provincia_nombre',), unidad)
+    resumen = resumen.fillna({'edad_promedio': 0, 'anio_min': 0, 'anio_max': 0}).round(2)
+    return resumen[['total', 'edad_promedio', 'anio_min', 'anio_max', 'anios_con_datos']].reset_index()
+
+
+def _actualizar_resumen(resumen: pd.DataFrame, cambio: Cambio, unidad: str) -> pd.DataFrame:
+    return _resumen_provincias(cambio.datos, unidad)
+
+
+# Después de _partes y _conteos: al recibir un Cambio, ambos ya siguen la versión nueva
+_resumenes = CacheIncremental(_resumen_provincias, _actualizar_resumen, max_entradas=4)
+
+
+@medir("resumen_provincias")
+def obtener_resumen_provincias(df: pd.DataFrame, unidad: str = "victimas") -> pd.DataFrame:
+    """
+    Resumen por provincia: total (según la unidad), edad promedio de las víctimas,
+    primer y último año con datos y cantidad de años con datos.
+    """
+    return _resumenes.obtener(df, unidad)
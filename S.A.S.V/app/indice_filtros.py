@@ -0,0 +1,153 @@
+"""
+Índice de filtros con bitmaps empaquetados por año, mes, provincia, tipo de lugar y vehículo.
+Cualquier combinación de filtros se resuelve con AND/OR bit a bit sobre los bitmaps,
+sin volver a recorrer las columnas del DataFrame. Las altas publicadas en vivo (app.cambios)
+solo prenden sus bits: el índice no se reconstruye.
+"""
+
+import pandas as pd
+import numpy as np
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from app.cambios import Cambio, CacheIncremental
+
+# Columnas indexadas por defecto
+COLUMNAS_INDICE = (
+    'anio', 'mes', 'provincia_nombre', 'tipo_lugar', 'victima_vehiculo', 'inculpado_vehiculo'
+)
+
+# Nombre del argumento de filtrar() -> columna indexada
+FILTROS = {
+    'anios': 'anio',
+    'meses': 'mes',
+    'provincias': 'provincia_nombre',
+    'tipos_lugar': 'tipo_lugar',
+    'victima_vehiculos': 'victima_vehiculo',
+    'inculpado_vehiculos': 'inculpado_vehiculo',
+}
+
+
+def _normalizar_valor(valor: Any) -> Any:
+    """Los años y meses numéricos se indexan como int (2019.0 -> 2019)."""
+    if isinstance(valor, (float, np.floating)) and float(valor).is_integer():
+        return int(valor)
+    if isinstance(valor, np.integer):
+        return int(valor)
+    return valor
+
+
+class IndiceFiltros:
+    """
+    Un bitmap empaquetado (1 bit por fila, np.packbits) por cada valor distinto
+    de las columnas indexadas. Los nulos no tienen bitmap: nunca coinciden con un filtro.
+    Un bitmap puede ser más corto que n_filas: las filas que le faltan valen 0.
+    """
+
+    def __init__(self, df: pd.DataFrame, columnas: Iterable[str] = COLUMNAS_INDICE):
+        self.n_filas = len(df)
+        self.bitmaps: Dict[str, Dict[Any, np.ndarray]] = {}
+
+        for columna in columnas:
+            if columna not in df.columns:
+                continue
+            codigos, valores = pd.factorize(df[columna], sort=True)
+            # Un solo ordenamiento por columna: cada valor ocupa un tramo contiguo de filas
+            orden = np.argsort(codigos, kind='stable')
+            limites = np.searchsorted(codigos[orden], np.arange(len(valores) + 1))
+            bitmaps = {}
+            for i, valor in enumerate(valores):
+                filas = np.zeros(self.n_filas, dtype=bool)
+                filas[orden[limites[i]:limites[i + 1]]] = True
+                bitmaps[_normalizar_valor(valor)] = np.packbits(filas)
+            self.bitmaps[columna] = bitmaps
+
+    def agregado(self, filas: pd.DataFrame, desde: int) -> "IndiceFiltros":
+        """
+        Índice con filas nuevas sumadas al final (la primera en la posición `desde`); self no cambia.
+        Solo se copian y extienden los bitmaps de los valores que aparecen en las filas nuevas.
+        """
+        nuevo = IndiceFiltros.__new__(IndiceFiltros)
+        nuevo.n_filas = desde + len(filas)
+        nuevo.bitmaps = {}
+        for columna, bitmaps in self.bitmaps.items():
+            bitmaps = dict(bitmaps)
+            codigos, valores = pd.factorize(filas[columna]) if columna in filas.columns else ([], [])
+            for i, valor in enumerate(valores):
+                posiciones = desde + np.flatnonzero(codigos == i)
+                clave = _normalizar_valor(valor)
+                anterior = bitmaps.get(clave, np.zeros(0, dtype=np.uint8))
+                bitmap = np.zeros(max(len(anterior), int(posiciones[-1]) // 8 + 1), dtype=np.uint8)
+                bitmap[:len(anterior)] = anterior
+                np.bitwise_or.at(bitmap, posiciones >> 3, (0x80 >> (posiciones & 7)).astype(np.uint8))
+                bitmaps[clave] = bitmap
+            if len(bitmaps) > len(self.bitmaps[columna]):
+                bitmaps = dict(sorted(bitmaps.items()))
+            nuevo.bitmaps[columna] = bitmaps
+        return nuevo
+
+    def valores(self, columna: str) -> List[Any]:
+        """Valores distintos (ordenados) de una columna indexada."""
+        return list(self.bitmaps.get(columna, {}).keys())
+
+    def _union(self, columna: str, valores: Iterable[Any]) -> np.ndarray:
+        """OR de los bitmaps de los valores pedidos (valores sin bitmap no aportan filas)."""
+        resultado = np.zeros((self.n_filas + 7) // 8, dtype=np.uint8)
+        bitmaps = self.bitmaps.get(columna, {})
+        for valor in valores:
+            bitmap = bitmaps.get(_normalizar_valor(valor))
+            if bitmap is not None:
+                parte = resultado[:len(bitmap)]
+                np.bitwise_or(parte, bitmap[:len(parte)], out=parte)
+        return resultado
+
+    def bitmap(self, anios: Optional[Tuple[int, int]] = None, **filtros) -> Optional[np.ndarray]:
+        """
+        Bitmap empaquetado resultante de combinar los filtros (AND entre columnas, OR dentro de cada una).
+        - anios: rango inclusivo (desde, hasta)
+        - resto: listas de valores, con las claves de FILTROS (meses, provincias, ...)
+        Un filtro en None no restringe; una lista vacía no deja filas. Devuelve None si no hay filtros.
+        """
+        resultado = None
+        condiciones = dict(filtros)
+        if anios is not None:
+            condiciones['anios'] = [a for a in self.valores('anio') if anios[0] <= a <= anios[1]]
+
+        for nombre, valores in condiciones.items():
+            if nombre not in FILTROS:
+                raise ValueError(f"Filtro desconocido: {nombre}")
+            if valores is None:
+                continue
+            union = self._union(FILTROS[nombre], valores)
+            resultado = union if resultado is None else np.bitwise_and(resultado, union, out=resultado)
+        return resultado
+
+    def filtrar(self, anios: Optional[Tuple[int, int]] = None, **filtros) -> np.ndarray:
+        """Posiciones (iloc, en orden ascendente) de las filas que cumplen todos los filtros."""
+        bitmap = self.bitmap(anios=anios, **filtros)
+        if bitmap is None:
+            return np.arange(self.n_filas)
+        return np.flatnonzero(np.unpackbits(bitmap, count=self.n_filas))
+
+    def contar(self, anios: Optional[Tuple[int, int]] = None, **filtros) -> int:
+        """Cantidad de filas que cumplen los filtros, sin materializar las posiciones."""
+        bitmap = self.bitmap(anios=anios, **filtros)
+        if bitmap is None:
+            return self.n_filas
+        return int(np.unpackbits(bitmap, count=self.n_filas).sum())
+
+
+def _agregar_cambio(indice: IndiceFiltros, cambio: Cambio) -> IndiceFiltros:
+    return indice.agregado(cambio.filas, cambio.desde)
+
+
+_indices = CacheIncremental(IndiceFiltros, _agregar_cambio, max_entradas=2)
+
+
+def obtener_indice_filtros(df: pd.DataFrame) -> IndiceFiltros:
+    """Índice construido una vez y seguido con las altas en vivo; compartido entre vistas y sesiones."""
+    return _indices.obtener(df)
+
+
+def filtrar_datos(df: pd.DataFrame, anios: Optional[Tuple[int, int]] = None, **filtros) -> pd.DataFrame:
+    """Atajo para las vistas: devuelve las filas del DataFrame completo que cumplen los filtros."""
+    indice = obtener_indice_filtros(df)
+    return df.iloc[indice.filtrar(anios=anios, **filtros)]
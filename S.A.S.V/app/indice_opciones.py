@@ -0,0 +1,140 @@
+"""
+Índice de opciones del formulario de registro.
+Guarda junto al CSV los valores distintos (canonizados) de cada columna categórica del
+formulario y el encabezado del archivo, así el formulario no lee el CSV en cada rerun:
+- se construye una sola vez leyendo solo esas columnas (o de nuevo si el CSV cambió por fuera)
+- se mantiene al agregar registros desde la app, sin releer el archivo
+- la versión del CSV y su diario de altas con la que está sincronizado va dentro del índice
+- quien lo escribe toma un bloqueo exclusivo (<índice>.lock): dos altas simultáneas, de sesiones
+  o de procesos distintos, no se pisan los valores nuevos
+"""
+
+import os
+import json
+import bisect
+import pandas as pd
+import streamlit as st
+from typing import Any, Dict, List, Mapping, Sequence
+from app.bloqueo_archivos import bloqueo_exclusivo
+from app.data_loader import DATA_PATH, version_fuente
+from app.diario import bloqueo_diario, filas_diario
+
+COLUMNAS_OPCIONES = ('tipo_lugar', 'victima_vehiculo', 'inculpado_vehiculo', 'modo_produccion_hecho')
+VALOR_FALTANTE = "Desconocido"
+SEPARADOR_CSV = ';'
+
+
+def ruta_indice(path: str = DATA_PATH) -> str:
+    """Archivo del índice, al lado del CSV (data/MUERTES_VIALES_opciones.json)."""
+    return f"{os.path.splitext(path)[0]}_opciones.json"
+
+
+def canonizar_opcion(valor: Any) -> str:
+    """Forma en que el formulario muestra un valor: sin espacios extremos y capitalizado ('' si no hay valor)."""
+    if valor is None or (isinstance(valor, float) and pd.isna(valor)):
+        valor = VALOR_FALTANTE
+    texto = str(valor).strip()
+    return '' if texto.lower() == 'nan' else texto.title()
+
+
+class IndiceOpciones:
+    """
+    - columnas: encabezado del CSV, en orden
+    - opciones: columna -> valores distintos canonizados, ordenados
+    - version: versión del CSV que refleja el índice
+    """
+
+    def __init__(self, columnas: List[str], opciones: Dict[str, List[str]], version: str):
+        self.columnas = list(columnas)
+        self.opciones = {columna: list(valores) for columna, valores in opciones.items()}
+        self.version = version
+
+    @classmethod
+    def construir(cls, path: str = DATA_PATH) -> "IndiceOpciones":
+        """Lee del CSV solo el encabezado y las columnas del formulario, más las altas del diario."""
+        version = version_fuente(path)
+        if not os.path.exists(path):
+            return cls([], {}, version)
+        with bloqueo_diario(path):
+            columnas = pd.read_csv(path, sep=SEPARADOR_CSV, nrows=0).columns.tolist()
+            datos = pd.read_csv(path, sep=SEPARADOR_CSV, usecols=lambda c: c in COLUMNAS_OPCIONES, dtype=str)
+            diario = filas_diario(path)
+        if not diario.empty:
+            datos = pd.concat([datos, diario.reindex(columns=datos.columns)], ignore_index=True)
+        opciones = {}
+        for columna in datos.columns:
+            distintos = {canonizar_opcion(v) for v in datos[columna].fillna(VALOR_FALTANTE).unique()}
+            opciones[columna] = sorted(distintos - {''})
+        return cls(columnas, opciones, version)
+
+    @classmethod
+    def leer(cls, path: str = DATA_PATH) -> "IndiceOpciones":
+        with open(ruta_indice(path), encoding="utf-8") as archivo:
+            contenido = json.load(archivo)
+        return cls(contenido['columnas'], contenido['opciones'], contenido['version'])
+
+    def guardar(self, path: str = DATA_PATH):
+        """Escritura atómica: archivo temporal y os.replace."""
+        ruta = ruta_indice(path)
+        with open(f"{ruta}.tmp", "w", encoding="utf-8") as archivo:
+            json.dump({'version': self.version, 'columnas': self.columnas, 'opciones': self.opciones}, archivo, ensure_ascii=False)
+        os.replace(f"{ruta}.tmp", ruta)
+
+    def agregar(self, registro: Mapping[str, Any]):
+        """Incorpora los valores de un registro nuevo (inserción ordenada, sin duplicados)."""
+        for columna in COLUMNAS_OPCIONES:
+            if columna not in registro:
+                continue
+            valor = canonizar_opcion(registro[columna])
+            valores = self.opciones.setdefault(columna, [])
+            posicion = bisect.bisect_left(valores, valor)
+            if valor and (posicion == len(valores) or valores[posicion] != valor):
+                valores.insert(posicion, valor)
+
+    def opciones_de(self, columna: str, por_defecto: List[str]) -> List[str]:
+        """Valores de la columna, o por_defecto si el CSV no la tiene."""
+        return list(self.opciones[columna]) if columna in self.opciones else list(por_defecto)
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _indice_opciones(path: str, version: str) -> IndiceOpciones:
+    try:
+        indice = IndiceOpciones.leer(path)
+        if indice.version == version:
+            return indice
+    except (OSError, ValueError, KeyError):
+        pass
+    # Sin índice, o el CSV cambió fuera de la app: se reconstruye una vez para esta versión
+    indice = IndiceOpciones.construir(path)
+    if indice.columnas:
+        with bloqueo_exclusivo(f"{ruta_indice(path)}.lock"):
+            indice.guardar(path)
+    return indice
+
+
+def obtener_indice_opciones(path: str = DATA_PATH) -> IndiceOpciones:
+    """Índice de la versión actual del CSV: un os.stat por llamada; lectura o construcción una vez por versión."""
+    return _indice_opciones(path, version_fuente(path))
+
+
+def registrar_opciones(registros: Sequence[Mapping[str, Any]], version_anterior: str, path: str = DATA_PATH):
+    """
+    Actualiza el índice después de agregar `registros` (version_anterior: la de los datos antes
+    de agregarlos). Si el índice reflejaba esa versión se le suman sus valores; si no,
+    se reconstruye. Queda marcado con la versión nueva, así el próximo rerun lo lee sin reconstruirlo.
+    Lectura, comparación de versión y escritura van bajo el bloqueo del índice (como
+    app.secuencia_ids.reservar_ids): otra alta simultánea no puede leer el mismo índice viejo y
+    pisar al guardar los valores de esta.
+    """
+    with bloqueo_exclusivo(f"{ruta_indice(path)}.lock"):
+        try:
+            indice = IndiceOpciones.leer(path)
+        except (OSError, ValueError, KeyError):
+            indice = None
+        if indice is None or indice.version != version_anterior:
+            indice = IndiceOpciones.construir(path)
+        else:
+            for registro in registros:
+                indice.agregar(registro)
+            indice.version = version_fuente(path)
+        indice.guardar(path)
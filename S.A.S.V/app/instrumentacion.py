@@ -0,0 +1,376 @@
+"""
+Instrumentación por rerun: dónde se va el tiempo de una página lenta (carga de datos, un
+groupby, armar figuras, serializar el mapa de folium, el modelo).
+- medir(nombre): decorador que registra un tramo (segundos y filas del DataFrame recibido);
+  con cache=True, encima de un @st.cache_resource y con @marcar_calculo debajo, además
+  cuenta acierto o fallo de la caché
+- tramo(nombre): lo mismo como contexto, para bloques dentro de una función
+- registrar_payload / registrar_cache: bytes que se envían al navegador y aciertos de cachés
+  propias (app.cambios.CacheIncremental)
+- ejecucion(): un rerun completo (main.py); opcionalmente con cProfile o tracemalloc
+Se activa con SASV_INSTRUMENTACION=1 (al iniciar el proceso). Desactivada, los decoradores
+devuelven la función sin envolver y tramo/ejecucion devuelven un contexto vacío: el costo es
+una comparación. Con SASV_INSTRUMENTACION_LOG=ruta.jsonl cada rerun se escribe como una
+línea JSON. El panel (mostrar_panel) aparece en la barra lateral con ?admin=1 en la URL.
+streamlit se importa solo en lo que dibuja o lee la sesión: app.calculos, que no depende de la
+interfaz, se puede instrumentar.
+"""
+
+import io
+import os
+import json
+import time
+import pstats
+import logging
+import cProfile
+import functools
+import threading
+import tracemalloc
+import contextlib
+import contextvars
+import pandas as pd
+from collections import Counter, deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+ACTIVA = os.environ.get("SASV_INSTRUMENTACION", "0") == "1"
+RUTA_LOG = os.environ.get("SASV_INSTRUMENTACION_LOG")
+PARAMETRO_PANEL = "admin"
+# Reruns que se guardan (de todas las sesiones del proceso) y filas de los perfiles
+MAX_EJECUCIONES = 200
+LINEAS_PERFIL = 30
+LINEAS_MEMORIA = 15
+
+_NULO = contextlib.nullcontext()
+_actual: contextvars.ContextVar[Optional["Ejecucion"]] = contextvars.ContextVar("ejecucion", default=None)
+_historial: Deque[Dict[str, Any]] = deque(maxlen=MAX_EJECUCIONES)
+_bloqueo = threading.Lock()
+# cProfile perfila todo el proceso (Python 3.12+): un solo rerun a la vez
+_bloqueo_cprofile = threading.Lock()
+_graficos_instalados = False
+
+_log = logging.getLogger("sasv.instrumentacion")
+if ACTIVA and RUTA_LOG:
+    _manejador = logging.FileHandler(RUTA_LOG, encoding="utf-8")
+    _manejador.setFormatter(logging.Formatter("%(message)s"))
+    _log.addHandler(_manejador)
+    _log.setLevel(logging.INFO)
+    _log.propagate = False
+
+
+def _filas(args) -> Optional[int]:
+    """Filas del primer DataFrame entre los argumentos (las que procesa la función)."""
+    for argumento in args:
+        if isinstance(argumento, pd.DataFrame):
+            return len(argumento)
+    return None
+
+
+class Tramo:
+    """Un bloque medido dentro de un rerun: segundos, filas, profundidad y estado de la caché."""
+
+    __slots__ = ('ejecucion', 'nombre', 'filas', 'cache', 'profundidad', 'inicio', 'segundos')
+
+    def __init__(self, ejecucion: "Ejecucion", nombre: str, filas: Optional[int] = None, cache: bool = False):
+        self.ejecucion = ejecucion
+        self.nombre = nombre
+        self.filas = filas
+        # Una función cacheada es un acierto salvo que su cuerpo corra (marcar_calculo)
+        self.cache = 'acierto' if cache else None
+        self.profundidad = 0
+        self.inicio = 0.0
+        self.segundos = 0.0
+
+    def __enter__(self) -> "Tramo":
+        pila = self.ejecucion.pila
+        self.profundidad = len(pila)
+        pila.append(self)
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.segundos = time.perf_counter() - self.inicio
+        self.ejecucion.pila.pop()
+        self.ejecucion.tramos.append(self)
+        if self.cache is not None:
+            self.ejecucion.contar_cache(self.nombre, self.cache == 'acierto')
+        return False
+
+    def como_dict(self) -> Dict[str, Any]:
+        return {
+            'tramo': self.nombre, 'profundidad': self.profundidad, 'segundos': round(self.segundos, 6),
+            'filas': self.filas, 'cache': self.cache, 'inicio': round(self.inicio - self.ejecucion.inicio, 6),
+        }
+
+
+class Ejecucion:
+    """
+    Un rerun de una sesión: sus tramos, payloads y cachés; con "cprofile" y/o "tracemalloc" en
+    perfiles, además el perfil del rerun completo. Cada uno perfila a un rerun por vez en el proceso:
+    si ya está en uso, se quita de perfiles.
+    """
+
+    def __init__(self, sesion: Optional[str] = None, perfiles: tuple = ()):
+        self.sesion = sesion
+        self.perfiles = perfiles
+        self.fecha = datetime.now()
+        self.vista: Optional[str] = None
+        self.unidad: Optional[str] = None
+        self.inicio = 0.0
+        self.segundos = 0.0
+        self.pila: List[Tramo] = []
+        self.tramos: List[Tramo] = []
+        self.payloads: Counter = Counter()
+        self.caches: Dict[str, List[int]] = {}
+        self.perfil: Optional[str] = None
+        self.memoria: Optional[List[Dict[str, Any]]] = None
+        self._perfilador: Optional[cProfile.Profile] = None
+        self._token = None
+
+    def contar_cache(self, nombre: str, acierto: bool):
+        contadores = self.caches.setdefault(nombre, [0, 0])
+        contadores[0 if acierto else 1] += 1
+
+    def __enter__(self) -> "Ejecucion":
+        self._token = _actual.set(self)
+        if "tracemalloc" in self.perfiles and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        else:
+            self.perfiles = tuple(p for p in self.perfiles if p != "tracemalloc")
+        if "cprofile" in self.perfiles and _bloqueo_cprofile.acquire(blocking=False):
+            self._perfilador = cProfile.Profile()
+            try:
+                self._perfilador.enable()
+            except ValueError:
+                # Otro perfilador ya activo (fuera de la instrumentación)
+                self._perfilador = None
+                _bloqueo_cprofile.release()
+        if self._perfilador is None:
+            self.perfiles = tuple(p for p in self.perfiles if p != "cprofile")
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.segundos = time.perf_counter() - self.inicio
+        if self._perfilador is not None:
+            self._perfilador.disable()
+            _bloqueo_cprofile.release()
+            salida = io.StringIO()
+            pstats.Stats(self._perfilador, stream=salida).sort_stats("cumulative").print_stats(LINEAS_PERFIL)
+            self.perfil = salida.getvalue()
+            self._perfilador = None
+        if "tracemalloc" in self.perfiles:
+            captura = tracemalloc.take_snapshot()
+            pico = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self.memoria = [{'linea': str(estadistica.traceback), 'kb': estadistica.size / 1024, 'bloques': estadistica.count}
+                            for estadistica in captura.statistics("lineno")[:LINEAS_MEMORIA]]
+            self.memoria.insert(0, {'linea': "pico total", 'kb': pico / 1024, 'bloques': None})
+        _actual.reset(self._token)
+
+        resumen = self.resumen()
+        with _bloqueo:
+            _historial.append(resumen)
+        if RUTA_LOG:
+            _log.info(json.dumps(resumen, ensure_ascii=False, default=str))
+        return False
+
+    def resumen(self) -> Dict[str, Any]:
+        return {
+            'fecha': self.fecha.isoformat(timespec='seconds'),
+            'sesion': self.sesion,
+            'vista': self.vista,
+            'unidad': self.unidad,
+            'segundos': round(self.segundos, 6),
+            'payload_bytes': sum(self.payloads.values()),
+            'aciertos_cache': sum(aciertos for aciertos, _ in self.caches.values()),
+            'fallos_cache': sum(fallos for _, fallos in self.caches.values()),
+            'tramos': [tramo.como_dict() for tramo in sorted(self.tramos, key=lambda t: t.inicio)],
+            'payloads': dict(self.payloads),
+            'caches': {nombre: {'aciertos': a, 'fallos': f} for nombre, (a, f) in self.caches.items()},
+            'perfiles': list(self.perfiles),
+        }
+
+
+def medir(nombre: str, cache: bool = False) -> Callable:
+    """Decorador: registra cada llamada como un tramo del rerun en curso (si lo hay)."""
+    def decorar(funcion: Callable) -> Callable:
+        if not ACTIVA:
+            return funcion
+
+        @functools.wraps(funcion)
+        def medida(*args, **kwargs):
+            ejecucion = _actual.get()
+            if ejecucion is None:
+                return funcion(*args, **kwargs)
+            with Tramo(ejecucion, nombre, _filas(args), cache):
+                return funcion(*args, **kwargs)
+        return medida
+    return decorar
+
+
+def marcar_calculo(funcion: Callable) -> Callable:
+    """
+    Decorador para el cuerpo de una función cacheada (debajo de @st.cache_resource): si corre,
+    la llamada medida con medir(..., cache=True) fue un fallo de la caché.
+    """
+    if not ACTIVA:
+        return funcion
+
+    @functools.wraps(funcion)
+    def calculo(*args, **kwargs):
+        ejecucion = _actual.get()
+        if ejecucion is not None and ejecucion.pila and ejecucion.pila[-1].cache is not None:
+            ejecucion.pila[-1].cache = 'fallo'
+        return funcion(*args, **kwargs)
+    return calculo
+
+
+def tramo(nombre: str, filas: Optional[int] = None):
+    """Contexto que registra el bloque como un tramo del rerun en curso (si lo hay)."""
+    if not ACTIVA:
+        return _NULO
+    ejecucion = _actual.get()
+    return _NULO if ejecucion is None else Tramo(ejecucion, nombre, filas)
+
+
+def etiquetar_ejecucion(vista: str, unidad: Optional[str] = None):
+    """Vista y unidad del rerun en curso (si lo hay), para el panel y los logs."""
+    if not ACTIVA:
+        return
+    ejecucion = _actual.get()
+    if ejecucion is not None:
+        ejecucion.vista, ejecucion.unidad = vista, unidad
+
+
+def registrar_payload(nombre: str, tamanio: Callable[[], int]):
+    """Suma tamanio() bytes enviados al navegador; tamanio solo se evalúa con un rerun medido."""
+    if not ACTIVA:
+        return
+    ejecucion = _actual.get()
+    if ejecucion is not None:
+        ejecucion.payloads[nombre] += tamanio()
+
+
+def registrar_cache(nombre: str, acierto: bool):
+    """Cuenta un acierto o fallo de una caché propia en el rerun en curso (si lo hay)."""
+    if not ACTIVA:
+        return
+    ejecucion = _actual.get()
+    if ejecucion is not None:
+        ejecucion.contar_cache(nombre, acierto)
+
+
+def _instalar_graficos():
+    """
+    Envuelve st.plotly_chart (una sola vez, y solo con la instrumentación activa) para medir
+    cuánto tarda y cuántos bytes de JSON manda cada figura, sin tocar cada vista.
+    """
+    global _graficos_instalados
+    if _graficos_instalados:
+        return
+    import streamlit as st
+    original = st.plotly_chart
+
+    @functools.wraps(original)
+    def plotly_chart(figure_or_data, *args, **kwargs):
+        registrar_payload("plotly", lambda: len(figure_or_data.to_json().encode("utf-8"))
+                          if hasattr(figure_or_data, "to_json") else 0)
+        with tramo("st.plotly_chart"):
+            return original(figure_or_data, *args, **kwargs)
+
+    st.plotly_chart = plotly_chart
+    _graficos_instalados = True
+
+
+def _sesion() -> Optional[str]:
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    contexto = get_script_run_ctx()
+    return contexto.session_id if contexto is not None else None
+
+
+def panel_visible() -> bool:
+    import streamlit as st
+    return ACTIVA and st.query_params.get(PARAMETRO_PANEL) == "1"
+
+
+def ejecucion():
+    """
+    Contexto de un rerun completo (main.py). Con el panel abierto, las casillas de perfil del
+    panel agregan cProfile y/o tracemalloc a los reruns de esa sesión.
+    """
+    if not ACTIVA:
+        return _NULO
+    import streamlit as st
+    _instalar_graficos()
+    perfiles = ()
+    if panel_visible():
+        perfiles = tuple(perfil for perfil in ("cprofile", "tracemalloc")
+                         if st.session_state.get(f"instrumentacion_{perfil}"))
+    return Ejecucion(_sesion(), perfiles)
+
+
+def ultima_ejecucion(sesion: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """El último rerun registrado (de la sesión indicada, si se indica)."""
+    with _bloqueo:
+        for resumen in reversed(_historial):
+            if sesion is None or resumen['sesion'] == sesion:
+                return resumen
+    return None
+
+
+def historial() -> List[Dict[str, Any]]:
+    with _bloqueo:
+        return list(_historial)
+
+
+def mostrar_panel(actual: Any = None):
+    """
+    Panel oculto (barra lateral, ?admin=1): el rerun recién terminado de esta sesión, con sus
+    tramos, cachés, payloads y perfiles, y los últimos reruns del proceso.
+    """
+    if not panel_visible():
+        return
+    import streamlit as st
+    with st.sidebar.expander("🛠️ Instrumentación", expanded=True):
+        st.checkbox("cProfile en cada rerun", key="instrumentacion_cprofile")
+        st.checkbox("tracemalloc en cada rerun", key="instrumentacion_tracemalloc")
+        st.caption("Los perfiles se aplican desde el próximo rerun, solo a esta sesión.")
+
+        resumen = actual.resumen() if isinstance(actual, Ejecucion) else ultima_ejecucion(_sesion())
+        if resumen is None:
+            st.info("Todavía no hay reruns registrados.")
+            return
+        st.metric("⏱️ Rerun", f"{resumen['segundos'] * 1e3:,.0f} ms")
+        st.caption(
+            f"📦 {resumen['payload_bytes'] / 1_048_576:,.2f} MB al navegador · "
+            f"🎯 {resumen['aciertos_cache']} aciertos / {resumen['fallos_cache']} fallos de caché"
+        )
+        tramos = pd.DataFrame(resumen['tramos'])
+        if not tramos.empty:
+            tramos['tramo'] = ["· " * p + t for p, t in zip(tramos['profundidad'], tramos['tramo'])]
+            tramos['ms'] = tramos['segundos'] * 1e3
+            st.dataframe(tramos[['tramo', 'ms', 'filas', 'cache']], hide_index=True, use_container_width=True)
+        if resumen['caches']:
+            st.dataframe(pd.DataFrame(resumen['caches']).T, use_container_width=True)
+        if resumen['payloads']:
+            st.dataframe(pd.Series(resumen['payloads'], name='bytes'), use_container_width=True)
+        if isinstance(actual, Ejecucion) and actual.perfil:
+            st.text_area("cProfile (acumulado)", actual.perfil, height=300)
+        if isinstance(actual, Ejecucion) and actual.memoria:
+            st.dataframe(pd.DataFrame(actual.memoria), hide_index=True, use_container_width=True)
+
+        st.markdown("**Últimos reruns del proceso**")
+        anteriores = pd.DataFrame(historial())
+        if not anteriores.empty:
+            anteriores['ms'] = anteriores['segundos'] * 1e3
+            st.dataframe(
+                anteriores[['fecha', 'vista', 'unidad', 'ms', 'payload_bytes', 'aciertos_cache', 'fallos_cache']].iloc[::-1],
+                hide_index=True, use_container_width=True
+            )
+            st.download_button(
+                "📥 Descargar reruns (JSON)",
+                json.dumps(historial(), ensure_ascii=False, default=str),
+                file_name="instrumentacion.json",
+                mime="application/json"
+            )
@@ -7,30 +7,23 @@ from folium.plugins import HeatMap
 from streamlit_folium import st_folium
 import streamlit as st
 import pandas as pd
+from app.calculos import marcadores_provincias, puntos_mapa_calor
+from app.incidentes import ETIQUETAS_UNIDAD
+from app.instrumentacion import medir, registrar_payload, tramo
 # Importación correcta: 'coordenadas_provincias' ahora viene de 'app.utils'
 from app.utils import coordenadas_provincias 
 
 
-def crear_mapa_argentina_interactivo(df: pd.DataFrame) -> folium.Map:
+@medir("folium: mapa interactivo")
+def crear_mapa_argentina_interactivo(df: pd.DataFrame, unidad: str = "victimas") -> folium.Map:
     """
     Crea un mapa de Argentina con marcadores por provincia.
+    - unidad: "victimas" o "incidentes" (ver app.incidentes)
     Retorna el objeto folium.Map (no hace display por sí mismo).
     """
-    # Agrupar y calcular estadísticas por provincia
-    stats_provincia = df.groupby('provincia_nombre').agg({
-        'id_hecho': 'count',
-        'victima_tr_edad': lambda x: x.dropna().mean() if len(x.dropna()) > 0 else 0,
-        'anio': lambda x: x.dropna().min() if len(x.dropna()) > 0 else 0
-    }).round(2)
-
-    # año máximo
-    stats_max = df.groupby('provincia_nombre')['anio'].agg(
-        lambda x: x.dropna().max() if len(x.dropna()) > 0 else 0
-    ).round(2)
-
-    stats_provincia['anio_max'] = stats_max
-    stats_provincia.columns = ['total_muertes', 'edad_promedio', 'anio_min', 'anio_max']
-    stats_provincia = stats_provincia.reset_index()
+    # Marcadores (totales, color y radio) calculados una vez por versión de datos en app.calculos
+    marcadores = marcadores_provincias(df, unidad)
+    sustantivo = ETIQUETAS_UNIDAD[unidad].lower()
 
     # NOTA: El diccionario coordenadas_provincias se importa ahora desde app.utils
     
@@ -42,74 +35,77 @@ def crear_mapa_argentina_interactivo(df: pd.DataFrame) -> folium.Map:
         control_scale=True
     )
 
-    for _, row in stats_provincia.iterrows():
-        provincia = row['provincia_nombre']
-        if provincia in coordenadas_provincias:
-            lat, lon = coordenadas_provincias[provincia]
-
-            total_muertes = row['total_muertes']
-            # NOTA: Paleta que resalta más (rojo-naranja-amarillo-verde)
-            if total_muertes > 5000:
-                color = '#D9534F'  # Rojo fuerte (Advertencia)
-                size = 15
-            elif total_muertes > 2000:
-                color = '#FF8C00'  # Naranja
-                size = 12
-            elif total_muertes > 500:
-                color = '#FFD700'  # Amarillo/Oro
-                size = 10
-            else:
-                color = "#24F81D"  # Azul profundo (Base)
-                size = 8
-
-            # Cálculo de promedio anual para el popup
-            rango_anios = row['anio_max'] - row['anio_min']
-            promedio_anual = total_muertes / (rango_anios + 1) if rango_anios >= 0 else total_muertes
-
-
-            popup_text = f"""
-            <div style="width: 250px; font-family: sans-serif; color: #333;">
-                <h3 style="color: {color}; margin-bottom: 10px;">{provincia}</h3>
-                <table style="width: 100%; border-collapse: collapse;">
-                    <tr><td style="padding: 3px 5px;"><strong>Total Muertes:</strong></td><td style="padding: 3px 5px; text-align: right;">{total_muertes:,.0f}</td></tr>
-                    <tr><td style="padding: 3px 5px;"><strong>Edad Promedio:</strong></td><td style="padding: 3px 5px; text-align: right;">{row['edad_promedio']:.1f} años</td></tr>
-                    <tr><td style="padding: 3px 5px;"><strong>Período:</strong></td><td style="padding: 3px 5px; text-align: right;">{row['anio_min']:.0f}-{row['anio_max']:.0f}</td></tr>
-                    <tr><td style="padding: 3px 5px;"><strong>Promedio/año:</strong></td><td style="padding: 3px 5px; text-align: right;">{promedio_anual:.0f}</td></tr>
-                </table>
-                <p style="margin-top: 10px; font-size: 12px; color: #666; text-align: center;">
-                    Haz clic para ver estadísticas detalladas
-                </p>
-            </div>
-            """
-
-            folium.CircleMarker(
-                location=[lat, lon],
-                radius=size,
-                popup=folium.Popup(popup_text, max_width=300),
-                tooltip=f"<b>{provincia}</b><br>{total_muertes:,.0f} muertes",
-                color=color,
-                fill=True,
-                fillColor=color,
-                fillOpacity=0.7,
-                weight=2
-            ).add_to(mapa)
-
-            # etiqueta (pequeña)
-            folium.Tooltip(
-                f"{provincia}<br>{total_muertes:,.0f} muertes",
-                permanent=False
-            ).add_to(folium.CircleMarker(
-                location=[lat, lon],
-                radius=1,
-                color='transparent',
-                fill=False
-            ).add_to(mapa))
+    for marcador in marcadores:
+        provincia = marcador['provincia']
+        lat, lon = marcador['latitud'], marcador['longitud']
+        total_muertes = marcador['total']
+        color = marcador['color']
+        size = marcador['radio']
+        promedio_anual = marcador['promedio_anual']
+
+        popup_text = f"""
+        <div style="width: 250px; font-family: sans-serif; color: #333;">
+            <h3 style="color: {color}; margin-bottom: 10px;">{provincia}</h3>
+            <table style="width: 100%; border-collapse: collapse;">
+                <tr><td style="padding: 3px 5px;"><strong>Total {ETIQUETAS_UNIDAD[unidad]}:</strong></td><td style="padding: 3px 5px; text-align: right;">{total_muertes:,.0f}</td></tr>
+                <tr><td style="padding: 3px 5px;"><strong>Edad Promedio:</strong></td><td style="padding: 3px 5px; text-align: right;">{marcador['edad_promedio']:.1f} años</td></tr>
+                <tr><td style="padding: 3px 5px;"><strong>Período:</strong></td><td style="padding: 3px 5px; text-align: right;">{marcador['anio_min']:.0f}-{marcador['anio_max']:.0f}</td></tr>
+                <tr><td style="padding: 3px 5px;"><strong>Promedio/año:</strong></td><td style="padding: 3px 5px; text-align: right;">{promedio_anual:.0f}</td></tr>
+            </table>
+            <p style="margin-top: 10px; font-size: 12px; color: #666; text-align: center;">
+                Haz clic para ver estadísticas detalladas
+            </p>
+        </div>
+        """
+
+        folium.CircleMarker(
+            location=[lat, lon],
+            radius=size,
+            popup=folium.Popup(popup_text, max_width=300),
+            tooltip=f"<b>{provincia}</b><br>{total_muertes:,.0f} {sustantivo}",
+            color=color,
+            fill=True,
+            fillColor=color,
+            fillOpacity=0.7,
+            weight=2
+        ).add_to(mapa)
+
+        # etiqueta (pequeña)
+        folium.Tooltip(
+            f"{provincia}<br>{total_muertes:,.0f} {sustantivo}",
+            permanent=False
+        ).add_to(folium.CircleMarker(
+            location=[lat, lon],
+            radius=1,
+            color='transparent',
+            fill=False
+        ).add_to(mapa))
 
     return mapa
 
-def crear_mapa_de_calor(df: pd.DataFrame):
+
+def mostrar_mapa_interactivo(df: pd.DataFrame, unidad: str = "victimas"):
+    """Vista del mapa por provincias: leyenda de colores y mapa (st_folium)."""
+    sustantivo = ETIQUETAS_UNIDAD[unidad].lower()
+    st.markdown("### 📊 Leyenda del Mapa")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1: st.markdown(f"🔴 **Rojo**: > 5,000 {sustantivo}")
+    with col2: st.markdown(f"🟠 **Naranja**: 2,000 - 5,000 {sustantivo}")
+    with col3: st.markdown(f"🟡 **Amarillo**: 500 - 2,000 {sustantivo}")
+    with col4: st.markdown(f"🟢 **Verde**: < 500 {sustantivo}")
+
+    st.markdown("---")
+    st.markdown("### 🗺️ Mapa Interactivo de Argentina")
+    st.markdown("**Haz clic en los círculos de colores para ver información detallada de cada provincia.**")
+
+    mapa = crear_mapa_argentina_interactivo(df, unidad)
+    _dibujar(mapa, "mapa interactivo")
+
+
+def crear_mapa_de_calor(df: pd.DataFrame, unidad: str = "victimas"):
     """
     Crea y muestra un mapa de calor en streamlit (hace st_folium internamente).
+    - unidad: "victimas" (un punto por persona) o "incidentes" (un punto por siniestro)
     """
     st.markdown("### 🔥 Mapa de Calor de las muertes viales en la República Argentina")
     st.markdown("Utiliza los filtros para explorar la concentración geográfica de los siniestros viales a lo largo del tiempo.")
@@ -144,32 +140,33 @@ def crear_mapa_de_calor(df: pd.DataFrame):
 
     meses_seleccionados_numeros = [meses_dict[nombre] for nombre in meses_seleccionados_nombres]
 
-    df_filtrado = df[
-        (df['anio'].between(anios_seleccionados[0], anios_seleccionados[1])) &
-        (df['mes'].isin(meses_seleccionados_numeros))
-    ]
+    coordenadas = puntos_mapa_calor(df, unidad, anios=anios_seleccionados, meses=meses_seleccionados_numeros)
 
-    df_mapa = df_filtrado.dropna(subset=['latitud', 'longitud'])
-
-    if df_mapa.empty:
+    if len(coordenadas) == 0:
         st.warning(f"No se encontraron siniestros con coordenadas para los filtros seleccionados. Intenta con otro rango de fechas.")
         return
 
-    st.success(f"Mostrando {len(df_mapa):,} siniestros en el mapa de calor.")
+    st.success(f"Mostrando {len(coordenadas):,} {ETIQUETAS_UNIDAD[unidad].lower()} en el mapa de calor.")
 
-    mapa_calor = folium.Map(
-        location=[-38, -63],
-        zoom_start=4,
-        tiles='CartoDB dark_matter',
-        control_scale=True
-    )
+    with tramo("folium: mapa de calor", len(coordenadas)):
+        mapa_calor = folium.Map(
+            location=[-38, -63],
+            zoom_start=4,
+            tiles='CartoDB dark_matter',
+            control_scale=True
+        )
+
+        HeatMap(
+            coordenadas.tolist(),
+            radius=10,
+            blur=12
+        ).add_to(mapa_calor)
 
-    coordenadas = df_mapa[['latitud', 'longitud']].values.tolist()
+    _dibujar(mapa_calor, "mapa de calor")
 
-    HeatMap(
-        coordenadas,
-        radius=10,
-        blur=12
-    ).add_to(mapa_calor)
 
-    st_folium(mapa_calor, width=800, height=600)
+def _dibujar(mapa: folium.Map, nombre: str):
+    """st_folium con su serialización medida (app.instrumentacion): tiempo y HTML que recibe el navegador."""
+    registrar_payload(f"folium: {nombre}", lambda: len(mapa.get_root().render().encode('utf-8')))
+    with tramo(f"st_folium: {nombre}"):
+        st_folium(mapa, width=800, height=600)
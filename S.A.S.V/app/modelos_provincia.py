@@ -0,0 +1,186 @@
+"""
+Modelos de calles fragmentados por provincia.
+En lugar de un único clasificador con todas las calles del país, se entrena un modelo por
+provincia con solo las calles vistas en ella, en paralelo en un pool de procesos.
+ModeloPorProvincia enruta cada fila al modelo de su provincia y carga los fragmentos
+del registro solo cuando se necesitan.
+"""
+
+import io
+import re
+import time
+import joblib
+import unicodedata
+import multiprocessing
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.registro_modelos import cargar_artefacto
+
+COLUMNA_PROVINCIA = 'provincia_nombre'
+PREFIJO_FRAGMENTO = "provincia_"
+
+
+def nombre_fragmento(provincia: str) -> str:
+    """Nombre de archivo del fragmento de una provincia dentro de la carpeta del modelo."""
+    texto = unicodedata.normalize('NFKD', str(provincia)).encode('ascii', 'ignore').decode('ascii')
+    return f"{PREFIJO_FRAGMENTO}{re.sub(r'[^a-z0-9]+', '_', texto.lower()).strip('_')}.joblib"
+
+
+def aciertos_top_k(probabilidades: np.ndarray, clases: np.ndarray, y_real: pd.Series, k: int) -> np.ndarray:
+    """Por fila: True si la clase real está entre las k más probables."""
+    k = min(k, probabilidades.shape[1])
+    top_k = np.argpartition(-probabilidades, k - 1, axis=1)[:, :k]
+    posicion_real = pd.Index(clases).get_indexer(y_real)
+    return (top_k == posicion_real[:, None]).any(axis=1) & (posicion_real >= 0)
+
+
+def bytes_en_memoria(modelo: Any) -> int:
+    """Memoria aproximada del modelo: arrays de nodos y valores de cada árbol, o lo que informe el propio estimador."""
+    if hasattr(modelo, 'bytes_en_memoria'):
+        return modelo.bytes_en_memoria()
+    bosque = modelo.named_steps['classifier'] if hasattr(modelo, 'named_steps') else modelo
+    total = 0
+    for arbol in getattr(bosque, 'estimators_', []):
+        total += arbol.tree_.__getstate__()['nodes'].nbytes + arbol.tree_.value.nbytes
+    return total
+
+
+class ModeloPorProvincia:
+    """
+    Enrutador de fragmentos con la misma interfaz que el pipeline global
+    (classes_ y predict_proba), así el resto de la app no distingue los modos.
+    - fragmentos: provincia -> nombre del artefacto en la carpeta del modelo
+    - classes_: unión ordenada de las calles de todos los fragmentos
+    Las filas de provincias sin fragmento reciben probabilidad 0 en todas las calles.
+    """
+
+    def __init__(self, id_modelo: str, fragmentos: Dict[str, str], clases: List[str], valores: Dict[str, List[Any]]):
+        self.id_modelo = id_modelo
+        self.fragmentos = dict(fragmentos)
+        self.classes_ = np.asarray(clases, dtype=object)
+        self.valores = valores
+        self._cargados: Dict[str, Any] = {}
+
+    def __getstate__(self):
+        # Los fragmentos se guardan aparte: el enrutador se serializa sin ellos
+        estado = self.__dict__.copy()
+        estado['_cargados'] = {}
+        return estado
+
+    def fragmento(self, provincia: str) -> Optional[Any]:
+        """Modelo de la provincia, cargado del registro la primera vez que se pide."""
+        if provincia not in self.fragmentos:
+            return None
+        if provincia not in self._cargados:
+            self._cargados[provincia] = cargar_artefacto(self.id_modelo, self.fragmentos[provincia])
+        return self._cargados[provincia]
+
+    def valores_features(self) -> Dict[str, List[Any]]:
+        """Espacio de entrada conocido (ver app.tabla_predicciones.valores_del_modelo)."""
+        return self.valores
+
+    def bytes_en_memoria(self) -> int:
+        """Memoria de los fragmentos cargados."""
+        return sum(bytes_en_memoria(modelo) for modelo in self._cargados.values())
+
+    def bytes_serializado(self) -> int:
+        """Tamaño serializado del enrutador más el de todos sus fragmentos."""
+        buffer = io.BytesIO()
+        joblib.dump(self, buffer)
+        total = buffer.getbuffer().nbytes
+        for provincia in self.fragmentos:
+            buffer = io.BytesIO()
+            joblib.dump(self.fragmento(provincia), buffer)
+            total += buffer.getbuffer().nbytes
+        return total
+
+    def predict_proba(self, X: pd.DataFrame) -> np.ndarray:
+        probabilidades = np.zeros((len(X), len(self.classes_)))
+        posiciones = pd.Series(np.arange(len(X)), index=X.index)
+        indice_clases = pd.Index(self.classes_)
+        for provincia, filas in posiciones.groupby(X[COLUMNA_PROVINCIA].to_numpy(), sort=False):
+            modelo = self.fragmento(provincia)
+            if modelo is None:
+                continue
+            columnas = indice_clases.get_indexer(modelo.classes_)
+            probabilidades[np.ix_(filas.to_numpy(), columnas)] = modelo.predict_proba(X.iloc[filas.to_numpy()])
+        return probabilidades
+
+
+def _ajustar_fragmento(
+    provincia: str,
+    X: pd.DataFrame,
+    y: pd.Series,
+    construir: Callable[..., Any],
+    hiperparametros: Dict[str, Any]
+) -> Tuple[str, Any, float]:
+    """Tarea del pool: ajusta el modelo de una provincia (un núcleo por proceso)."""
+    inicio = time.perf_counter()
+    modelo = construir(hiperparametros, n_jobs=1)
+    modelo.fit(X, y)
+    return provincia, modelo, time.perf_counter() - inicio
+
+
+def entrenar_fragmentos(
+    X_train: pd.DataFrame,
+    y_train: pd.Series,
+    construir: Callable[..., Any],
+    hiperparametros: Dict[str, Any],
+    max_procesos: Optional[int] = None,
+    progreso: Optional[Callable[[float], None]] = None
+) -> Dict[str, Tuple[Any, float]]:
+    """
+    Entrena un modelo por provincia en paralelo; devuelve provincia -> (modelo, segundos de ajuste).
+    construir(hiperparametros, n_jobs=...) debe ser una función de nivel de módulo.
+    Las provincias más grandes se encolan primero para equilibrar la carga del pool.
+    """
+    grupos = X_train.groupby(COLUMNA_PROVINCIA, sort=False).indices
+    orden = sorted(grupos, key=lambda p: -len(grupos[p]))
+    resultados = {}
+    with ProcessPoolExecutor(max_workers=max_procesos, mp_context=multiprocessing.get_context("spawn")) as pool:
+        tareas = [
+            pool.submit(_ajustar_fragmento, provincia, X_train.iloc[grupos[provincia]],
+                        y_train.iloc[grupos[provincia]], construir, hiperparametros)
+            for provincia in orden
+        ]
+        for terminadas, tarea in enumerate(as_completed(tareas), start=1):
+            provincia, modelo, segundos = tarea.result()
+            resultados[provincia] = (modelo, segundos)
+            if progreso:
+                progreso(terminadas / len(tareas))
+    return resultados
+
+
+def unir_valores(
+    modelos: Dict[str, Any],
+    valores_de: Callable[[Any], Dict[str, List[Any]]],
+    base: Optional[Dict[str, List[Any]]] = None
+) -> Dict[str, List[Any]]:
+    """Unión ordenada de los valores de cada feature conocidos por los fragmentos (y por base, si se indica)."""
+    union: Dict[str, set] = {feature: set(valores) for feature, valores in (base or {}).items()}
+    for modelo in modelos.values():
+        for feature, valores in valores_de(modelo).items():
+            union.setdefault(feature, set()).update(valores)
+    union[COLUMNA_PROVINCIA] = union.get(COLUMNA_PROVINCIA, set()) | set(modelos)
+    return {feature: _ordenar(valores) for feature, valores in union.items()}
+
+
+def _ordenar(valores: set) -> List[Any]:
+    try:
+        return sorted(valores)
+    except TypeError:  # tipos mezclados
+        return sorted(valores, key=str)
+
+
+def top_k_por_provincia(
+    probabilidades: np.ndarray,
+    clases: np.ndarray,
+    X_prueba: pd.DataFrame,
+    y_prueba: pd.Series,
+    k: int = 5
+) -> Dict[str, float]:
+    """Proporción de aciertos top-k de cada provincia sobre el conjunto de prueba."""
+    aciertos = pd.Series(aciertos_top_k(probabilidades, clases, y_prueba, k), index=X_prueba.index)
+    return aciertos.groupby(X_prueba[COLUMNA_PROVINCIA]).mean().astype(float).to_dict()
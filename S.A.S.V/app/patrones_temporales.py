@@ -0,0 +1,104 @@
+"""
+Patrones temporales: matriz hora x día de la semana y series diarias con medias móviles.
+Todo se sirve desde un tensor provincia x día x hora y una tabla diaria precalculados
+(app.calculos), que siguen las altas en vivo (app.cambios) sumando solo las filas nuevas.
+"""
+
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+from app.calculos import obtener_tensor_temporal, patron_semanal, promedios_feriados, serie_diaria
+from app.incidentes import ETIQUETAS_UNIDAD
+
+DIAS_SEMANA = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
+
+
+def mostrar_patrones_temporales(df: pd.DataFrame, unidad: str = "victimas"):
+    """
+    Muestra la matriz de riesgo hora x día de la semana, la distribución horaria,
+    la comparación feriados / días hábiles y la serie diaria con medias móviles.
+    """
+    st.markdown("### 🕒 Patrones Temporales de los Siniestros Viales")
+    etiqueta = ETIQUETAS_UNIDAD[unidad]
+
+    tensor = obtener_tensor_temporal(df, unidad)
+    if tensor.conteos.sum() == 0:
+        st.warning("No hay datos con fecha y hora válidas para analizar patrones temporales.")
+        return
+
+    provincias = st.multiselect(
+        "Provincias (vacío = todo el país):",
+        options=tensor.provincias,
+        key="temporal_provincias"
+    )
+    titulo = ", ".join(provincias) if provincias else "Total Argentina"
+
+    patron = patron_semanal(df, unidad, provincias)
+    matriz = patron['matriz']
+
+    st.markdown(f"#### 🔥 Matriz Hora x Día de la Semana - {titulo}")
+    fig_matriz = px.imshow(
+        matriz,
+        x=[f"{h:02d}h" for h in range(24)],
+        y=DIAS_SEMANA,
+        labels={'x': 'Hora', 'y': 'Día', 'color': etiqueta},
+        color_continuous_scale='Reds',
+        aspect='auto'
+    )
+    fig_matriz.update_layout(height=420)
+    st.plotly_chart(fig_matriz, use_container_width=True)
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        por_hora = patron['por_hora']
+        fig_hora = px.bar(
+            x=list(range(24)),
+            y=por_hora,
+            title=f"Distribución por Hora - {titulo}",
+            labels={'x': 'Hora', 'y': f'Número de {etiqueta}'}
+        )
+        fig_hora.update_layout(height=400, showlegend=False)
+        fig_hora.update_traces(marker_color='#D9534F')
+        st.plotly_chart(fig_hora, use_container_width=True)
+
+    with col2:
+        por_dia = patron['por_dia']
+        fig_dia = px.bar(
+            x=DIAS_SEMANA,
+            y=por_dia,
+            title=f"Distribución por Día de la Semana - {titulo}",
+            labels={'x': 'Día', 'y': f'Número de {etiqueta}'}
+        )
+        fig_dia.update_layout(height=400, showlegend=False)
+        fig_dia.update_traces(marker_color='#0A497A')
+        st.plotly_chart(fig_dia, use_container_width=True)
+
+    st.markdown(f"#### 📈 Serie Diaria - {titulo}")
+    ventanas = st.multiselect("Medias móviles (días):", [7, 30, 90], default=[7, 30], key="temporal_ventanas")
+    tabla = serie_diaria(df, unidad, provincias, ventanas)
+    if tabla.empty:
+        st.info("No hay fechas válidas para construir la serie diaria.")
+        return
+    serie = tabla['diario']
+
+    fig_serie = go.Figure()
+    fig_serie.add_trace(go.Scatter(x=serie.index, y=serie.values, name='Diario', line=dict(color='#999', width=1)))
+    for ventana in ventanas:
+        fig_serie.add_trace(go.Scatter(
+            x=serie.index,
+            y=tabla[f'media_{ventana}'].values,
+            name=f'Media móvil {ventana} días',
+            line=dict(width=2)
+        ))
+    fig_serie.update_layout(height=450, xaxis_title='Fecha', yaxis_title=f'{etiqueta} por día')
+    st.plotly_chart(fig_serie, use_container_width=True)
+
+    # Promedio diario en feriados vs resto de los días (calendario de app.feriados)
+    promedios = promedios_feriados(serie)
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("🎉 Promedio diario en feriados", f"{promedios['feriados']:.2f}")
+    with col2:
+        st.metric("📅 Promedio diario resto de los días", f"{promedios['resto']:.2f}")
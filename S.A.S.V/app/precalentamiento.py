@@ -0,0 +1,181 @@
+"""
+Precalentamiento de cachés: el primer usuario después de un despliegue no paga la lectura
+del CSV, los agregados, los índices ni el modelo dentro de su propia request.
+- Primero se cargan los datos vivos (app.cambios) y, a la vez, el índice de opciones
+- Después, los pasos que solo dependen de los datos corren en paralelo en un pool de hilos
+  (pandas y numpy liberan el GIL en lo pesado; el entrenamiento corre en el proceso trabajador)
+- Cada paso registra su estado y su tiempo; Precalentamiento.listo indica que terminaron todos
+En el servidor, main.py llama a iniciar_precalentamiento() (una vez por proceso, en segundo
+plano; SASV_PRECALENTAR=0 lo desactiva). Como paso previo a recibir tráfico:
+    python -m app.precalentamiento [--hilos 4] [--salida informe.json]
+entrena y registra el modelo y deja el índice de opciones al día (lo que persiste entre procesos);
+termina con código 0 si todos los pasos salieron bien.
+Cada paso importa sus módulos adentro: importar este módulo no trae scikit-learn, scipy ni
+plotly.express al arranque (ver app.vistas).
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import pandas as pd
+import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from app.cambios import datos_en_vivo
+from app.incidentes import UNIDADES_CONTEO
+
+PRECALENTAR_AL_INICIO = os.environ.get("SASV_PRECALENTAR", "1") != "0"
+HILOS = 4
+
+# Columnas que las vistas cruzan con la provincia (estadísticas y gráficos por categoría)
+COLUMNAS_CONTEOS = ('anio', 'mes', 'localidad_nombre', 'tipo_lugar', 'victima_vehiculo', 'inculpado_vehiculo', 'modo_produccion_hecho')
+
+
+def _opciones(df: Optional[pd.DataFrame] = None):
+    from app.indice_opciones import obtener_indice_opciones
+    obtener_indice_opciones()
+
+
+def _indices(df: pd.DataFrame):
+    from app.incidentes import obtener_modelo_incidentes
+    from app.indice_filtros import obtener_indice_filtros
+    obtener_indice_filtros(df)
+    obtener_modelo_incidentes(df)
+
+
+def _agregados(df: pd.DataFrame):
+    from app.incidentes import obtener_conteos, obtener_resumen_provincias
+    for unidad in UNIDADES_CONTEO.values():
+        obtener_resumen_provincias(df, unidad)
+        for columna in COLUMNAS_CONTEOS:
+            obtener_conteos(df, ('provincia_nombre', columna), unidad)
+
+
+def _temporales(df: pd.DataFrame):
+    from app.calculos import obtener_serie_diaria, obtener_tensor_temporal
+    for unidad in UNIDADES_CONTEO.values():
+        obtener_tensor_temporal(df, unidad)
+        obtener_serie_diaria(df, unidad)
+
+
+def _pronosticos(df: pd.DataFrame):
+    from app.pronosticos import HORIZONTE, obtener_pronosticos
+    for unidad in UNIDADES_CONTEO.values():
+        obtener_pronosticos(df, unidad, HORIZONTE)
+
+
+def _calles(df: pd.DataFrame):
+    from app.buscador_calles import obtener_indice_calles
+    obtener_indice_calles(df)
+
+
+def _modelo(df: pd.DataFrame):
+    from app.prediccion_ml import precalentar_modelo
+    if precalentar_modelo(df) is None:
+        raise RuntimeError("No hay suficientes datos para entrenar el modelo de predicción")
+
+
+# Pasos que dependen de los datos cargados, en el orden en que se encolan (el modelo primero: es el más largo)
+PASOS: Dict[str, Callable[[pd.DataFrame], Any]] = {
+    "modelo": _modelo,
+    "indices": _indices,
+    "agregados": _agregados,
+    "temporales": _temporales,
+    "pronosticos": _pronosticos,
+    "calles": _calles,
+}
+
+
+class Precalentamiento:
+    """
+    Estado del precalentamiento: por paso, 'pendiente' | 'en_curso' | 'listo' | 'error', con su
+    duración y error. listo queda en True cuando terminaron todos los pasos (aunque alguno falle).
+    """
+
+    def __init__(self):
+        self.pasos: Dict[str, Dict[str, Any]] = {
+            nombre: {'estado': 'pendiente', 'segundos': None, 'error': None}
+            for nombre in ("datos", "opciones", *PASOS)
+        }
+        self.segundos: Optional[float] = None
+        self._terminado = threading.Event()
+
+    @property
+    def listo(self) -> bool:
+        return self._terminado.is_set()
+
+    @property
+    def correcto(self) -> bool:
+        return self.listo and all(paso['estado'] == 'listo' for paso in self.pasos.values())
+
+    def esperar(self, timeout: Optional[float] = None) -> bool:
+        return self._terminado.wait(timeout)
+
+    def _medir(self, nombre: str, funcion: Callable, *args) -> Any:
+        paso = self.pasos[nombre]
+        paso['estado'] = 'en_curso'
+        inicio = time.perf_counter()
+        try:
+            resultado = funcion(*args)
+            paso['estado'] = 'listo'
+            return resultado
+        except Exception as e:
+            paso.update(estado='error', error=repr(e))
+            return None
+        finally:
+            paso['segundos'] = round(time.perf_counter() - inicio, 3)
+
+    def ejecutar(self, hilos: int = HILOS) -> "Precalentamiento":
+        inicio = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="precalentamiento") as pool:
+                pool.submit(self._medir, "opciones", _opciones)
+                df = self._medir("datos", datos_en_vivo)
+                for nombre, funcion in PASOS.items():
+                    if df is None:
+                        self.pasos[nombre].update(estado='error', error="No se pudieron cargar los datos")
+                    else:
+                        pool.submit(self._medir, nombre, funcion, df)
+        finally:
+            self.segundos = round(time.perf_counter() - inicio, 3)
+            self._terminado.set()
+        return self
+
+    def informe(self) -> Dict[str, Any]:
+        return {'listo': self.listo, 'correcto': self.correcto, 'segundos': self.segundos, 'pasos': self.pasos}
+
+
+@st.cache_resource(show_spinner=False)
+def iniciar_precalentamiento() -> Precalentamiento:
+    """Lanza el precalentamiento en segundo plano, una sola vez por proceso, y devuelve su estado."""
+    precalentamiento = Precalentamiento()
+    if PRECALENTAR_AL_INICIO:
+        threading.Thread(target=precalentamiento.ejecutar, name="precalentamiento", daemon=True).start()
+    else:
+        precalentamiento._terminado.set()
+    return precalentamiento
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hilos", type=int, default=HILOS, help="hilos del pool para los pasos independientes")
+    parser.add_argument("--salida", help="archivo JSON donde guardar el informe")
+    args = parser.parse_args()
+
+    precalentamiento = Precalentamiento().ejecutar(args.hilos)
+    print(f"{'Paso':<14}{'Estado':<10}{'Segundos':>10}")
+    for nombre, paso in precalentamiento.pasos.items():
+        segundos = f"{paso['segundos']:.2f}" if paso['segundos'] is not None else '-'
+        print(f"{nombre:<14}{paso['estado']:<10}{segundos:>10}  {paso['error'] or ''}")
+    print(f"Total: {precalentamiento.segundos:.2f} s")
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            json.dump(precalentamiento.informe(), archivo, ensure_ascii=False, indent=2)
+    sys.exit(0 if precalentamiento.correcto else 1)
+
+
+if __name__ == "__main__":
+    main()
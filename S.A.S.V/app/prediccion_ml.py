@@ -2,80 +2,746 @@
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import OneHotEncoder
+from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 import numpy as np
+import plotly.express as px
+import os
+import time
+import warnings
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+from app.data_loader import datos_base, version_archivo, version_datos
+from app.calculos import ranking_calles, top_calles
+from app.almacen_features import DIAS_SEMANA, ZONAS_HORARIAS, construir_features, features_de
+from app.entrenamiento_background import ProgramadorEntrenamiento, informar_progreso
+from app.registro_modelos import (
+    MODELOS_DIR, activar_modelo, cargar_artefacto, cargar_modelo, clave_modelo, existe_modelo,
+    guardar_artefacto, guardar_modelo, leer_metadatos, liberar_modelo, listar_modelos, modelo_activo
+)
+from app.frecuencias_calles import FrecuenciasJerarquicas
+from app.evaluacion_modelos import evaluar
+from app.instrumentacion import marcar_calculo, medir
+from app.tabla_predicciones import NOMBRE_ARTEFACTO, TablaPredicciones, construir_tabla, valores_del_modelo
+from app.modelos_provincia import (
+    ModeloPorProvincia, aciertos_top_k, bytes_en_memoria, entrenar_fragmentos,
+    nombre_fragmento, top_k_por_provincia, unir_valores
+)
+from app.actualizacion_incremental import (
+    actualizar_modelo, admite_actualizacion, escribir_derivado, id_derivado,
+    leer_derivado, leer_registros, lote_listo, ruta_registros, sin_datos_base
+)
 
-def _crear_features(df: pd.DataFrame) -> pd.DataFrame:
-    """Crea nuevas features a partir de los datos existentes para mejorar el modelo."""
-    df_copy = df.copy()
+# Features y objetivo del modelo de calles (nombre canónico, ver app.calles)
+FEATURES = ['provincia_nombre', 'mes', 'zona_horaria', 'dia_semana', 'tipo_lugar']
+TARGET = 'calle'
+
+# Núcleos usados por el bosque (no forma parte de la clave del modelo: no cambia el resultado)
+N_JOBS = -1
+# Árboles que se agregan por paso al informar el progreso del entrenamiento
+ARBOLES_POR_PASO = 10
+
+# Hiperparámetros del modelo; cualquier cambio genera un modelo nuevo en el registro
+HIPERPARAMETROS = {
+    'n_estimators': 100,
+    'class_weight': 'balanced',
+    'random_state': 42,
+    'min_incidentes_calle': 10,
+    'test_size': 0.2,
+    'objetivo': TARGET,
+}
+
+# Motor de frecuencias jerárquicas suavizadas (app.frecuencias_calles)
+HIPERPARAMETROS_FRECUENCIAS = {
+    'motor': 'frecuencias',
+    'alpha': 1.0,
+    'min_incidentes_calle': 10,
+    'test_size': 0.2,
+    'objetivo': TARGET,
+}
+
+# Motor de estimación: opción visible -> motor interno, y sus hiperparámetros por defecto
+MOTORES = {
+    "Bosque aleatorio": "bosque",
+    "Frecuencias jerárquicas": "frecuencias",
+}
+HIPERPARAMETROS_MOTOR = {
+    "bosque": HIPERPARAMETROS,
+    "frecuencias": HIPERPARAMETROS_FRECUENCIAS,
+}
+
+# Modo del modelo: un clasificador global o uno por provincia (app.modelos_provincia)
+MODOS_MODELO = {
+    "Global": "global",
+    "Por provincia": "provincias",
+}
+
+
+def hiperparametros_de(motor: str = "bosque", modo: str = "global") -> Dict[str, Any]:
+    """Hiperparámetros (y clave en el registro) de cada motor y modo; el bosque global no lleva motor ni modo."""
+    base = HIPERPARAMETROS_MOTOR[motor]
+    return base if modo == "global" else {**base, 'modo': modo}
+
+
+def _preparar_datos_entrenamiento(df: pd.DataFrame, min_incidentes_calle: int) -> Optional[Tuple[pd.DataFrame, pd.Series]]:
+    """Devuelve (X, y) listos para entrenar, o None si no hay suficientes calles con datos."""
+    return _seleccionar(features_de(df), min_incidentes_calle)
 
-    # Convertir 'hora_hecho' a datetime
-    df_copy['hora_hecho'] = pd.to_datetime(df_copy['hora_hecho'], format='%H:%M:%S', errors='coerce').dt.hour
-    
-    # Defino las zonas horarias aca
-    bins = [-1, 6, 12, 19, 24]
-    labels = ['Madrugada', 'Mañana', 'Tarde', 'Noche']
-    df_copy['zona_horaria'] = pd.cut(df_copy['hora_hecho'], bins=bins, labels=labels, right=False)
-
-    # Defino los dias de la seamna aca
-    df_copy['fecha_hecho'] = pd.to_datetime(df_copy['fecha_hecho'], errors='coerce')
-    df_copy['dia_semana'] = df_copy['fecha_hecho'].dt.day_name()
-    
-    return df_copy
 
-@st.cache_resource
-def entrenar_modelo_y_preprocesador(df: pd.DataFrame):
+def _seleccionar(
+    features: pd.DataFrame,
+    min_incidentes_calle: int = 0,
+    min_calles: int = 10
+) -> Optional[Tuple[pd.DataFrame, pd.Series]]:
     """
-    Prepara los datos, entrena un modelo RandomForest y devuelve el pipeline entrenado.
-    Se cachea para no re-entrenar en cada interacción del usuario.
+    Filas del almacén de features aptas para entrenar: features y calle completas, calle
+    determinada y con más de min_incidentes_calle casos. None si quedan menos de min_calles calles.
     """
-    with st.spinner("🧠 Entrenando el modelo de predicción por primera vez... Esto puede tardar un momento."):
-        
-        df_ml = _crear_features(df)
-        
-        # Features
-        features = [
-            'provincia_nombre', 'mes', 'zona_horaria', 'dia_semana', 'tipo_lugar'
-        ]
-        target = 'calle_nombre'
-        
-        df_ml = df_ml.dropna(subset=features + [target])
-        df_ml = df_ml[df_ml[target].str.lower() != 'sin determinar']
-        df_ml = df_ml[df_ml[target].str.lower() != 'perdido']
+    validas = features[FEATURES + [TARGET]].notna().all(axis=1).to_numpy() & \
+        ~features['calle_clave'].isin(['sin determinar', 'perdido']).to_numpy()
 
-        # Solo dejar calles con suficientes datos (10 al menos)
-        top_streets = df_ml[target].value_counts()
-        streets_to_keep = top_streets[top_streets > 10].index 
-        
-        if len(streets_to_keep) < 10:
-             st.error("No hay suficientes datos históricos para entrenar un modelo fiable. Se necesitan más incidentes por calle.")
-             return None
+    # Solo dejar calles con suficientes datos
+    conteos = features[TARGET][validas].value_counts()
+    calles = conteos[conteos > min_incidentes_calle].index
+    if len(calles) < min_calles:
+        return None
 
-        df_ml = df_ml[df_ml[target].isin(streets_to_keep)]
-        
-        X = df_ml[features]
-        y = df_ml[target]
-        
-        
-        X_train, _, y_train, _ = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
-        
-        # creo el pipeline
-        preprocessor = ColumnTransformer(
-            transformers=[
-                ('cat', OneHotEncoder(handle_unknown='ignore'), features)
-            ])
-            
-        model_pipeline = Pipeline(steps=[
-            ('preprocessor', preprocessor),
-            ('classifier', RandomForestClassifier(n_estimators=100, random_state=42, class_weight='balanced'))
+    filas = validas & features[TARGET].isin(calles).to_numpy()
+    return features.loc[filas, FEATURES], features.loc[filas, TARGET].astype(object)
+
+
+def _precision_top_k(probabilidades: np.ndarray, clases: np.ndarray, y_real: pd.Series, k: int) -> float:
+    """Proporción de casos cuya calle real está entre las k más probables."""
+    return float(aciertos_top_k(probabilidades, clases, y_real, k).mean())
+
+
+def _dividir(X: pd.DataFrame, y: pd.Series, hiperparametros: Dict[str, Any]):
+    """División entrenamiento / prueba; la misma para ambos modos, así las métricas son comparables."""
+    return train_test_split(X, y, test_size=hiperparametros['test_size'], random_state=42, stratify=y)
+
+
+def _construir_pipeline(hiperparametros: Dict[str, Any], n_jobs: int = N_JOBS) -> Pipeline:
+    """
+    Pipeline codificador + RandomForest para los hiperparámetros dados.
+    Opcionales (para el barrido): 'max_depth' y 'codificador' ('onehot' por defecto u 'ordinal').
+    """
+    if hiperparametros.get('codificador', 'onehot') == 'ordinal':
+        codificador = OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=-1)
+    else:
+        codificador = OneHotEncoder(handle_unknown='ignore')
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ('cat', codificador, FEATURES)
         ])
-        
-        # Entrenamienot
+
+    return Pipeline(steps=[
+        ('preprocessor', preprocessor),
+        ('classifier', RandomForestClassifier(
+            n_estimators=hiperparametros['n_estimators'],
+            random_state=hiperparametros['random_state'],
+            class_weight=hiperparametros['class_weight'],
+            max_depth=hiperparametros.get('max_depth'),
+            n_jobs=n_jobs
+        ))
+    ])
+
+
+def _construir_frecuencias(hiperparametros: Dict[str, Any], n_jobs: int = 1) -> FrecuenciasJerarquicas:
+    """Estimador de frecuencias jerárquicas (n_jobs se ignora: el ajuste es un único conteo)."""
+    return FrecuenciasJerarquicas(alpha=hiperparametros['alpha'])
+
+
+# Interfaz de motores: constructor(hiperparametros, n_jobs) -> estimador con fit / predict_proba / classes_
+CONSTRUCTORES = {
+    "bosque": _construir_pipeline,
+    "frecuencias": _construir_frecuencias,
+}
+
+
+def construir_estimador(hiperparametros: Dict[str, Any], n_jobs: int = N_JOBS):
+    """Estimador sin ajustar del motor indicado en los hiperparámetros (bosque si no se indica)."""
+    return CONSTRUCTORES[hiperparametros.get('motor', 'bosque')](hiperparametros, n_jobs=n_jobs)
+
+
+def _ajustar_con_progreso(pipeline: Pipeline, X_train: pd.DataFrame, y_train: pd.Series, progreso: Callable[[str, float], None]):
+    """
+    Ajusta el preprocesador y luego el bosque de a ARBOLES_POR_PASO árboles (warm_start),
+    informando el avance por etapa y por árbol. El resultado es el mismo que un fit completo.
+    """
+    preprocesador = pipeline.named_steps['preprocessor']
+    bosque = pipeline.named_steps['classifier']
+    total = bosque.n_estimators
+
+    progreso('Preprocesando', 0.02)
+    X_transformado = preprocesador.fit_transform(X_train, y_train)
+
+    bosque.set_params(warm_start=True)
+    with warnings.catch_warnings():
+        # class_weight='balanced' con warm_start avisa por si cambian los datos; aquí son siempre los mismos
+        warnings.simplefilter('ignore', UserWarning)
+        for arboles in range(min(ARBOLES_POR_PASO, total), total + ARBOLES_POR_PASO, ARBOLES_POR_PASO):
+            bosque.set_params(n_estimators=min(arboles, total))
+            bosque.fit(X_transformado, y_train)
+            progreso(f'Entrenando árboles ({bosque.n_estimators}/{total})', 0.05 + 0.85 * bosque.n_estimators / total)
+            if bosque.n_estimators >= total:
+                break
+    bosque.set_params(warm_start=False)
+
+
+def entrenar_desde_datos(
+    X: pd.DataFrame,
+    y: pd.Series,
+    hiperparametros: Dict[str, Any] = HIPERPARAMETROS,
+    progreso: Optional[Callable[[str, float], None]] = None
+) -> Tuple[Pipeline, Dict[str, Any]]:
+    """
+    Entrena el pipeline sobre (X, y) y lo evalúa sobre el conjunto reservado.
+    Devuelve (pipeline, metadatos). No usa Streamlit.
+    """
+    progreso = progreso or (lambda etapa, avance: None)
+    X_train, X_test, y_train, y_test = _dividir(X, y, hiperparametros)
+
+    model_pipeline = construir_estimador(hiperparametros)
+
+    # Entrenamiento
+    inicio = time.perf_counter()
+    if isinstance(model_pipeline, Pipeline):
+        _ajustar_con_progreso(model_pipeline, X_train, y_train, progreso)
+    else:
+        progreso('Contando frecuencias', 0.05)
         model_pipeline.fit(X_train, y_train)
-        
-    return model_pipeline
+    segundos = time.perf_counter() - inicio
+
+    progreso('Evaluando', 0.93)
+    metadatos = {
+        'hiperparametros': dict(hiperparametros),
+        'features': list(FEATURES),
+        'target': TARGET,
+        'clases': [str(c) for c in model_pipeline.classes_],
+        'fecha_entrenamiento': datetime.now().isoformat(timespec='seconds'),
+        'segundos_entrenamiento': round(segundos, 3),
+        'metricas': {
+            **evaluar(model_pipeline, X_test, y_test),
+            'n_entrenamiento': len(X_train),
+            'n_prueba': len(X_test),
+        },
+    }
+    return model_pipeline, metadatos
+
+
+def entrenar_modelo(
+    df: pd.DataFrame,
+    hiperparametros: Dict[str, Any] = HIPERPARAMETROS,
+    progreso: Optional[Callable[[str, float], None]] = None
+) -> Optional[Tuple[Pipeline, Dict[str, Any]]]:
+    """
+    Entrena y evalúa el modelo a partir del DataFrame completo.
+    Devuelve (pipeline, metadatos) o None si no hay datos suficientes. No usa Streamlit.
+    """
+    datos = _preparar_datos_entrenamiento(df, hiperparametros['min_incidentes_calle'])
+    if datos is None:
+        return None
+    pipeline, metadatos = entrenar_desde_datos(*datos, hiperparametros, progreso)
+    metadatos['version_datos'] = version_datos(df)
+    return pipeline, metadatos
+
+
+def _entrenar_y_guardar(id_modelo: str, X: pd.DataFrame, y: pd.Series, hiperparametros: Dict[str, Any], version: str) -> Dict[str, Any]:
+    """Tarea del proceso trabajador: entrena, evalúa, guarda en el registro y devuelve los metadatos."""
+    def progreso(etapa: str, avance: float):
+        informar_progreso(id_modelo, etapa, avance)
+
+    pipeline, metadatos = entrenar_desde_datos(X, y, hiperparametros, progreso)
+    metadatos.update({'id': id_modelo, 'version_datos': version})
+
+    # La tabla se guarda antes que el modelo: cuando el modelo aparece en el registro ya la tiene
+    tabla = construir_tabla(pipeline, progreso=lambda avance: progreso('Precalculando predicciones', 0.94 + 0.03 * avance))
+    guardar_artefacto(id_modelo, NOMBRE_ARTEFACTO, tabla)
+    metadatos['combinaciones_precalculadas'] = tabla.n_combinaciones
+
+    progreso('Guardando en el registro', 0.97)
+    guardar_modelo(pipeline, metadatos)
+    progreso('Listo', 1.0)
+    return metadatos
+
+
+def _entrenar_y_guardar_por_provincia(
+    id_modelo: str,
+    X: pd.DataFrame,
+    y: pd.Series,
+    hiperparametros: Dict[str, Any],
+    version: str,
+    id_global: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Tarea del proceso trabajador para el modo por provincia: entrena un fragmento por provincia
+    en paralelo, los guarda en la carpeta del modelo y lo compara con el modelo global
+    (id_global, si existe) sobre el mismo conjunto de prueba.
+    """
+    def progreso(etapa: str, avance: float):
+        informar_progreso(id_modelo, etapa, avance)
+
+    X_train, X_test, y_train, y_test = _dividir(X, y, hiperparametros)
+
+    progreso('Entrenando modelos por provincia', 0.02)
+    inicio = time.perf_counter()
+    fragmentos = entrenar_fragmentos(
+        X_train, y_train, construir_estimador, hiperparametros,
+        progreso=lambda avance: progreso('Entrenando modelos por provincia', 0.02 + 0.78 * avance)
+    )
+    segundos = time.perf_counter() - inicio
+
+    progreso('Guardando fragmentos', 0.82)
+    archivos = {provincia: nombre_fragmento(provincia) for provincia in fragmentos}
+    tamanios = {
+        provincia: os.path.getsize(guardar_artefacto(id_modelo, archivos[provincia], pipeline))
+        for provincia, (pipeline, _) in fragmentos.items()
+    }
+
+    modelos = {provincia: pipeline for provincia, (pipeline, _) in fragmentos.items()}
+    modelo = ModeloPorProvincia(
+        id_modelo, archivos,
+        clases=sorted({str(c) for pipeline in modelos.values() for c in pipeline.classes_}),
+        valores=unir_valores(modelos, valores_del_modelo)
+    )
+    modelo._cargados.update(modelos)  # ya están en memoria: no hace falta releerlos
+
+    progreso('Evaluando', 0.86)
+    probabilidades = modelo.predict_proba(X_test)
+    top5_fragmento = top_k_por_provincia(probabilidades, modelo.classes_, X_test, y_test, 5)
+    top5_global, bytes_global = {}, None
+    if id_global and existe_modelo(id_global):
+        pipeline_global, _ = cargar_modelo(id_global)
+        top5_global = top_k_por_provincia(pipeline_global.predict_proba(X_test), pipeline_global.classes_, X_test, y_test, 5)
+        bytes_global = bytes_en_memoria(pipeline_global)
+
+    n_prueba = X_test['provincia_nombre'].value_counts()
+    metadatos = {
+        'id': id_modelo,
+        'version_datos': version,
+        'hiperparametros': dict(hiperparametros),
+        'features': list(FEATURES),
+        'target': TARGET,
+        'clases': [str(c) for c in modelo.classes_],
+        'fecha_entrenamiento': datetime.now().isoformat(timespec='seconds'),
+        'segundos_entrenamiento': round(segundos, 3),
+        'metricas': {
+            **evaluar(modelo, X_test, y_test),
+            'n_entrenamiento': len(X_train),
+            'n_prueba': len(X_test),
+        },
+        'fragmentos': {
+            provincia: {
+                'archivo': archivos[provincia],
+                'clases': len(pipeline.classes_),
+                'n_entrenamiento': int((X_train['provincia_nombre'] == provincia).sum()),
+                'n_prueba': int(n_prueba.get(provincia, 0)),
+                'segundos_entrenamiento': round(segundos_fragmento, 3),
+                'bytes_memoria': bytes_en_memoria(pipeline),
+                'tamanio_bytes': tamanios[provincia],
+                'top5': top5_fragmento.get(provincia),
+                'top5_global': top5_global.get(provincia),
+            }
+            for provincia, (pipeline, segundos_fragmento) in fragmentos.items()
+        },
+        'comparacion_global': {'id': id_global, 'bytes_memoria': bytes_global} if bytes_global is not None else None,
+    }
+
+    tabla = construir_tabla(modelo, progreso=lambda avance: progreso('Precalculando predicciones', 0.9 + 0.07 * avance))
+    guardar_artefacto(id_modelo, NOMBRE_ARTEFACTO, tabla)
+    metadatos['combinaciones_precalculadas'] = tabla.n_combinaciones
+
+    progreso('Guardando en el registro', 0.97)
+    guardar_modelo(modelo, metadatos)
+    progreso('Listo', 1.0)
+    return metadatos
+
+
+def _actualizar_y_guardar(
+    id_raiz: str,
+    id_actual: str,
+    X_lote: pd.DataFrame,
+    y_lote: pd.Series,
+    X_acumulado: pd.DataFrame,
+    y_acumulado: pd.Series,
+    X: pd.DataFrame,
+    y: pd.Series,
+    hiperparametros: Dict[str, Any],
+    aplicados: int
+) -> Dict[str, Any]:
+    """
+    Tarea del proceso trabajador para la actualización incremental: incorpora un lote de
+    registros nuevos al modelo servido (id_actual) y lo guarda como derivado de id_raiz.
+    Las métricas se conservan del entrenamiento completo del modelo raíz.
+    """
+    id_nuevo = id_derivado(id_raiz, aplicados)
+
+    def progreso(etapa: str, avance: float):
+        informar_progreso(id_nuevo, etapa, avance)
+
+    progreso('Incorporando registros nuevos', 0.05)
+    inicio = time.perf_counter()
+    modelo, metadatos = cargar_modelo(id_actual)
+    # Los fragmentos que se reentrenan usan la misma parte de entrenamiento que el modelo raíz
+    X_train, _, y_train, _ = _dividir(X, y, hiperparametros)
+    modelo, provincias = actualizar_modelo(
+        modelo, id_nuevo, X_lote, y_lote, X_acumulado, y_acumulado, X_train, y_train,
+        construir_estimador, hiperparametros
+    )
+    segundos = time.perf_counter() - inicio
+
+    metadatos = {k: v for k, v in metadatos.items() if k not in ('tamanio_bytes', 'fecha_guardado')}
+    metadatos.update({
+        'id': id_nuevo,
+        'clases': [str(c) for c in modelo.classes_],
+        'fecha_entrenamiento': datetime.now().isoformat(timespec='seconds'),
+        'segundos_entrenamiento': round(segundos, 3),
+        'incremental': {
+            'raiz': id_raiz,
+            'origen': id_actual,
+            'registros_aplicados': aplicados,
+            'registros_lote': len(X_lote),
+            'provincias_actualizadas': provincias,
+        },
+    })
+    if isinstance(modelo, ModeloPorProvincia):
+        fragmentos = dict(metadatos.get('fragmentos') or {})
+        for provincia in provincias:
+            fragmento = modelo.fragmento(provincia)
+            fragmentos[provincia] = {
+                **fragmentos.get(provincia, {}),
+                'archivo': modelo.fragmentos[provincia],
+                'clases': len(fragmento.classes_),
+                'bytes_memoria': bytes_en_memoria(fragmento),
+                'tamanio_bytes': os.path.getsize(os.path.join(MODELOS_DIR, id_nuevo, modelo.fragmentos[provincia])),
+            }
+        metadatos['fragmentos'] = fragmentos
+
+    tabla = construir_tabla(modelo, progreso=lambda avance: progreso('Precalculando predicciones', 0.3 + 0.6 * avance))
+    guardar_artefacto(id_nuevo, NOMBRE_ARTEFACTO, tabla)
+    metadatos['combinaciones_precalculadas'] = tabla.n_combinaciones
+
+    progreso('Guardando en el registro', 0.95)
+    guardar_modelo(modelo, metadatos)
+    escribir_derivado(id_raiz, id_nuevo, aplicados)
+    progreso('Listo', 1.0)
+    return metadatos
+
+
+# Tarea del proceso trabajador de cada modo
+ENTRENADORES = {
+    "global": _entrenar_y_guardar,
+    "provincias": _entrenar_y_guardar_por_provincia,
+}
+
+
+@medir("cargar_modelo_registrado", cache=True)
+@st.cache_resource(show_spinner=False)
+@marcar_calculo
+def _cargar_modelo_registrado(id_modelo: str) -> Tuple[Pipeline, Dict[str, Any]]:
+    """Carga un modelo del registro una sola vez por proceso."""
+    return cargar_modelo(id_modelo)
+
+
+@st.cache_resource(show_spinner=False)
+def obtener_programador() -> ProgramadorEntrenamiento:
+    """Programador de entrenamientos compartido por todas las sesiones."""
+    return ProgramadorEntrenamiento(max_procesos=1)
+
+
+@medir("datos_entrenamiento", cache=True)
+@st.cache_resource(show_spinner=False, max_entries=2)
+@marcar_calculo
+def _datos_entrenamiento(_df: pd.DataFrame, version: str, min_incidentes_calle: int) -> Optional[Tuple[pd.DataFrame, pd.Series]]:
+    return _preparar_datos_entrenamiento(_df, min_incidentes_calle)
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _registros_incrementales(version: str) -> pd.DataFrame:
+    """Log de registros incrementales, releído solo cuando cambia el archivo."""
+    return leer_registros()
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _ids_datos(_df: pd.DataFrame, version: str) -> pd.Index:
+    """Ids de los incidentes ya presentes en los datos cargados."""
+    return pd.Index(_df['id_hecho'].astype(str).unique())
+
+
+def _features_registros(registros: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
+    """(X, y) de los registros incrementales, con las mismas features que el entrenamiento."""
+    return _seleccionar(construir_features(registros), min_calles=0)
+
+
+def _solicitar_actualizacion(
+    df: pd.DataFrame,
+    id_raiz: str,
+    id_actual: str,
+    aplicados: int,
+    registros: pd.DataFrame,
+    hiperparametros: Dict[str, Any],
+    version: str
+) -> int:
+    """
+    Encola la actualización incremental si el lote de registros pendientes está listo
+    (ver app.actualizacion_incremental.lote_listo); devuelve cuántos registros incorpora (0 si ninguno).
+    """
+    ids = _ids_datos(df, version)
+    X_lote, y_lote = _features_registros(sin_datos_base(registros.iloc[aplicados:], ids))
+    if not lote_listo(registros.iloc[aplicados:].loc[X_lote.index]):
+        return 0
+    datos = _datos_entrenamiento(df, version, hiperparametros['min_incidentes_calle'])
+    if datos is None:
+        return 0
+    X_acumulado, y_acumulado = _features_registros(sin_datos_base(registros, ids))
+    obtener_programador().solicitar(
+        id_derivado(id_raiz, len(registros)), _actualizar_y_guardar,
+        id_raiz, id_actual, X_lote, y_lote, X_acumulado, y_acumulado, *datos, hiperparametros, len(registros)
+    )
+    return len(X_lote)
+
+
+def _modelo_actualizado(df: pd.DataFrame, id_raiz: str, hiperparametros: Dict[str, Any], version: str) -> str:
+    """
+    Última versión incremental del modelo raíz (o el raíz si no tiene) y, si hay un lote
+    de registros nuevos listo, encola su incorporación en segundo plano.
+    """
+    derivado = leer_derivado(id_raiz)
+    if derivado and existe_modelo(derivado['id']):
+        id_actual, aplicados = derivado['id'], derivado['aplicados']
+    else:
+        id_actual, aplicados = id_raiz, 0
+
+    if admite_actualizacion(hiperparametros):
+        registros = _registros_incrementales(version_archivo(ruta_registros()))
+        if len(registros) > aplicados:
+            n = _solicitar_actualizacion(df, id_raiz, id_actual, aplicados, registros, hiperparametros, version)
+            if n:
+                st.caption(f"🔄 Incorporando {n} registro(s) nuevo(s) al modelo en segundo plano...")
+    return id_actual
+
+
+def _mostrar_progreso_entrenamiento(id_modelo: str):
+    """Barra de progreso del entrenamiento en curso; recarga la página al terminar."""
+    estado = obtener_programador().estado(id_modelo)
+    if estado['estado'] != 'en_curso':
+        st.rerun()
+    st.progress(min(estado['avance'], 1.0), text=f"🧠 Entrenando nuevo modelo en segundo plano: {estado['etapa']}")
+
+
+# Con st.fragment la barra se actualiza sola cada 2 segundos sin recargar toda la página
+if hasattr(st, 'fragment'):
+    _mostrar_progreso_entrenamiento = st.fragment(run_every=2)(_mostrar_progreso_entrenamiento)
+
+
+def hiperparametros_seleccionados() -> Dict[str, Any]:
+    """Hiperparámetros del motor y modo elegidos en la página de predicción (bosque global por defecto)."""
+    motor = MOTORES[st.session_state.get("prediccion_motor", "Bosque aleatorio")]
+    modo = MODOS_MODELO[st.session_state.get("prediccion_modo", "Global")]
+    return hiperparametros_de(motor, modo)
+
+
+def _solicitar_entrenamiento(df: pd.DataFrame, id_modelo: str, hiperparametros: Dict[str, Any], version: str) -> bool:
+    """Encola el entrenamiento con los hiperparámetros indicados; False si no hay datos suficientes."""
+    datos = _datos_entrenamiento(df, version, hiperparametros['min_incidentes_calle'])
+    if datos is None:
+        return False
+    modo = hiperparametros.get('modo', 'global')
+    argumentos = [id_modelo, *datos, hiperparametros, version]
+    if modo == "provincias":
+        # Modelo global del mismo motor con el que compararse
+        globales = {k: v for k, v in hiperparametros.items() if k != 'modo'}
+        argumentos.append(clave_modelo(version, globales))
+    obtener_programador().solicitar(id_modelo, ENTRENADORES[modo], *argumentos)
+    return True
+
+
+@medir("resolver_modelo")
+def _resolver_modelo(df: pd.DataFrame, hiperparametros: Dict[str, Any] = HIPERPARAMETROS) -> Optional[str]:
+    """
+    Devuelve el id del modelo a servir:
+    - el modelo fijado manualmente en el registro (rollback), si lo hay
+    - si no, el modelo registrado para la versión de datos e hiperparámetros actuales,
+      con los registros nuevos ya incorporados incrementalmente (ver _modelo_actualizado)
+    - si no existe, encola su entrenamiento en segundo plano y, mientras tanto,
+      sirve el modelo activo anterior (o None si todavía no hay ninguno)
+    """
+    activo = modelo_activo()
+    if activo and activo.get('fijado'):
+        return activo['id']
+
+    # Los modelos se guardan por versión de la carga completa: las altas en vivo (app.cambios)
+    # no disparan un reentrenamiento, entran como registros incrementales
+    df = datos_base(df)
+    version = version_datos(df)
+    id_modelo = clave_modelo(version, hiperparametros)
+    if existe_modelo(id_modelo):
+        id_modelo = _modelo_actualizado(df, id_modelo, hiperparametros, version)
+        if not activo or activo['id'] != id_modelo:
+            activar_modelo(id_modelo, fijar=False)
+        return id_modelo
+
+    programador = obtener_programador()
+    estado = programador.estado(id_modelo)
+
+    if estado['estado'] == 'sin_tarea':
+        if not _solicitar_entrenamiento(df, id_modelo, hiperparametros, version):
+            st.error("No hay suficientes datos históricos para entrenar un modelo fiable. Se necesitan más incidentes por calle.")
+            return None
+        estado = programador.estado(id_modelo)
+
+    if estado['estado'] == 'error':
+        st.error(f"❌ Falló el entrenamiento del modelo: {estado['error']}")
+        if st.button("🔁 Reintentar entrenamiento"):
+            _solicitar_entrenamiento(df, id_modelo, hiperparametros, version)
+            st.rerun()
+    elif estado['estado'] == 'en_curso':
+        _mostrar_progreso_entrenamiento(id_modelo)
+
+    if activo:
+        st.info("ℹ️ Mientras se entrena el modelo con los datos actuales, se usa el modelo anterior.")
+        return activo['id']
+    return None
+
+
+def precalentar_modelo(df: pd.DataFrame, hiperparametros: Dict[str, Any] = HIPERPARAMETROS) -> Optional[str]:
+    """
+    Versión sin interfaz de _resolver_modelo para el precalentamiento (app.precalentamiento):
+    si el modelo de la versión de datos no está registrado lo entrena en el proceso trabajador
+    y espera a que termine; después carga en memoria el modelo a servir y su tabla de predicciones.
+    Devuelve el id del modelo servido, o None si no hay datos suficientes para entrenar.
+    """
+    activo = modelo_activo()
+    if activo and activo.get('fijado'):
+        id_servido = activo['id']
+    else:
+        df = datos_base(df)
+        version = version_datos(df)
+        id_modelo = clave_modelo(version, hiperparametros)
+        if not existe_modelo(id_modelo):
+            if not _solicitar_entrenamiento(df, id_modelo, hiperparametros, version):
+                return None
+            obtener_programador().tarea(id_modelo).result()
+        derivado = leer_derivado(id_modelo)
+        id_servido = derivado['id'] if derivado and existe_modelo(derivado['id']) else id_modelo
+    _cargar_modelo_registrado(id_servido)
+    _tabla_predicciones(id_servido)
+    return id_servido
+
+
+def entrenar_modelo_y_preprocesador(df: pd.DataFrame, hiperparametros: Dict[str, Any] = HIPERPARAMETROS):
+    """Pipeline a servir (ver _resolver_modelo), o None si todavía no hay ninguno."""
+    id_modelo = _resolver_modelo(df, hiperparametros)
+    return _cargar_modelo_registrado(id_modelo)[0] if id_modelo else None
+
+
+@medir("tabla_predicciones", cache=True)
+@st.cache_resource(show_spinner=False)
+@marcar_calculo
+def _tabla_predicciones(id_modelo: str) -> TablaPredicciones:
+    tabla = cargar_artefacto(id_modelo, NOMBRE_ARTEFACTO)
+    if tabla is None:
+        # Modelos guardados antes de existir la tabla: se calcula una vez y se guarda junto al modelo
+        with st.spinner("⚙️ Precalculando las predicciones de todas las combinaciones..."):
+            tabla = construir_tabla(_cargar_modelo_registrado(id_modelo)[0])
+        guardar_artefacto(id_modelo, NOMBRE_ARTEFACTO, tabla)
+    return tabla
+
+
+def obtener_tabla_predicciones(df: pd.DataFrame) -> Optional[TablaPredicciones]:
+    """Tabla de predicciones precalculada del modelo servido, o None si todavía no hay modelo."""
+    id_modelo = _resolver_modelo(df, hiperparametros_seleccionados())
+    return _tabla_predicciones(id_modelo) if id_modelo else None
+
+
+def _tamanio_total(metadatos: Dict[str, Any]) -> int:
+    """Bytes en disco del modelo, incluidos sus fragmentos por provincia."""
+    fragmentos = metadatos.get('fragmentos') or {}
+    return metadatos.get('tamanio_bytes', 0) + sum(f.get('tamanio_bytes', 0) for f in fragmentos.values())
+
+
+def mostrar_registro_modelos():
+    """Panel con los modelos guardados: métricas, activación (rollback) y liberación."""
+    modelos = listar_modelos()
+    activo = modelo_activo()
+    with st.expander("🗂️ Registro de modelos"):
+        if not modelos:
+            st.info("Todavía no hay modelos guardados.")
+            return
+
+        tabla = pd.DataFrame([{
+            'ID': m['id'],
+            'Activo': '✅' if activo and activo['id'] == m['id'] else '',
+            'Entrenado': m.get('fecha_entrenamiento', ''),
+            'Motor': 'Frecuencias' if m.get('hiperparametros', {}).get('motor') == 'frecuencias' else 'Bosque',
+            'Modo': 'Por provincia' if m.get('hiperparametros', {}).get('modo') == 'provincias' else 'Global',
+            'Clases': len(m.get('clases', [])),
+            'Registros incrementales': (m.get('incremental') or {}).get('registros_aplicados', 0),
+            'Top-1': m.get('metricas', {}).get('top1'),
+            'Top-5': m.get('metricas', {}).get('top5'),
+            'Log loss': m.get('metricas', {}).get('log_loss'),
+            'Entrenamiento (s)': m.get('segundos_entrenamiento'),
+            'Tamaño (MB)': round(_tamanio_total(m) / 1_048_576, 2),
+        } for m in modelos])
+        st.dataframe(tabla.style.format({'Top-1': '{:.2%}', 'Top-5': '{:.2%}', 'Log loss': '{:.3f}'}, na_rep='-'), use_container_width=True, hide_index=True)
+
+        if activo and activo.get('fijado'):
+            st.warning(f"📌 Modelo fijado manualmente: {activo['id']}. No se reentrenará al cambiar los datos.")
+            if st.button("🔓 Volver a usar el modelo de los datos actuales"):
+                liberar_modelo()
+                st.rerun()
+
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            elegido = st.selectbox("Modelo a activar (rollback):", [m['id'] for m in modelos], key="registro_modelo_elegido")
+        with col2:
+            st.markdown("<p style='visibility: hidden;'>placeholder</p>", unsafe_allow_html=True) # Alineación
+            if st.button("📌 Activar"):
+                activar_modelo(elegido, fijar=True)
+                st.rerun()
+
+def mostrar_comparacion_provincias(id_modelo: str):
+    """Memoria, tiempo de entrenamiento y acierto top-5 por provincia del modo fragmentado frente al global."""
+    metadatos = _cargar_modelo_registrado(id_modelo)[1] or {}
+    fragmentos = metadatos.get('fragmentos')
+    if not fragmentos:
+        return
+
+    with st.expander("⚖️ Modelos por provincia vs modelo global"):
+        tabla = pd.DataFrame([{
+            'Provincia': provincia,
+            'Calles': f['clases'],
+            'Casos entrenamiento': f['n_entrenamiento'],
+            'Casos prueba': f['n_prueba'],
+            'Entrenamiento (s)': f['segundos_entrenamiento'],
+            'Memoria (MB)': f['bytes_memoria'] / 1_048_576,
+            'Top-5 provincia': f['top5'],
+            'Top-5 global': f['top5_global'],
+        } for provincia, f in fragmentos.items()]).sort_values('Casos entrenamiento', ascending=False)
+
+        global_ = metadatos.get('comparacion_global')
+        metadatos_global = leer_metadatos(global_['id']) if global_ else None
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("💾 Memoria total (MB)", f"{tabla['Memoria (MB)'].sum():.1f}",
+                      delta=f"{tabla['Memoria (MB)'].sum() - global_['bytes_memoria'] / 1_048_576:+.1f} vs global" if global_ else None,
+                      delta_color="inverse")
+        with col2:
+            st.metric("⏱️ Entrenamiento (s)", f"{metadatos['segundos_entrenamiento']:.1f}",
+                      delta=f"{metadatos['segundos_entrenamiento'] - metadatos_global['segundos_entrenamiento']:+.1f} vs global" if metadatos_global else None,
+                      delta_color="inverse")
+        with col3:
+            st.metric("🎯 Top-5", f"{metadatos['metricas']['top5']:.2%}",
+                      delta=f"{(metadatos['metricas']['top5'] - metadatos_global['metricas']['top5']) * 100:+.1f} pp vs global" if metadatos_global else None)
+        if not global_:
+            st.caption("Entrena también el modelo global con estos datos para ver la comparación por provincia.")
+
+        st.dataframe(
+            tabla.style.format({'Memoria (MB)': '{:.2f}', 'Top-5 provincia': '{:.2%}', 'Top-5 global': '{:.2%}'}, na_rep='-'),
+            use_container_width=True, hide_index=True
+        )
+
 
 def mostrar_interfaz_prediccion(df: pd.DataFrame):
     """Muestra la interfaz de usuario en Streamlit para hacer predicciones."""
@@ -87,10 +753,29 @@ def mostrar_interfaz_prediccion(df: pd.DataFrame):
     )
     st.info("ℹ️ **Nota:** El modelo se ha entrenado con datos históricos y su precisión depende de la cantidad y calidad de los mismos. Por ello, la mejor prediccion sera en provincia de BS AS por la cantidad de datos.")
 
-    pipeline = entrenar_modelo_y_preprocesador(df)
-    
-    if pipeline is None:
+    st.radio(
+        "Motor:",
+        list(MOTORES.keys()),
+        horizontal=True,
+        key="prediccion_motor",
+        help="Bosque aleatorio: 100 árboles sobre las variables codificadas. "
+             "Frecuencias jerárquicas: conteos suavizados de provincia a mes, se entrena en milisegundos."
+    )
+    st.radio(
+        "Modelo:",
+        list(MODOS_MODELO.keys()),
+        horizontal=True,
+        key="prediccion_modo",
+        help="Global: un único modelo con todas las calles del país. Por provincia: un modelo por provincia, solo con sus calles."
+    )
+    id_modelo = _resolver_modelo(df, hiperparametros_seleccionados())
+
+    if id_modelo is None:
         return
+    tabla = _tabla_predicciones(id_modelo)
+
+    mostrar_registro_modelos()
+    mostrar_comparacion_provincias(id_modelo)
 
     st.markdown("#### Selecciona los parámetros para la predicción:")
 
@@ -107,7 +792,7 @@ def mostrar_interfaz_prediccion(df: pd.DataFrame):
     with col1:
         provincia = st.selectbox(
             "Provincia:",
-            options=sorted(df['provincia_nombre'].unique())
+            options=list(features_de(df)['provincia_nombre'].cat.categories)
         )
         
         
@@ -120,17 +805,17 @@ def mostrar_interfaz_prediccion(df: pd.DataFrame):
 
         tipo_lugar = st.selectbox(
             "Tipo de Lugar:",
-            options=sorted(df['tipo_lugar'].dropna().unique())
+            options=list(features_de(df)['tipo_lugar'].cat.categories)
         )
 
     with col2:
         zona_horaria = st.selectbox(
             "Franja Horaria:",
-            options=['Mañana', 'Tarde', 'Noche', 'Madrugada']
+            options=ZONAS_HORARIAS
         )
         dia_semana = st.selectbox(
             "Día de la Semana:",
-            options=['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'],
+            options=DIAS_SEMANA,
             format_func=lambda x: {'Monday':'Lunes', 'Tuesday':'Martes', 'Wednesday':'Miércoles', 'Thursday':'Jueves', 'Friday':'Viernes', 'Saturday':'Sábado', 'Sunday':'Domingo'}.get(x, x)
         )
 
@@ -141,24 +826,21 @@ def mostrar_interfaz_prediccion(df: pd.DataFrame):
         mes_numero = meses_map[mes_nombre_seleccionado]
         
 
-        input_data = pd.DataFrame({
-            'provincia_nombre': [provincia],
-            'mes': [mes_numero], # <--- Usamos el valor numérico correcto
-            'zona_horaria': [zona_horaria],
-            'dia_semana': [dia_semana],
-            'tipo_lugar': [tipo_lugar]
-        })
+        input_data = {
+            'provincia_nombre': provincia,
+            'mes': mes_numero, # <--- Usamos el valor numérico correcto
+            'zona_horaria': zona_horaria,
+            'dia_semana': dia_semana,
+            'tipo_lugar': tipo_lugar
+        }
 
+        # Búsqueda directa en la tabla precalculada; si la combinación no está
+        # (valor que el modelo no vio al entrenar) se predice con el pipeline
         with st.spinner("🤖 Analizando patrones y calculando probabilidades..."):
-            probabilities = pipeline.predict_proba(input_data)[0]
-            classes = pipeline.classes_
-            
-            results_df = pd.DataFrame({
-                'Calle': classes,
-                'Probabilidad': probabilities
-            }).sort_values(by='Probabilidad', ascending=False)
-            
-            top_5_results = results_df.head(5)
+            top_5_results = top_calles(tabla, input_data, k=5, pipeline=lambda: _cargar_modelo_registrado(id_modelo)[0])
+        if top_5_results['Probabilidad'].sum() == 0:
+            st.warning("⚠️ El modelo no tiene datos suficientes para esta provincia.")
+            return
             
         st.success("✅ ¡Análisis completado! Estas son las 5 calles con mayor probabilidad de siniestro:")
 
@@ -172,3 +854,50 @@ def mostrar_interfaz_prediccion(df: pd.DataFrame):
         st.subheader("Detalle de las probabilidades")
         st.dataframe(top_5_results.style.format({'Probabilidad': '{:.2%}'}), use_container_width=True)
 
+
+def mostrar_ranking_calles(df: pd.DataFrame):
+    """Ranking de las calles de mayor riesgo según la tabla de predicciones precalculada."""
+    st.markdown("### ⚠️ Calles de Mayor Riesgo")
+    st.markdown(
+        "Calles ordenadas por su **probabilidad media de siniestro** según el modelo, sobre todas las "
+        "combinaciones de mes, franja horaria, día y tipo de lugar que elijas (vacío = todas)."
+    )
+
+    tabla = obtener_tabla_predicciones(df)
+    if tabla is None:
+        return
+
+    valores = dict(zip(tabla.features, tabla.valores))
+    nombres_dia = {'Monday': 'Lunes', 'Tuesday': 'Martes', 'Wednesday': 'Miércoles', 'Thursday': 'Jueves',
+                   'Friday': 'Viernes', 'Saturday': 'Sábado', 'Sunday': 'Domingo'}
+
+    col1, col2 = st.columns(2)
+    with col1:
+        provincias = st.multiselect("Provincias:", valores['provincia_nombre'], key="ranking_provincias")
+        meses = st.multiselect("Meses:", valores['mes'], key="ranking_meses")
+        tipos_lugar = st.multiselect("Tipo de Lugar:", valores['tipo_lugar'], key="ranking_tipos_lugar")
+    with col2:
+        zonas = st.multiselect("Franja Horaria:", valores['zona_horaria'], key="ranking_zonas")
+        dias = st.multiselect("Día de la Semana:", valores['dia_semana'],
+                              format_func=lambda x: nombres_dia.get(x, x), key="ranking_dias")
+        n = st.slider("Cantidad de calles:", 5, 50, 20, key="ranking_n")
+
+    ranking = ranking_calles(
+        tabla, n=n, provincia_nombre=provincias, mes=meses, zona_horaria=zonas, dia_semana=dias, tipo_lugar=tipos_lugar
+    )
+    if ranking.empty:
+        st.info("No hay combinaciones para los filtros seleccionados.")
+        return
+
+    fig = px.bar(
+        ranking.iloc[::-1],
+        x='Probabilidad media',
+        y='Calle',
+        orientation='h',
+        title=f"Top {len(ranking)} calles de mayor riesgo",
+        labels={'Probabilidad media': 'Probabilidad media', 'Calle': 'Calle'}
+    )
+    fig.update_layout(height=max(400, 25 * len(ranking)), xaxis_tickformat='.1%')
+    fig.update_traces(marker_color='#D9534F')
+    st.plotly_chart(fig, use_container_width=True)
+    st.dataframe(ranking.style.format({'Probabilidad media': '{:.2%}'}), use_container_width=True, hide_index=True)
@@ -0,0 +1,239 @@
+"""
+Pronóstico mensual de muertes (o siniestros) por provincia.
+Las series anio/mes de todas las provincias se apilan en una matriz provincia x mes y cada
+modelo se ajusta sobre la matriz completa a la vez (numpy/scipy, sin bucles por provincia):
+- Estacional ingenuo: repite el último año observado
+- Suavizado exponencial: Holt-Winters aditivo; los parámetros se eligen por provincia en una grilla
+- Poisson con efectos de mes: GLM log(mu) = tendencia + mes, ajustado por IRLS en lote
+Cada modelo se evalúa con backtesting de origen móvil sobre los últimos años y los
+resultados se calculan una vez por unidad; con cada alta en vivo se vuelven a ajustar sobre la
+matriz provincia x mes, armada con los conteos incrementales (sin recorrer las filas).
+"""
+
+import itertools
+import numpy as np
+import pandas as pd
+from scipy import stats
+from typing import Callable, Dict, List, Tuple
+from app.cambios import Cambio, CacheIncremental
+from app.incidentes import obtener_conteos
+from app.instrumentacion import medir
+
+ESTACIONALIDAD = 12
+HORIZONTE = 12
+# Backtesting: cortes de origen móvil, cada uno pronostica HORIZONTE meses
+PLIEGUES_BACKTEST = 3
+MESES_MINIMOS_ENTRENAMIENTO = 2 * ESTACIONALIDAD
+NIVEL_INTERVALO = 0.8
+
+# Grilla de Holt-Winters: (alpha, beta, gamma)
+GRILLA_SUAVIZADO = list(itertools.product((0.05, 0.1, 0.2, 0.4), (0.0, 0.02), (0.05, 0.15, 0.3)))
+ITERACIONES_IRLS = 25
+REGULARIZACION_IRLS = 1e-6
+
+
+def matriz_mensual(df: pd.DataFrame, unidad: str = "victimas") -> Tuple[List[str], pd.DatetimeIndex, np.ndarray]:
+    """
+    Conteos mensuales por provincia: (provincias, meses, matriz provincia x mes).
+    Los meses sin registros dentro del período observado cuentan 0.
+    """
+    conteos = obtener_conteos(df, ('provincia_nombre', 'anio', 'mes'), unidad)
+    provincia = conteos.index.get_level_values(0)
+    mes_absoluto = (conteos.index.get_level_values(1).astype(int) * 12 + conteos.index.get_level_values(2).astype(int) - 1).to_numpy()
+    codigos, provincias = pd.factorize(provincia, sort=True)
+    inicio = int(mes_absoluto.min())
+    n_meses = int(mes_absoluto.max()) - inicio + 1
+    matriz = np.zeros((len(provincias), n_meses))
+    matriz[codigos, mes_absoluto - inicio] = conteos.to_numpy()
+    meses = pd.date_range(pd.Timestamp(year=inicio // 12, month=inicio % 12 + 1, day=1), periods=n_meses, freq='MS')
+    return list(provincias), meses, matriz
+
+
+def ingenuo_estacional(Y: np.ndarray, horizonte: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Repite el último año; el desvío crece con cada año de horizonte. Devuelve (media, desvío) P x h."""
+    pasos = np.arange(horizonte)
+    media = Y[:, Y.shape[1] - ESTACIONALIDAD + pasos % ESTACIONALIDAD]
+    residuos = Y[:, ESTACIONALIDAD:] - Y[:, :-ESTACIONALIDAD]
+    sigma = np.sqrt(np.mean(residuos ** 2, axis=1, keepdims=True))
+    return media, sigma * np.sqrt(pasos // ESTACIONALIDAD + 1)
+
+
+def suavizado_exponencial(Y: np.ndarray, horizonte: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Holt-Winters aditivo (nivel, tendencia, estación) sobre un tensor provincia x combinación de
+    la grilla; por provincia se elige la combinación con menor error de un paso dentro de la muestra.
+    """
+    m = ESTACIONALIDAD
+    alpha, beta, gamma = (np.asarray(p)[None, :] for p in zip(*GRILLA_SUAVIZADO))
+    n_provincias, n_meses = Y.shape
+    # Estado inicial desde los dos primeros años
+    primer_anio = Y[:, :m].mean(axis=1, keepdims=True)
+    nivel = np.repeat(primer_anio, alpha.shape[1], axis=1)
+    tendencia = np.repeat((Y[:, m:2 * m].mean(axis=1, keepdims=True) - primer_anio) / m, alpha.shape[1], axis=1)
+    estacion = np.repeat((Y[:, :m] - primer_anio)[:, None, :], alpha.shape[1], axis=1)
+    errores = np.zeros_like(nivel)
+    for t in range(n_meses):
+        y = Y[:, t, None]
+        s = estacion[:, :, t % m]
+        error = y - (nivel + tendencia + s)
+        if t >= m:
+            errores += error ** 2
+        nuevo_nivel = alpha * (y - s) + (1 - alpha) * (nivel + tendencia)
+        tendencia = beta * (nuevo_nivel - nivel) + (1 - beta) * tendencia
+        estacion[:, :, t % m] = gamma * (y - nuevo_nivel) + (1 - gamma) * s
+        nivel = nuevo_nivel
+
+    filas = np.arange(n_provincias)
+    mejor = errores.argmin(axis=1)
+    pasos = np.arange(1, horizonte + 1)
+    media = nivel[filas, mejor, None] + pasos * tendencia[filas, mejor, None] \
+        + estacion[filas, mejor][:, (n_meses + pasos - 1) % m]
+    sigma = np.sqrt(errores[filas, mejor] / max(n_meses - m, 1))[:, None]
+    # Varianza del pronóstico a h pasos de ETS(A,A,A): sigma² (1 + sum c_j²), c_j = alpha (1 + j beta) + gamma [j % m == 0]
+    a, b, g = alpha[0, mejor][:, None], beta[0, mejor][:, None], gamma[0, mejor][:, None]
+    j = np.arange(1, horizonte)[None, :]
+    c = a * (1 + j * b) + g * (j % m == 0)
+    acumulado = np.concatenate([np.zeros((n_provincias, 1)), np.cumsum(c ** 2, axis=1)], axis=1)
+    return np.maximum(media, 0), sigma * np.sqrt(1 + acumulado)
+
+
+def _diseno_poisson(meses: np.ndarray) -> np.ndarray:
+    """Matriz de diseño: intercepto, tendencia lineal (en años) y 11 indicadores de mes."""
+    indicadores = (meses[:, None] % ESTACIONALIDAD == np.arange(1, ESTACIONALIDAD)[None, :]).astype(float)
+    return np.column_stack([np.ones(len(meses)), meses / ESTACIONALIDAD, indicadores])
+
+
+def poisson_estacional(Y: np.ndarray, horizonte: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    GLM de Poisson con tendencia y efectos de mes, un juego de coeficientes por provincia.
+    IRLS en lote: en cada iteración se resuelven los P sistemas normales ponderados con un solo
+    np.linalg.solve. El desvío usa la sobredispersión estimada (cuasi-Poisson, al menos 1).
+    """
+    n_provincias, n_meses = Y.shape
+    X = _diseno_poisson(np.arange(n_meses))
+    identidad = REGULARIZACION_IRLS * np.eye(X.shape[1])
+    mu = Y + 0.5
+    eta = np.log(mu)
+    for _ in range(ITERACIONES_IRLS):
+        z = eta + (Y - mu) / mu
+        A = np.einsum('tk,pt,tl->pkl', X, mu, X) + identidad
+        b = np.einsum('tk,pt->pk', X, mu * z)
+        coeficientes = np.linalg.solve(A, b[:, :, None])[:, :, 0]
+        nuevo_eta = np.clip(coeficientes @ X.T, -20, 20)
+        convergio = np.max(np.abs(nuevo_eta - eta)) < 1e-8
+        eta, mu = nuevo_eta, np.exp(nuevo_eta)
+        if convergio:
+            break
+    dispersion = np.maximum(np.sum((Y - mu) ** 2 / mu, axis=1) / max(n_meses - X.shape[1], 1), 1.0)[:, None]
+    media = np.exp(np.clip(coeficientes @ _diseno_poisson(np.arange(n_meses, n_meses + horizonte)).T, -20, 20))
+    return media, np.sqrt(dispersion * media)
+
+
+MODELOS_PRONOSTICO: Dict[str, Callable[[np.ndarray, int], Tuple[np.ndarray, np.ndarray]]] = {
+    "Estacional ingenuo": ingenuo_estacional,
+    "Suavizado exponencial": suavizado_exponencial,
+    "Poisson con efectos de mes": poisson_estacional,
+}
+
+
+def banda(media: np.ndarray, desvio: np.ndarray, nivel: float = NIVEL_INTERVALO) -> Tuple[np.ndarray, np.ndarray]:
+    """Intervalo normal central al nivel indicado, recortado a conteos no negativos."""
+    z = stats.norm.ppf(0.5 + nivel / 2)
+    return np.maximum(media - z * desvio, 0), media + z * desvio
+
+
+def backtest(Y: np.ndarray, horizonte: int = HORIZONTE, pliegues: int = PLIEGUES_BACKTEST) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    Backtesting de origen móvil: cada corte entrena con los meses anteriores y pronostica los
+    `horizonte` siguientes. Métricas por modelo, promediadas entre cortes (un valor por provincia):
+    MAE, RMSE, MASE (MAE relativo al ingenuo estacional de un paso dentro del entrenamiento)
+    y cobertura del intervalo.
+    """
+    n_meses = Y.shape[1]
+    cortes = [n_meses - horizonte * k for k in range(pliegues, 0, -1)]
+    cortes = [c for c in cortes if c >= MESES_MINIMOS_ENTRENAMIENTO]
+    resultados = {}
+    for nombre, modelo in MODELOS_PRONOSTICO.items():
+        errores_abs, errores_cuad, escalados, cubiertos = [], [], [], []
+        for corte in cortes:
+            entrenamiento, real = Y[:, :corte], Y[:, corte:corte + horizonte]
+            media, desvio = modelo(entrenamiento, real.shape[1])
+            inferior, superior = banda(media, desvio)
+            escala = np.mean(np.abs(entrenamiento[:, ESTACIONALIDAD:] - entrenamiento[:, :-ESTACIONALIDAD]), axis=1)
+            mae = np.mean(np.abs(real - media), axis=1)
+            errores_abs.append(mae)
+            errores_cuad.append(np.mean((real - media) ** 2, axis=1))
+            escalados.append(mae / np.where(escala > 0, escala, np.nan))
+            cubiertos.append(np.mean((real >= inferior) & (real <= superior), axis=1))
+        if not cortes:
+            continue
+        resultados[nombre] = {
+            'MAE': np.mean(errores_abs, axis=0),
+            'RMSE': np.sqrt(np.mean(errores_cuad, axis=0)),
+            'MASE': np.nanmean(escalados, axis=0) if np.isfinite(escalados).any() else np.full(Y.shape[0], np.nan),
+            'Cobertura': np.mean(cubiertos, axis=0),
+        }
+    return resultados
+
+
+class PronosticoMensual:
+    """
+    Historia, pronósticos y métricas de backtesting de todas las provincias.
+    - pronosticos: modelo -> (media, inferior, superior), cada uno provincia x mes futuro
+    - metricas: una fila por (provincia, modelo) con MAE, RMSE, MASE y cobertura
+    """
+
+    def __init__(self, df: pd.DataFrame, unidad: str = "victimas", horizonte: int = HORIZONTE):
+        self.provincias, self.meses, self.historia = matriz_mensual(df, unidad)
+        self.futuro = pd.date_range(self.meses[-1] + pd.offsets.MonthBegin(1), periods=horizonte, freq='MS')
+        self.pronosticos: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        if self.historia.shape[1] >= MESES_MINIMOS_ENTRENAMIENTO:
+            for nombre, modelo in MODELOS_PRONOSTICO.items():
+                media, desvio = modelo(self.historia, horizonte)
+                self.pronosticos[nombre] = (media, *banda(media, desvio))
+
+        filas = []
+        for nombre, metricas in backtest(self.historia, horizonte).items():
+            tabla = pd.DataFrame(metricas)
+            tabla.insert(0, 'Modelo', nombre)
+            tabla.insert(0, 'Provincia', self.provincias)
+            filas.append(tabla)
+        self.metricas = pd.concat(filas, ignore_index=True) if filas else \
+            pd.DataFrame(columns=['Provincia', 'Modelo', 'MAE', 'RMSE', 'MASE', 'Cobertura'])
+
+    @property
+    def disponible(self) -> bool:
+        return bool(self.pronosticos)
+
+    def metricas_de(self, provincia: str) -> pd.DataFrame:
+        return self.metricas[self.metricas['Provincia'] == provincia].drop(columns='Provincia').reset_index(drop=True)
+
+    def mejor_modelo(self, provincia: str) -> str:
+        """Modelo con menor MAE de backtesting en la provincia (el primero si no hay métricas)."""
+        metricas = self.metricas_de(provincia)
+        if metricas.empty:
+            return next(iter(MODELOS_PRONOSTICO))
+        return metricas.loc[metricas['MAE'].idxmin(), 'Modelo']
+
+    def serie(self, provincia: str) -> pd.Series:
+        return pd.Series(self.historia[self.provincias.index(provincia)], index=self.meses)
+
+    def pronostico(self, provincia: str, modelo: str) -> pd.DataFrame:
+        """Media e intervalo de la provincia para cada mes futuro."""
+        fila = self.provincias.index(provincia)
+        media, inferior, superior = self.pronosticos[modelo]
+        return pd.DataFrame({'media': media[fila], 'inferior': inferior[fila], 'superior': superior[fila]}, index=self.futuro)
+
+
+def _actualizar_pronosticos(pronostico: PronosticoMensual, cambio: Cambio, unidad: str, horizonte: int) -> PronosticoMensual:
+    # La matriz sale de los conteos, que ya siguen la versión nueva: el ajuste no recorre las filas
+    return PronosticoMensual(cambio.datos, unidad, horizonte)
+
+
+_pronosticos = CacheIncremental(PronosticoMensual, _actualizar_pronosticos, max_entradas=8)
+
+
+@medir("pronosticos")
+def obtener_pronosticos(df: pd.DataFrame, unidad: str = "victimas", horizonte: int = HORIZONTE) -> PronosticoMensual:
+    """Pronósticos de todas las provincias, una vez por unidad y horizonte, seguidos con las altas en vivo."""
+    return _pronosticos.obtener(df, unidad, horizonte)
@@ -0,0 +1,177 @@
+"""
+Registro persistente de modelos de predicción en disco.
+Cada modelo se guarda en su propia carpeta dentro de modelos/:
+- modelo.joblib: el pipeline entrenado (joblib comprimido)
+- metadatos.json: versión de datos, hiperparámetros, features, clases, tiempos y métricas
+- artefactos derivados del modelo (p. ej. la tabla de predicciones precalculada)
+El archivo activo.json indica qué modelo se sirve y si fue fijado manualmente (rollback).
+"""
+
+import os
+import json
+import hashlib
+import shutil
+import joblib
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))  # sube desde app/ a S.A.S.V/
+MODELOS_DIR = os.path.join(BASE_DIR, "modelos")
+ARCHIVO_ACTIVO = "activo.json"
+ARCHIVO_MODELO = "modelo.joblib"
+ARCHIVO_METADATOS = "metadatos.json"
+NIVEL_COMPRESION = 3
+
+
+def clave_modelo(version_datos: str, hiperparametros: Dict[str, Any]) -> str:
+    """Identificador determinista del modelo para una versión de datos y unos hiperparámetros."""
+    contenido = json.dumps({"datos": version_datos, "hiperparametros": hiperparametros}, sort_keys=True, default=str)
+    return hashlib.sha1(contenido.encode("utf-8")).hexdigest()[:16]
+
+
+def _ruta(id_modelo: str, archivo: str = "", directorio: str = MODELOS_DIR) -> str:
+    return os.path.join(directorio, id_modelo, archivo)
+
+
+def _escribir_json(ruta: str, contenido: Dict[str, Any]):
+    """Escritura atómica: archivo temporal + os.replace."""
+    temporal = f"{ruta}.tmp"
+    with open(temporal, "w", encoding="utf-8") as archivo:
+        json.dump(contenido, archivo, ensure_ascii=False, indent=2, default=str)
+    os.replace(temporal, ruta)
+
+
+def guardar_modelo(
+    modelo: Any,
+    metadatos: Dict[str, Any],
+    directorio: str = MODELOS_DIR,
+    activar: bool = True
+) -> str:
+    """
+    Guarda el modelo y sus metadatos; devuelve el id del modelo.
+    metadatos debe incluir 'id' (ver clave_modelo).
+    """
+    id_modelo = metadatos["id"]
+    carpeta = _ruta(id_modelo, directorio=directorio)
+    os.makedirs(carpeta, exist_ok=True)
+
+    ruta_modelo = os.path.join(carpeta, ARCHIVO_MODELO)
+    joblib.dump(modelo, f"{ruta_modelo}.tmp", compress=NIVEL_COMPRESION)
+    os.replace(f"{ruta_modelo}.tmp", ruta_modelo)
+
+    metadatos = dict(metadatos)
+    metadatos.setdefault("fecha_guardado", datetime.now().isoformat(timespec="seconds"))
+    metadatos["tamanio_bytes"] = os.path.getsize(ruta_modelo)
+    _escribir_json(os.path.join(carpeta, ARCHIVO_METADATOS), metadatos)
+
+    # Un modelo fijado manualmente (rollback) no se reemplaza automáticamente
+    activo = modelo_activo(directorio)
+    if activar and not (activo and activo.get("fijado")):
+        activar_modelo(id_modelo, fijar=False, directorio=directorio)
+    return id_modelo
+
+
+def guardar_artefacto(id_modelo: str, nombre: str, objeto: Any, directorio: str = MODELOS_DIR) -> str:
+    """Guarda un artefacto derivado del modelo en su carpeta (joblib comprimido); devuelve la ruta."""
+    carpeta = _ruta(id_modelo, directorio=directorio)
+    os.makedirs(carpeta, exist_ok=True)
+    ruta = os.path.join(carpeta, nombre)
+    joblib.dump(objeto, f"{ruta}.tmp", compress=NIVEL_COMPRESION)
+    os.replace(f"{ruta}.tmp", ruta)
+    return ruta
+
+
+def cargar_artefacto(id_modelo: str, nombre: str, directorio: str = MODELOS_DIR) -> Optional[Any]:
+    """Carga un artefacto del modelo, o None si no existe."""
+    ruta = _ruta(id_modelo, nombre, directorio)
+    if not os.path.exists(ruta):
+        return None
+    return joblib.load(ruta)
+
+
+def enlazar_artefacto(id_origen: str, id_destino: str, nombre: str, directorio: str = MODELOS_DIR) -> str:
+    """
+    Reutiliza un artefacto de otro modelo sin reescribirlo (enlace duro, o copia si el
+    sistema de archivos no lo permite); devuelve la ruta en la carpeta de destino.
+    """
+    origen = _ruta(id_origen, nombre, directorio)
+    destino = _ruta(id_destino, nombre, directorio)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    if os.path.exists(destino):
+        os.remove(destino)
+    try:
+        os.link(origen, destino)
+    except OSError:
+        shutil.copy2(origen, destino)
+    return destino
+
+
+def existe_modelo(id_modelo: str, directorio: str = MODELOS_DIR) -> bool:
+    return os.path.exists(_ruta(id_modelo, ARCHIVO_MODELO, directorio)) and \
+        os.path.exists(_ruta(id_modelo, ARCHIVO_METADATOS, directorio))
+
+
+def leer_metadatos(id_modelo: str, directorio: str = MODELOS_DIR) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_ruta(id_modelo, ARCHIVO_METADATOS, directorio), encoding="utf-8") as archivo:
+            return json.load(archivo)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def cargar_modelo(id_modelo: str, directorio: str = MODELOS_DIR) -> Tuple[Any, Dict[str, Any]]:
+    """Carga (modelo, metadatos). Lanza FileNotFoundError si no existe."""
+    if not existe_modelo(id_modelo, directorio):
+        raise FileNotFoundError(f"No existe el modelo {id_modelo} en {directorio}")
+    modelo = joblib.load(_ruta(id_modelo, ARCHIVO_MODELO, directorio))
+    return modelo, leer_metadatos(id_modelo, directorio)
+
+
+def listar_modelos(directorio: str = MODELOS_DIR) -> List[Dict[str, Any]]:
+    """Metadatos de todos los modelos guardados, del más reciente al más antiguo."""
+    if not os.path.isdir(directorio):
+        return []
+    modelos = []
+    for nombre in os.listdir(directorio):
+        if existe_modelo(nombre, directorio):
+            metadatos = leer_metadatos(nombre, directorio)
+            if metadatos:
+                modelos.append(metadatos)
+    return sorted(modelos, key=lambda m: m.get("fecha_entrenamiento", ""), reverse=True)
+
+
+def modelo_activo(directorio: str = MODELOS_DIR) -> Optional[Dict[str, Any]]:
+    """Contenido de activo.json: {'id': ..., 'fijado': bool} o None."""
+    try:
+        with open(os.path.join(directorio, ARCHIVO_ACTIVO), encoding="utf-8") as archivo:
+            activo = json.load(archivo)
+    except (OSError, json.JSONDecodeError):
+        return None
+    return activo if existe_modelo(activo.get("id", ""), directorio) else None
+
+
+def activar_modelo(id_modelo: str, fijar: bool = True, directorio: str = MODELOS_DIR):
+    """
+    Marca un modelo como activo.
+    - fijar=True (rollback): se sirve este modelo aunque cambien los datos, hasta liberarlo
+    - fijar=False: el registro puede reemplazarlo cuando se entrene uno nuevo
+    """
+    if not existe_modelo(id_modelo, directorio):
+        raise FileNotFoundError(f"No existe el modelo {id_modelo} en {directorio}")
+    os.makedirs(directorio, exist_ok=True)
+    _escribir_json(os.path.join(directorio, ARCHIVO_ACTIVO), {"id": id_modelo, "fijado": fijar})
+
+
+def liberar_modelo(directorio: str = MODELOS_DIR):
+    """Quita la fijación: vuelve a servirse el modelo que corresponde a los datos actuales."""
+    activo = modelo_activo(directorio)
+    if activo:
+        activar_modelo(activo["id"], fijar=False, directorio=directorio)
+
+
+def eliminar_modelo(id_modelo: str, directorio: str = MODELOS_DIR):
+    """Borra un modelo del registro (no se permite borrar el activo)."""
+    activo = modelo_activo(directorio)
+    if activo and activo["id"] == id_modelo:
+        raise ValueError("No se puede eliminar el modelo activo")
+    shutil.rmtree(_ruta(id_modelo, directorio=directorio), ignore_errors=True)
@@ -1,50 +1,23 @@
 ﻿"""
 Funciones para gestionar el registro de nuevos incidentes viales.
 Se enfoca en la interfaz de Streamlit para la entrada de datos
-y la lógica para añadir el nuevo registro al archivo MUERTES_VIALES.csv.
+y la lógica para añadir el nuevo registro a MUERTES_VIALES.csv (a través de su diario de altas).
 """
 import streamlit as st
-import pandas as pd
 import os
 from datetime import datetime
-import uuid
 import numpy as np
 from app.utils import coordenadas_provincias # <--- IMPORTACIÓN AÑADIDA
-from typing import Union
+from app.cambios import registrar_altas
+from app.indice_opciones import obtener_indice_opciones
+from app.secuencia_ids import siguiente_id
 
 # Ruta del archivo CSV de datos. Asume que el archivo está en la carpeta 'data' al mismo nivel que 'app'.
 DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'MUERTES_VIALES.csv')
-DELIMITER = ';' # El CSV usa punto y coma como delimitador
 
-def cargar_datos_registro(path: str = DATA_PATH) -> Union[pd.DataFrame, None]:
-    """Intenta cargar el DataFrame para obtener los valores únicos de los selectores."""
-    if not os.path.exists(path): # Si no existe el archivo, no se puede cargar
-        st.warning(f"Archivo de datos no encontrado en: {path}. El formulario usará opciones por defecto.")
-        # Retorna un DataFrame vacío con las columnas esperadas
-        return pd.DataFrame(columns=[
-            'provincia_nombre', 'tipo_lugar', 'victima_sexo', 
-            'victima_vehiculo', 'inculpado_vehiculo', 'modo_produccion_hecho'
-        ])
-    try:
-        # Importante: Usar el delimitador correcto (punto y coma)
-        df = pd.read_csv(path, sep=DELIMITER)
-        return df
-    except Exception as e:
-        st.error(f"Error al leer el CSV de registro ({path}): {e}")
-        return None
-
-def obtener_siguiente_id(df: pd.DataFrame) -> int:
-    """Genera un nuevo ID basado en el máximo existente o un UUID."""
-    try:
-        # Intentamos encontrar el ID numérico más alto y sumarle 1
-        max_id = df['id_hecho'].astype(str).str.extract(r'(\d+)', expand=False).astype(float).max()
-        if pd.isna(max_id):
-            return 100000 # Comenzamos desde un número alto si no hay IDs numéricos
-        return int(max_id) + 1
-    except:
-        # Si el ID no es numérico o hay error, usamos un UUID aleatorio (como fallback)
-        st.warning("No se pudo generar un ID numérico secuencial. Usando UUID.")
-        return str(uuid.uuid4())
+def obtener_siguiente_id(path: str = DATA_PATH) -> int:
+    """Reserva el próximo id_hecho de la secuencia persistente (ver app.secuencia_ids)."""
+    return siguiente_id(path)
 
 
 def mostrar_formulario_registro():
@@ -53,20 +26,12 @@ def mostrar_formulario_registro():
     Usa st.form para agrupar los campos y un botón de envío.
     """
     
-    # Cargar datos para obtener las opciones únicas
-    df_base = cargar_datos_registro() 
-    if df_base is None:
-        return
-        
-    # --- Opciones Normalizadas (limpieza y ordenamiento) ---
+    # Opciones únicas y encabezado del CSV desde el índice persistido (sin leer el archivo)
+    indice_opciones = obtener_indice_opciones()
+
+    # --- Opciones Normalizadas (limpieza y ordenamiento, ver app.indice_opciones) ---
     def get_options(col_name, default_list):
-        if col_name in df_base.columns:
-            # Reemplazar valores NaN por "Desconocido" y obtener únicos
-            options = df_base[col_name].fillna("Desconocido").astype(str).unique().tolist()
-            # Opcionalmente, agregar una limpieza de espacios y capitalización
-            options = sorted([o.strip().title() for o in options if o.strip() not in ('', 'nan')])
-            return ["Seleccione..."] + options
-        return ["Seleccione..."] + default_list
+        return ["Seleccione..."] + indice_opciones.opciones_de(col_name, default_list)
 
     # Mapeo de nombres largos a las claves de coordenadas (ej: 'Ciudad Autónoma de Buenos Aires' -> 'CABA')
     PROVINCIA_COORD_MAP = {
@@ -132,8 +97,14 @@ def mostrar_formulario_registro():
             with col1:
                 st.markdown("<p style='visibility: hidden;'>placeholder</p>", unsafe_allow_html=True) # Alineación
                 fecha_incidente = st.date_input("🗓️ Fecha del Hecho", datetime.now().date(), key="fecha_hecho")
+                hora_incidente = st.time_input("🕒 Hora del Hecho (opcional)", value=None, key="hora_hecho")
                 st.text_input("🌎 Provincia Seleccionada", provincia_seleccionada, disabled=True)
                 localidad = st.text_input("🏙️ Localidad/Municipio", key="localidad_nombre")
+                calle = st.text_input(
+                    "🛣️ Calle (opcional)",
+                    key="calle_nombre",
+                    help="Con calle y hora, el registro se incorpora al modelo de predicción sin reentrenarlo."
+                )
                 
                 
             # Columna 2: Geo y Tipo de Lugar
@@ -190,7 +161,7 @@ def mostrar_formulario_registro():
                 return
 
             # 1. Crear el nuevo registro con los campos mínimos requeridos
-            nuevo_id = obtener_siguiente_id(df_base)
+            nuevo_id = obtener_siguiente_id()
             
             nuevo_registro = {
                 # Campos obligatorios del CSV
@@ -217,8 +188,8 @@ def mostrar_formulario_registro():
                 'departamento_id': np.nan,
                 'departamento_nombre': np.nan,
                 'localidad_id': np.nan,
-                'hora_hecho': np.nan,
-                'calle_nombre': np.nan,
+                'hora_hecho': hora_incidente.strftime('%H:%M:%S') if hora_incidente else np.nan,
+                'calle_nombre': calle.strip() or np.nan,
                 'calle_altura': np.nan,
                 'calle_interseccion': np.nan,
                 'calle_interseccion_nombre': np.nan,
@@ -244,32 +215,19 @@ def mostrar_formulario_registro():
             }
             
             # Asegurar que el diccionario tenga todas las 44 columnas del CSV original
-            columnas_csv = df_base.columns.tolist()
+            columnas_csv = indice_opciones.columnas or list(nuevo_registro)
             registro_final = {col: nuevo_registro.get(col, np.nan) for col in columnas_csv}
 
 
-            # 2. Crear el DataFrame de un solo registro y guardar
+            # 2. Guardar el registro en el diario de altas (bloqueo, fsync y commit en grupo; ver app.diario)
+            #    y propagarlo a los datos en memoria de todas las sesiones (ver app.cambios)
             try:
-                nuevo_df = pd.DataFrame([registro_final])
-                
-                # Guardar en el CSV, modo 'a' (append) y sin escribir el encabezado si el archivo ya existe.
-                # Usar el delimitador punto y coma (';')
-                nuevo_df.to_csv(
-                    DATA_PATH, 
-                    mode='a', 
-                    index=False, 
-                    header=False, # Nunca escribir encabezado al añadir
-                    sep=DELIMITER 
-                )
-                
-                st.success(f"✅ ¡Registro #{nuevo_id} guardado con éxito en el archivo CSV!")
+                registrar_altas([registro_final], DATA_PATH)
+                st.success(f"✅ ¡Registro #{nuevo_id} guardado con éxito!")
                 st.balloons()
                 
-                # Opcionalmente, forzar una recarga de datos en Streamlit para ver el cambio
-                st.session_state["data_reloaded"] = True
-                
             except Exception as e:
-                st.error(f"❌ Error al guardar el registro en el CSV: {e}")
+                st.error(f"❌ Error al guardar el registro: {e}")
 
 # Ejecución de la función
 if __name__ == "__main__":
@@ -0,0 +1,64 @@
+"""
+Secuencia persistente de id_hecho.
+El próximo id libre se guarda en un archivo al lado del CSV (data/MUERTES_VIALES_secuencia.txt):
+- se inicializa una sola vez desde el máximo id numérico del CSV y de su diario de altas
+- reservar uno o un rango de ids es O(1): leer, sumar y reemplazar el archivo bajo un bloqueo
+  exclusivo, así sesiones y procesos concurrentes nunca reciben el mismo id
+- cada reserva se escribe con fsync y os.replace: un corte nunca deja el contador a medias
+"""
+
+import os
+import pandas as pd
+from app.bloqueo_archivos import bloqueo_exclusivo
+from app.data_loader import DATA_PATH
+from app.diario import bloqueo_diario, filas_diario
+
+ID_INICIAL = 100000  # primer id si el CSV no tiene ids numéricos
+SEPARADOR_CSV = ';'
+
+
+def ruta_secuencia(path: str = DATA_PATH) -> str:
+    return f"{os.path.splitext(path)[0]}_secuencia.txt"
+
+
+def _maximo_id(path: str) -> int:
+    """Máximo id numérico del CSV (solo se lee la columna id_hecho) y del diario; -1 si no hay."""
+    ids = pd.Series(dtype=str)
+    with bloqueo_diario(path):
+        if os.path.exists(path):
+            ids = pd.read_csv(path, sep=SEPARADOR_CSV, usecols=['id_hecho'], dtype=str)['id_hecho']
+        diario = filas_diario(path)
+    if 'id_hecho' in diario.columns:
+        ids = pd.concat([ids, diario['id_hecho'].astype(str)], ignore_index=True)
+    numeros = pd.to_numeric(ids.str.extract(r'(\d+)', expand=False), errors='coerce')
+    maximo = numeros.max()
+    return -1 if pd.isna(maximo) else int(maximo)
+
+
+def _escribir(ruta: str, valor: int):
+    with open(f"{ruta}.tmp", "w", encoding="utf-8") as archivo:
+        archivo.write(str(valor))
+        archivo.flush()
+        os.fsync(archivo.fileno())
+    os.replace(f"{ruta}.tmp", ruta)
+
+
+def reservar_ids(cantidad: int = 1, path: str = DATA_PATH) -> range:
+    """Reserva `cantidad` ids consecutivos y devuelve su rango."""
+    if cantidad < 1:
+        raise ValueError("La cantidad de ids a reservar debe ser al menos 1")
+    ruta = ruta_secuencia(path)
+    with bloqueo_exclusivo(f"{ruta}.lock"):
+        try:
+            with open(ruta, encoding="utf-8") as archivo:
+                siguiente = int(archivo.read().strip())
+        except (OSError, ValueError):
+            maximo = _maximo_id(path)
+            siguiente = maximo + 1 if maximo >= 0 else ID_INICIAL
+        _escribir(ruta, siguiente + cantidad)
+    return range(siguiente, siguiente + cantidad)
+
+
+def siguiente_id(path: str = DATA_PATH) -> int:
+    """Reserva y devuelve un único id."""
+    return reservar_ids(1, path)[0]
@@ -0,0 +1,147 @@
+"""
+Tabla de predicciones precalculada sobre todo el espacio de entrada del modelo de calles.
+Las features son categóricas y discretas (provincia x mes x zona horaria x día x tipo de lugar),
+así que tras cada entrenamiento se predicen todas las combinaciones en lotes y se guardan
+solo las K calles más probables de cada una. Una predicción pasa a ser una búsqueda O(1).
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+TOP_K = 10
+TAM_LOTE = 8192
+NOMBRE_ARTEFACTO = "tabla_predicciones.joblib"
+
+
+class TablaPredicciones:
+    """
+    Top-K por combinación de features, en arrays contiguos:
+    - indices: (n_combinaciones, K) int32 con la posición de la calle en clases
+    - probabilidades: (n_combinaciones, K) float32, de mayor a menor
+    La fila de una combinación se obtiene en base mixta a partir del código de cada valor.
+    """
+
+    def __init__(self, features: List[str], valores: List[List[Any]], clases: Sequence[str],
+                 indices: np.ndarray, probabilidades: np.ndarray):
+        self.features = list(features)
+        self.valores = [list(v) for v in valores]
+        self.clases = np.asarray(clases, dtype=object)
+        self.indices = indices
+        self.probabilidades = probabilidades
+        self._codigos = [{v: i for i, v in enumerate(vals)} for vals in self.valores]
+        tamanios = [len(v) for v in self.valores]
+        # Paso de cada feature en la numeración mixta (la última varía más rápido)
+        self._pasos = np.cumprod([1] + tamanios[:0:-1])[::-1].astype(np.int64)
+
+    @property
+    def n_combinaciones(self) -> int:
+        return len(self.indices)
+
+    @property
+    def k(self) -> int:
+        return self.indices.shape[1]
+
+    def fila(self, **valores) -> Optional[int]:
+        """Fila de la combinación, o None si algún valor no existe en la tabla."""
+        fila = 0
+        for feature, codigos, paso in zip(self.features, self._codigos, self._pasos):
+            codigo = codigos.get(valores[feature])
+            if codigo is None:
+                return None
+            fila += codigo * int(paso)
+        return fila
+
+    def consultar(self, k: int = 5, **valores) -> Optional[pd.DataFrame]:
+        """Las k calles más probables para una combinación (columnas Calle y Probabilidad)."""
+        fila = self.fila(**valores)
+        if fila is None:
+            return None
+        k = min(k, self.k)
+        return pd.DataFrame({
+            'Calle': self.clases[self.indices[fila, :k]],
+            'Probabilidad': self.probabilidades[fila, :k].astype(float),
+        })
+
+    def filas(self, **filtros) -> np.ndarray:
+        """Filas de todas las combinaciones que cumplen los filtros (feature -> lista de valores)."""
+        ejes = []
+        for feature, vals, codigos in zip(self.features, self.valores, self._codigos):
+            elegidos = filtros.get(feature)
+            if elegidos:
+                ejes.append(np.array([codigos[v] for v in elegidos if v in codigos], dtype=np.int64))
+            else:
+                ejes.append(np.arange(len(vals), dtype=np.int64))
+        filas = np.zeros(1, dtype=np.int64)
+        for eje, paso in zip(ejes, self._pasos):
+            filas = (filas[:, None] + eje[None, :] * paso).ravel()
+        return filas
+
+    def ranking(self, n: int = 20, **filtros) -> pd.DataFrame:
+        """
+        Calles de mayor riesgo sobre las combinaciones filtradas: probabilidad media
+        (cada combinación pesa igual; fuera del top-K se cuenta 0) y veces en el top-1.
+        """
+        filas = self.filas(**filtros)
+        if len(filas) == 0:
+            return pd.DataFrame(columns=['Calle', 'Probabilidad media', 'Veces más probable'])
+        indices = self.indices[filas]
+        suma = np.bincount(indices.ravel(), weights=self.probabilidades[filas].ravel(), minlength=len(self.clases))
+        primeras = np.bincount(indices[:, 0], minlength=len(self.clases))
+        mejores = np.argsort(-suma, kind='stable')[:n]
+        mejores = mejores[suma[mejores] > 0]
+        return pd.DataFrame({
+            'Calle': self.clases[mejores],
+            'Probabilidad media': suma[mejores] / len(filas),
+            'Veces más probable': primeras[mejores],
+        })
+
+
+def valores_del_modelo(pipeline) -> Dict[str, List[Any]]:
+    """Valores de cada feature que conoce el OneHotEncoder del pipeline (su espacio de entrada)."""
+    if hasattr(pipeline, 'valores_features'):
+        return pipeline.valores_features()
+    transformador = pipeline.named_steps['preprocessor']
+    for _, codificador, columnas in transformador.transformers_:
+        if hasattr(codificador, 'categories_'):
+            return {c: list(cats) for c, cats in zip(columnas, codificador.categories_)}
+    raise ValueError("El pipeline no tiene un codificador categórico ajustado")
+
+
+def construir_tabla(
+    pipeline,
+    k: int = TOP_K,
+    tam_lote: int = TAM_LOTE,
+    progreso: Optional[Callable[[float], None]] = None
+) -> TablaPredicciones:
+    """
+    Predice todas las combinaciones de features en lotes de tam_lote filas
+    y guarda las k calles más probables de cada una.
+    """
+    espacio = valores_del_modelo(pipeline)
+    features = list(espacio)
+    valores = [espacio[f] for f in features]
+    clases = pipeline.classes_
+    k = min(k, len(clases))
+
+    n = int(np.prod([len(v) for v in valores]))
+    indices = np.empty((n, k), dtype=np.int32)
+    probabilidades = np.empty((n, k), dtype=np.float32)
+
+    tamanios = [len(v) for v in valores]
+    for inicio in range(0, n, tam_lote):
+        filas = np.arange(inicio, min(inicio + tam_lote, n))
+        # Decodifica la numeración mixta en el código de cada feature
+        codigos = np.unravel_index(filas, tamanios)
+        lote = pd.DataFrame({f: np.asarray(v, dtype=object)[c] for f, v, c in zip(features, valores, codigos)})
+
+        proba = pipeline.predict_proba(lote)
+        top = np.argpartition(-proba, k - 1, axis=1)[:, :k]
+        top_proba = np.take_along_axis(proba, top, axis=1)
+        orden = np.argsort(-top_proba, axis=1, kind='stable')
+        indices[filas] = np.take_along_axis(top, orden, axis=1)
+        probabilidades[filas] = np.take_along_axis(top_proba, orden, axis=1)
+        if progreso:
+            progreso(filas[-1] / max(n - 1, 1))
+
+    return TablaPredicciones(features, valores, [str(c) for c in clases], indices, probabilidades)
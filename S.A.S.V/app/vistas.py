@@ -0,0 +1,51 @@
+"""
+Vistas del menú principal, importadas recién cuando se abren.
+Cada opción apunta al módulo y la función que la dibujan: el módulo, y con él sus dependencias
+pesadas (scikit-learn, scipy, folium, plotly.express), se importa la primera vez que se elige
+la opción y no al arrancar la app. benchmarks/tiempos_importacion.py mide el costo de cada una.
+"""
+
+import sys
+import importlib
+import pandas as pd
+import streamlit as st
+from typing import Callable, Dict, Tuple
+from app.instrumentacion import tramo
+
+# Opción del menú -> (módulo, función, argumentos que recibe: "df" y/o "unidad")
+VISTAS: Dict[str, Tuple[str, str, Tuple[str, ...]]] = {
+    "🗺️ Mapa Interactivo": ("app.mapa", "mostrar_mapa_interactivo", ("df", "unidad")),
+    "🔥 Mapa de Calor": ("app.mapa", "crear_mapa_de_calor", ("df", "unidad")),
+    "📊 Estadísticas por Provincia": ("app.estadisticas", "mostrar_estadisticas_provincia", ("df", "unidad")),
+    "📈 Análisis Comparativo": ("app.comparativo", "mostrar_analisis_comparativo", ("df", "unidad")),
+    "🔍 Explorador de Datos": ("app.explorador", "mostrar_explorador_datos", ("df",)),
+    "🕒 Patrones Temporales": ("app.patrones_temporales", "mostrar_patrones_temporales", ("df", "unidad")),
+    "🛣️ Análisis por Tipo de Lugar": ("app.graficos", "crear_graficos_tipo_lugar", ("df", "unidad")),
+    "🚗 Vehículo de la Víctima": ("app.graficos", "crear_graficos_victima_vehiculo", ("df", "unidad")),
+    "🚙 Vehículo del Inculpado": ("app.graficos", "crear_graficos_inculpado_vehiculo", ("df", "unidad")),
+    "🚨 Modo de Producción del Hecho": ("app.graficos", "crear_graficos_modo_produccion_hecho", ("df", "unidad")),
+    "➕ Registrar nuevo incidente": ("app.registro_nuevo_incidente", "mostrar_formulario_registro", ()),
+    "📥 Importación Masiva": ("app.importacion_masiva", "mostrar_importacion_masiva", ("df",)),
+    "🔮 Módulo de Predicción": ("app.prediccion_ml", "mostrar_interfaz_prediccion", ("df",)),
+    "⚠️ Calles de Mayor Riesgo": ("app.prediccion_ml", "mostrar_ranking_calles", ("df",)),
+    "🔎 Buscar Calle": ("app.buscador_calles", "mostrar_buscador_calles", ("df",)),
+    "🧪 Calidad del Modelo": ("app.barrido_modelos", "mostrar_calidad_modelo", ("df",)),
+}
+
+
+def cargar_vista(opcion: str) -> Callable:
+    """Función que dibuja la opción; importa su módulo si todavía no se importó en el proceso."""
+    modulo, funcion, _ = VISTAS[opcion]
+    if modulo not in sys.modules:
+        with st.spinner("⏳ Cargando la vista por primera vez..."), tramo(f"import {modulo}"):
+            importlib.import_module(modulo)
+    return getattr(sys.modules[modulo], funcion)
+
+
+def mostrar_vista(opcion: str, df: pd.DataFrame, unidad: str):
+    """Dibuja la opción del menú con los argumentos que su función recibe."""
+    _, _, argumentos = VISTAS[opcion]
+    valores = {"df": df, "unidad": unidad}
+    funcion = cargar_vista(opcion)
+    with tramo(f"vista: {funcion.__name__}", len(df)):
+        funcion(*(valores[argumento] for argumento in argumentos))
@@ -0,0 +1,199 @@
+"""
+Prueba de carga del diario de altas (app.diario) frente a la escritura directa al CSV.
+Varios escritores concurrentes (hilos, como las sesiones de Streamlit, y opcionalmente procesos)
+guardan altas de una fila. Estrategias comparadas:
+- csv_directo: to_csv(mode='a') sin bloqueo por alta, como hacía el formulario
+- csv_bloqueo_fsync: to_csv bajo bloqueo exclusivo + fsync por alta (durable, sin agrupar)
+- diario: DiarioIncidentes (bloqueo, fsync y commit en grupo) y una compactación final
+Para cada una se mide el throughput y se verifica el CSV resultante: filas parseables con
+todas sus columnas, sin ids perdidos ni duplicados. Además se prueba la recuperación: cola
+rota en el diario y compactación interrumpida.
+
+Uso (desde S.A.S.V/):
+    python benchmarks/carga_diario.py [--escritores 32] [--altas 50] [--procesos 4]
+Los resultados se imprimen y se guardan en benchmarks/resultados/carga_diario.json.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+import pandas as pd
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.bloqueo_archivos import bloqueo_exclusivo
+from app.data_loader import DATA_PATH
+from app.diario import DiarioIncidentes, _ruta_bloqueo, _ruta_marca, codificar, compactar, recuperar, ruta_diario
+
+RESULTADOS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resultados")
+SEPARADOR_CSV = ';'
+
+
+def _columnas() -> list:
+    return pd.read_csv(DATA_PATH, sep=SEPARADOR_CSV, nrows=0).columns.tolist()
+
+
+def _fila(columnas: list, id_hecho: int) -> dict:
+    """Alta sintética con textos que incluyen el separador entre comillas y caracteres no ASCII."""
+    fila = {columna: None for columna in columnas}
+    fila.update({
+        'id_hecho': id_hecho, 'provincia_nombre': 'Córdoba', 'localidad_nombre': f'Río Cuarto; barrio {id_hecho}',
+        'anio': 2024, 'mes': 5, 'fecha_hecho': '17/05/2024', 'latitud': -33.12, 'longitud': -64.35,
+        'victima_tr_edad': 34, 'tipo_lugar': 'Calle', 'calle_nombre': 'Av. Sabattini',
+    })
+    return fila
+
+
+def _nuevo_csv(directorio: str, columnas: list) -> str:
+    path = os.path.join(directorio, "MUERTES_VIALES.csv")
+    pd.DataFrame(columns=columnas).to_csv(path, index=False, sep=SEPARADOR_CSV)
+    return path
+
+
+def _alta_csv_directo(path: str, columnas: list, id_hecho: int):
+    pd.DataFrame([_fila(columnas, id_hecho)]).to_csv(path, mode='a', index=False, header=False, sep=SEPARADOR_CSV)
+
+
+def _alta_csv_bloqueo_fsync(path: str, columnas: list, id_hecho: int):
+    with bloqueo_exclusivo(f"{path}.lock"):
+        with open(path, "a", encoding="utf-8", newline="") as archivo:
+            pd.DataFrame([_fila(columnas, id_hecho)]).to_csv(archivo, index=False, header=False, sep=SEPARADOR_CSV)
+            archivo.flush()
+            os.fsync(archivo.fileno())
+
+
+def _escritor_proceso(estrategia: str, path: str, columnas: list, ids: list, hilos: int) -> float:
+    """Un proceso con `hilos` escritores; devuelve los segundos que tardó."""
+    diario = DiarioIncidentes(path) if estrategia == 'diario' else None
+    escribir = {
+        'csv_directo': lambda i: _alta_csv_directo(path, columnas, i),
+        'csv_bloqueo_fsync': lambda i: _alta_csv_bloqueo_fsync(path, columnas, i),
+        'diario': lambda i: diario.agregar([_fila(columnas, i)]),
+    }[estrategia]
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        list(pool.map(escribir, ids))
+    return time.perf_counter() - inicio
+
+
+def verificar(path: str, columnas: list, esperados: int) -> dict:
+    """Parsea el CSV línea por línea con el lector de pandas y cuenta problemas."""
+    try:
+        datos = pd.read_csv(path, sep=SEPARADOR_CSV, dtype=str, on_bad_lines='skip', engine='python')
+        mal_formadas = sum(1 for _ in open(path, encoding="utf-8", errors="replace")) - 1 - len(datos)
+    except Exception as e:
+        return {'error': str(e), 'corrupto': True}
+    ids = pd.to_numeric(datos['id_hecho'], errors='coerce')
+    distintos = int(ids.dropna().nunique())
+    perdidos = esperados - distintos
+    duplicados = int(ids.dropna().duplicated().sum())
+    sin_provincia = int((datos['provincia_nombre'] != 'Córdoba').sum())
+    return {
+        'filas': len(datos),
+        'lineas_mal_formadas': int(mal_formadas),
+        'ids_perdidos': int(perdidos),
+        'ids_duplicados': duplicados,
+        'filas_alteradas': sin_provincia,
+        'corrupto': bool(mal_formadas or perdidos or duplicados or sin_provincia),
+    }
+
+
+def medir(estrategia: str, escritores: int, altas: int, procesos: int, columnas: list) -> dict:
+    directorio = tempfile.mkdtemp(prefix="carga_diario_")
+    try:
+        path = _nuevo_csv(directorio, columnas)
+        total = escritores * altas
+        ids = list(range(1, total + 1))
+        hilos = max(escritores // procesos, 1)
+        lotes = [ids[i::procesos] for i in range(procesos)]
+        # Se cronometra dentro de cada proceso (sin el arranque de los procesos); cuenta el más lento
+        if procesos == 1:
+            segundos = _escritor_proceso(estrategia, path, columnas, ids, hilos)
+        else:
+            with ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context("spawn")) as pool:
+                segundos = max(pool.map(_escritor_proceso, [estrategia] * procesos, [path] * procesos,
+                                        [columnas] * procesos, lotes, [hilos] * procesos))
+        compactadas = compactar(path) if estrategia == 'diario' else 0
+        return {
+            'estrategia': estrategia,
+            'escritores': escritores,
+            'procesos': procesos,
+            'altas': total,
+            'segundos': segundos,
+            'altas_por_segundo': total / segundos,
+            'filas_compactadas': compactadas,
+            **verificar(path, columnas, total),
+        }
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+def probar_recuperacion(columnas: list) -> dict:
+    """Cola rota en el diario y compactación cortada después de escribir parte del CSV."""
+    directorio = tempfile.mkdtemp(prefix="recuperacion_diario_")
+    try:
+        path = _nuevo_csv(directorio, columnas)
+        diario = DiarioIncidentes(path)
+        for i in range(1, 11):
+            diario.agregar([_fila(columnas, i)])
+        # Corte a mitad de escritura: media transacción al final
+        with bloqueo_exclusivo(_ruta_bloqueo(path)), open(ruta_diario(path), "ab") as archivo:
+            archivo.write(codificar([_fila(columnas, 11)])[:40])
+        pendientes = recuperar(path)
+        cola_truncada = pendientes == 10
+
+        # Compactación cortada: marca escrita y CSV con parte de las filas volcadas
+        with open(_ruta_marca(path), "w", encoding="utf-8") as archivo:
+            json.dump({'tamano_csv': os.path.getsize(path)}, archivo)
+        with open(path, "a", encoding="utf-8") as archivo:
+            archivo.write("1;Córdoba;parcial")
+        recuperar(path)
+        resultado = verificar(path, columnas, 10)
+        return {'cola_truncada': cola_truncada, 'compactacion_rehecha': not resultado['corrupto'], **resultado}
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--escritores", type=int, default=32, help="escritores concurrentes (hilos en total)")
+    parser.add_argument("--altas", type=int, default=50, help="altas por escritor")
+    parser.add_argument("--procesos", type=int, default=4, help="procesos para la corrida multiproceso")
+    args = parser.parse_args()
+
+    columnas = _columnas()
+    resultados = [
+        medir(estrategia, args.escritores, args.altas, procesos, columnas)
+        for procesos in sorted({1, args.procesos})
+        for estrategia in ('csv_directo', 'csv_bloqueo_fsync', 'diario')
+    ]
+    recuperacion = probar_recuperacion(columnas)
+
+    print(f"{'Estrategia':<20}{'Procesos':>9}{'Altas':>8}{'Altas/s':>10}{'Mal formadas':>14}{'Perdidos':>10}{'Duplicados':>12}")
+    for r in resultados:
+        print(f"{r['estrategia']:<20}{r['procesos']:>9}{r['altas']:>8}{r['altas_por_segundo']:>10.0f}"
+              f"{r.get('lineas_mal_formadas', '-'):>14}{r.get('ids_perdidos', '-'):>10}{r.get('ids_duplicados', '-'):>12}")
+    print(f"\nRecuperación: cola truncada {recuperacion['cola_truncada']}, compactación rehecha {recuperacion['compactacion_rehecha']}")
+
+    os.makedirs(RESULTADOS_DIR, exist_ok=True)
+    ruta = os.path.join(RESULTADOS_DIR, "carga_diario.json")
+    with open(ruta, "w", encoding="utf-8") as archivo:
+        json.dump({
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'escritores': args.escritores,
+            'altas_por_escritor': args.altas,
+            'resultados': resultados,
+            'recuperacion': recuperacion,
+        }, archivo, ensure_ascii=False, indent=2, default=str)
+    print(f"\nResultados guardados en {ruta}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""
+Generador de datos sintéticos con el esquema de data/MUERTES_VIALES.csv (mismas columnas y
+separador ';'), para probar y medir la app a escala sin el CSV real.
+- una fila por víctima; los incidentes (id_hecho) tienen 1 o más víctimas y comparten los datos del hecho
+- provincias, tipos de lugar, modos de producción y vehículos con proporciones realistas
+- fechas con estacionalidad (más hechos en verano y fines de semana) y horas con picos nocturnos
+- suciedad como la del archivo real: edades "menos de 1", "20-24", "SD" o vacías; fechas en ISO
+  y dd/mm/YYYY; horas "HH:MM:SS" y "HH:MM"; coordenadas faltantes; nombres de calle con
+  variantes ("Av. Rivadavia", "AVENIDA RIVADAVIA", "rivadavia"), espacios, sin acentos y con typos;
+  provincia "Desconocido"
+La generación es vectorizada y por bloques (memoria acotada también para 10M de filas) y
+determinista para una semilla.
+
+Uso (desde S.A.S.V/):
+    python benchmarks/generar_datos.py [--filas 10k 1M 10M] [--semilla 0] [--salida benchmarks/datos]
+Los archivos se guardan como benchmarks/datos/sinteticos_<filas>_s<semilla>.csv.
+"""
+
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from typing import Iterator, List, Optional, Tuple
+
+DATOS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "datos")
+SEPARADOR_CSV = ';'
+FILAS_POR_BLOQUE = 500_000
+
+COLUMNAS = [
+    'id_hecho', 'provincia_nombre', 'localidad_nombre', 'anio', 'mes', 'fecha_hecho', 'latitud', 'longitud',
+    'victima_tr_edad', 'victima_sexo', 'tipo_lugar', 'modo_produccion_hecho', 'victima_vehiculo',
+    'inculpado_vehiculo', 'federal', 'tipo_persona', 'tipo_persona_id', 'provincia_id', 'departamento_id',
+    'departamento_nombre', 'localidad_id', 'hora_hecho', 'calle_nombre', 'calle_altura', 'calle_interseccion',
+    'calle_interseccion_nombre', 'semaforo_estado', 'modo_produccion_hecho_ampliada', 'modo_produccion_hecho_otro',
+    'clima_condicion', 'clima_otro', 'motivo_origen_registro', 'motivo_origen_registro_otro',
+    'victima_18_años_o_mas', 'victima_clase', 'victima_clase_otro', 'victima_vehiculo_ampliado',
+    'victima_vehiculo_otro', 'victima_identidad_genero', 'inculpado_sexo', 'inculpado_tr_edad',
+    'inculpado_18_años_o_mas', 'inculpado_vehiculo_ampliado', 'inculpado_vehiculo_otro', 'inculpado_identidad_genero',
+]
+
+# Provincia -> (código INDEC, latitud, longitud, dispersión de las coordenadas en grados, peso)
+PROVINCIAS = {
+    "Buenos Aires": ("06", -36.6769, -60.5598, 1.6, 27.0),
+    "CABA": ("02", -34.6037, -58.3816, 0.05, 4.0),
+    "Catamarca": ("10", -27.4578, -66.9084, 0.8, 1.0),
+    "Chaco": ("22", -27.0854, -60.8447, 0.9, 3.0),
+    "Chubut": ("26", -43.7925, -68.7495, 1.5, 1.5),
+    "Córdoba": ("14", -31.3995, -64.2127, 1.1, 9.0),
+    "Corrientes": ("18", -29.1723, -57.8540, 0.9, 3.0),
+    "Entre Ríos": ("30", -32.0520, -59.2016, 0.8, 3.5),
+    "Formosa": ("34", -24.9658, -59.5447, 0.8, 1.5),
+    "Jujuy": ("38", -23.3175, -65.7331, 0.6, 2.0),
+    "La Pampa": ("42", -37.1610, -65.4190, 1.0, 1.0),
+    "La Rioja": ("46", -29.8340, -67.1627, 0.9, 1.0),
+    "Mendoza": ("50", -34.6542, -68.5866, 1.0, 5.0),
+    "Misiones": ("54", -26.8687, -54.6534, 0.6, 3.0),
+    "Neuquén": ("58", -38.7454, -70.1172, 0.9, 2.0),
+    "Río Negro": ("62", -40.4026, -67.2014, 1.2, 2.0),
+    "Salta": ("66", -24.7821, -65.4239, 1.0, 4.0),
+    "San Juan": ("70", -30.8654, -68.8878, 0.8, 2.0),
+    "San Luis": ("74", -33.7431, -66.1960, 0.8, 1.5),
+    "Santa Cruz": ("78", -48.8156, -70.0152, 1.5, 0.8),
+    "Santa Fe": ("82", -31.6496, -60.7001, 1.0, 8.0),
+    "Santiago del Estero": ("86", -27.7801, -63.3644, 0.9, 3.0),
+    "Tierra del Fuego": ("94", -54.8019, -68.3030, 0.4, 0.4),
+    "Tucumán": ("90", -26.8083, -65.2282, 0.4, 4.0),
+}
+PROPORCION_DESCONOCIDO = 0.02
+LOCALIDADES_POR_PROVINCIA = 40
+DEPARTAMENTOS_POR_PROVINCIA = 12
+
+TIPOS_LUGAR = {'Ruta': 0.36, 'Calle': 0.30, 'Avenida': 0.20, 'Autopista': 0.08, 'Camino rural': 0.04, 'Otro': 0.02}
+MODOS_PRODUCCION = {'Colisión': 0.56, 'Atropello': 0.20, 'Vuelco': 0.12, 'Despiste': 0.08, 'Caída': 0.03, 'Otro': 0.01}
+VEHICULOS_VICTIMA = {'Moto': 0.42, 'Auto': 0.22, 'Peatón': 0.15, 'Camioneta': 0.07, 'Bicicleta': 0.06,
+                     'Camión': 0.03, 'Colectivo': 0.02, 'Otro': 0.01, 'SD': 0.02}
+VEHICULOS_INCULPADO = {'Auto': 0.34, 'Camioneta': 0.16, 'Camión': 0.15, 'Moto': 0.13, 'Colectivo': 0.05,
+                       'Sin inculpado': 0.08, 'Otro': 0.03, 'SD': 0.06}
+SEXOS = {'Masculino': 0.75, 'Femenino': 0.22, 'SD': 0.03}
+CLIMAS = {'Bueno': 0.62, 'Lluvia': 0.09, 'Nublado': 0.08, 'Niebla': 0.02, '': 0.19}
+ANIOS = (2017, 2023)
+# Peso relativo de cada mes (verano y fiestas) y de cada hora del día
+PESOS_MES = np.array([1.15, 1.05, 1.0, 0.95, 0.9, 0.9, 0.95, 0.9, 0.95, 1.0, 1.05, 1.2])
+PESOS_HORA = np.array([5, 5, 4, 4, 4, 5, 6, 7, 6, 5, 5, 5, 6, 6, 6, 6, 7, 7, 8, 8, 8, 7, 6, 6], dtype=float)
+PESOS_DIA_SEMANA = np.array([0.9, 0.85, 0.85, 0.9, 1.05, 1.2, 1.25])  # lunes a domingo
+
+# Calles: nombres de todo el país más rutas y calles numeradas
+CALLES_COMUNES = [
+    'San Martín', 'Belgrano', 'Rivadavia', 'Sarmiento', 'Mitre', 'Urquiza', 'Alem', 'Moreno', '9 de Julio',
+    '25 de Mayo', 'Independencia', 'Colón', 'Pellegrini', 'Roca', 'Hipólito Yrigoyen', 'Alsina', 'Güemes',
+    'Lavalle', 'Perón', 'Maipú', 'Italia', 'España', 'Tucumán', 'Corrientes', 'Entre Ríos', 'Libertad',
+    'General Paz', 'Juan B. Justo', 'Córdoba', 'Brown', 'Las Heras', 'Dorrego', 'Laprida', 'Pueyrredón',
+]
+RUTAS = [f'Ruta Nacional {n}' for n in (2, 3, 5, 7, 8, 9, 14, 12, 22, 33, 34, 40, 151)] + \
+        [f'Ruta Provincial {n}' for n in (1, 6, 11, 36, 51, 63)]
+CALLES_NUMERADAS = [f'Calle {n}' for n in range(1, 201)]
+PROPORCION_CALLE_VACIA = 0.04
+PROPORCION_SIN_COORDENADAS = 0.06
+PROPORCION_SIN_LATITUD = 0.03
+
+
+def leer_cantidad(texto: str) -> int:
+    """'10k' -> 10000, '1M' -> 1000000, '2500' -> 2500."""
+    texto = texto.strip().lower().replace('_', '')
+    for sufijo, factor in (('k', 1_000), ('m', 1_000_000)):
+        if texto.endswith(sufijo):
+            return int(float(texto[:-1]) * factor)
+    return int(texto)
+
+
+def ruta_dataset(filas: int, semilla: int = 0, directorio: str = DATOS_DIR) -> str:
+    return os.path.join(directorio, f"sinteticos_{filas}_s{semilla}.csv")
+
+
+def _elegir(rng: np.random.Generator, opciones: dict, n: int) -> np.ndarray:
+    valores = np.array(list(opciones.keys()), dtype=object)
+    pesos = np.array(list(opciones.values()), dtype=float)
+    return valores[rng.choice(len(valores), size=n, p=pesos / pesos.sum())]
+
+
+def _zipf(rng: np.random.Generator, cantidad: int, n: int, exponente: float = 1.1) -> np.ndarray:
+    """Índices en [0, cantidad) con distribución de Zipf truncada (pocas calles concentran muchos hechos)."""
+    pesos = 1 / np.arange(1, cantidad + 1) ** exponente
+    return rng.choice(cantidad, size=n, p=pesos / pesos.sum())
+
+
+def _sin_acentos(texto: str) -> str:
+    return texto.translate(str.maketrans('áéíóúüÁÉÍÓÚÜ', 'aeiouuAEIOUU'))
+
+
+def _variantes_calle(nombre: str, rng: np.random.Generator) -> List[str]:
+    """Formas en que el mismo nombre aparece cargado a mano."""
+    base = nombre
+    variantes = [base, base.upper(), base.lower(), _sin_acentos(base), f"  {base} ", base.replace(' ', '  ')]
+    if not base.startswith(('Ruta', 'Calle')):
+        variantes += [f"Av. {base}", f"AVENIDA {base.upper()}", f"Avda {_sin_acentos(base)}", f"Calle {base}"]
+        if base.startswith('General '):
+            variantes.append(base.replace('General ', 'Gral. '))
+    elif base.startswith('Ruta Nacional'):
+        numero = base.split()[-1]
+        variantes += [f"RN {numero}", f"Ruta {numero}", f"ruta nac. {numero}", f"R.N. {numero}"]
+    elif base.startswith('Ruta Provincial'):
+        numero = base.split()[-1]
+        variantes += [f"RP {numero}", f"Ruta Prov. {numero}"]
+    # Un typo: dos letras vecinas intercambiadas
+    if len(base) > 5:
+        i = int(rng.integers(1, len(base) - 2))
+        variantes.append(base[:i] + base[i + 1] + base[i] + base[i + 2:])
+    return variantes
+
+
+class _Calles:
+    """Tabla de calles con sus variantes sucias, para elegir por índice sin bucles por fila."""
+
+    def __init__(self, rng: np.random.Generator):
+        nombres = CALLES_COMUNES + RUTAS + CALLES_NUMERADAS
+        self.variantes = [np.array(_variantes_calle(nombre, rng), dtype=object) for nombre in nombres]
+        self.es_ruta = np.array([nombre.startswith('Ruta') for nombre in nombres])
+
+    def elegir(self, rng: np.random.Generator, tipo_lugar: np.ndarray) -> np.ndarray:
+        n = len(tipo_lugar)
+        indices = _zipf(rng, len(self.variantes), n, exponente=0.9)
+        # En rutas y autopistas el nombre es casi siempre una ruta
+        rutas = np.flatnonzero(self.es_ruta)
+        en_ruta = np.isin(tipo_lugar, ['Ruta', 'Autopista']) & (rng.random(n) < 0.8)
+        indices[en_ruta] = rutas[_zipf(rng, len(rutas), int(en_ruta.sum()))]
+
+        resultado = np.empty(n, dtype=object)
+        # Variante limpia la mitad de las veces; el resto, cualquiera de las sucias
+        sucia = rng.random(n) < 0.5
+        for indice in np.unique(indices):
+            filas = np.flatnonzero(indices == indice)
+            variantes = self.variantes[indice]
+            elegidas = np.where(sucia[filas], rng.integers(0, len(variantes), len(filas)), 0)
+            resultado[filas] = variantes[elegidas]
+        resultado[rng.random(n) < PROPORCION_CALLE_VACIA] = ''
+        return resultado
+
+
+def _edades(rng: np.random.Generator, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Edad como texto (número, rango quinquenal, 'menos de 1', 'SD' o vacía) y la columna
+    '18 años o más' que le corresponde ('SI', 'NO' o 'SD').
+    """
+    edad = np.clip(np.round(rng.gamma(4.0, 9.0, n)), 0, 95).astype(int)
+    texto = edad.astype(str).astype(object)
+    formato = rng.random(n)
+    rango = (formato >= 0.70) & (formato < 0.85)
+    edad[rango] = edad[rango] // 5 * 5
+    texto[rango] = np.char.add(np.char.add(edad[rango].astype(str), '-'), (edad[rango] + 4).astype(str))
+    menor = ((formato >= 0.85) & (formato < 0.87)) | (edad == 0)
+    edad[menor] = 0
+    texto[menor] = 'menos de 1'
+    sin_dato = formato >= 0.87
+    texto[sin_dato] = np.where(formato[sin_dato] < 0.95, 'SD', '')
+    mayor = np.where(sin_dato, 'SD', np.where(edad >= 18, 'SI', 'NO')).astype(object)
+    return texto, mayor
+
+
+def generar_bloque(rng: np.random.Generator, filas: int, primer_id: int, calles: Optional[_Calles] = None) -> pd.DataFrame:
+    """`filas` víctimas (todas columnas de texto, en el orden de COLUMNAS) con ids desde primer_id."""
+    calles = calles or _Calles(rng)
+    # Víctimas por incidente: 1 + Poisson(0.35); se generan incidentes de más y se recorta
+    victimas = 1 + rng.poisson(0.35, size=int(filas / 1.3) + 16)
+    while victimas.sum() < filas:
+        victimas = np.concatenate([victimas, 1 + rng.poisson(0.35, size=filas // 10 + 16)])
+    victimas = victimas[:np.searchsorted(np.cumsum(victimas), filas) + 1]
+    k = len(victimas)
+
+    # --- Datos del hecho (uno por incidente) ---
+    nombres = np.array(list(PROVINCIAS) + ['Desconocido'], dtype=object)
+    pesos = np.array([p[4] for p in PROVINCIAS.values()])
+    pesos = np.append(pesos / pesos.sum() * (1 - PROPORCION_DESCONOCIDO), PROPORCION_DESCONOCIDO)
+    provincia = rng.choice(len(nombres), size=k, p=pesos)
+    datos = np.array([PROVINCIAS[p] for p in PROVINCIAS] + [("", np.nan, np.nan, 0.0, 0.0)], dtype=object)
+
+    dias = pd.date_range(f"{ANIOS[0]}-01-01", f"{ANIOS[1]}-12-31", freq='D')
+    peso_dia = PESOS_MES[dias.month - 1] * PESOS_DIA_SEMANA[dias.dayofweek]
+    fecha = dias[rng.choice(len(dias), size=k, p=peso_dia / peso_dia.sum())]
+    hora = rng.choice(24, size=k, p=PESOS_HORA / PESOS_HORA.sum())
+    minuto = rng.choice([0, 15, 30, 45], size=k)
+
+    centro_lat = datos[provincia, 1].astype(float)
+    centro_lon = datos[provincia, 2].astype(float)
+    dispersion = datos[provincia, 3].astype(float)
+    latitud = centro_lat + rng.normal(0, 1, k) * dispersion
+    longitud = centro_lon + rng.normal(0, 1, k) * dispersion
+    sin_coordenadas = rng.random(k) < PROPORCION_SIN_COORDENADAS
+    latitud[sin_coordenadas | (rng.random(k) < PROPORCION_SIN_LATITUD)] = np.nan
+    longitud[sin_coordenadas] = np.nan
+
+    localidad = _zipf(rng, LOCALIDADES_POR_PROVINCIA, k)
+    departamento = localidad % DEPARTAMENTOS_POR_PROVINCIA
+    tipo_lugar = _elegir(rng, TIPOS_LUGAR, k)
+
+    fecha_texto = fecha.strftime('%Y-%m-%d').to_numpy(dtype=object)
+    formulario = rng.random(k) < 0.05  # altas del formulario: dd/mm/YYYY
+    fecha_texto[formulario] = fecha[formulario].strftime('%d/%m/%Y').to_numpy(dtype=object)
+    hora_texto = np.char.add(np.char.add(np.char.zfill(hora.astype(str), 2), ':'), np.char.zfill(minuto.astype(str), 2)).astype(object)
+    formato_hora = rng.random(k)
+    hora_texto[formato_hora < 0.92] = hora_texto[formato_hora < 0.92] + ':00'
+    hora_texto[formato_hora >= 0.97] = np.where(rng.random(int((formato_hora >= 0.97).sum())) < 0.5, 'SD', '')
+
+    codigo_provincia = datos[provincia, 0]
+    nombre_provincia = nombres[provincia]
+    hecho = pd.DataFrame({
+        'id_hecho': np.arange(primer_id, primer_id + k).astype(str),
+        'provincia_nombre': nombre_provincia,
+        'localidad_nombre': np.char.add('Localidad ', (localidad + 1).astype(str)).astype(object),
+        'anio': fecha.year.astype(str),
+        'mes': fecha.month.astype(str),
+        'fecha_hecho': fecha_texto,
+        'latitud': np.where(np.isnan(latitud), '', np.round(latitud, 6).astype(str)).astype(object),
+        'longitud': np.where(np.isnan(longitud), '', np.round(longitud, 6).astype(str)).astype(object),
+        'tipo_lugar': tipo_lugar,
+        'modo_produccion_hecho': _elegir(rng, MODOS_PRODUCCION, k),
+        'inculpado_vehiculo': _elegir(rng, VEHICULOS_INCULPADO, k),
+        'federal': np.where(rng.random(k) < 0.9, '1', '0').astype(object),
+        'provincia_id': codigo_provincia,
+        'departamento_id': np.char.add(codigo_provincia.astype(str), np.char.zfill((departamento * 7 + 7).astype(str), 3)).astype(object),
+        'departamento_nombre': np.char.add('Departamento ', (departamento + 1).astype(str)).astype(object),
+        'localidad_id': np.char.add(codigo_provincia.astype(str), np.char.zfill((localidad * 10 + 10).astype(str), 6)).astype(object),
+        'hora_hecho': hora_texto,
+        'calle_nombre': calles.elegir(rng, tipo_lugar),
+        'calle_altura': np.where(rng.random(k) < 0.45, rng.integers(1, 9000, k).astype(str), '').astype(object),
+        'clima_condicion': _elegir(rng, CLIMAS, k),
+        'inculpado_sexo': _elegir(rng, SEXOS, k),
+    })
+    desconocida = nombre_provincia == 'Desconocido'
+    hecho.loc[desconocida, ['provincia_id', 'departamento_id', 'localidad_id']] = ''
+    hecho['inculpado_tr_edad'], hecho['inculpado_18_años_o_mas'] = _edades(rng, k)
+
+    # --- Una fila por víctima ---
+    filas_df = hecho.iloc[np.repeat(np.arange(k), victimas)].iloc[:filas].reset_index(drop=True)
+    filas_df['victima_tr_edad'], filas_df['victima_18_años_o_mas'] = _edades(rng, filas)
+    filas_df['victima_sexo'] = _elegir(rng, SEXOS, filas)
+    filas_df['victima_vehiculo'] = _elegir(rng, VEHICULOS_VICTIMA, filas)
+    filas_df['tipo_persona'] = 'Víctima'
+    filas_df['tipo_persona_id'] = '1'
+    return filas_df.reindex(columns=COLUMNAS, fill_value='')
+
+
+def generar(filas: int, semilla: int = 0, filas_por_bloque: int = FILAS_POR_BLOQUE) -> Iterator[pd.DataFrame]:
+    """Bloques de hasta filas_por_bloque víctimas (ids consecutivos entre bloques), `filas` en total."""
+    rng = np.random.default_rng(semilla)
+    calles = _Calles(rng)
+    primer_id = 1
+    restantes = filas
+    while restantes > 0:
+        bloque = generar_bloque(rng, min(restantes, filas_por_bloque), primer_id, calles)
+        primer_id = int(bloque['id_hecho'].iloc[-1]) + 1
+        restantes -= len(bloque)
+        yield bloque
+
+
+def escribir_csv(ruta: str, filas: int, semilla: int = 0, filas_por_bloque: int = FILAS_POR_BLOQUE) -> str:
+    """Genera `filas` víctimas en `ruta` (CSV ';' con encabezado); escribe a un temporal y lo renombra."""
+    os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+    temporal = f"{ruta}.tmp"
+    with open(temporal, "w", encoding="utf-8", newline="") as archivo:
+        for i, bloque in enumerate(generar(filas, semilla, filas_por_bloque)):
+            bloque.to_csv(archivo, sep=SEPARADOR_CSV, index=False, header=(i == 0))
+    os.replace(temporal, ruta)
+    return ruta
+
+
+def obtener_dataset(filas: int, semilla: int = 0, directorio: str = DATOS_DIR) -> str:
+    """Ruta del dataset sintético de ese tamaño y semilla; lo genera si todavía no existe."""
+    ruta = ruta_dataset(filas, semilla, directorio)
+    if not os.path.exists(ruta):
+        escribir_csv(ruta, filas, semilla)
+    return ruta
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", nargs="+", default=["10k"], help="cantidades de filas (admite k y M: 10k 1M 10M)")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--salida", default=DATOS_DIR, help="directorio de salida")
+    args = parser.parse_args()
+
+    for cantidad in args.filas:
+        filas = leer_cantidad(cantidad)
+        ruta = ruta_dataset(filas, args.semilla, args.salida)
+        inicio = time.perf_counter()
+        escribir_csv(ruta, filas, args.semilla)
+        print(f"{filas:>12,} filas  {os.path.getsize(ruta) / 1_048_576:>9.1f} MB  {time.perf_counter() - inicio:>7.1f} s  {ruta}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark de los motores de predicción de calles (bosque aleatorio vs frecuencias jerárquicas).
+Mide, sobre la misma división entrenamiento / prueba que usa la app:
+- tiempo de ajuste, tamaño serializado y memoria del modelo
+- latencia de predicción de una fila y por fila en lote
+- precisión top-1, top-5 y log loss
+
+Uso (desde S.A.S.V/):
+    python benchmarks/motores_prediccion.py [--repeticiones 200]
+Los resultados se imprimen y se guardan en benchmarks/resultados/motores_prediccion.json.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.data_loader import cargar_datos
+from app.evaluacion_modelos import evaluar
+from app.prediccion_ml import (
+    MOTORES, N_JOBS, _dividir, _preparar_datos_entrenamiento, construir_estimador, hiperparametros_de
+)
+
+RESULTADOS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resultados")
+
+
+def medir_motor(motor: str, X_train, X_test, y_train, y_test, repeticiones: int) -> dict:
+    hiperparametros = hiperparametros_de(motor)
+    modelo = construir_estimador(hiperparametros, n_jobs=N_JOBS)
+
+    inicio = time.perf_counter()
+    modelo.fit(X_train, y_train)
+    segundos_ajuste = time.perf_counter() - inicio
+
+    return {
+        'motor': motor,
+        'hiperparametros': hiperparametros,
+        'segundos_ajuste': segundos_ajuste,
+        **evaluar(modelo, X_test, y_test, repeticiones),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=200, help="predicciones de una fila a cronometrar")
+    args = parser.parse_args()
+
+    df = cargar_datos()
+    hiperparametros = hiperparametros_de()
+    datos = _preparar_datos_entrenamiento(df, hiperparametros['min_incidentes_calle'])
+    if datos is None:
+        sys.exit("No hay datos suficientes para entrenar.")
+    X_train, X_test, y_train, y_test = _dividir(*datos, hiperparametros)
+
+    resultados = [medir_motor(motor, X_train, X_test, y_train, y_test, args.repeticiones) for motor in MOTORES.values()]
+
+    print(f"{'Motor':<12}{'Ajuste (s)':>12}{'Disco (MB)':>12}{'Memoria (MB)':>14}{'1 fila (ms)':>13}{'Lote (µs/f)':>13}"
+          f"{'Top-1':>8}{'Top-5':>8}{'Log loss':>10}")
+    for r in resultados:
+        print(f"{r['motor']:<12}{r['segundos_ajuste']:>12.3f}{r['bytes_serializado'] / 1_048_576:>12.2f}"
+              f"{r['bytes_memoria'] / 1_048_576:>14.2f}{r['latencia_fila_ms']:>13.2f}{r['latencia_lote_us']:>13.1f}"
+              f"{r['top1']:>8.2%}{r['top5']:>8.2%}{r['log_loss']:>10.3f}")
+
+    os.makedirs(RESULTADOS_DIR, exist_ok=True)
+    ruta = os.path.join(RESULTADOS_DIR, "motores_prediccion.json")
+    with open(ruta, "w", encoding="utf-8") as archivo:
+        json.dump({
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'version_datos': df.attrs.get('version'),
+            'n_entrenamiento': len(X_train),
+            'n_prueba': len(X_test),
+            'resultados': resultados,
+        }, archivo, ensure_ascii=False, indent=2, default=str)
+    print(f"\nResultados guardados en {ruta}")
+
+
+if __name__ == "__main__":
+    main()
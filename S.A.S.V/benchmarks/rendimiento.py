@@ -0,0 +1,314 @@
+"""
+Suite de rendimiento sobre datos sintéticos (benchmarks/generar_datos.py) de varios tamaños.
+Para cada tamaño, en un proceso nuevo (memoria y cachés independientes), mide:
+- carga: lectura del CSV y limpieza (app.data_loader.preparar_datos)
+- índices: bitmaps de filtros y tabla de incidentes
+- el cálculo de cada vista (app.calculos y los módulos de cálculo que usan las vistas), en
+  víctimas y en incidentes, en frío y en una segunda llamada (con las cachés ya armadas)
+- mapa de calor: cantidad de puntos y tamaño del payload JSON que recibe el navegador
+- modelo de calles: features, ajuste de cada motor y latencia de predicción (una fila y lote).
+  Los árboles del bosque guardan, en cada nodo, una fila de probabilidades por calle: su memoria
+  crece con filas x calles. Si la estimación supera --memoria-bosque-mb, el bosque no se ajusta y
+  el resultado lo indica (con la estimación) en lugar de cortar la corrida por falta de memoria.
+Cada paso informa segundos y pico de memoria; cada tamaño, además, el máximo de memoria residente
+del proceso. El pico se mide por defecto como el aumento de la memoria residente máxima durante el
+paso (/proc, sin costo; incluye lo que reservan numpy y las extensiones en C). --memoria tracemalloc
+mide solo las reservas de Python y suma memoria y tiempo por cada objeto (caro con millones de
+filas); --memoria no, solo tiempos.
+
+Uso (desde S.A.S.V/):
+    python benchmarks/rendimiento.py [--filas 10k 1M] [--semilla 0] [--max-filas-modelo 50000]
+                                     [--memoria-bosque-mb 2048] [--sin-modelo] [--memoria rss|tracemalloc|no]
+                                     [--comparar RESULTADO.json]
+Los datasets que falten se generan en benchmarks/datos. Los resultados se imprimen y se guardan
+en benchmarks/resultados/rendimiento_<fecha>.json; con --comparar se muestra la relación de
+tiempos contra una corrida anterior.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(RAIZ)
+
+from benchmarks.generar_datos import leer_cantidad, obtener_dataset
+
+RESULTADOS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resultados")
+UNIDADES = ("victimas", "incidentes")
+MEMORIA_BOSQUE_MB = 2048
+COLUMNAS_GRAFICOS = ('tipo_lugar', 'victima_vehiculo', 'inculpado_vehiculo', 'modo_produccion_hecho')
+
+
+ESTADO_PROCESO = "/proc/self/status"
+REINICIO_PICO = "/proc/self/clear_refs"
+
+
+def _rss_pico_kb() -> int:
+    """VmHWM: máximo de memoria residente del proceso (KB)."""
+    with open(ESTADO_PROCESO) as archivo:
+        for linea in archivo:
+            if linea.startswith("VmHWM:"):
+                return int(linea.split()[1])
+    raise OSError("VmHWM no disponible")
+
+
+def _reiniciar_rss_pico() -> int:
+    """Lleva VmHWM a la memoria residente actual (Linux >= 4.0) y la devuelve."""
+    with open(REINICIO_PICO, "w") as archivo:
+        archivo.write("5")
+    return _rss_pico_kb()
+
+
+def rss_disponible() -> bool:
+    try:
+        _reiniciar_rss_pico()
+        return True
+    except OSError:
+        return False
+
+
+class Medidor:
+    """
+    Registra segundos y pico de memoria (MB) de cada paso.
+    - memoria: "rss" (aumento del máximo residente), "tracemalloc" (reservas de Python) o "no"
+    """
+
+    def __init__(self, memoria: str = "rss"):
+        self.memoria = memoria
+        self.pasos: List[Dict[str, Any]] = []
+
+    def medir(self, nombre: str, funcion: Callable, *args, repetir: bool = False, **extra) -> Any:
+        """Ejecuta funcion(*args); con repetir=True la repite (segunda llamada, con las cachés ya armadas)."""
+        if self.memoria == "tracemalloc":
+            tracemalloc.start()
+        elif self.memoria == "rss":
+            base = _reiniciar_rss_pico()
+        inicio = time.perf_counter()
+        resultado = funcion(*args)
+        segundos = time.perf_counter() - inicio
+        paso = {'paso': nombre, 'segundos': segundos, **extra}
+        if self.memoria == "tracemalloc":
+            paso['pico_mb'] = tracemalloc.get_traced_memory()[1] / 1_048_576
+            tracemalloc.stop()
+        elif self.memoria == "rss":
+            # Los contadores de RSS del kernel son aproximados: una diferencia mínima puede dar negativa
+            paso['pico_mb'] = max(_rss_pico_kb() - base, 0) / 1024
+        if repetir:
+            inicio = time.perf_counter()
+            funcion(*args)
+            paso['segundos_repetido'] = time.perf_counter() - inicio
+        self.pasos.append(paso)
+        return resultado
+
+
+def _vistas(medidor: Medidor, df, unidad: str):
+    """El cálculo que hace cada vista al abrirse, con los argumentos por defecto de su interfaz."""
+    from app import calculos
+    from app.explorador import ordenar_posiciones
+    from app.indice_filtros import obtener_indice_filtros
+    from app.pronosticos import obtener_pronosticos
+
+    # La provincia con más filas, sin pasar por las cachés que se miden
+    provincia = df['provincia_nombre'].value_counts().index[0]
+    medidor.medir(f"mapa_interactivo[{unidad}]", calculos.marcadores_provincias, df, unidad, repetir=True)
+    puntos = medidor.medir(f"mapa_calor[{unidad}]", calculos.puntos_mapa_calor, df, unidad, repetir=True)
+    # Lo que HeatMap incrusta en la página: la lista de [lat, lon]
+    payload = len(json.dumps(puntos.tolist()).encode('utf-8'))
+    medidor.pasos[-1].update(puntos=len(puntos), payload_mb=payload / 1_048_576)
+
+    medidor.medir(f"estadisticas[{unidad}]", calculos.estadisticas_provincia, df, provincia, unidad, repetir=True)
+    medidor.medir(f"comparativo[{unidad}]", calculos.comparativo_provincias, df, unidad, repetir=True)
+
+    def graficos():
+        for columna in COLUMNAS_GRAFICOS:
+            conteos = calculos.conteos_categoria(df, columna, unidad)
+            calculos.top_total(conteos)
+            calculos.top_provincia(conteos, provincia)
+    medidor.medir(f"graficos[{unidad}]", graficos, repetir=True)
+
+    def patrones():
+        calculos.patron_semanal(df, unidad)
+        serie = calculos.serie_diaria(df, unidad, ventanas=[7, 30])
+        calculos.promedios_feriados(serie['diario'])
+    medidor.medir(f"patrones_temporales[{unidad}]", patrones, repetir=True)
+    medidor.medir(f"pronosticos[{unidad}]", obtener_pronosticos, df, unidad, repetir=True)
+
+    if unidad == "victimas":
+        def explorador():
+            posiciones = obtener_indice_filtros(df).filtrar(provincias=[provincia])
+            return ordenar_posiciones(df, posiciones, ('fecha',), False)
+        medidor.medir("explorador", explorador, repetir=True)
+
+
+def memoria_bosque_mb(hiperparametros: Dict[str, Any], filas: int, clases: int) -> float:
+    """
+    Cota de la memoria del bosque ajustado: árboles sin límite de profundidad tienen hasta
+    2 * filas nodos, y cada nodo guarda un float64 por clase (tree_.value).
+    """
+    return hiperparametros['n_estimators'] * 2 * filas * clases * 8 / 1_048_576
+
+
+def _modelo(medidor: Medidor, df, max_filas: int, repeticiones: int, memoria_bosque: float) -> Dict[str, Any]:
+    from app.almacen_features import features_de
+    from app.evaluacion_modelos import evaluar
+    from app.prediccion_ml import MOTORES, N_JOBS, _dividir, _seleccionar, construir_estimador, hiperparametros_de
+
+    features = medidor.medir("features", features_de, df)
+    hiperparametros = hiperparametros_de()
+    datos = _seleccionar(features, hiperparametros['min_incidentes_calle'])
+    if datos is None:
+        return {'error': "No hay datos suficientes para entrenar."}
+    X, y = datos
+    if len(X) > max_filas:
+        muestra = X.sample(max_filas, random_state=0).index
+        X, y = X.loc[muestra], y.loc[muestra]
+        # Calles que quedaron con un solo caso: la división estratificada las necesita de a dos
+        frecuentes = y.map(y.value_counts()) > 1
+        X, y = X[frecuentes], y[frecuentes]
+    X_train, X_test, y_train, y_test = _dividir(X, y, hiperparametros)
+
+    motores = {}
+    for motor in MOTORES.values():
+        hiperparametros_motor = hiperparametros_de(motor)
+        if motor == "bosque":
+            estimado = memoria_bosque_mb(hiperparametros_motor, len(X_train), y_train.nunique())
+            if estimado > memoria_bosque:
+                motores[motor] = {'omitido': f"memoria estimada {estimado:,.0f} MB > {memoria_bosque:,.0f} MB"}
+                continue
+        modelo = construir_estimador(hiperparametros_motor, n_jobs=N_JOBS)
+        medidor.medir(f"ajuste[{motor}]", modelo.fit, X_train, y_train)
+        motores[motor] = evaluar(modelo, X_test, y_test, repeticiones)
+    return {'n_entrenamiento': len(X_train), 'n_prueba': len(X_test), 'calles': int(y.nunique()), 'motores': motores}
+
+
+def medir_tamanio(filas: int, semilla: int, memoria: str, modelo: bool, max_filas_modelo: int, repeticiones: int,
+                  memoria_bosque: float = MEMORIA_BOSQUE_MB) -> Dict[str, Any]:
+    """Todas las mediciones de un tamaño; pensada para correr en un proceso propio."""
+    import pandas as pd
+    from app.data_loader import preparar_datos
+    from app.incidentes import obtener_modelo_incidentes
+    from app.indice_filtros import obtener_indice_filtros
+
+    inicio = time.perf_counter()
+    ruta = obtener_dataset(filas, semilla)
+    generacion = time.perf_counter() - inicio
+
+    medidor = Medidor(memoria)
+    crudo = medidor.medir("lectura_csv", lambda: pd.read_csv(ruta, sep=";", encoding="utf-8", low_memory=False))
+    df = medidor.medir("limpieza", preparar_datos, crudo)
+    del crudo
+    version = f"sintetico-{filas}-s{semilla}"
+    df.attrs.update({"version": version, "version_base": version, "filas_base": len(df)})
+
+    medidor.medir("indice_filtros", obtener_indice_filtros, df)
+    medidor.medir("modelo_incidentes", obtener_modelo_incidentes, df)
+    for unidad in UNIDADES:
+        _vistas(medidor, df, unidad)
+
+    resultado = {
+        'filas': filas,
+        'filas_limpias': len(df),
+        'incidentes': int(df['id_hecho'].nunique()),
+        'segundos_generacion': generacion,
+        'pasos': medidor.pasos,
+    }
+    if modelo:
+        resultado['modelo'] = _modelo(medidor, df, max_filas_modelo, repeticiones, memoria_bosque)
+    resultado['rss_max_mb'] = _rss_max_mb()
+    return resultado
+
+
+def _rss_max_mb() -> Optional[float]:
+    """Máximo residente de todo el proceso (MB); None donde no hay módulo resource (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss: KB en Linux, bytes en macOS (no lo afecta el reinicio de VmHWM)
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1_048_576 if sys.platform == "darwin" else 1024)
+
+
+def _mb(valor: Optional[float]) -> str:
+    return "no disponible" if valor is None else f"{valor:.0f} MB"
+
+
+def _imprimir(resultado: Dict[str, Any], anterior: Optional[Dict[str, Any]]):
+    previos = {p['paso']: p for p in (anterior or {}).get('pasos', [])}
+    print(f"\n=== {resultado['filas']:,} filas ({resultado['filas_limpias']:,} limpias, "
+          f"{resultado['incidentes']:,} incidentes) — memoria residente máx. {_mb(resultado['rss_max_mb'])}")
+    print(f"{'Paso':<34}{'Frío (s)':>10}{'2ª vez (ms)':>12}{'Pico (MB)':>11}{'vs. anterior':>14}  Detalle")
+    for paso in resultado['pasos']:
+        repetido = f"{paso['segundos_repetido'] * 1e3:.2f}" if 'segundos_repetido' in paso else '-'
+        pico = f"{paso['pico_mb']:.1f}" if 'pico_mb' in paso else '-'
+        previo = previos.get(paso['paso'])
+        relacion = f"x{paso['segundos'] / previo['segundos']:.2f}" if previo and previo['segundos'] > 0 else '-'
+        detalle = f"{paso['puntos']:,} puntos, {paso['payload_mb']:.1f} MB JSON" if 'payload_mb' in paso else ''
+        print(f"{paso['paso']:<34}{paso['segundos']:>10.3f}{repetido:>12}{pico:>11}{relacion:>14}  {detalle}")
+    for motor, metricas in resultado.get('modelo', {}).get('motores', {}).items():
+        if 'omitido' in metricas:
+            print(f"predicción[{motor}]: omitido ({metricas['omitido']})")
+            continue
+        print(f"predicción[{motor}]: {metricas['latencia_fila_ms']:.2f} ms por fila, "
+              f"{metricas['latencia_lote_us']:.1f} µs/fila en lote, top-5 {metricas['top5']:.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", nargs="+", default=["10k", "1M"], help="tamaños (admite k y M: 10k 1M 10M)")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--max-filas-modelo", type=int, default=50_000, help="filas (muestra) para ajustar los modelos")
+    parser.add_argument("--repeticiones", type=int, default=30, help="predicciones de una fila a cronometrar")
+    parser.add_argument("--memoria-bosque-mb", type=float, default=MEMORIA_BOSQUE_MB,
+                        help="no ajustar el bosque si su memoria estimada supera este valor")
+    parser.add_argument("--sin-modelo", action="store_true", help="no medir el modelo de calles")
+    parser.add_argument("--memoria", choices=("rss", "tracemalloc", "no"), default="rss",
+                        help="cómo medir el pico de memoria de cada paso (rss solo en Linux)")
+    parser.add_argument("--comparar", help="resultado JSON anterior contra el que comparar tiempos")
+    args = parser.parse_args()
+    if args.memoria == "rss" and not rss_disponible():
+        print("Aviso: sin /proc/self/clear_refs; se mide la memoria con tracemalloc.")
+        args.memoria = "tracemalloc"
+
+    anteriores = {}
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            anteriores = {r['filas']: r for r in json.load(archivo)['resultados']}
+
+    resultados = []
+    contexto = multiprocessing.get_context("spawn")
+    for cantidad in args.filas:
+        filas = leer_cantidad(cantidad)
+        with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as pool:
+            resultado = pool.submit(
+                medir_tamanio, filas, args.semilla, args.memoria, not args.sin_modelo,
+                args.max_filas_modelo, args.repeticiones, args.memoria_bosque_mb
+            ).result()
+        _imprimir(resultado, anteriores.get(filas))
+        resultados.append(resultado)
+
+    os.makedirs(RESULTADOS_DIR, exist_ok=True)
+    fecha = datetime.now()
+    ruta = os.path.join(RESULTADOS_DIR, f"rendimiento_{fecha:%Y%m%d-%H%M%S}.json")
+    with open(ruta, "w", encoding="utf-8") as archivo:
+        json.dump({
+            'fecha': fecha.isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'cpus': os.cpu_count(),
+            'semilla': args.semilla,
+            'memoria': args.memoria,
+            'resultados': resultados,
+        }, archivo, ensure_ascii=False, indent=2, default=str)
+    print(f"\nResultados guardados en {ruta}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Informe de tiempos de importación (como python -X importtime) del arranque y de cada vista.
+- arranque: `import main` en un intérprete nuevo (lo que paga cada proceso antes de dibujar nada)
+- cada vista de app.vistas: lo que agrega importar su módulo después del arranque
+Para cada medición se listan los módulos con más tiempo propio. Si el arranque importa alguna
+dependencia pesada (PESADOS_ARRANQUE) o supera --limite-arranque-ms, termina con código 1:
+sirve para detectar regresiones (una vista importada otra vez desde main.py, por ejemplo).
+
+Uso (desde S.A.S.V/):
+    python benchmarks/tiempos_importacion.py [--repeticiones 3] [--top 10] [--limite-arranque-ms 2500]
+Los resultados se imprimen y se guardan en benchmarks/resultados/tiempos_importacion.json.
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(RAIZ)
+
+from app.vistas import VISTAS
+
+RESULTADOS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resultados")
+
+# Paquetes que solo deben cargarse al abrir la vista que los usa
+PESADOS_ARRANQUE = ("sklearn", "scipy", "folium", "streamlit_folium", "plotly.express", "PIL")
+
+
+def _parsear(salida: str) -> List[Dict[str, Any]]:
+    """Líneas de -X importtime en orden: módulo, nivel de anidamiento y microsegundos propios / acumulados."""
+    entradas = []
+    for linea in salida.splitlines():
+        if not linea.startswith("import time:") or "[us]" in linea:
+            continue
+        propio, acumulado, nombre = linea[len("import time:"):].split("|")
+        entradas.append({
+            'modulo': nombre.strip(),
+            'nivel': (len(nombre) - len(nombre.lstrip()) - 1) // 2,
+            'propio_us': int(propio),
+            'acumulado_us': int(acumulado),
+        })
+    return entradas
+
+
+def medir(codigo: str, desde: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Importaciones de `codigo` en un intérprete nuevo. Con `desde`, solo las que ocurren después
+    de importar ese módulo (lo que agrega una vista al arranque).
+    """
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        cwd=RAIZ, capture_output=True, text=True, env={**os.environ, "PYTHONPATH": RAIZ}
+    )
+    if proceso.returncode != 0:
+        raise RuntimeError(f"Falló {codigo!r}:\n{proceso.stderr[-2000:]}")
+    entradas = _parsear(proceso.stderr)
+    if desde is not None:
+        # importtime escribe cada módulo al terminar de importarlo: el de nivel 0 cierra su bloque
+        fin = next(i for i, e in enumerate(entradas) if e['nivel'] == 0 and e['modulo'] == desde)
+        entradas = entradas[fin + 1:]
+    return entradas
+
+
+def resumir(entradas: List[Dict[str, Any]], top: int) -> Dict[str, Any]:
+    modulos = {e['modulo'] for e in entradas}
+    return {
+        'total_ms': sum(e['acumulado_us'] for e in entradas if e['nivel'] == 0) / 1000,
+        'modulos': len(entradas),
+        'pesados': sorted(p for p in PESADOS_ARRANQUE if p in modulos),
+        'top': [
+            {'modulo': e['modulo'], 'propio_ms': e['propio_us'] / 1000, 'acumulado_ms': e['acumulado_us'] / 1000}
+            for e in sorted(entradas, key=lambda e: e['propio_us'], reverse=True)[:top]
+        ],
+    }
+
+
+def medir_mejor(codigo: str, repeticiones: int, top: int, desde: Optional[str] = None) -> Dict[str, Any]:
+    """La repetición más rápida (la menos afectada por el resto de la máquina)."""
+    return min((resumir(medir(codigo, desde), top) for _ in range(repeticiones)), key=lambda r: r['total_ms'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=3, help="mediciones por módulo (se toma la más rápida)")
+    parser.add_argument("--top", type=int, default=10, help="módulos con más tiempo propio a listar")
+    parser.add_argument("--limite-arranque-ms", type=float, default=2500, help="tiempo máximo aceptado para el arranque")
+    args = parser.parse_args()
+
+    arranque = medir_mejor("import main", args.repeticiones, args.top)
+    vistas = {}
+    for modulo in dict.fromkeys(modulo for modulo, _, _ in VISTAS.values()):
+        vistas[modulo] = medir_mejor(f"import main; import {modulo}", args.repeticiones, args.top, desde="main")
+
+    print(f"Arranque (import main): {arranque['total_ms']:.0f} ms, {arranque['modulos']} módulos")
+    for entrada in arranque['top']:
+        print(f"  {entrada['propio_ms']:>8.1f} ms propio {entrada['acumulado_ms']:>9.1f} ms acumulado  {entrada['modulo']}")
+    print(f"\n{'Vista (módulo)':<32}{'ms':>9}{'Módulos':>9}  Más lento (propio)")
+    for modulo, resumen in sorted(vistas.items(), key=lambda par: -par[1]['total_ms']):
+        lento = resumen['top'][0]['modulo'] if resumen['top'] else '-'
+        print(f"{modulo:<32}{resumen['total_ms']:>9.0f}{resumen['modulos']:>9}  {lento}")
+
+    problemas = []
+    if arranque['pesados']:
+        problemas.append(f"el arranque importa {', '.join(arranque['pesados'])}")
+    if arranque['total_ms'] > args.limite_arranque_ms:
+        problemas.append(f"el arranque tarda {arranque['total_ms']:.0f} ms (límite {args.limite_arranque_ms:.0f} ms)")
+
+    os.makedirs(RESULTADOS_DIR, exist_ok=True)
+    ruta = os.path.join(RESULTADOS_DIR, "tiempos_importacion.json")
+    with open(ruta, "w", encoding="utf-8") as archivo:
+        json.dump({
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'arranque': arranque,
+            'vistas': vistas,
+            'problemas': problemas,
+        }, archivo, ensure_ascii=False, indent=2)
+    print(f"\nResultados guardados en {ruta}")
+
+    for problema in problemas:
+        print(f"❌ Regresión: {problema}")
+    sys.exit(1 if problemas else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,23 +4,15 @@ Punto de entrada de la app Streamlit.
 
 import streamlit as st
 import sys, os
-from PIL import Image 
-from pathlib import Path
 sys.path.append(os.path.dirname(__file__))
 
-from app.data_loader import cargar_datos
-from app.mapa import crear_mapa_argentina_interactivo, crear_mapa_de_calor
-from app.estadisticas import mostrar_estadisticas_detalladas
-from app.comparativo import mostrar_analisis_comparativo
-from app.registro_nuevo_incidente import mostrar_formulario_registro
-from app.prediccion_ml import mostrar_interfaz_prediccion
-from app.graficos import (
-    crear_graficos_tipo_lugar,
-    crear_graficos_victima_vehiculo,
-    crear_graficos_inculpado_vehiculo,
-    crear_graficos_modo_produccion_hecho
-)
-from streamlit_folium import st_folium
+# Solo lo necesario para el arranque: cada vista (y sus dependencias pesadas) se importa al abrirla (app.vistas)
+from app.cambios import datos_en_vivo
+from app.exportacion import barrer_exportaciones
+from app.incidentes import UNIDADES_CONTEO
+from app.instrumentacion import ejecucion, etiquetar_ejecucion, mostrar_panel
+from app.precalentamiento import iniciar_precalentamiento
+from app.vistas import VISTAS, mostrar_vista
 
 # --- Estilos CSS personalizados ---
 st.markdown("""
@@ -268,116 +260,42 @@ def main():
         <h3 style="color: #ffc107; margin-bottom: 10px;">📂 Panel de análisis</h3>
         """, unsafe_allow_html=True)
 
-    # --- Cargar los datos ---
-    
-    with st.spinner("🔄 Cargando datos de muertes viales..."):
-        df = cargar_datos()
-
-    # Si hubo error al cargar los datos, detener ejecución
-    if df is None:
-        st.error("❌ No se pudieron cargar los datos. Verifica que el archivo CSV esté en `data/MUERTES_VIALES.csv`.")
-        return
-
-    # --- Menú principal ---
-    menu_items = {
-        "🗺️ Mapa Interactivo": "mapa",
-        "🔥 Mapa de Calor": "calor",
-        "📊 Estadísticas por Provincia": "estadisticas",
-        "📈 Análisis Comparativo": "comparativo",
-        "🔍 Explorador de Datos": "explorador",
-        "🛣️ Análisis por Tipo de Lugar": "tipo_lugar",
-        "🚗 Vehículo de la Víctima": "victima",
-        "🚙 Vehículo del Inculpado": "inculpado",
-        "🚨 Modo de Producción del Hecho": "modo",
-        "➕ Registrar nuevo incidente": "registro",
-        "🔮 Módulo de Predicción": "prediccion"
-    }
-
-    opcion = st.sidebar.radio("Selecciona una opción:", list(menu_items.keys()))
-
-    # --- Navegación entre opciones ---
-    if opcion == "🗺️ Mapa Interactivo":
-        st.markdown("### 📊 Leyenda del Mapa")
-        col1, col2, col3, col4 = st.columns(4)
-        with col1: st.markdown("🔴 **Rojo**: > 5,000 muertes")
-        with col2: st.markdown("🟠 **Naranja**: 2,000 - 5,000 muertes")
-        with col3: st.markdown("🟡 **Amarillo**: 500 - 2,000 muertes")
-        with col4: st.markdown("🟢 **Verde**: < 500 muertes")
-
-        st.markdown("---")
-        st.markdown("### 🗺️ Mapa Interactivo de Argentina")
-        st.markdown("**Haz clic en los círculos de colores para ver información detallada de cada provincia.**")
-
-        mapa = crear_mapa_argentina_interactivo(df)
-        st_folium(mapa, width=800, height=600)
-
-    elif opcion == "🔥 Mapa de Calor":
-        crear_mapa_de_calor(df)
-
-    elif opcion == "📊 Estadísticas por Provincia":
-        provincias = sorted(df['provincia_nombre'].unique())
-        provincia_seleccionada = st.selectbox(
-            "Selecciona una provincia para ver estadísticas detalladas:",
-            provincias
-        )
-        mostrar_estadisticas_detalladas(df, provincia_seleccionada)
-
-    elif opcion == "📈 Análisis Comparativo":
-        mostrar_analisis_comparativo(df)
-
-    elif opcion == "🔍 Explorador de Datos":
-        col1, col2 = st.columns(2)
-
-        with col1:
-            anio_min = int(df['anio'].dropna().min())
-            anio_max = int(df['anio'].dropna().max())
-            anio_seleccionado = st.slider(
-                "Año:",
-                min_value=anio_min,
-                max_value=anio_max,
-                value=(anio_min, anio_max)
-            )
-        with col2:
-            provincias_seleccionadas = st.multiselect(
-                "Provincias:",
-                options=sorted(df['provincia_nombre'].unique()),
-                default=sorted(df['provincia_nombre'].unique())[:5]
-            )
-
-        df_filtrado = df[
-            (df['anio'].between(anio_seleccionado[0], anio_seleccionado[1])) &
-            (df['provincia_nombre'].isin(provincias_seleccionadas))
-        ]
-
-        st.markdown(f"#### 📊 Datos Filtrados: {len(df_filtrado):,} registros")
-        st.dataframe(df_filtrado.head(100), use_container_width=True)
-
-        # Botón de descarga
-        csv = df_filtrado.to_csv(index=False)
-        st.download_button(
-            label="📥 Descargar datos filtrados (CSV)",
-            data=csv,
-            file_name=f"muertes_viales_filtrado_{anio_seleccionado[0]}_{anio_seleccionado[1]}.csv",
-            mime="text/csv"
-        )
-
-    elif opcion == "🛣️ Análisis por Tipo de Lugar":
-        crear_graficos_tipo_lugar(df)
-
-    elif opcion == "🚗 Vehículo de la Víctima":
-        crear_graficos_victima_vehiculo(df)
-
-    elif opcion == "🚙 Vehículo del Inculpado":
-        crear_graficos_inculpado_vehiculo(df)
-
-    elif opcion == "🚨 Modo de Producción del Hecho":
-        crear_graficos_modo_produccion_hecho(df)
-
-    elif opcion == "➕ Registrar nuevo incidente":
-        mostrar_formulario_registro()
-
-    elif opcion == "🔮 Módulo de Predicción":
-        mostrar_interfaz_prediccion(df)
+    # --- Instrumentación del rerun (SASV_INSTRUMENTACION=1; panel oculto con ?admin=1) ---
+    with ejecucion() as rerun:
+        # --- Precalentamiento de cachés (una vez por proceso, en segundo plano) ---
+        precalentamiento = iniciar_precalentamiento()
+        # --- Exportaciones temporales abandonadas por procesos anteriores (una vez por proceso) ---
+        barrer_exportaciones()
+        if not precalentamiento.listo:
+            listos = sum(paso['estado'] in ('listo', 'error') for paso in precalentamiento.pasos.values())
+            st.sidebar.caption(f"⏳ Preparando cachés: {listos}/{len(precalentamiento.pasos)} pasos listos")
+
+        # --- Cargar los datos ---
+        # Carga completa una vez por proceso; las altas de cualquier sesión se suman en vivo (app.cambios)
+        with st.spinner("🔄 Cargando datos de muertes viales..."):
+            df = datos_en_vivo()
+
+        # Si hubo error al cargar los datos, detener ejecución
+        if df is None:
+            st.error("❌ No se pudieron cargar los datos. Verifica que el archivo CSV esté en `data/MUERTES_VIALES.csv`.")
+            return
+
+        # --- Menú principal ---
+        opcion = st.sidebar.radio("Selecciona una opción:", list(VISTAS.keys()))
+
+        # Unidad de conteo compartida por todas las vistas (tablas precalculadas en app.incidentes)
+        unidad = UNIDADES_CONTEO[st.sidebar.radio(
+            "Contar:",
+            list(UNIDADES_CONTEO.keys()),
+            horizontal=True,
+            help="Víctimas: una fila por persona fallecida. Incidentes: siniestros distintos (id_hecho)."
+        )]
+
+        # --- Navegación entre opciones ---
+        etiquetar_ejecucion(opcion, unidad)
+        mostrar_vista(opcion, df, unidad)
+
+    mostrar_panel(rerun)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file